@@ -37,6 +37,8 @@ if config.config_file_name is not None:
 # This dual schema management approach ensures:
 # - User authentication tables are versioned via Alembic migrations
 # - Bot conversation state tables are managed by the Bot Framework's storage system
+# The 'bot_messages' table (MessageLogStorage) has a migration for existing
+# databases but is not part of target_metadata either.
 target_metadata = UserAuthBase.metadata # Use UserAuthBase.metadata
 
 # other values from the config, defined by the needs of env.py,
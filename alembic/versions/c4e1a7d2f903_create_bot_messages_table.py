@@ -0,0 +1,43 @@
+"""create bot_messages table
+
+Revision ID: c4e1a7d2f903
+Revises: b3177e90c798
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7d2f903'
+down_revision: Union[str, None] = 'b3177e90c798'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BOT_MESSAGES_TABLE_NAME = "bot_messages"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLiteMessageLog also creates the table on startup; skip if it already did.
+    # Existing conversations are moved into the log on their next save, or in bulk
+    # with scripts/backfill_message_log.py.
+    if sa.inspect(op.get_bind()).has_table(BOT_MESSAGES_TABLE_NAME):
+        return
+    op.create_table(
+        BOT_MESSAGES_TABLE_NAME,
+        sa.Column('state_key', sa.Text(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.Text(), nullable=True, server_default=sa.text("(datetime('now'))")),
+        sa.PrimaryKeyConstraint('state_key', 'seq'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table(BOT_MESSAGES_TABLE_NAME)
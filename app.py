@@ -2,6 +2,7 @@
 """
 Main entry point for the chatbot application (Bot Framework Version).
 """
+import asyncio
 import os
 import sys
 import logging
@@ -10,6 +11,10 @@ import re
 
 from llm_interface import LLMInterface # Ensure LLMInterface is imported
 from tools.tool_executor import ToolExecutor # Keep this, it's used in the shim
+from tools._http_client import close_http_clients, http_client_metrics
+from tools._tool_offload import get_sync_tool_offload
+from core_logic.tool_selector_registry import close_tool_selector, tool_selector_metrics, warm_up_tool_selector
+from user_auth.profile_repository import close_profile_repository, profile_repository_metrics
 from core_logic import start_streaming_response, HistoryResetRequiredError # Keep this
 from core_logic.intent_classifier import IntentClassifier # Added import for IntentClassifier
 from workflows.workflow_manager import WorkflowManager # Added import for WorkflowManager
@@ -216,7 +221,8 @@ try:
         workflow_manager=WORKFLOW_MANAGER_INSTANCE, 
         tool_executor=TOOL_EXECUTOR_INSTANCE, 
         conversation_state=BOT.conversation_state, 
-        user_state=BOT.user_state                 
+        user_state=BOT.user_state,
+        turn_locks=BOT.turn_locks  # One lock manager for both handlers
     )
     logger.info("IntelligentConversationOrchestrator initialized successfully.")
 
@@ -234,6 +240,13 @@ except Exception as e:
 
 async def on_bot_startup(app: web.Application):
     """Called when the bot server has started successfully"""
+    try:
+        # Embed the tool catalog and build the similarity index before the first turn needs them
+        await asyncio.to_thread(
+            warm_up_tool_selector, APP_SETTINGS, TOOL_EXECUTOR_INSTANCE.get_available_tool_definitions()
+        )
+    except Exception as e:
+        logger.error(f"Tool selector warm-up failed; it will initialize on first use: {e}", exc_info=True)
     logger.info("=== BOT SERVER RUNNING ===")  # Matches the end trigger in formatter
 
 async def on_bot_shutdown(app: web.Application):
@@ -259,6 +272,17 @@ async def on_bot_shutdown(app: web.Application):
             logger.info("Bot storage does not have a recognized close/aclose method or is not RedisStorage.")
     else:
         logger.info("No bot storage found on BOT object or BOT.storage is None. Skipping storage cleanup.")
+    if getattr(BOT, 'turn_locks', None) is not None:
+        try:
+            await BOT.turn_locks.close()
+        except Exception as e:
+            logger.error(f"Error closing turn locks: {e}", exc_info=True)
+    # Stop accepting sync tool calls; calls already submitted still finish on their threads
+    get_sync_tool_offload().shutdown(wait=False)
+    await close_http_clients()
+    close_tool_selector()
+    # Write buffered last_active and tool metric updates before exiting
+    await close_profile_repository()
 
 async def messages(req: web.BaseRequest) -> web.Response:
     if "application/json" not in req.headers.get("Content-Type", ""):
@@ -349,8 +373,16 @@ async def healthz(req: web.BaseRequest) -> web.Response:
         # else if overall_status == "DEGRADED": http_status_code = 200 # Or 503 if degraded is severe
 
         logger.info(f"Health check completed. Overall status: {overall_status}")
+        response = {"overall_status": overall_status, "components": health_results, "version": APP_VERSION}
+        turn_locks = getattr(BOT, 'turn_locks', None)
+        if turn_locks is not None:
+            response["turn_locks"] = turn_locks.metrics()
+        response["tool_offload"] = get_sync_tool_offload().metrics()
+        response["http_clients"] = http_client_metrics()
+        response["tool_selector"] = tool_selector_metrics()
+        response["profile_repository"] = profile_repository_metrics()
         return web.json_response(
-            {"overall_status": overall_status, "components": health_results, "version": APP_VERSION},
+            response,
             status=http_status_code
         )
     except Exception as e:
@@ -0,0 +1,421 @@
+"""
+Async-native SQLite storage for Bot Framework state.
+
+Uses the same ``bot_state`` table as ``SQLiteStorage`` but keeps all blocking
+``sqlite3`` calls off the event loop:
+
+- Reads run on a small pool of worker threads, each holding its own read-only
+  connection. Under WAL they never wait for the writer.
+- Writes and deletes are queued to a single writer thread. It drains everything
+  queued while the previous commit was in flight and commits it in one
+  transaction (group commit), so concurrent turn saves share one fsync.
+- Writes are compare-and-set on the row ``version`` (see ``state_concurrency``).
+  As in ``SQLiteStorage``, only the items whose e_tag is stale are skipped:
+  the write's other items and the rest of the batch still commit, and the
+  write then fails with ``ETagConflictError`` naming the skipped keys.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from botbuilder.core import Storage
+from state_models import AppState
+
+from .state_codec import StateCodec, StateCodecError
+from .state_concurrency import ETagConflictError, expected_etag, set_etag, sqlite_compare_and_set, without_etag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_POOL_SIZE = 4
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# SQLite primary result codes worth retrying (SQLITE_BUSY, SQLITE_LOCKED);
+# extended codes are reduced to these with "& 0xFF"
+_TRANSIENT_PRIMARY_CODES = {5, 6}
+
+_STOP = object()
+
+
+def _split_key(key: Any) -> Tuple[str, str]:
+    """Map a storage key ("namespace/id" string or {'namespace', 'id'} dict) to its row key."""
+    if isinstance(key, dict) and 'namespace' in key and 'id' in key:
+        return key['namespace'], key['id']
+    if isinstance(key, str):
+        namespace, sep, id_ = key.partition('/')
+        return (namespace, id_) if sep else ("default", key)
+    raise TypeError(f"Unsupported key format: {key}. Key must be a string (namespace/id) or a dict {{'namespace': ..., 'id': ...}}.")
+
+
+def _is_transient(error: sqlite3.Error) -> bool:
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is None:
+        return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+    return (code & 0xFF) in _TRANSIENT_PRIMARY_CODES
+
+
+def _resolve(loop: asyncio.AbstractEventLoop, future: asyncio.Future, error: Optional[BaseException]) -> None:
+    """Complete an awaiting caller's future from the writer thread."""
+    def set_outcome():
+        if future.done():  # Caller was cancelled
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+    try:
+        loop.call_soon_threadsafe(set_outcome)
+    except RuntimeError:
+        logger.debug("Event loop closed before a storage write completed")
+
+
+class _WriteOp:
+    __slots__ = ("kind", "payload", "loop", "future", "rows", "versions", "conflicts")
+
+    def __init__(self, kind: str, payload: Any, loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+        self.kind = kind  # "write" or "delete"
+        self.payload = payload
+        self.loop = loop
+        self.future = future
+        self.rows: List[Tuple] = []
+        self.versions: List[Tuple[Any, int]] = []  # (item, new version) of committed writes
+        self.conflicts: List[Any] = []  # Keys whose e_tag was stale
+
+
+class AsyncSQLiteStorage(Storage):
+    """
+    Bot Framework ``Storage`` backed by SQLite, with a read pool and a
+    group-committing writer thread.
+
+    Compatible with databases written by ``SQLiteStorage``.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        read_pool_size: int = DEFAULT_READ_POOL_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_retries: int = 3,
+        codec: Optional[StateCodec] = None,
+    ):
+        """
+        Args:
+            db_path: Path to the SQLite database file
+            read_pool_size: Number of reader threads (one read-only connection each)
+            max_batch_size: Maximum number of queued writes/deletes committed together
+            max_retries: Retry attempts for a batch failing with SQLITE_BUSY/LOCKED
+            codec: Serializer for stored items (default: StateCodec())
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_retries = max_retries
+        self.codec = codec or StateCodec()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._write_conn = self._create_connection()
+        self._ensure_table(self._write_conn)
+
+        self._reader_local = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._reader_conns_lock = threading.Lock()
+        self._read_executor = ThreadPoolExecutor(max_workers=read_pool_size, thread_name_prefix="sqlite-read")
+
+        self._write_queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        self.commits = 0
+        self.committed_ops = 0
+        self.largest_batch = 0
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    # --- Connections ---
+
+    def _create_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=30.0, isolation_level=None, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA cache_size=2000")
+        return conn
+
+    def _reader_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._reader_local, "conn", None)
+        if conn is None:
+            conn = self._create_connection(read_only=True)
+            self._reader_local.conn = conn
+            with self._reader_conns_lock:
+                self._reader_conns.append(conn)
+        return conn
+
+    @staticmethod
+    def _ensure_table(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bot_state (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT,
+                created_at TEXT DEFAULT (datetime('now')),
+                updated_at TEXT DEFAULT (datetime('now')),
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (namespace, id)
+            )
+            """
+        )
+        # Tables created by older SQLiteStorage versions lack the timestamp and version columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(bot_state)")}
+        for column in ("created_at", "updated_at"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE bot_state ADD COLUMN {column} TEXT")
+                conn.execute(f"UPDATE bot_state SET {column} = datetime('now')")
+        if "version" not in columns:
+            conn.execute("ALTER TABLE bot_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    # --- Storage interface ---
+
+    async def read(self, keys: List[Any]) -> Dict[Any, Any]:
+        """Read items by key; missing or undecodable items map to None."""
+        if not keys:
+            return {}
+        row_keys: Dict[Any, Optional[Tuple[str, str]]] = {}
+        for key in keys:
+            try:
+                row_keys[self._hashable(key)] = _split_key(key)
+            except TypeError:
+                logger.warning(f"Unsupported key format during read: {key}")
+                row_keys[self._hashable(key)] = None
+
+        wanted = [row_key for row_key in row_keys.values() if row_key is not None]
+        rows = await asyncio.get_running_loop().run_in_executor(self._read_executor, self._read_rows, wanted) if wanted else {}
+        return {self._hashable(key): rows.get(row_keys[self._hashable(key)]) for key in keys}
+
+    def _read_rows(self, row_keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        conn = self._reader_connection()
+        where = " OR ".join("(namespace=? AND id=?)" for _ in row_keys)
+        params = [part for row_key in row_keys for part in row_key]
+        for attempt in range(self.max_retries + 1):
+            try:
+                rows = conn.execute(f"SELECT namespace, id, data, version FROM bot_state WHERE {where}", params).fetchall()
+                break
+            except sqlite3.Error as e:
+                if not _is_transient(e) or attempt == self.max_retries:
+                    logger.error(f"SQLite error during read: {e}")
+                    raise
+                time.sleep(0.05 * (2 ** attempt))
+        results = {}
+        for namespace, id_, data, version in rows:
+            try:
+                item = self.codec.decode(data)
+                set_etag(item, version)
+                results[(namespace, id_)] = item
+            except StateCodecError as e:
+                logger.error(f"Error decoding stored data for {namespace}/{id_}: {e}")
+                results[(namespace, id_)] = None
+        return results
+
+    async def write(self, changes: Dict[Any, Any]) -> None:
+        """Queue items for the writer thread and wait until they are committed."""
+        if not changes:
+            return
+        if isinstance(changes, list):
+            logger.warning("Deprecated list format passed to write(). Please update to use dictionary.")
+            return
+        await self._submit("write", changes)
+
+    async def delete(self, keys: List[Any]) -> None:
+        """Queue keys for deletion and wait until the deletion is committed."""
+        if not keys:
+            return
+        if not isinstance(keys, list):
+            keys = [keys]
+        await self._submit("delete", keys)
+
+    async def _submit(self, kind: str, payload: Any) -> None:
+        if self._closed:
+            raise RuntimeError("AsyncSQLiteStorage is closed")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._write_queue.put(_WriteOp(kind, payload, loop, future))
+        await future
+
+    # --- Writer thread ---
+
+    def _writer_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._write_queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Everything queued while the previous commit ran goes into this one
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[_WriteOp]) -> None:
+        ready = []
+        for op in batch:
+            try:
+                op.rows = self._rows_for(op)
+                ready.append(op)
+            except Exception as e:  # Bad key or unserializable value fails only its own caller
+                logger.error(f"Error preparing storage {op.kind}: {e}", exc_info=True)
+                _resolve(op.loop, op.future, e)
+        if not ready:
+            return
+
+        error = self._commit(ready)
+        if error is None:
+            for op in ready:
+                _resolve(op.loop, op.future, self._outcome(op))
+            return
+        if len(ready) == 1:
+            _resolve(ready[0].loop, ready[0].future, error)
+            return
+        # Find the offending op(s) without failing the rest of the batch
+        logger.warning(f"Batched commit of {len(ready)} storage ops failed ({error}); committing them one by one")
+        for op in ready:
+            _resolve(op.loop, op.future, self._commit([op]) or self._outcome(op))
+
+    @staticmethod
+    def _outcome(op: _WriteOp) -> Optional[Exception]:
+        """Hand committed versions back to the caller's items; a stale e_tag fails the op."""
+        for item, version in op.versions:
+            set_etag(item, version)
+        if op.conflicts:
+            logger.warning(f"e_tag conflict, not written: {op.conflicts}")
+            return ETagConflictError(op.conflicts)
+        return None
+
+    def _rows_for(self, op: _WriteOp) -> List[Tuple]:
+        if op.kind == "write":
+            return [
+                (key, *_split_key(key), self.codec.encode(without_etag(value)), expected_etag(value))
+                for key, value in op.payload.items()
+            ]
+        rows = []
+        for key in op.payload:
+            if not isinstance(key, dict) or 'namespace' not in key or 'id' not in key:
+                logger.warning(f"Invalid key format for delete: {key}")
+                continue
+            rows.append((key['namespace'], key['id']))
+        return rows
+
+    def _commit(self, ops: List[_WriteOp]) -> Optional[Exception]:
+        """Apply ops in one transaction. Returns the error, or None once committed."""
+        conn = self._write_conn
+        for attempt in range(self.max_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for op in ops:
+                    if op.kind == "write":
+                        self._write_rows(conn, op)
+                    elif op.rows:
+                        conn.executemany("DELETE FROM bot_state WHERE namespace=? AND id=?", op.rows)
+                conn.execute("COMMIT")
+                self.commits += 1
+                self.committed_ops += len(ops)
+                self.largest_batch = max(self.largest_batch, len(ops))
+                return None
+            except sqlite3.Error as e:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                if _is_transient(e) and attempt < self.max_retries:
+                    wait_time = 0.05 * (2 ** attempt)
+                    logger.warning(f"Transient SQLite error during commit, retrying in {wait_time:.2f}s: {e}")
+                    time.sleep(wait_time)
+                    continue
+                logger.error(f"SQLite error during commit: {e}")
+                return e
+        return None
+
+    @staticmethod
+    def _write_rows(conn: sqlite3.Connection, op: _WriteOp) -> None:
+        """Compare-and-set the op's rows; rows with a stale e_tag are skipped and recorded as conflicts."""
+        op.versions, op.conflicts = [], []
+        for key, namespace, id_, data, etag in op.rows:
+            version = sqlite_compare_and_set(conn, namespace, id_, data, etag)
+            if version is None:
+                op.conflicts.append(key)
+            else:
+                op.versions.append((op.payload[key], version))
+
+    # --- Adapter methods for ToolCallAdapter (same contract as SQLiteStorage) ---
+
+    async def get_app_state(self, session_id: str) -> Optional[AppState]:
+        """Get the AppState stored under ``session_id``, or None if missing or invalid."""
+        try:
+            state_data = (await self.read([session_id])).get(session_id)
+            if state_data is None:
+                logger.warning(f"No state found for session_id: {session_id}")
+                return None
+            return state_data if isinstance(state_data, AppState) else AppState.model_validate(state_data)
+        except Exception as e:
+            logger.error(f"Error in get_app_state for session_id {session_id}: {e}", exc_info=True)
+            return None
+
+    async def save_app_state(self, session_id: str, app_state: AppState) -> bool:
+        """Save an AppState under ``session_id``. Returns True on success."""
+        try:
+            await self.write({session_id: app_state.model_dump(mode='json')})
+            return True
+        except Exception as e:
+            logger.error(f"Error in save_app_state for session_id {session_id}: {e}", exc_info=True)
+            return False
+
+    # --- Lifecycle ---
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "commits": self.commits,
+            "committed_ops": self.committed_ops,
+            "ops_per_commit": round(self.committed_ops / self.commits, 2) if self.commits else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._write_queue.qsize(),
+        }
+
+    async def aclose(self) -> None:
+        """``close`` on a worker thread, so draining the write queue does not block the event loop."""
+        await asyncio.to_thread(self.close)
+
+    def close(self) -> None:
+        """Commit queued writes, stop the writer thread and close all connections."""
+        if self._closed:
+            return
+        self._closed = True
+        self._write_queue.put(_STOP)
+        self._writer.join()
+        self._read_executor.shutdown(wait=True)
+        with self._reader_conns_lock:
+            conns, self._reader_conns = self._reader_conns, []
+        for conn in conns + [self._write_conn]:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Error closing connection: {e}")
+
+    @staticmethod
+    def _hashable(key: Any) -> Any:
+        return (key['namespace'], key['id']) if isinstance(key, dict) else key
@@ -15,11 +15,14 @@ from workflows.workflow_manager import WorkflowManager
 from llm_interface import LLMInterface
 from tools.tool_executor import ToolExecutor
 from core_logic.history_utils import prepare_messages_for_llm_from_appstate
-from user_auth import db_manager
 from user_auth.models import UserProfile
-from user_auth.utils import get_current_user_profile, invalidate_user_profile_cache
+from user_auth.profile_repository import get_profile_repository
 from state_models import AppState, _migrate_state_if_needed, Message, TextPart
 from core_logic.constants import MAX_TOOL_CYCLES_OUTER, TOOL_CALL_ID_PREFIX
+from bot_core.streaming_reply import StreamingReplyWriter
+from bot_core.turn_lock import TurnLockManager
+from bot_core.turn_pipeline import TurnPipeline
+from core_logic.text_utils import is_greeting_or_chitchat
 import uuid
 from utils.utils import validate_and_repair_state
 from workflows.onboarding import OnboardingWorkflow, get_active_onboarding_workflow, ONBOARDING_QUESTIONS
@@ -33,7 +36,8 @@ class IntelligentConversationOrchestrator:
                  workflow_manager: Optional[WorkflowManager] = None,
                  intent_classifier: Optional[IntentClassifier] = None,
                  conversation_state: Optional[ConversationState] = None,
-                 user_state: Optional[UserState] = None):
+                 user_state: Optional[UserState] = None,
+                 turn_locks: Optional[TurnLockManager] = None):
         """
         Initialize the IntelligentConversationOrchestrator.
         
@@ -46,6 +50,7 @@ class IntelligentConversationOrchestrator:
             intent_classifier: Intent classification system
             conversation_state: Bot framework conversation state
             user_state: Bot framework user state
+            turn_locks: Per-conversation turn locks (shared with MyBot); None runs turns unserialized
         """
         self.app_state = app_state
         self.config = config
@@ -55,6 +60,7 @@ class IntelligentConversationOrchestrator:
         self.intent_classifier = intent_classifier
         self.conversation_state = conversation_state
         self.user_state = user_state
+        self.turn_locks = turn_locks
         self.logger = logging.getLogger(__name__)
         
         # Initialize workflow manager if not provided
@@ -74,70 +80,76 @@ class IntelligentConversationOrchestrator:
         # Basic logging setup
         self.logger.info("IntelligentConversationOrchestrator initialized.")
 
-    async def _get_app_state_and_user(self, turn_context: TurnContext) -> tuple[Optional[AppState], Optional[UserProfile]]:
+    async def _get_app_state_and_user(self, turn_context: TurnContext, pipeline: Optional[TurnPipeline] = None) -> tuple[Optional[AppState], Optional[UserProfile]]:
         """
-        Placeholder for loading AppState and UserProfile.
-        In the final architecture, this logic will be more robust, likely involving
-        direct use of state accessors passed during __init__ or a dedicated state utility.
+        Loads AppState and the UserProfile for the turn. The two loads are
+        independent, so they run concurrently; with a ``pipeline`` they are
+        recorded as its ``state_load`` and ``profile_load`` stages.
         This mimics what MyBot._get_conversation_data and get_current_user_profile do.
         """
-        app_state: Optional[AppState] = None
-        user_profile: Optional[UserProfile] = None
-
         if not self.convo_state_accessor:
             self.logger.error("Orchestrator: convo_state_accessor not initialized. Cannot load AppState.")
             return None, None
 
+        pipeline = pipeline or TurnPipeline(logger=self.logger)
+        state_task = pipeline.start("state_load", self._load_app_state(turn_context))
+        profile_task = pipeline.start("profile_load", self._load_user_profile(turn_context))
         try:
-            # Load AppState similar to MyBot._get_conversation_data
-            app_state_raw = await self.convo_state_accessor.get(turn_context, lambda: {})
-            self.logger.debug(f"Orchestrator: Raw state from accessor: {type(app_state_raw)}")
-
-            if not app_state_raw:
-                app_state = AppState(session_id=turn_context.activity.conversation.id)
-                self.logger.info(f"Orchestrator: Initialized fresh AppState for conv {app_state.session_id}")
-            elif isinstance(app_state_raw, AppState):
-                app_state = app_state_raw
-                self.logger.info(f"Orchestrator: Accessor returned AppState instance directly for conv {app_state.session_id}")
-            elif isinstance(app_state_raw, dict):
-                self.logger.info(f"Orchestrator: Existing dict state found for conv {turn_context.activity.conversation.id}. Migrating/Validating.")
-                migrated_data = _migrate_state_if_needed(app_state_raw)
-                if isinstance(migrated_data, AppState):
-                    app_state = migrated_data
-                else: # Should be dict after migration
-                    app_state = AppState(**migrated_data)
-            else:
-                self.logger.error(f"Orchestrator: Loaded state is unexpected type {type(app_state_raw)}. Re-initializing.")
-                app_state = AppState(session_id=turn_context.activity.conversation.id)
-
-            # Ensure session_id is set
-            if not app_state.session_id and turn_context.activity and turn_context.activity.conversation:
-                app_state.session_id = turn_context.activity.conversation.id
-            
-            # Load UserProfile
-            # For now, using get_current_user_profile which uses db_manager or a direct DB interaction.
-            # In future, could use self.user_state if that becomes primary for UserProfile storage.
-            if self.config:
-                user_profile = get_current_user_profile(turn_context, db_path=self.config.STATE_DB_PATH)
-                if user_profile:
-                    app_state.current_user = user_profile # Ensure app_state has the latest user profile
-                    self.logger.info(f"Orchestrator: User profile loaded/set for {user_profile.user_id}")
-                else:
-                    app_state.current_user = None # Ensure it's None if not found
-                    self.logger.info("Orchestrator: No user profile found for current turn.")
-            else:
-                self.logger.warning("Orchestrator: Config not available, cannot determine DB path for UserProfile.")
-                app_state.current_user = None
-
-            # TODO: Add other AppState initializations/validations from MyBot._get_conversation_data if needed here
-            # (e.g., selected_model, available_personas, etc., if not handled by Pydantic defaults adequately)
-
-            return app_state, app_state.current_user # Return user_profile from app_state
-        
+            app_state, user_profile = await asyncio.gather(state_task, profile_task)
         except Exception as e:
+            state_task.cancel()
+            profile_task.cancel()
             self.logger.error(f"Orchestrator: Error in _get_app_state_and_user: {e}", exc_info=True)
             return None, None
 
+        # Ensure app_state has the latest user profile (None if not found)
+        app_state.current_user = user_profile
+        # TODO: Add other AppState initializations/validations from MyBot._get_conversation_data if needed here
+        # (e.g., selected_model, available_personas, etc., if not handled by Pydantic defaults adequately)
+        return app_state, app_state.current_user
+
+    async def _load_app_state(self, turn_context: TurnContext) -> AppState:
+        """Loads (or initializes) the conversation's AppState, similar to MyBot._get_conversation_data."""
+        app_state_raw = await self.convo_state_accessor.get(turn_context, lambda: {})
+        self.logger.debug(f"Orchestrator: Raw state from accessor: {type(app_state_raw)}")
+
+        if not app_state_raw:
+            app_state = AppState(session_id=turn_context.activity.conversation.id)
+            self.logger.info(f"Orchestrator: Initialized fresh AppState for conv {app_state.session_id}")
+        elif isinstance(app_state_raw, AppState):
+            app_state = app_state_raw
+            self.logger.info(f"Orchestrator: Accessor returned AppState instance directly for conv {app_state.session_id}")
+        elif isinstance(app_state_raw, dict):
+            self.logger.info(f"Orchestrator: Existing dict state found for conv {turn_context.activity.conversation.id}. Migrating/Validating.")
+            migrated_data = _migrate_state_if_needed(app_state_raw)
+            if isinstance(migrated_data, AppState):
+                app_state = migrated_data
+            else: # Should be dict after migration
+                app_state = AppState(**migrated_data)
+        else:
+            self.logger.error(f"Orchestrator: Loaded state is unexpected type {type(app_state_raw)}. Re-initializing.")
+            app_state = AppState(session_id=turn_context.activity.conversation.id)
+
+        # Ensure session_id is set
+        if not app_state.session_id and turn_context.activity and turn_context.activity.conversation:
+            app_state.session_id = turn_context.activity.conversation.id
+        return app_state
+
+    async def _load_user_profile(self, turn_context: TurnContext) -> Optional[UserProfile]:
+        """
+        Loads the UserProfile through the profile repository, whose database
+        lookups run on its thread pool alongside the state load.
+        """
+        if not self.config:
+            self.logger.warning("Orchestrator: Config not available, cannot determine DB path for UserProfile.")
+            return None
+        user_profile = await get_profile_repository(self.config).get_profile(turn_context, db_path=self.config.STATE_DB_PATH)
+        if user_profile:
+            self.logger.info(f"Orchestrator: User profile loaded/set for {user_profile.user_id}")
+        else:
+            self.logger.info("Orchestrator: No user profile found for current turn.")
+        return user_profile
+
     async def _save_app_state(self, turn_context: TurnContext, app_state: Optional[AppState]):
         if not self.convo_state_accessor:
             self.logger.error("Orchestrator: convo_state_accessor not initialized. Cannot save AppState.")
@@ -329,6 +341,7 @@ class IntelligentConversationOrchestrator:
         This adapts the core loop from agent_loop.py.
         """
         self.logger.info(f"Orchestrator: Starting general task handling for: '{initial_user_message[:100]}'")
+        task_start_time = time.monotonic()
         max_cycles = self.config.MAX_CONSECUTIVE_TOOL_CALLS if self.config else MAX_TOOL_CYCLES_OUTER
         
         # Ensure user message is in history if not already (e.g. if this is first pass after intent classification)
@@ -340,7 +353,11 @@ class IntelligentConversationOrchestrator:
 
             # 1. Prepare messages for LLM
             # Ensure system prompt is handled correctly (prepare_messages_for_llm_from_appstate should manage this)
-            llm_messages, history_preparation_notes = prepare_messages_for_llm_from_appstate(app_state, self.config.LLM_MAX_HISTORY_ITEMS)
+            llm_messages, history_preparation_notes = prepare_messages_for_llm_from_appstate(
+                app_state, self.config.LLM_MAX_HISTORY_ITEMS,
+                config_token_budget=getattr(self.config, 'LLM_HISTORY_TOKEN_BUDGET', None),
+                config_max_function_response_tokens=getattr(self.config, 'LLM_MAX_FUNCTION_RESPONSE_TOKENS', None)
+            )
             if not llm_messages:
                 self.logger.error("Orchestrator: No messages prepared for LLM. Aborting cycle.")
                 await turn_context.send_activity(MessageFactory.text("I couldn't prepare our conversation history for my AI. Please try again."))
@@ -368,6 +385,10 @@ class IntelligentConversationOrchestrator:
             llm_turn_completed_without_tools = False
             final_bot_message_sent_this_llm_turn = False
             last_activity_id_to_update = None
+            # Streams this LLM call's text: sent as a new message, then updated in place
+            reply_writer = StreamingReplyWriter.from_config(
+                turn_context, self.config, started_at=task_start_time if cycle_num == 0 else time.monotonic(), logger=self.logger
+            )
 
             # Send initial typing indicator / placeholder message
             # if cycle_num == 0: # Only for the very first LLM call in this task handler
@@ -383,52 +404,21 @@ class IntelligentConversationOrchestrator:
                 if event_type == "text_chunk":
                     if event_content:
                         accumulated_text_response.append(str(event_content))
-                        # Update activity if possible
-                        if last_activity_id_to_update:
-                            updated_text = "".join(accumulated_text_response).strip()
-                            if updated_text:
-                                # Check if accumulated text is getting too long for reliable updates
-                                text_is_long = len(updated_text) > 1000  # Threshold for streaming updates
-                                
-                                if not text_is_long:
-                                    # Try to update for shorter messages
-                                    try:
-                                        await turn_context.update_activity(Activity(id=last_activity_id_to_update, type=ActivityTypes.message, text=updated_text))
-                                        final_bot_message_sent_this_llm_turn = True
-                                    except Exception as e_update:
-                                        self.logger.warning(f"Orchestrator: Failed to update activity {last_activity_id_to_update}, sending new. Error: {e_update}")
-                                        res = await turn_context.send_activity(MessageFactory.text(updated_text))
-                                        last_activity_id_to_update = res.id if res else None
-                                        final_bot_message_sent_this_llm_turn = True
-                                        accumulated_text_response = []  # Clear after sending new message
-                                else:
-                                    # Text is too long for reliable updates, send as new message
-                                    self.logger.info(f"Orchestrator: Streaming text too long ({len(updated_text)} chars), sending as new message.")
-                                    res = await turn_context.send_activity(MessageFactory.text(updated_text))
-                                    last_activity_id_to_update = res.id if res else None
-                                    final_bot_message_sent_this_llm_turn = True
-                                    accumulated_text_response = []  # Clear after sending new message
-                        elif accumulated_text_response: # No activity to update, send new if there's content
-                            updated_text = "".join(accumulated_text_response).strip()
-                            if updated_text:  # Only send if there's actual content
-                                res = await turn_context.send_activity(MessageFactory.text(updated_text))
-                                last_activity_id_to_update = res.id if res else None
-                                final_bot_message_sent_this_llm_turn = True
-                                accumulated_text_response = [] # Clear after sending
+                        await reply_writer.append(str(event_content))
+                        if reply_writer.delivered:
+                            final_bot_message_sent_this_llm_turn = True
                 elif event_type == "tool_calls":
                     if isinstance(event_content, list):
                         tool_calls_received.extend(event_content)
                         self.logger.info(f"Orchestrator: LLM requested {len(event_content)} tool_calls: {[tc.get('function',{}).get('name') for tc in event_content]}")
-                    # If there was text before tool_calls, send it as a separate message
-                    if accumulated_text_response:
-                        updated_text = "".join(accumulated_text_response).strip()
-                        if updated_text:  # Only send if there's actual content
-                            await turn_context.send_activity(MessageFactory.text(updated_text))
-                            accumulated_text_response = []  # Clear after sending
-                            final_bot_message_sent_this_llm_turn = True 
-                            last_activity_id_to_update = None # New message was sent
+                    # If there was text before tool_calls, deliver it as its own message
+                    await reply_writer.end_message()
+                    if reply_writer.delivered:
+                        final_bot_message_sent_this_llm_turn = True
+                        last_activity_id_to_update = None # New message was sent
                 elif event_type == "error":
                     self.logger.error(f"Orchestrator: Error event from LLM stream: {event_content}")
+                    await reply_writer.end_message() # Keep whatever partial answer was already received
                     err_text_for_user = "I encountered an issue with my AI core."
                     err_code = event_content.get("code", "UNKNOWN_LLM_ERROR") if isinstance(event_content, dict) else "UNKNOWN_LLM_ERROR"
                     raw_err_detail = event_content.get("content", str(event_content)) if isinstance(event_content, dict) else str(event_content)
@@ -465,17 +455,8 @@ class IntelligentConversationOrchestrator:
             if tool_calls_received: # LLM wants to use tools
                 self.logger.info(f"Orchestrator: LLM requested tools. Final text before tools: '{final_text_str}'")
                 if final_text_str: # There was introductory text from LLM before tool calls
-                    # Ensure this text was sent if not already part of a stream update
-                    if not final_bot_message_sent_this_llm_turn:
-                        if last_activity_id_to_update:
-                            try:
-                                await turn_context.update_activity(Activity(id=last_activity_id_to_update, type=ActivityTypes.message, text=final_text_str))
-                                self.logger.debug(f"Updated activity {last_activity_id_to_update} with pre-tool text.")
-                            except Exception as e_update_pre_tool:
-                                self.logger.warning(f"Failed to update activity {last_activity_id_to_update} with pre-tool text, sending new. Error: {e_update_pre_tool}")
-                                await turn_context.send_activity(MessageFactory.text(final_text_str))
-                        else:
-                            await turn_context.send_activity(MessageFactory.text(final_text_str))
+                    # Ensure this text was delivered even if the stream ended without a flush
+                    await reply_writer.finalize()
                     app_state.add_message(role="assistant", content=final_text_str)
                     last_activity_id_to_update = None # Pre-tool text sent, next tool messages will be new
 
@@ -545,10 +526,10 @@ class IntelligentConversationOrchestrator:
                     message_to_send = await self._get_llm_phrased_response(app_state, initial_user_message, situation, "neutral and acknowledging")
                     self.logger.info(f"LLM provided no text, using phrased acknowledgement: '{message_to_send}'")
 
-                if message_to_send: # We have something to say (either original LLM text or fallback)
-                    if final_text_str: # Original LLM text was not empty
-                         app_state.add_message(role="assistant", content=message_to_send)
-
+                if final_text_str: # Original LLM text: the writer has streamed it, deliver the tail
+                    app_state.add_message(role="assistant", content=message_to_send)
+                    await reply_writer.finalize()
+                elif message_to_send: # Fallback acknowledgement
                     # Check if message is long - if so, always send as new message to avoid emulator issues
                     message_is_long = len(message_to_send) > 500  # Threshold for long messages
                     
@@ -572,6 +553,8 @@ class IntelligentConversationOrchestrator:
             else: # LLM stream ended without tool calls and without explicit completion.
                 self.logger.warning("Orchestrator: LLM stream ended without tool calls and without explicit completion. Ending task.")
                 app_state.last_interaction_status = "COMPLETED_UNKNOWN"
+                await reply_writer.finalize()
+                final_bot_message_sent_this_llm_turn = final_bot_message_sent_this_llm_turn or reply_writer.delivered
                 if not final_bot_message_sent_this_llm_turn and not tool_calls_received: 
                     situation = "I finished my current step, but I'm not sure how to proceed further with that."
                     phrased_msg = await self._get_llm_phrased_response(app_state, initial_user_message, situation, "slightly puzzled but helpful")
@@ -687,372 +670,430 @@ Keep the response concise but informative.
             self.logger.error(f"Exception in _get_contextual_llm_response: {e}", exc_info=True)
             return "I understand your question, but I'm having trouble formulating a complete response right now."
 
-    async def process_activity(self, turn_context: TurnContext):
+    def _turn_speculation_enabled(self) -> bool:
+        """Whether turn stages may start before it is known that the turn needs them (TURN_PIPELINE config)."""
+        settings = getattr(self.config, "TURN_PIPELINE", None)
+        if not isinstance(settings, dict):
+            return True
+        return bool(settings.get("speculation_enabled", True))
+
+    def _start_query_embedding(self, pipeline: TurnPipeline, user_message: Optional[str]) -> Optional[asyncio.Task]:
         """
-        Processes an incoming activity from the user.
-        This is the main entry point for the orchestrator.
+        Speculatively embeds the message for tool selection. Skipped for chit-chat,
+        which LLMInterface does not select tools for either.
         """
-        if turn_context.activity.type == ActivityTypes.message:
-            user_message = turn_context.activity.text
-            self.logger.info(f"Orchestrator received user message: {user_message}")
+        if not pipeline.speculation_enabled or not self.tool_executor or not user_message:
+            return None
+        tool_selector = getattr(self.llm_interface, "tool_selector", None)
+        if not hasattr(tool_selector, "embed_query_async") or is_greeting_or_chitchat(user_message.strip().lower()):
+            return None
+        return pipeline.start("query_embedding", tool_selector.embed_query_async(user_message), speculative=True)
 
-            app_state, user_profile = await self._get_app_state_and_user(turn_context)
+    def _start_intent_classification(self, pipeline: TurnPipeline, user_message: str, app_state: AppState,
+                                     user_profile: Optional[UserProfile], speculative: bool = False) -> Optional[asyncio.Task]:
+        """Starts classifying the message as the pipeline's ``intent_classification`` stage."""
+        if not (self.intent_classifier and self.llm_interface) or (speculative and not pipeline.speculation_enabled):
+            return None
+        classification_context = {
+            "user_message": user_message,
+            "user_role": user_profile.assigned_role if user_profile and hasattr(user_profile, 'assigned_role') else "guest",
+            "pending_onboarding_decision": app_state.meta_flags.get("pending_onboarding_decision", False) if hasattr(app_state, 'meta_flags') and app_state.meta_flags else False,
+            # active_onboarding_workflow is false here as active workflows get the message before classification
+            "active_onboarding_workflow": False,
+            "app_state_version": app_state.version
+        }
+        return pipeline.start(
+            "intent_classification",
+            self.intent_classifier.classify_intent(user_message, classification_context),
+            speculative=speculative,
+        )
 
-            if not app_state:
-                self.logger.error("Orchestrator: Failed to load AppState. Aborting turn processing.")
-                await turn_context.send_activity(MessageFactory.text("Sorry, I encountered an issue with my memory. Please try again."))
-                return
-            
-            user_id_for_log = user_profile.user_id if user_profile else "anonymous"
-            self.logger.info(f"Orchestrator: Processing for user: {user_id_for_log}, AppState version: {app_state.version}")
-
-            # Add user message to app_state history (unless it's an event or something)
-            # Ensure it's only added if it's a new message to avoid duplicates on retries/internal loops.
-            if not app_state.messages or app_state.messages[-1].text != user_message or app_state.messages[-1].role != "user":
-                app_state.add_message(role="user", content=user_message)
-                self.logger.debug(f"Orchestrator: Added current user message to app_state: '{user_message[:100]}'")
-            
-            handled_by_active_workflow = False
-            # 1. Check if an active workflow should handle this message first
-            if self.workflow_manager and user_profile: # Workflows typically need user context
-                active_workflow_type = app_state.get_primary_active_workflow_name()
-                if active_workflow_type:
-                    self.logger.info(f"Orchestrator: Active workflow '{active_workflow_type}' detected. Routing to WorkflowManager.")
-                    workflow_response_dict = await self.workflow_manager.process_workflow_step(turn_context, app_state, user_profile, user_message)
-                    if workflow_response_dict: # If workflow provided a response, it handled it.
-                        await self._send_activity_from_dict(turn_context, workflow_response_dict)
-                        handled_by_active_workflow = True # Mark as handled
-                        
-                        # If workflow updated the user profile, save it and invalidate cache
-                        if workflow_response_dict.get("profile_updated") and user_profile:
-                            self.logger.info(f"Workflow '{active_workflow_type}' updated user profile. Saving and invalidating cache.")
-                            try:
-                                if db_manager.save_user_profile(user_profile.model_dump()):
-                                    self.logger.info(f"User profile saved successfully after workflow update.")
-                                    # Invalidate cache to ensure fresh data next time
-                                    invalidate_user_profile_cache(user_profile.user_id)
-                                    self.logger.info(f"Cache invalidated for user {user_profile.user_id} after workflow update.")
-                                else:
-                                    self.logger.error(f"Failed to save user profile after workflow '{active_workflow_type}' update.")
-                            except Exception as e:
-                                self.logger.error(f"Error saving profile after workflow: {e}", exc_info=True)
-                    else:
-                        self.logger.info(f"Orchestrator: Workflow '{active_workflow_type}' processed input but yielded no immediate response. Continuing.")
-                        if not app_state.get_active_workflow_by_type(active_workflow_type): 
-                            self.logger.info(f"Orchestrator: Workflow '{active_workflow_type}' seems to have ended after processing.")
-            
-            if handled_by_active_workflow:
-                await self._save_app_state(turn_context, app_state)
-                self.logger.info("Orchestrator: Turn handled by active workflow.")
-                return
+    async def _process_message_activity(self, turn_context: TurnContext, pipeline: TurnPipeline):
+        """Handles one user message; stages are started on, and timed by, ``pipeline``."""
+        user_message = turn_context.activity.text
+        self.logger.info(f"Orchestrator received user message: {user_message}")
 
-            # --- START: Proactive Onboarding Trigger for New Users (before intent classification) ---
-            if user_profile and self.workflow_manager: # Ensure user_profile and workflow_manager are available
-                # Check if an onboarding workflow is already active OR if a decision is pending
-                is_onboarding_active_or_pending = get_active_onboarding_workflow(app_state, user_profile.user_id) is not None or \
-                                                  (hasattr(app_state, 'meta_flags') and app_state.meta_flags and app_state.meta_flags.get("pending_onboarding_decision"))
+        # The query embedding only needs the message text, so it overlaps state and profile loading;
+        # the tool selector's query embedding cache hands the result to the LLM call later in the turn
+        self._start_query_embedding(pipeline, user_message)
+        app_state, user_profile = await self._get_app_state_and_user(turn_context, pipeline)
 
-                if not is_onboarding_active_or_pending and OnboardingWorkflow.should_trigger_onboarding(user_profile, app_state):
-                    self.logger.info(f"Orchestrator: User {user_profile.user_id} is eligible for onboarding. Prompting user.", extra={"event_type": "onboarding_prompt_initiated_orchestrator"})
-                    
-                    prompt_hero_card = HeroCard(
-                        title="🤖 Welcome to Aughie!",
-                        subtitle="Your AI Development Assistant",
-                        text=f"Hi {user_profile.display_name}! 👋\n\nI'm here to help with your development tasks. To provide the best assistance, I'd love to learn a bit about you and your preferences.\n\n**Quick Setup** (~2 minutes)\n• Personalize my responses\n• Configure your tools\n• Set communication style",
-                        images=[CardImage(url=getattr(self.config.settings, "AUGIE_LOGO_URL", "https://raw.githubusercontent.com/Aughie/augie_images/main/logos_various_formats/logo_circle_transparent_256.png"))],
-                        buttons=[
-                            CardAction(type=ActionTypes.im_back, title="🚀 Let's Get Started!", value="start onboarding"),
-                            CardAction(type=ActionTypes.im_back, title="⏭️ Maybe Later", value="skip onboarding for now")
-                        ]
-                    )
-                    prompt_activity = MessageFactory.attachment(CardFactory.hero_card(prompt_hero_card))
-                    await turn_context.send_activity(prompt_activity)
-                    
-                    if not hasattr(app_state, 'meta_flags') or app_state.meta_flags is None:
-                        app_state.meta_flags = {}
-                    app_state.meta_flags["pending_onboarding_decision"] = True
+        if not app_state:
+            self.logger.error("Orchestrator: Failed to load AppState. Aborting turn processing.")
+            pipeline.short_circuit("state_load_failed")
+            await turn_context.send_activity(MessageFactory.text("Sorry, I encountered an issue with my memory. Please try again."))
+            return
+        
+        user_id_for_log = user_profile.user_id if user_profile else "anonymous"
+        self.logger.info(f"Orchestrator: Processing for user: {user_id_for_log}, AppState version: {app_state.version}")
+
+        # Add user message to app_state history (unless it's an event or something)
+        # Ensure it's only added if it's a new message to avoid duplicates on retries/internal loops.
+        if not app_state.messages or app_state.messages[-1].text != user_message or app_state.messages[-1].role != "user":
+            app_state.add_message(role="user", content=user_message)
+            self.logger.debug(f"Orchestrator: Added current user message to app_state: '{user_message[:100]}'")
+
+        # Intent classification only needs the message and flags that are loaded by now, so it runs alongside
+        # the workflow and onboarding checks. An active workflow usually answers the message itself, so in that
+        # case classification is left until it turns out to be needed.
+        if not (self.workflow_manager and user_profile and app_state.get_primary_active_workflow_name()):
+            self._start_intent_classification(pipeline, user_message, app_state, user_profile, speculative=True)
+        
+        handled_by_active_workflow = False
+        # 1. Check if an active workflow should handle this message first
+        if self.workflow_manager and user_profile: # Workflows typically need user context
+            active_workflow_type = app_state.get_primary_active_workflow_name()
+            if active_workflow_type:
+                self.logger.info(f"Orchestrator: Active workflow '{active_workflow_type}' detected. Routing to WorkflowManager.")
+                workflow_response_dict = await pipeline.run(
+                    "workflow_step", self.workflow_manager.process_workflow_step(turn_context, app_state, user_profile, user_message)
+                )
+                if workflow_response_dict: # If workflow provided a response, it handled it.
+                    await self._send_activity_from_dict(turn_context, workflow_response_dict)
+                    handled_by_active_workflow = True # Mark as handled
                     
-                    await self._save_app_state(turn_context, app_state)
-                    self.logger.info(f"Orchestrator: Sent onboarding prompt to user {user_profile.user_id}. Awaiting decision.", extra={"event_type": "onboarding_prompt_sent_orchestrator"})
-                    return # Important: End turn here, wait for user's response to the prompt
-            # --- END: Proactive Onboarding Trigger ---
-
-            # 2. If not handled by an active workflow or proactive onboarding prompt, proceed with intent classification
-            intent = UserIntent.UNCLEAR
-            confidence = 0.0
-            if self.intent_classifier and self.llm_interface:
-                classification_context = {
-                    "user_message": user_message,
-                    "user_role": user_profile.assigned_role if user_profile and hasattr(user_profile, 'assigned_role') else "guest",
-                    "pending_onboarding_decision": app_state.meta_flags.get("pending_onboarding_decision", False) if hasattr(app_state, 'meta_flags') and app_state.meta_flags else False,
-                    # active_onboarding_workflow is false here as we are past the active workflow check
-                    "active_onboarding_workflow": False, 
-                    "app_state_version": app_state.version
-                }
-                try:
-                    # Fix: Use strings instead of dict objects for message content, as the LLM expects string messages
-                    intent, confidence = await self.intent_classifier.classify_intent(
-                        user_message, 
-                        classification_context
-                    )
-                    self.logger.info(f"Orchestrator: Classified intent: {intent.value} with confidence: {confidence:.2f}")
-                except Exception as e_intent:
-                    self.logger.error(f"Orchestrator: Intent classification failed: {e_intent}", exc_info=True)
-                    situation = "I had a little trouble understanding your main request."
-                    phrased_msg = await self._get_llm_phrased_response(app_state, user_message, situation, "apologetic, asking to rephrase")
-                    await turn_context.send_activity(MessageFactory.text(phrased_msg))
-                    await self._save_app_state(turn_context, app_state)
-                    return
-            else:
-                self.logger.warning("Orchestrator: Intent classifier or LLM interface not available. Defaulting to UNCLEAR intent.")
+                    # If workflow updated the user profile, save it and invalidate cache
+                    if workflow_response_dict.get("profile_updated") and user_profile:
+                        self.logger.info(f"Workflow '{active_workflow_type}' updated user profile. Saving and invalidating cache.")
+                        try:
+                            # save_profile also invalidates the cached copy
+                            if await get_profile_repository(self.config).save_profile(user_profile):
+                                self.logger.info(f"User profile saved successfully after workflow update.")
+                            else:
+                                self.logger.error(f"Failed to save user profile after workflow '{active_workflow_type}' update.")
+                        except Exception as e:
+                            self.logger.error(f"Error saving profile after workflow: {e}", exc_info=True)
+                else:
+                    self.logger.info(f"Orchestrator: Workflow '{active_workflow_type}' processed input but yielded no immediate response. Continuing.")
+                    if not app_state.get_active_workflow_by_type(active_workflow_type): 
+                        self.logger.info(f"Orchestrator: Workflow '{active_workflow_type}' seems to have ended after processing.")
+        
+        if handled_by_active_workflow:
+            pipeline.short_circuit("active_workflow")
+            await self._save_app_state(turn_context, app_state)
+            self.logger.info("Orchestrator: Turn handled by active workflow.")
+            return
 
-            # 3. Route based on classified intent (if not handled by workflow)
-            handled_by_specific_intent = False
-            if intent == UserIntent.COMMAND_HELP and confidence > 0.5:
-                await self._send_help_message(turn_context, user_message)
-                handled_by_specific_intent = True
-            elif intent == UserIntent.COMMAND_PERMISSIONS and confidence > 0.5:
-                self.logger.info(f"Orchestrator: Routing to permissions command based on classified intent: {intent.value}")
+        # --- START: Proactive Onboarding Trigger for New Users (before intent classification) ---
+        if user_profile and self.workflow_manager: # Ensure user_profile and workflow_manager are available
+            # Check if an onboarding workflow is already active OR if a decision is pending
+            is_onboarding_active_or_pending = get_active_onboarding_workflow(app_state, user_profile.user_id) is not None or \
+                                              (hasattr(app_state, 'meta_flags') and app_state.meta_flags and app_state.meta_flags.get("pending_onboarding_decision"))
+
+            if not is_onboarding_active_or_pending and OnboardingWorkflow.should_trigger_onboarding(user_profile, app_state):
+                self.logger.info(f"Orchestrator: User {user_profile.user_id} is eligible for onboarding. Prompting user.", extra={"event_type": "onboarding_prompt_initiated_orchestrator"})
+                pipeline.short_circuit("onboarding_prompt")
                 
-                # Check if user is asking about bot rules/guidelines rather than permissions
-                if any(word in user_message.lower() for word in ["rules", "guidelines", "constraints", "limitations"]):
-                    # Use LLM to generate a contextual response about bot capabilities
-                    situation = "The user is asking about my rules, guidelines, or capabilities as a bot assistant."
-                    context_info = "I should explain my capabilities (code assistance, GitHub/Jira integration, search, etc.) and my guidelines (respecting permissions, being helpful, asking for clarification when needed)."
-                    response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "informative and friendly")
-                    await turn_context.send_activity(MessageFactory.text(response_text))
-                else:
-                    await turn_context.send_activity(MessageFactory.text("I understand you're asking about your permissions or role. This feature is being integrated! Soon I'll be able to tell you more."))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.ONBOARDING_ACCEPT and confidence > 0.5:
-                self.logger.info(f"Orchestrator: Routing to ONBOARDING_ACCEPT based on classified intent: {intent.value}")
-                if self.workflow_manager and user_profile and app_state:
-                    if hasattr(app_state, 'meta_flags') and app_state.meta_flags:
-                        app_state.meta_flags["pending_onboarding_decision"] = False
-                    workflow_response = await self.workflow_manager.start_workflow(turn_context, app_state, user_profile, "onboarding")
-                    await self._send_activity_from_dict(turn_context, workflow_response)
-                else:
-                    await turn_context.send_activity(MessageFactory.text("Onboarding cannot be started (missing components)."))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.ONBOARDING_DECLINE and confidence > 0.5:
-                self.logger.info(f"Orchestrator: Routing to ONBOARDING_DECLINE based on classified intent: {intent.value}")
-                if hasattr(app_state, 'meta_flags') and app_state.meta_flags:
-                    app_state.meta_flags["pending_onboarding_decision"] = False
+                prompt_hero_card = HeroCard(
+                    title="🤖 Welcome to Aughie!",
+                    subtitle="Your AI Development Assistant",
+                    text=f"Hi {user_profile.display_name}! 👋\n\nI'm here to help with your development tasks. To provide the best assistance, I'd love to learn a bit about you and your preferences.\n\n**Quick Setup** (~2 minutes)\n• Personalize my responses\n• Configure your tools\n• Set communication style",
+                    images=[CardImage(url=getattr(self.config.settings, "AUGIE_LOGO_URL", "https://raw.githubusercontent.com/Aughie/augie_images/main/logos_various_formats/logo_circle_transparent_256.png"))],
+                    buttons=[
+                        CardAction(type=ActionTypes.im_back, title="🚀 Let's Get Started!", value="start onboarding"),
+                        CardAction(type=ActionTypes.im_back, title="⏭️ Maybe Later", value="skip onboarding for now")
+                    ]
+                )
+                prompt_activity = MessageFactory.attachment(CardFactory.hero_card(prompt_hero_card))
+                await turn_context.send_activity(prompt_activity)
                 
-                if user_profile:
-                    if user_profile.profile_data is None:
-                        user_profile.profile_data = {}
-                    user_profile.profile_data["onboarding_interaction_status"] = "declined"
-                    user_profile.profile_data["onboarding_declined_at"] = datetime.utcnow().isoformat()
-                    user_profile.profile_data["onboarding_completed"] = True  # Align with skip_onboarding behavior
+                if not hasattr(app_state, 'meta_flags') or app_state.meta_flags is None:
+                    app_state.meta_flags = {}
+                app_state.meta_flags["pending_onboarding_decision"] = True
+                
+                await self._save_app_state(turn_context, app_state)
+                self.logger.info(f"Orchestrator: Sent onboarding prompt to user {user_profile.user_id}. Awaiting decision.", extra={"event_type": "onboarding_prompt_sent_orchestrator"})
+                return # Important: End turn here, wait for user's response to the prompt
+        # --- END: Proactive Onboarding Trigger ---
 
-                    self.logger.info(f"Attempting to save profile for user {user_profile.user_id} after decline.")
-                    try:
-                        if db_manager.save_user_profile(user_profile.model_dump()):
-                            self.logger.info(f"User {user_profile.user_id} declined onboarding. Flag set and profile SAVED successfully.")
-                            # Invalidate the cache to ensure fresh data is loaded next time
-                            invalidate_user_profile_cache(user_profile.user_id)
-                            self.logger.info(f"Cache invalidated for user {user_profile.user_id} after decline.")
-                        else:
-                            self.logger.error(f"User {user_profile.user_id} declined onboarding. Flag set BUT FAILED TO SAVE PROFILE (db_manager.save_user_profile returned False).")
-                    except NameError as ne:
-                        self.logger.error(f"User {user_profile.user_id} declined onboarding. Flag set BUT NameError on save (db_manager likely not imported): {ne}", exc_info=True)
-                    except Exception as e_save_profile:
-                        self.logger.error(f"User {user_profile.user_id} declined onboarding. Flag set BUT EXCEPTION ON SAVE: {e_save_profile}", exc_info=True)
-                else:
-                    self.logger.warning("Orchestrator: User profile not found, cannot set onboarding decline flag.")
+        # 2. If not handled by an active workflow or proactive onboarding prompt, proceed with intent classification
+        intent = UserIntent.UNCLEAR
+        confidence = 0.0
+        if self.intent_classifier and self.llm_interface:
+            # Started speculatively above unless an active workflow was given the message first
+            intent_task = pipeline.task("intent_classification") or \
+                          self._start_intent_classification(pipeline, user_message, app_state, user_profile)
+            try:
+                intent, confidence = await intent_task
+                self.logger.info(f"Orchestrator: Classified intent: {intent.value} with confidence: {confidence:.2f}")
+            except Exception as e_intent:
+                self.logger.error(f"Orchestrator: Intent classification failed: {e_intent}", exc_info=True)
+                pipeline.short_circuit("intent_classification_failed")
+                situation = "I had a little trouble understanding your main request."
+                phrased_msg = await self._get_llm_phrased_response(app_state, user_message, situation, "apologetic, asking to rephrase")
+                await turn_context.send_activity(MessageFactory.text(phrased_msg))
+                await self._save_app_state(turn_context, app_state)
+                return
+        else:
+            self.logger.warning("Orchestrator: Intent classifier or LLM interface not available. Defaulting to UNCLEAR intent.")
 
-                await turn_context.send_activity(MessageFactory.text("Okay, I understand you don't want to proceed with the detailed setup. We can skip it."))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.ONBOARDING_POSTPONE and confidence > 0.5:
-                self.logger.info(f"Orchestrator: Routing to ONBOARDING_POSTPONE based on classified intent: {intent.value}")
+        # 3. Route based on classified intent (if not handled by workflow)
+        handled_by_specific_intent = False
+        if intent == UserIntent.COMMAND_HELP and confidence > 0.5:
+            pipeline.short_circuit(f"intent:{intent.value}")
+            await self._send_help_message(turn_context, user_message)
+            handled_by_specific_intent = True
+        elif intent == UserIntent.COMMAND_PERMISSIONS and confidence > 0.5:
+            self.logger.info(f"Orchestrator: Routing to permissions command based on classified intent: {intent.value}")
+            
+            # Check if user is asking about bot rules/guidelines rather than permissions
+            if any(word in user_message.lower() for word in ["rules", "guidelines", "constraints", "limitations"]):
+                # Use LLM to generate a contextual response about bot capabilities
+                situation = "The user is asking about my rules, guidelines, or capabilities as a bot assistant."
+                context_info = "I should explain my capabilities (code assistance, GitHub/Jira integration, search, etc.) and my guidelines (respecting permissions, being helpful, asking for clarification when needed)."
+                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "informative and friendly")
+                await turn_context.send_activity(MessageFactory.text(response_text))
+            else:
+                await turn_context.send_activity(MessageFactory.text("I understand you're asking about your permissions or role. This feature is being integrated! Soon I'll be able to tell you more."))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.ONBOARDING_ACCEPT and confidence > 0.5:
+            self.logger.info(f"Orchestrator: Routing to ONBOARDING_ACCEPT based on classified intent: {intent.value}")
+            if self.workflow_manager and user_profile and app_state:
                 if hasattr(app_state, 'meta_flags') and app_state.meta_flags:
                     app_state.meta_flags["pending_onboarding_decision"] = False
+                workflow_response = await self.workflow_manager.start_workflow(turn_context, app_state, user_profile, "onboarding")
+                await self._send_activity_from_dict(turn_context, workflow_response)
+            else:
+                await turn_context.send_activity(MessageFactory.text("Onboarding cannot be started (missing components)."))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.ONBOARDING_DECLINE and confidence > 0.5:
+            self.logger.info(f"Orchestrator: Routing to ONBOARDING_DECLINE based on classified intent: {intent.value}")
+            if hasattr(app_state, 'meta_flags') and app_state.meta_flags:
+                app_state.meta_flags["pending_onboarding_decision"] = False
+            
+            if user_profile:
+                if user_profile.profile_data is None:
+                    user_profile.profile_data = {}
+                user_profile.profile_data["onboarding_interaction_status"] = "declined"
+                user_profile.profile_data["onboarding_declined_at"] = datetime.utcnow().isoformat()
+                user_profile.profile_data["onboarding_completed"] = True  # Align with skip_onboarding behavior
+
+                self.logger.info(f"Attempting to save profile for user {user_profile.user_id} after decline.")
+                try:
+                    # save_profile also invalidates the cached copy, so fresh data is loaded next time
+                    if await get_profile_repository(self.config).save_profile(user_profile):
+                        self.logger.info(f"User {user_profile.user_id} declined onboarding. Flag set and profile SAVED successfully.")
+                    else:
+                        self.logger.error(f"User {user_profile.user_id} declined onboarding. Flag set BUT FAILED TO SAVE PROFILE (save_profile returned False).")
+                except Exception as e_save_profile:
+                    self.logger.error(f"User {user_profile.user_id} declined onboarding. Flag set BUT EXCEPTION ON SAVE: {e_save_profile}", exc_info=True)
+            else:
+                self.logger.warning("Orchestrator: User profile not found, cannot set onboarding decline flag.")
+
+            await turn_context.send_activity(MessageFactory.text("Okay, I understand you don't want to proceed with the detailed setup. We can skip it."))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.ONBOARDING_POSTPONE and confidence > 0.5:
+            self.logger.info(f"Orchestrator: Routing to ONBOARDING_POSTPONE based on classified intent: {intent.value}")
+            if hasattr(app_state, 'meta_flags') and app_state.meta_flags:
+                app_state.meta_flags["pending_onboarding_decision"] = False
+            
+            if user_profile:
+                if user_profile.profile_data is None:
+                    user_profile.profile_data = {}
+                user_profile.profile_data["onboarding_interaction_status"] = "postponed"
+                user_profile.profile_data["onboarding_postponed_at"] = datetime.utcnow().isoformat()
+                user_profile.profile_data["onboarding_completed"] = True  # Prevent unwanted re-prompts
                 
-                if user_profile:
-                    if user_profile.profile_data is None:
-                        user_profile.profile_data = {}
-                    user_profile.profile_data["onboarding_interaction_status"] = "postponed"
-                    user_profile.profile_data["onboarding_postponed_at"] = datetime.utcnow().isoformat()
-                    user_profile.profile_data["onboarding_completed"] = True  # Prevent unwanted re-prompts
+                self.logger.info(f"Attempting to save profile for user {user_profile.user_id} after postpone.")
+                try:
+                    # save_profile also invalidates the cached copy, so fresh data is loaded next time
+                    if await get_profile_repository(self.config).save_profile(user_profile):
+                        self.logger.info(f"User {user_profile.user_id} postponed onboarding. Flag set and profile SAVED successfully.")
+                    else:
+                        self.logger.error(f"User {user_profile.user_id} postponed onboarding. Flag set BUT FAILED TO SAVE PROFILE (save_profile returned False).")
+                except Exception as e_save_profile:
+                    self.logger.error(f"User {user_profile.user_id} postponed onboarding. Flag set BUT EXCEPTION ON SAVE: {e_save_profile}", exc_info=True)
                     
-                    self.logger.info(f"Attempting to save profile for user {user_profile.user_id} after postpone.")
-                    try:
-                        if db_manager.save_user_profile(user_profile.model_dump()): # Use model_dump() for Pydantic v2+
-                            self.logger.info(f"User {user_profile.user_id} postponed onboarding. Flag set and profile SAVED successfully.")
-                            # Invalidate the cache to ensure fresh data is loaded next time
-                            invalidate_user_profile_cache(user_profile.user_id)
-                            self.logger.info(f"Cache invalidated for user {user_profile.user_id} after postpone.")
-                        else:
-                            self.logger.error(f"User {user_profile.user_id} postponed onboarding. Flag set BUT FAILED TO SAVE PROFILE (db_manager.save_user_profile returned False).")
-                    except NameError as ne:
-                        self.logger.error(f"User {user_profile.user_id} postponed onboarding. Flag set BUT NameError on save (db_manager likely not imported): {ne}", exc_info=True)
-                    except Exception as e_save_profile:
-                        self.logger.error(f"User {user_profile.user_id} postponed onboarding. Flag set BUT EXCEPTION ON SAVE: {e_save_profile}", exc_info=True)
-                        
-                else:
-                    self.logger.warning("Orchestrator: User profile not found, cannot set onboarding postponement flag.")
+            else:
+                self.logger.warning("Orchestrator: User profile not found, cannot set onboarding postponement flag.")
 
-                await turn_context.send_activity(MessageFactory.text("Alright, we can skip the setup for now."))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.COMMAND_RESET_CHAT and confidence > 0.5:
-                self.logger.info(f"Orchestrator: Routing to COMMAND_RESET_CHAT. Clearing chat.")
-                if app_state: app_state.clear_chat()
-                # Use LLM to phrase the reset confirmation
-                situation = "The chat history has just been reset at the user's request."
-                response_text = await self._get_llm_phrased_response(app_state, user_message, situation, "reassuring and ready for next steps")
-                await turn_context.send_activity(MessageFactory.text(response_text))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.ONBOARDING_START and confidence > 0.7:
-                self.logger.info(f"Orchestrator: Routing to ONBOARDING_START based on classified intent: {intent.value}")
-                if self.workflow_manager and user_profile and app_state:
-                    # Check if user previously declined/skipped/postponed
-                    interaction_status = user_profile.profile_data.get("onboarding_interaction_status") if user_profile.profile_data else None
-                    previously_declined = interaction_status in ["declined", "skipped", "postponed"]
-                    onboarding_completed = user_profile.profile_data.get("onboarding_completed", False) if user_profile.profile_data else False
+            await turn_context.send_activity(MessageFactory.text("Alright, we can skip the setup for now."))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.COMMAND_RESET_CHAT and confidence > 0.5:
+            self.logger.info(f"Orchestrator: Routing to COMMAND_RESET_CHAT. Clearing chat.")
+            pipeline.short_circuit(f"intent:{intent.value}")
+            if app_state: app_state.clear_chat()
+            # Use LLM to phrase the reset confirmation
+            situation = "The chat history has just been reset at the user's request."
+            response_text = await self._get_llm_phrased_response(app_state, user_message, situation, "reassuring and ready for next steps")
+            await turn_context.send_activity(MessageFactory.text(response_text))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.ONBOARDING_START and confidence > 0.7:
+            self.logger.info(f"Orchestrator: Routing to ONBOARDING_START based on classified intent: {intent.value}")
+            if self.workflow_manager and user_profile and app_state:
+                # Check if user previously declined/skipped/postponed
+                interaction_status = user_profile.profile_data.get("onboarding_interaction_status") if user_profile.profile_data else None
+                previously_declined = interaction_status in ["declined", "skipped", "postponed"]
+                onboarding_completed = user_profile.profile_data.get("onboarding_completed", False) if user_profile.profile_data else False
+                
+                if previously_declined and onboarding_completed:
+                    # User previously opted out but now wants to start
+                    self.logger.info(f"User {user_profile.user_id} previously {interaction_status} onboarding, now requesting to start.")
                     
-                    if previously_declined and onboarding_completed:
-                        # User previously opted out but now wants to start
-                        self.logger.info(f"User {user_profile.user_id} previously {interaction_status} onboarding, now requesting to start.")
-                        
-                        # Ask for confirmation
-                        hero_card = HeroCard(
-                            title="🤔 Start Onboarding Setup?",
-                            text=f"I see you previously chose not to complete the setup. Would you like to start it now?\n\nThis will help me personalize my responses and configure your preferences.",
-                            buttons=[
-                                CardAction(type=ActionTypes.im_back, title="✅ Yes, start setup", value="confirm start onboarding"),
-                                CardAction(type=ActionTypes.im_back, title="❌ No, not now", value="cancel start onboarding")
-                            ]
-                        )
-                        confirm_activity = MessageFactory.attachment(CardFactory.hero_card(hero_card))
-                        await turn_context.send_activity(confirm_activity)
-                        
-                        # Set a flag to track pending confirmation
-                        if not hasattr(app_state, 'meta_flags') or app_state.meta_flags is None:
-                            app_state.meta_flags = {}
-                        app_state.meta_flags["pending_onboarding_restart_confirmation"] = True
-                    else:
-                        # User hasn't completed onboarding yet, start directly
-                        self.logger.info(f"Starting onboarding workflow for user {user_profile.user_id}")
-                        if user_profile.profile_data is None:
-                            user_profile.profile_data = {}
-                        user_profile.profile_data["onboarding_completed"] = False
-                        
-                        workflow_response = await self.workflow_manager.start_workflow(turn_context, app_state, user_profile, "onboarding")
-                        await self._send_activity_from_dict(turn_context, workflow_response)
+                    # Ask for confirmation
+                    hero_card = HeroCard(
+                        title="🤔 Start Onboarding Setup?",
+                        text=f"I see you previously chose not to complete the setup. Would you like to start it now?\n\nThis will help me personalize my responses and configure your preferences.",
+                        buttons=[
+                            CardAction(type=ActionTypes.im_back, title="✅ Yes, start setup", value="confirm start onboarding"),
+                            CardAction(type=ActionTypes.im_back, title="❌ No, not now", value="cancel start onboarding")
+                        ]
+                    )
+                    confirm_activity = MessageFactory.attachment(CardFactory.hero_card(hero_card))
+                    await turn_context.send_activity(confirm_activity)
+                    
+                    # Set a flag to track pending confirmation
+                    if not hasattr(app_state, 'meta_flags') or app_state.meta_flags is None:
+                        app_state.meta_flags = {}
+                    app_state.meta_flags["pending_onboarding_restart_confirmation"] = True
                 else:
-                    await turn_context.send_activity(MessageFactory.text("I'd like to help you get set up, but some components aren't available right now. Please try again later."))
-                handled_by_specific_intent = True
-            elif user_message.lower() in ["confirm start onboarding", "yes, start setup"] and \
-                 hasattr(app_state, 'meta_flags') and app_state.meta_flags and \
-                 app_state.meta_flags.get("pending_onboarding_restart_confirmation"):
-                # Handle confirmation of onboarding restart
-                self.logger.info("User confirmed onboarding restart")
-                app_state.meta_flags["pending_onboarding_restart_confirmation"] = False
-                
-                if self.workflow_manager and user_profile:
+                    # User hasn't completed onboarding yet, start directly
+                    self.logger.info(f"Starting onboarding workflow for user {user_profile.user_id}")
                     if user_profile.profile_data is None:
                         user_profile.profile_data = {}
-                    
-                    # Clear previous decline/skip/postpone flags
-                    user_profile.profile_data["onboarding_interaction_status"] = "re-initiated"
                     user_profile.profile_data["onboarding_completed"] = False
-                    for key in ["onboarding_declined_at", "onboarding_skipped_at", "onboarding_postponed_at"]:
-                        user_profile.profile_data.pop(key, None)
-                    
-                    # Save updated profile and invalidate cache
-                    try:
-                        if db_manager.save_user_profile(user_profile.model_dump()):
-                            self.logger.info(f"User profile updated for onboarding restart. Invalidating cache.")
-                            invalidate_user_profile_cache(user_profile.user_id)
-                    except Exception as e:
-                        self.logger.error(f"Error saving profile for onboarding restart: {e}", exc_info=True)
                     
-                    # Start the workflow
                     workflow_response = await self.workflow_manager.start_workflow(turn_context, app_state, user_profile, "onboarding")
                     await self._send_activity_from_dict(turn_context, workflow_response)
-                handled_by_specific_intent = True
-            elif user_message.lower() in ["cancel start onboarding", "no, not now"] and \
-                 hasattr(app_state, 'meta_flags') and app_state.meta_flags and \
-                 app_state.meta_flags.get("pending_onboarding_restart_confirmation"):
-                # Handle cancellation of onboarding restart
-                self.logger.info("User cancelled onboarding restart")
-                app_state.meta_flags["pending_onboarding_restart_confirmation"] = False
-                await turn_context.send_activity(MessageFactory.text("No problem! I'm here whenever you're ready. Just let me know if you'd like to set up your preferences later."))
-                handled_by_specific_intent = True
-            elif intent == UserIntent.WORKFLOW_CONTINUE and confidence > 0.5:
-                # User seems to want to continue something, but there's no active workflow
-                self.logger.info(f"Orchestrator: WORKFLOW_CONTINUE intent but no active workflow")
+            else:
+                await turn_context.send_activity(MessageFactory.text("I'd like to help you get set up, but some components aren't available right now. Please try again later."))
+            handled_by_specific_intent = True
+        elif user_message.lower() in ["confirm start onboarding", "yes, start setup"] and \
+             hasattr(app_state, 'meta_flags') and app_state.meta_flags and \
+             app_state.meta_flags.get("pending_onboarding_restart_confirmation"):
+            # Handle confirmation of onboarding restart
+            self.logger.info("User confirmed onboarding restart")
+            app_state.meta_flags["pending_onboarding_restart_confirmation"] = False
+            
+            if self.workflow_manager and user_profile:
+                if user_profile.profile_data is None:
+                    user_profile.profile_data = {}
                 
-                # Check if they just completed onboarding
-                recently_completed_onboarding = False
-                if user_profile and user_profile.profile_data:
-                    onboarding_status = user_profile.profile_data.get("onboarding_status")
-                    if onboarding_status == "completed" and app_state.messages:
-                        # Check if onboarding was recently completed (within last few messages)
-                        recently_completed_onboarding = any(
-                            "onboarding" in msg.text.lower() or "setup complete" in msg.text.lower()
-                            for msg in app_state.messages[-5:] if msg.role == "assistant" and msg.text
-                        )
+                # Clear previous decline/skip/postpone flags
+                user_profile.profile_data["onboarding_interaction_status"] = "re-initiated"
+                user_profile.profile_data["onboarding_completed"] = False
+                for key in ["onboarding_declined_at", "onboarding_skipped_at", "onboarding_postponed_at"]:
+                    user_profile.profile_data.pop(key, None)
                 
-                if recently_completed_onboarding:
-                    situation = "The user just completed onboarding and is asking what to do next."
-                    context_info = "They've just finished setting up their preferences. Suggest concrete next steps they can take with the bot, focusing on their stated role and tool preferences if available."
-                else:
-                    situation = "The user wants to continue or know what's next, but there's no active workflow or clear context."
-                    context_info = "Provide helpful suggestions for what they can do with the bot, focusing on common tasks and available capabilities."
+                # Save updated profile and invalidate cache
+                try:
+                    if await get_profile_repository(self.config).save_profile(user_profile):
+                        self.logger.info(f"User profile updated for onboarding restart.")
+                except Exception as e:
+                    self.logger.error(f"Error saving profile for onboarding restart: {e}", exc_info=True)
                 
-                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "encouraging and helpful")
-                await turn_context.send_activity(MessageFactory.text(response_text))
-                handled_by_specific_intent = True
+                # Start the workflow
+                workflow_response = await self.workflow_manager.start_workflow(turn_context, app_state, user_profile, "onboarding")
+                await self._send_activity_from_dict(turn_context, workflow_response)
+            handled_by_specific_intent = True
+        elif user_message.lower() in ["cancel start onboarding", "no, not now"] and \
+             hasattr(app_state, 'meta_flags') and app_state.meta_flags and \
+             app_state.meta_flags.get("pending_onboarding_restart_confirmation"):
+            # Handle cancellation of onboarding restart
+            self.logger.info("User cancelled onboarding restart")
+            app_state.meta_flags["pending_onboarding_restart_confirmation"] = False
+            await turn_context.send_activity(MessageFactory.text("No problem! I'm here whenever you're ready. Just let me know if you'd like to set up your preferences later."))
+            handled_by_specific_intent = True
+        elif intent == UserIntent.WORKFLOW_CONTINUE and confidence > 0.5:
+            # User seems to want to continue something, but there's no active workflow
+            self.logger.info(f"Orchestrator: WORKFLOW_CONTINUE intent but no active workflow")
+            
+            # Check if they just completed onboarding
+            recently_completed_onboarding = False
+            if user_profile and user_profile.profile_data:
+                onboarding_status = user_profile.profile_data.get("onboarding_status")
+                if onboarding_status == "completed" and app_state.messages:
+                    # Check if onboarding was recently completed (within last few messages)
+                    recently_completed_onboarding = any(
+                        "onboarding" in msg.text.lower() or "setup complete" in msg.text.lower()
+                        for msg in app_state.messages[-5:] if msg.role == "assistant" and msg.text
+                    )
+            
+            if recently_completed_onboarding:
+                situation = "The user just completed onboarding and is asking what to do next."
+                context_info = "They've just finished setting up their preferences. Suggest concrete next steps they can take with the bot, focusing on their stated role and tool preferences if available."
+            else:
+                situation = "The user wants to continue or know what's next, but there's no active workflow or clear context."
+                context_info = "Provide helpful suggestions for what they can do with the bot, focusing on common tasks and available capabilities."
+            
+            response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "encouraging and helpful")
+            await turn_context.send_activity(MessageFactory.text(response_text))
+            handled_by_specific_intent = True
 
-            # Ensure all explicit intent handlers that `return` also set handled_by_specific_intent = True before returning,
-            # or adjust this flow.
-            if handled_by_specific_intent:
-                await self._save_app_state(turn_context, app_state)
-                return
+        # Ensure all explicit intent handlers that `return` also set handled_by_specific_intent = True before returning,
+        # or adjust this flow.
+        if handled_by_specific_intent:
+            pipeline.short_circuit(f"intent:{intent.value}")
+            await self._save_app_state(turn_context, app_state)
+            return
 
-            # 4. Fallback to General Task Handling or Phrased Default Response
-            if intent in [UserIntent.GENERAL_TASK, UserIntent.GENERAL_QUESTION] or (intent == UserIntent.UNCLEAR and confidence < 0.7) or confidence <= 0.5:
-                self.logger.info(f"Orchestrator: Intent '{intent.value}' (conf: {confidence:.2f}) or low confidence. Proceeding to general task/tool handler.")
-                
-                # Check if user is asking about tools specifically
-                if user_message.lower().strip() in ["tools", "tools?", "what tools", "what tools?", "available tools", "list tools"]:
-                    situation = "The user is asking about what tools are available."
-                    context_info = "List the specific tools you have access to with brief descriptions of what each can do. Be specific about actual capabilities."
-                    response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "informative and organized")
-                    await turn_context.send_activity(MessageFactory.text(response_text))
-                    handled_by_specific_intent = True
-                elif self.tool_executor: 
-                    await self._handle_general_task_with_tools(turn_context, app_state, user_profile, user_message)
-                else:
-                    self.logger.warning("Orchestrator: Tool executor not available for general task.")
-                    situation = f"User message was '{user_message}'. My tool handling is not set up right now, but I understood the request."
-                    response_text = await self._get_llm_phrased_response(app_state, user_message, situation)
-                    await turn_context.send_activity(MessageFactory.text(response_text))
-            else: # Intent recognized with some confidence but not handled by specific flows or general task handler
-                self.logger.warning(f"Orchestrator: Intent '{intent.value}' (conf: {confidence:.2f}) was recognized but not explicitly handled. Using LLM to phrase acknowledgement.")
-                
-                # Create a more user-friendly response based on the intent type
-                if intent == UserIntent.GREETING:
-                    situation = "The user is greeting me."
-                    context_info = "Respond warmly and ask how you can help. If you know their name from preferences, use it."
-                    response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "warm and welcoming")
-                    await turn_context.send_activity(MessageFactory.text(response_text))
-                elif intent == UserIntent.THANKS:
-                    situation = "The user is thanking me."
-                    context_info = "Acknowledge their thanks graciously and offer continued assistance."
-                    response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "gracious and helpful")
-                    await turn_context.send_activity(MessageFactory.text(response_text))
-                else:
-                    # For other unhandled intents, provide a helpful response without technical details
-                    situation = f"The user said something I recognized but don't have a specific handler for."
-                    context_info = "Acknowledge their message and offer to help with common tasks. Don't mention intent classification or technical details."
-                    response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "helpful and proactive")
-                    await turn_context.send_activity(MessageFactory.text(response_text))
+        # 4. Fallback to General Task Handling or Phrased Default Response
+        if intent in [UserIntent.GENERAL_TASK, UserIntent.GENERAL_QUESTION] or (intent == UserIntent.UNCLEAR and confidence < 0.7) or confidence <= 0.5:
+            self.logger.info(f"Orchestrator: Intent '{intent.value}' (conf: {confidence:.2f}) or low confidence. Proceeding to general task/tool handler.")
+            
+            # Check if user is asking about tools specifically
+            if user_message.lower().strip() in ["tools", "tools?", "what tools", "what tools?", "available tools", "list tools"]:
+                situation = "The user is asking about what tools are available."
+                context_info = "List the specific tools you have access to with brief descriptions of what each can do. Be specific about actual capabilities."
+                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "informative and organized")
+                await turn_context.send_activity(MessageFactory.text(response_text))
                 handled_by_specific_intent = True
+            elif self.tool_executor: 
+                await pipeline.run("general_task", self._handle_general_task_with_tools(turn_context, app_state, user_profile, user_message))
+            else:
+                self.logger.warning("Orchestrator: Tool executor not available for general task.")
+                situation = f"User message was '{user_message}'. My tool handling is not set up right now, but I understood the request."
+                response_text = await self._get_llm_phrased_response(app_state, user_message, situation)
+                await turn_context.send_activity(MessageFactory.text(response_text))
+        else: # Intent recognized with some confidence but not handled by specific flows or general task handler
+            self.logger.warning(f"Orchestrator: Intent '{intent.value}' (conf: {confidence:.2f}) was recognized but not explicitly handled. Using LLM to phrase acknowledgement.")
             
-            await self._save_app_state(turn_context, app_state)
+            # Create a more user-friendly response based on the intent type
+            if intent == UserIntent.GREETING:
+                situation = "The user is greeting me."
+                context_info = "Respond warmly and ask how you can help. If you know their name from preferences, use it."
+                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "warm and welcoming")
+                await turn_context.send_activity(MessageFactory.text(response_text))
+            elif intent == UserIntent.THANKS:
+                situation = "The user is thanking me."
+                context_info = "Acknowledge their thanks graciously and offer continued assistance."
+                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "gracious and helpful")
+                await turn_context.send_activity(MessageFactory.text(response_text))
+            else:
+                # For other unhandled intents, provide a helpful response without technical details
+                situation = f"The user said something I recognized but don't have a specific handler for."
+                context_info = "Acknowledge their message and offer to help with common tasks. Don't mention intent classification or technical details."
+                response_text = await self._get_contextual_llm_response(app_state, user_message, situation, context_info, "helpful and proactive")
+                await turn_context.send_activity(MessageFactory.text(response_text))
+            handled_by_specific_intent = True
+        
+        await self._save_app_state(turn_context, app_state)
+
+    async def process_activity(self, turn_context: TurnContext):
+        """
+        Processes an incoming activity from the user.
+        This is the main entry point for the orchestrator.
+
+        app.py hands every activity to this method, so it is the live turn
+        handler and the one that runs the concurrent TurnPipeline stages.
+        MyBot.on_message_activity is not on the request path and is
+        intentionally left sequential.
+        """
+        # Turns of one conversation must not load and save the same AppState concurrently
+        if self.turn_locks is None:
+            await self._process_activity(turn_context)
+            return
+        conversation = turn_context.activity.conversation
+        async with self.turn_locks.hold(conversation.id if conversation else None):
+            await self._process_activity(turn_context)
+
+    async def _process_activity(self, turn_context: TurnContext):
+        if turn_context.activity.type == ActivityTypes.message:
+            pipeline = TurnPipeline(speculation_enabled=self._turn_speculation_enabled(), logger=self.logger)
+            try:
+                await self._process_message_activity(turn_context, pipeline)
+            finally:
+                pipeline.finish()
 
         elif turn_context.activity.type == ActivityTypes.conversation_update:
             self.logger.info("Received conversation update activity.")
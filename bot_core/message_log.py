@@ -0,0 +1,392 @@
+"""
+Append-only message log for conversation history.
+
+Without it every turn rewrites the whole AppState blob, message history
+included, so the bytes written per turn grow with the conversation.
+``MessageLogStorage`` wraps any bot state ``Storage`` and moves the
+conversation's messages into a log keyed by the storage key:
+
+- SQLite: the ``bot_messages`` table, one row per (state_key, seq).
+- Redis: a sorted set per state key, scored by sequence number.
+
+On write, the state blob is stored first, then only the messages that are not
+in the log yet are appended; a save that loses an e_tag conflict (see
+``state_concurrency``) never touches the log. The blob keeps the scalar
+fields, workflows and any leading system messages, plus
+``message_log_length`` and ``message_log_offset``. On read, only the last
+``tail_size`` messages are loaded back into ``AppState.messages``.
+
+Every logged message carries its ``log_seq``. When the in-memory history is no
+longer "persisted messages in order, then new ones" (e.g. after ``clear_chat``
+or a history rewrite), the log is replaced with the current messages.
+Dropping older messages from the front of the list only advances the offset;
+the log keeps them. Existing blobs with inline messages are moved into the log
+on their first write.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from botbuilder.core import Storage
+
+from state_models import AppState
+
+from .state_codec import StateCodec
+from .state_concurrency import ETAG_FIELD, ETagConflictError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAIL_SIZE = 200
+DEFAULT_STATE_PROPERTY = "AugieConversationState"
+
+
+class MessageLog(ABC):
+    """Per-key append-only message store. Sequence numbers start at 0 and have no gaps."""
+
+    @abstractmethod
+    async def read_range(self, state_key: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """Messages with start <= seq < end, in order."""
+
+    @abstractmethod
+    async def append(self, state_key: str, start_seq: int, messages: List[Dict[str, Any]]) -> None:
+        """Store messages at start_seq, start_seq + 1, ...; other positions are left alone."""
+
+    @abstractmethod
+    async def replace(self, state_key: str, messages: List[Dict[str, Any]]) -> None:
+        """Replace the whole log with messages at positions 0, 1, ..."""
+
+    @abstractmethod
+    async def delete(self, state_key: str) -> None:
+        """Remove every message stored under state_key."""
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteMessageLog(MessageLog):
+    """``bot_messages`` table in the bot state database (see the Alembic migration of the same name)."""
+
+    def __init__(self, db_path: str, codec: Optional[StateCodec] = None):
+        self.db_path = db_path
+        self.codec = codec or StateCodec(compression="none")
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bot_messages (
+                state_key TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                created_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (state_key, seq)
+            )
+            """
+        )
+
+    async def read_range(self, state_key: str, start: int, end: int) -> List[Dict[str, Any]]:
+        if end <= start:
+            return []
+        rows = await asyncio.to_thread(self._select, state_key, start, end)
+        return [self.codec.decode(data) for data in rows]
+
+    def _select(self, state_key: str, start: int, end: int) -> List[bytes]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT data FROM bot_messages WHERE state_key=? AND seq>=? AND seq<? ORDER BY seq",
+                (state_key, start, end),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    async def append(self, state_key: str, start_seq: int, messages: List[Dict[str, Any]]) -> None:
+        rows = [(state_key, start_seq + i, self.codec.encode(message)) for i, message in enumerate(messages)]
+        await asyncio.to_thread(self._store, None, rows)
+
+    async def replace(self, state_key: str, messages: List[Dict[str, Any]]) -> None:
+        rows = [(state_key, i, self.codec.encode(message)) for i, message in enumerate(messages)]
+        await asyncio.to_thread(self._store, state_key, rows)
+
+    def _store(self, clear_key: Optional[str], rows: List[Tuple[str, int, bytes]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if clear_key is not None:
+                    self._conn.execute("DELETE FROM bot_messages WHERE state_key=?", (clear_key,))
+                self._conn.executemany("INSERT OR REPLACE INTO bot_messages (state_key, seq, data) VALUES (?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def delete(self, state_key: str) -> None:
+        await asyncio.to_thread(self._store, state_key, [])
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisMessageLog(MessageLog):
+    """One Redis sorted set per state key, scored by the message's sequence number."""
+
+    def __init__(self, app_settings: Any, codec: Optional[StateCodec] = None):
+        self._app_settings = app_settings
+        self.codec = codec or StateCodec(compression="none")
+        from .redis_storage import MESSAGE_LOG_KEY_PREFIX  # Lazy import: needs redis
+        self._prefix = f"{getattr(app_settings, 'redis_prefix', '') or ''}{MESSAGE_LOG_KEY_PREFIX}"
+        self._client = None
+
+    async def _redis(self):
+        if self._client is None:
+            from .redis_storage import create_redis_client  # Lazy import: needs redis
+            self._client = await create_redis_client(self._app_settings, decode_responses=False)
+        return self._client
+
+    async def read_range(self, state_key: str, start: int, end: int) -> List[Dict[str, Any]]:
+        if end <= start:
+            return []
+        client = await self._redis()
+        values = await client.zrangebyscore(self._prefix + state_key, start, end - 1)
+        return [self.codec.decode(value) for value in values]
+
+    async def append(self, state_key: str, start_seq: int, messages: List[Dict[str, Any]]) -> None:
+        await self._store(state_key, start_seq, messages, clear=False)
+
+    async def replace(self, state_key: str, messages: List[Dict[str, Any]]) -> None:
+        await self._store(state_key, 0, messages, clear=True)
+
+    async def _store(self, state_key: str, start_seq: int, messages: List[Dict[str, Any]], clear: bool) -> None:
+        client = await self._redis()
+        key = self._prefix + state_key
+        async with client.pipeline(transaction=True) as pipe:
+            if clear:
+                pipe.delete(key)
+            elif messages:
+                pipe.zremrangebyscore(key, start_seq, start_seq + len(messages) - 1)
+            if messages:
+                pipe.zadd(key, {self.codec.encode(message): start_seq + i for i, message in enumerate(messages)})
+            await pipe.execute()
+
+    async def delete(self, state_key: str) -> None:
+        client = await self._redis()
+        await client.delete(self._prefix + state_key)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def _leading_system_count(messages: List[Any]) -> int:
+    count = 0
+    for message in messages:
+        role = message.get("role") if isinstance(message, dict) else message.role
+        if role != "system":
+            break
+        count += 1
+    return count
+
+
+def _log_seq(message: Any) -> Optional[int]:
+    return message.get("log_seq") if isinstance(message, dict) else message.log_seq
+
+
+def _set_log_seq(message: Any, seq: Optional[int]) -> None:
+    if isinstance(message, dict):
+        message["log_seq"] = seq
+    else:
+        # Assignment would re-run Message's "before" validator, which resets fields
+        message.__dict__["log_seq"] = seq
+
+
+def _dump(message: Any) -> Dict[str, Any]:
+    return dict(message) if isinstance(message, dict) else message.model_dump(mode='json')
+
+
+def _set_bookkeeping(state: Any, offset: int, length: int) -> None:
+    if isinstance(state, AppState):
+        state.message_log_offset, state.message_log_length = offset, length
+    else:
+        state["message_log_offset"], state["message_log_length"] = offset, length
+
+
+class _LogPlan:
+    """Log change for one state, applied once its blob is stored."""
+
+    def __init__(self, state_key: str, state: Any, is_append: bool, start_seq: int, new_messages: List[Any], previous: Tuple[int, int]):
+        self.state_key = state_key
+        self.state = state
+        self.is_append = is_append
+        self.start_seq = start_seq
+        self.new_messages = new_messages
+        self.previous = previous
+
+    async def apply(self, message_log: "MessageLog") -> None:
+        dumped = [_dump(message) for message in self.new_messages]
+        if not self.is_append:
+            await message_log.replace(self.state_key, dumped)
+        elif dumped:
+            await message_log.append(self.state_key, self.start_seq, dumped)
+
+    def rollback(self) -> None:
+        """Undo the log positions handed out, so a merged retry sees these messages as new."""
+        for message in self.new_messages:
+            _set_log_seq(message, None)
+        _set_bookkeeping(self.state, *self.previous)
+
+
+class MessageLogStorage(Storage):
+    """
+    ``Storage`` wrapper that keeps the conversation AppState's messages in a
+    ``MessageLog`` and only the rest of the state in the wrapped storage.
+    """
+
+    def __init__(
+        self,
+        inner: Storage,
+        message_log: MessageLog,
+        tail_size: int = DEFAULT_TAIL_SIZE,
+        state_property: str = DEFAULT_STATE_PROPERTY,
+    ):
+        """
+        Args:
+            inner: Storage holding the state blobs (SQLite, async SQLite or Redis)
+            message_log: Where the messages go
+            tail_size: Number of most recent messages loaded back on read
+            state_property: StoreItem property that holds the AppState
+        """
+        super().__init__()
+        self.inner = inner
+        self.message_log = message_log
+        self.tail_size = max(1, tail_size)
+        self.state_property = state_property
+
+    @staticmethod
+    def _state_key(key: Any) -> str:
+        if isinstance(key, dict) and 'namespace' in key and 'id' in key:
+            return f"{key['namespace']}/{key['id']}"
+        return str(key)
+
+    async def read(self, keys: List[str]) -> Dict[str, Any]:
+        items = await self.inner.read(keys)
+        for key, item in items.items():
+            state = item.get(self.state_property) if isinstance(item, dict) else None
+            if isinstance(state, dict) and state.get("message_log_length"):
+                await self._load_tail(self._state_key(key), state)
+        return items
+
+    async def _load_tail(self, state_key: str, state: Dict[str, Any]) -> None:
+        length = state["message_log_length"]
+        start = max(state.get("message_log_offset", 0), length - self.tail_size)
+        tail = await self.message_log.read_range(state_key, start, length)
+        if len(tail) != length - start:
+            logger.warning(f"Message log for {state_key} has {len(tail)} of {length - start} expected messages")
+        state["messages"] = list(state.get("messages") or []) + tail
+        state["message_log_offset"] = start
+
+    async def write(self, changes: Dict[str, Any]) -> None:
+        if not changes:
+            return
+        blobs, plans = {}, {}
+        for key, item in changes.items():
+            state = item.get(self.state_property) if isinstance(item, dict) else None
+            if isinstance(state, AppState) or (isinstance(state, dict) and "messages" in state):
+                blob, plans[key] = self._plan_messages(self._state_key(key), state)
+                item = {**item, self.state_property: blob}
+            blobs[key] = item
+
+        # The state blob is written first: if it loses an e_tag conflict the log is untouched
+        try:
+            await self.inner.write(blobs)
+        except ETagConflictError as e:
+            # The inner storage still wrote the other keys; their messages go to the log as usual
+            await self._finish_write(changes, blobs, plans, skipped=e.keys)
+            raise
+        except Exception:
+            for plan in plans.values():
+                plan.rollback()
+            raise
+        await self._finish_write(changes, blobs, plans, skipped=[])
+
+    async def _finish_write(self, changes: Dict[str, Any], blobs: Dict[str, Any], plans: Dict[Any, "_LogPlan"], skipped: List[Any]) -> None:
+        """Roll back the log plans of the skipped keys; apply the rest and pass their e_tags back."""
+        for key, plan in plans.items():
+            if key in skipped:
+                plan.rollback()
+        for key, item in changes.items():
+            if key not in skipped and isinstance(item, dict) and ETAG_FIELD in blobs[key]:
+                item[ETAG_FIELD] = blobs[key][ETAG_FIELD]
+        for key, plan in plans.items():
+            if key not in skipped:
+                await plan.apply(self.message_log)
+
+    def _plan_messages(self, state_key: str, state: Any) -> Tuple[Dict[str, Any], "_LogPlan"]:
+        """Assign log positions to new messages and build the state blob without the logged ones."""
+        if isinstance(state, AppState):
+            messages = state.messages
+            blob = state.model_dump(mode='json', exclude={'messages'})
+        else:
+            messages = state.get("messages") or []
+            blob = {k: v for k, v in state.items() if k != "messages"}
+        length = blob.get("message_log_length", 0) or 0
+        offset = blob.get("message_log_offset", 0) or 0
+
+        pinned_count = _leading_system_count(messages)
+        pinned, body = messages[:pinned_count], messages[pinned_count:]
+        seqs = [_log_seq(message) for message in body]
+        logged = [seq for seq in seqs if seq is not None]
+        # Logged messages must be in order and ahead of the new ones. The log may
+        # end before `length` if an earlier save never got to append its messages.
+        is_append = (
+            (not logged and length == 0)
+            or (
+                logged
+                and logged == list(range(logged[0], logged[0] + len(logged)))
+                and logged[-1] < length
+                and all(seq is not None for seq in seqs[:len(logged)])
+            )
+        )
+        if is_append:
+            new_offset, start_seq, new_messages = (logged[0] if logged else 0), length, body[len(logged):]
+        else:
+            logger.info(f"Message history of {state_key} was rewritten; replacing its message log")
+            new_offset, start_seq, new_messages = 0, 0, body
+
+        for i, message in enumerate(new_messages):
+            _set_log_seq(message, start_seq + i)
+        for message in pinned:
+            _set_log_seq(message, None)
+        new_length = start_seq + len(new_messages)
+        _set_bookkeeping(state, new_offset, new_length)
+        blob.update(messages=[_dump(message) for message in pinned], message_log_offset=new_offset, message_log_length=new_length)
+        plan = _LogPlan(state_key, state, is_append, start_seq, new_messages, (offset, length))
+        return blob, plan
+
+    async def delete(self, keys: List[str]) -> None:
+        await self.inner.delete(keys)
+        for key in keys:
+            await self.message_log.delete(self._state_key(key))
+
+    # --- Adapter methods for ToolCallAdapter (states saved there are not log-backed) ---
+
+    async def get_app_state(self, session_id: str) -> Optional[AppState]:
+        return await self.inner.get_app_state(session_id)
+
+    async def save_app_state(self, session_id: str, app_state: AppState) -> bool:
+        return await self.inner.save_app_state(session_id, app_state)
+
+    async def aclose(self) -> None:
+        """Close the message log and the wrapped storage."""
+        await self.message_log.close()
+        close = getattr(self.inner, "aclose", None) or getattr(self.inner, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
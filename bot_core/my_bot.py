@@ -54,9 +54,10 @@ from bot_core.enhanced_bot_handler import EnhancedBotHandler
 
 # Import conversation context manager for graceful error handling
 from bot_core.conversation_context_manager import ConversationContextManager, ErrorCategory
+from bot_core.streaming_reply import StreamingReplyWriter
 
 # Import user authentication utilities
-from user_auth.utils import get_current_user_profile # Added
+from user_auth.profile_repository import get_profile_repository
 from user_auth.models import UserProfile # Added
 from user_auth.permissions import Permission # Added for command checking
 from workflows.onboarding import OnboardingQuestionType # Added
@@ -91,6 +92,19 @@ except ImportError:
     RedisStorage = None # Allows conditional logic if file/class isn't there yet
     logger.info("RedisStorage not found or importable from .redis_storage. Redis will not be available.") # Now logger is defined
 
+from .async_sqlite_storage import AsyncSQLiteStorage
+from .state_codec import StateCodec, StateCodecError
+from .turn_lock import TurnLockManager
+from .state_concurrency import (
+    ConflictMergingStorage,
+    ETagConflictError,
+    expected_etag,
+    set_etag,
+    sqlite_compare_and_set,
+    without_etag,
+)
+from .message_log import MessageLogStorage, RedisMessageLog, SQLiteMessageLog
+
 # --- Start: Robust import of root utils.py and logging_config ---
 _my_bot_dir = os.path.dirname(os.path.abspath(__file__))
 _project_root_dir = os.path.dirname(_my_bot_dir) # This should be Light-MVP root
@@ -169,7 +183,7 @@ except ModuleNotFoundError as e:
 class SQLiteStorage:
     """
     Robust SQLite-backed storage for Bot Framework state.
-    Stores state as JSON blobs keyed by (namespace, id).
+    Stores state as StateCodec-encoded blobs (legacy rows: JSON text) keyed by (namespace, id).
     Includes connection pooling and enhanced error handling.
     
     NOTE: This class manages the 'bot_state' table in the SQLite database.
@@ -197,7 +211,7 @@ class SQLiteStorage:
         1053, # SQLITE_IOERR_RDLOCK
     }
     
-    def __init__(self, db_path: str, pool_size: int = 5, max_retries: int = 3):
+    def __init__(self, db_path: str, pool_size: int = 5, max_retries: int = 3, codec: Optional[StateCodec] = None):
         """
         Initialize SQLiteStorage with connection pooling.
         
@@ -205,8 +219,10 @@ class SQLiteStorage:
             db_path: Path to the SQLite database file
             pool_size: Size of the connection pool
             max_retries: Maximum number of retry attempts for transient errors
+            codec: Serializer for stored items (default: StateCodec()); reads legacy JSON rows too
         """
         self.db_path = db_path
+        self.codec = codec or StateCodec()
         self.pool_size = pool_size
         self.max_retries = max_retries
         self._pool_lock = threading.RLock()
@@ -424,6 +440,7 @@ class SQLiteStorage:
                         data TEXT,
                         created_at TEXT DEFAULT (datetime('now')),
                         updated_at TEXT DEFAULT (datetime('now')),
+                        version INTEGER NOT NULL DEFAULT 0,
                         PRIMARY KEY (namespace, id)
                     )
                     """
@@ -446,6 +463,12 @@ class SQLiteStorage:
                     # Update all existing rows with current timestamp
                     conn.execute("UPDATE bot_state SET updated_at = datetime('now')")
 
+                try:
+                    conn.execute("SELECT version FROM bot_state LIMIT 1")
+                except sqlite3.OperationalError:
+                    # version column (optimistic concurrency e_tag) doesn't exist yet
+                    conn.execute("ALTER TABLE bot_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
     async def read(self, keys):
         """
         Read items from storage with retry logic for transient errors.
@@ -506,19 +529,20 @@ class SQLiteStorage:
                         success = True # No valid keys to query, so technically successful
                         break 
 
-                    sql = f"SELECT namespace, id, data FROM bot_state WHERE {' OR '.join(where_clauses)}"
+                    sql = f"SELECT namespace, id, data, version FROM bot_state WHERE {' OR '.join(where_clauses)}"
                     cur = conn.execute(sql, params)
 
                     for row in cur.fetchall():
-                        namespace, id_, data_str = row
+                        namespace, id_, data_str, version = row
                         db_key = f"{namespace}/{id_}"
-                        logger.debug(f"SQLiteRead: Raw data_str for {db_key}: {data_str}")
                         try:
-                            loaded_data = json.loads(data_str)
-                            logger.debug(f"SQLiteRead: Loaded data for {db_key}: {pprint.pformat(loaded_data)}")
+                            loaded_data = self.codec.decode(data_str)
+                            set_etag(loaded_data, version)
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(f"SQLiteRead: Loaded data for {db_key}: {pprint.pformat(loaded_data)}")
                             db_results_dict[db_key] = loaded_data
-                        except json.JSONDecodeError as json_err:
-                            logger.error(f"Error decoding JSON data for {db_key}: {json_err}. Data: {data_str[:500]}") # Log part of the data
+                        except StateCodecError as json_err:
+                            logger.error(f"Error decoding stored data for {db_key}: {json_err}. Data: {data_str[:500]!r}") # Log part of the data
                             db_results_dict[db_key] = None # Store None if data is corrupted
                 success = True
                 break # Break from while loop on success
@@ -587,6 +611,7 @@ class SQLiteStorage:
         retries_left = self.max_retries
         
         while retries_left >= 0:
+            conflicts, written = [], []
             try:
                 with self._get_conn() as conn:
                     for key, value in changes.items():
@@ -609,52 +634,27 @@ class SQLiteStorage:
                                 logger.error(err_msg)
                                 raise TypeError(err_msg) # Raise an exception
                            
-                           # Serialize data
-                            logger.debug(f"SQLiteWrite: Key: {key}, Type of value: {type(value)}")
-                            if hasattr(value, '__dict__'):
-                                logger.debug(f"SQLiteWrite: value.__dict__: {pprint.pformat(value.__dict__)}")
-                                if 'AugieConversationState' in value.__dict__:
-                                     logger.debug(f"SQLiteWrite: Type of value.AugieConversationState: {type(value.__dict__['AugieConversationState'])}")
-                            
-                            # data_to_serialize = value # Original problematic line
-                            # The 'value' here is the StoreItem dict, e.g., {'AugieConversationState': AppState(...), 'eTag': '...'}
-                            # We need to serialize the AppState model *within* this dict.
-                            
-                            temp_store_item_dict = {}
-                            if isinstance(value, dict):
-                                for item_key, item_val in value.items():
-                                    if isinstance(item_val, BaseModel): # Check if nested item is Pydantic
-                                        temp_store_item_dict[item_key] = item_val.model_dump(mode='json')
-                                    else:
-                                        temp_store_item_dict[item_key] = item_val
-                                data_to_serialize = temp_store_item_dict
-                            else: # Should not happen if Bot Framework sends StoreItem dicts
-                                data_to_serialize = value
-                                if isinstance(value, BaseModel):
-                                     data_to_serialize = value.model_dump(mode='json')
-
-                            if isinstance(data_to_serialize, dict):
-                                logger.debug(f"SQLiteWrite: data_to_serialize (dict): {pprint.pformat(data_to_serialize)}")
-                            else:
-                                logger.debug(f"SQLiteWrite: data_to_serialize (str): {str(data_to_serialize)[:500]}")
+                           # Serialize data. The value is the StoreItem dict, e.g.
+                            # {'AugieConversationState': AppState(...), 'e_tag': '...'};
+                            # the codec dumps Pydantic models nested in it. The e_tag is
+                            # kept in the version column, not in the data.
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(f"SQLiteWrite: Key: {key}, Type of value: {type(value)}")
+                                if isinstance(value, dict):
+                                    logger.debug(f"SQLiteWrite: data_to_serialize (dict): {pprint.pformat(value)}")
 
                             try:
-                                data = json.dumps(data_to_serialize)
-                                logger.debug(f"SQLiteWrite: JSON data to write for key {key}: {data[:500]}") # Log first 500 chars
+                                data = self.codec.encode(without_etag(value))
                             except TypeError as json_err:
-                                logger.error(f"Error serializing data for {key}: {json_err}. Object type: {type(data_to_serialize)}", exc_info=True)
-                                # If model_dump was used, this error is less likely for Pydantic types
-                                # but could still occur for complex nested non-Pydantic types within the model.
+                                logger.error(f"Error serializing data for {key}: {json_err}. Object type: {type(value)}", exc_info=True)
                                 raise # Re-raise the TypeError to make the failure explicit
-                                
-                            # Update or insert the data with updated timestamp
-                            conn.execute(
-                                """
-                                REPLACE INTO bot_state (namespace, id, data, updated_at) 
-                                VALUES (?, ?, ?, datetime('now'))
-                                """,
-                                (namespace, id_, data)
-                            )
+
+                            # Update or insert the data if the e_tag still matches
+                            version = sqlite_compare_and_set(conn, namespace, id_, data, expected_etag(value))
+                            if version is None:
+                                conflicts.append(key)
+                            else:
+                                written.append((value, version))
                         except sqlite3.Error as e:
                             logger.error(f"Error writing key {key}: {e}")
                             # Continue with other keys
@@ -674,6 +674,12 @@ class SQLiteStorage:
                 logger.error(f"Unexpected error during write: {e}")
                 raise
 
+        for value, version in written:
+            set_etag(value, version)
+        if conflicts:
+            logger.warning(f"SQLiteWrite: e_tag conflict, not written: {conflicts}")
+            raise ETagConflictError(conflicts)
+
     async def delete(self, keys):
         """
         Delete items from storage with retry logic.
@@ -765,6 +771,7 @@ class MyBot(ActivityHandler):
         logger.info("Conversation context manager initialized for seamless error handling")
 
         # --- Storage Initialization based on memory_type --- 
+        state_codec = StateCodec.from_settings(app_config.settings)
         if app_config.settings.memory_type == "redis" and RedisStorage:
             logger.info(f"Using Redis for bot state. Configured URL: {app_config.settings.redis_url}, Host: {app_config.settings.redis_host}, Port: {app_config.settings.redis_port}")
             try:
@@ -777,16 +784,42 @@ class MyBot(ActivityHandler):
                 # Fallback to SQLite if Redis initialization fails
                 db_path = self.app_config.STATE_DB_PATH
                 logger.info(f"Using SQLite database for bot state at: {db_path} (fallback from Redis)")
-                self.storage = SQLiteStorage(db_path=db_path)
+                self.storage = SQLiteStorage(db_path=db_path, codec=state_codec)
+        elif app_config.settings.memory_type == "sqlite_async":
+            db_path = self.app_config.STATE_DB_PATH
+            logger.info(f"Using async SQLite storage (read pool + group-committing writer) for bot state at: {db_path}")
+            self.storage = AsyncSQLiteStorage(
+                db_path=db_path,
+                read_pool_size=app_config.settings.sqlite_read_pool_size,
+                max_batch_size=app_config.settings.sqlite_write_batch_size,
+                codec=state_codec,
+            )
         else:
             if app_config.settings.memory_type == "redis" and not RedisStorage:
                 logger.warning("MEMORY_TYPE is 'redis' but RedisStorage adapter is not available. Falling back to SQLite.")
             
             db_path = self.app_config.STATE_DB_PATH # Uses the property from Config
             logger.info(f"Using SQLite database for bot state at: {db_path}")
-            self.storage = SQLiteStorage(db_path=db_path) 
+            self.storage = SQLiteStorage(db_path=db_path, codec=state_codec)
+
+        if app_config.settings.message_log_enabled is True:
+            if RedisStorage and isinstance(self.storage, RedisStorage):
+                message_log = RedisMessageLog(app_config.settings)
+            else:
+                message_log = SQLiteMessageLog(self.app_config.STATE_DB_PATH)
+            logger.info(f"Conversation messages stored in an append-only {type(message_log).__name__}")
+            self.storage = MessageLogStorage(
+                self.storage, message_log, tail_size=app_config.settings.message_log_tail_size
+            )
+        max_merges = getattr(app_config.settings, 'state_conflict_max_merges', 3)
+        if isinstance(max_merges, int) and max_merges > 0:
+            # Outermost: a save that lost an e_tag race is merged with the stored state and retried
+            self.storage = ConflictMergingStorage(self.storage, max_attempts=max_merges)
         # --- End Storage Initialization ---
 
+        # One turn at a time per conversation; other conversations run in parallel
+        self.turn_locks = TurnLockManager.from_settings(app_config.settings)
+
         # Define state properties
         self.conversation_state = ConversationState(self.storage)
         self.user_state = UserState(self.storage)  # For user-specific state
@@ -976,6 +1009,15 @@ class MyBot(ActivityHandler):
         return app_state_instance
 
     async def on_turn(self, turn_context: TurnContext):
+        # Turns of one conversation must not load and save the same AppState concurrently
+        if self.turn_locks is None:
+            await self._run_turn(turn_context)
+            return
+        conversation = turn_context.activity.conversation
+        async with self.turn_locks.hold(conversation.id if conversation else None):
+            await self._run_turn(turn_context)
+
+    async def _run_turn(self, turn_context: TurnContext):
         # This is called for every activity.
         # It's crucial to call super().on_turn() to ensure the ActivityHandler
         # routes events.
@@ -1112,7 +1154,7 @@ class MyBot(ActivityHandler):
         # --- Start: Integrate User Authentication (P3A.4.1) ---
         try:
             # Attempt to load user profile from turn context
-            user_profile = get_current_user_profile(turn_context, db_path=self.app_config.STATE_DB_PATH)
+            user_profile = await get_profile_repository(self.app_config).get_profile(turn_context, db_path=self.app_config.STATE_DB_PATH)
             
             if user_profile:
                 # Store the user profile in app state for later access
@@ -1188,8 +1230,7 @@ class MyBot(ActivityHandler):
                             if hasattr(user_profile, 'profile_data') and isinstance(user_profile.profile_data, dict):
                                 user_profile.profile_data["onboarding_status"] = "started"
                                 user_profile.profile_data["onboarding_started_at"] = datetime.utcnow().isoformat()
-                            from user_auth import db_manager # Ensure import
-                            db_manager.save_user_profile(user_profile.model_dump())
+                            await get_profile_repository(self.app_config).save_profile(user_profile)
                             
                             logger_msg_activity.info(f"Started onboarding workflow {workflow.workflow_id} for user {user_profile.user_id} after opt-in.", extra={"event_type": "onboarding_workflow_started_opt_in", "workflow_id": workflow.workflow_id})
                             return # Onboarding question sent, end turn
@@ -1201,8 +1242,7 @@ class MyBot(ActivityHandler):
                             if hasattr(user_profile, 'profile_data') and isinstance(user_profile.profile_data, dict):
                                 user_profile.profile_data["onboarding_status"] = "skipped_temporarily"
                                 user_profile.profile_data["onboarding_skipped_at"] = datetime.utcnow().isoformat()
-                            from user_auth import db_manager # Ensure import
-                            db_manager.save_user_profile(user_profile.model_dump())
+                            await get_profile_repository(self.app_config).save_profile(user_profile)
                             return # End turn after handling skip
                         elif user_text_lower in ["later", "maybe later", "not now", "no", "nah", "nope", "skip", "no thanks", "not interested", "nah i dont wanna", "i dont want to", "hey i dont want to"]:
                             # Handle common rejection phrases
@@ -1212,8 +1252,7 @@ class MyBot(ActivityHandler):
                             if hasattr(user_profile, 'profile_data') and isinstance(user_profile.profile_data, dict):
                                 user_profile.profile_data["onboarding_status"] = "declined"
                                 user_profile.profile_data["onboarding_declined_at"] = datetime.utcnow().isoformat()
-                            from user_auth import db_manager # Ensure import
-                            db_manager.save_user_profile(user_profile.model_dump())
+                            await get_profile_repository(self.app_config).save_profile(user_profile)
                             return # End turn after handling rejection
                         else:
                             # User sent something else while decision was pending - clear the flag and continue processing
@@ -1255,12 +1294,8 @@ class MyBot(ActivityHandler):
                             
                             if skip_result.get("success"):
                                 await turn_context.send_activity(MessageFactory.text(skip_result["message"]))
-                                from user_auth import db_manager
-                                from user_auth.utils import invalidate_user_profile_cache
-                                profile_dict = onboarding_handler.user_profile.model_dump()
-                                db_manager.save_user_profile(profile_dict)
-                                # Invalidate cache to ensure fresh profile data is loaded next time
-                                invalidate_user_profile_cache(user_profile.user_id)
+                                # save_profile also invalidates the cached copy, so fresh profile data is loaded next time
+                                await get_profile_repository(self.app_config).save_profile(onboarding_handler.user_profile)
                                 logger_msg_activity.info(f"Onboarding successfully skipped ({event_source}) for user {user_profile.user_id}. WF: {current_active_onboarding_workflow.workflow_id}.",
                                                          extra={"event_type": "onboarding_skipped_successfully", "source": event_source})
                                 current_active_onboarding_workflow = None 
@@ -1332,10 +1367,6 @@ class MyBot(ActivityHandler):
 
                             result = onboarding_handler.process_answer(current_active_onboarding_workflow.workflow_id, user_text_lower)
                             
-                            # Import db_manager and invalidate_user_profile_cache here as they are used in multiple branches
-                            from user_auth import db_manager
-                            from user_auth.utils import invalidate_user_profile_cache
-
                             if result.get("error"):
                                 await turn_context.send_activity(MessageFactory.text(f"❌ {result['error']}"))
                                 return
@@ -1344,11 +1375,9 @@ class MyBot(ActivityHandler):
                                 return
                             
                             # --- Start: New logic for incremental save and confirmation ---
-                            profile_dict_for_save = onboarding_handler.user_profile.model_dump()
-                            save_successful = db_manager.save_user_profile(profile_dict_for_save)
+                            save_successful = await get_profile_repository(self.app_config).save_profile(onboarding_handler.user_profile)
                             
                             if save_successful:
-                                invalidate_user_profile_cache(user_profile.user_id)
                                 logger_msg_activity.info(f"Successfully saved UserProfile for {user_profile.user_id} after onboarding answer/skip.", extra={"event_type": "onboarding_profile_increment_save"})
                                 
                                 saved_key = result.get("answer_saved_key")
@@ -1818,6 +1847,10 @@ class MyBot(ActivityHandler):
 
         accumulated_text_response: List[str] = []
         final_bot_message_sent = False
+        # Partial LLM text is sent as a new message, then updated in place as it grows
+        reply_writer = StreamingReplyWriter.from_config(
+            turn_context, self.app_config, started_at=interaction_start_time, logger=logger_msg_activity
+        )
      
         # Check if the bot is already processing a request for this session
         if app_state.is_streaming:
@@ -1867,30 +1900,9 @@ class MyBot(ActivityHandler):
                 if event_type == "text_chunk":
                     if event_content is not None:
                         accumulated_text_response.append(str(event_content))
-                    
-                    if last_activity_id_to_update:
-                        updated_text = "".join(accumulated_text_response).strip()
-                        if updated_text:
-                            activity_to_update = Activity(
-                                id=last_activity_id_to_update,
-                                type=ActivityTypes.message,
-                                text=updated_text,
-                            )
-                            try:
-                                await turn_context.update_activity(activity_to_update)
-                                final_bot_message_sent = True
-                                logger_msg_activity.debug("Updated activity with text_chunk.", extra={"event_type": "activity_updated", "details": {"session_id": app_state.session_id, "activity_id": last_activity_id_to_update, "update_type": "text_chunk"}})
-                            except Exception as update_error:
-                                logger_msg_activity.warning(
-                                    "Failed to update activity with text_chunk, falling back to new message.",
-                                    exc_info=True,
-                                    extra={"event_type": "activity_update_failed", "details": {"session_id": app_state.session_id, "activity_id": last_activity_id_to_update, "error": str(update_error)}}
-                                )
-                                # Fallback: send as new message if update failed
-                                new_activity_sent_response = await turn_context.send_activity(Activity(type=ActivityTypes.message, text=updated_text))
-                                last_activity_id_to_update = new_activity_sent_response.id if new_activity_sent_response else None
-                                final_bot_message_sent = True
-                                accumulated_text_response = [updated_text] # Reset accumulated for next potential update
+                        await reply_writer.append(str(event_content))
+                        if reply_writer.delivered:
+                            final_bot_message_sent = True
                 elif event_type == "status":
                     status_message = f"⏳ Status: {event_content}"
                     if last_activity_id_to_update and not "".join(accumulated_text_response).strip():
@@ -1921,6 +1933,8 @@ class MyBot(ActivityHandler):
                         # For now, just logging if it can't be an update of the placeholder
 
                 elif event_type == "tool_calls":
+                    # Text streamed so far stays in its own message; the tool notice follows it
+                    await reply_writer.end_message()
                     tool_names = [tc.get("function", {}).get("name", "N/A") for tc in (event_content or []) if isinstance(tc, dict)]
                     tool_call_msg = f"🔧 Using tools: {', '.join(tool_names)}"
                     logger_msg_activity.info("Tool calls initiated.", extra={"event_type": "tool_calls_initiated", "details": {"tool_names": tool_names, "raw_tool_calls": event_content}})
@@ -2008,6 +2022,7 @@ class MyBot(ActivityHandler):
                     pause_msg = pause_event_content.get("message", "Workflow paused, awaiting your input.")
                     raw_draft = pause_event_content.get("raw_draft_for_display")
                     logger_msg_activity.info("Workflow paused.", extra={"event_type": "workflow_paused", "details": pause_event_content})
+                    await reply_writer.end_message()
 
                     if raw_draft:
                         await turn_context.send_activity(MessageFactory.text(f"```markdown\n{raw_draft}\n```"))
@@ -2041,6 +2056,7 @@ class MyBot(ActivityHandler):
                     next_stage_name = event_content.get("next_stage", "next stage") if isinstance(event_content, dict) else "next stage"
                     transition_msg = f"Workflow progressing to {next_stage_name}..."
                     logger_msg_activity.info("Workflow transitioning.", extra={"event_type": "workflow_transitioning", "details": {"next_stage": next_stage_name, "content": event_content}})
+                    await reply_writer.end_message()
                     await turn_context.send_activity(transition_msg)
                     final_bot_message_sent = True
                     last_activity_id_to_update = None
@@ -2187,12 +2203,19 @@ class MyBot(ActivityHandler):
             logger_msg_activity.info("Turn processing finished.", extra={"event_type": "turn_end", "details": {"activity_id": turn_context.activity.id, "final_status": getattr(app_state, "last_interaction_status", "UNKNOWN") if 'app_state' in locals() else "UNKNOWN_NO_APP_STATE"}})
 
         final_text_to_send = "".join(accumulated_text_response).strip()
-        placeholder_updated = final_bot_message_sent and last_activity_id_to_update is not None
 
-        if final_text_to_send and not placeholder_updated:
-            # Track with context manager before sending
+        if final_text_to_send and reply_writer.enabled:
+            # Already streamed to the user; deliver the tail and record it for repeat detection
+            try:
+                await reply_writer.finalize()
+                final_bot_message_sent = True
+            except Exception:
+                logger_msg_activity.error("Failed to deliver the end of the streamed reply.", exc_info=True, extra={"event_type": "streaming_reply_finalize_failed"})
+            self.context_manager.track_bot_response(final_text_to_send)
+        elif final_text_to_send:
+            # Buffered delivery: track with context manager before sending
             if self.context_manager.track_bot_response(final_text_to_send):
-                await turn_context.send_activity(MessageFactory.text(final_text_to_send))
+                await reply_writer.finalize()
                 final_bot_message_sent = True
                 logger_msg_activity.info("Sent final text response as a new message activity.", extra={"event_type": "final_text_sent_new_message"})
             else:
@@ -2206,15 +2229,6 @@ class MyBot(ActivityHandler):
                     logger_msg_activity.info("Sent generic completion message.", extra={"event_type": "generic_completion_sent"})
                     final_bot_message_sent = True
 
-        if final_text_to_send and placeholder_updated and last_activity_id_to_update is not None:
-            # Track with context manager before sending
-            if self.context_manager.track_bot_response(final_text_to_send):
-                await turn_context.send_activity(MessageFactory.text(final_text_to_send))
-                logger_msg_activity.info("Force-sent final response as a new message activity (bugfix).", extra={"event_type": "final_text_force_sent_new_message"})
-                final_bot_message_sent = True
-            else:
-                logger_msg_activity.warning("Skipped duplicate force-send response", extra={"event_type": "duplicate_force_response_blocked"})
-
         if hasattr(app_state, "session_stats") and app_state.session_stats is not None:
             logger.info( # This is the existing summary log, keep it as is or integrate with JSON if preferred
                 "Turn completed. Session: %s, Duration: %sms, LLM Calls: %s, Status: %s",
@@ -1,4 +1,3 @@
-import json
 import logging
 from typing import List, Dict, Any, Optional
 import pprint 
@@ -11,30 +10,90 @@ from pydantic import BaseModel # GOTTTTAAA make sure this is imported
 
 from config import AppSettings 
 
+from .state_codec import StateCodec, StateCodecError
+from .state_concurrency import ETagConflictError, expected_etag, set_etag, without_etag
+
 log = logging.getLogger(__name__)
 
 class RedisStorageError(Exception):
     """Custom exception for RedisStorage errors."""
     pass
 
+
+# Compare-and-set of one StoreItem. KEYS: data key, version key. ARGV: expected
+# version ("" = unconditional), encoded item. Returns the new version, or -1 if
+# the item exists and its version no longer matches.
+_COMPARE_AND_SET_LUA = """
+local current = redis.call('GET', KEYS[2]) or '0'
+if ARGV[1] ~= '' and ARGV[1] ~= current and redis.call('EXISTS', KEYS[1]) == 1 then
+    return -1
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[2])
+return version
+"""
+ETAG_KEY_PREFIX = "etag:"
+# Other data kept under REDIS_PREFIX next to the state items
+MESSAGE_LOG_KEY_PREFIX = "messages:"  # RedisMessageLog
+RESPONSE_CACHE_KEY_PREFIX = "llm_response:"  # RedisResponseCache
+TURN_LOCK_KEY_PREFIX = "turn_lock:"  # RedisTurnLockManager
+NON_STATE_KEY_PREFIXES = (ETAG_KEY_PREFIX, MESSAGE_LOG_KEY_PREFIX, RESPONSE_CACHE_KEY_PREFIX, TURN_LOCK_KEY_PREFIX)
+
+
+async def create_redis_client(settings: AppSettings, decode_responses: bool = True) -> aioredis.Redis:
+    """
+    Creates an asynchronous Redis client from the REDIS_* settings.
+
+    Shared by RedisStorage and other Redis-backed components (e.g. the LLM
+    response cache) so they all connect the same way. The client is not pinged.
+    Pass decode_responses=False to get raw bytes back (binary state payloads).
+    """
+    if settings.redis_url:
+        log.info(f"Connecting to Redis using URL: {settings.redis_url}")
+        # If from_url is patched with new_callable=AsyncMock, the call itself needs to be awaited.
+        return await aioredis.from_url(
+            str(settings.redis_url),
+            encoding="utf-8",
+            decode_responses=decode_responses
+        )
+    log.info(f"Connecting to Redis using host: {settings.redis_host}, port: {settings.redis_port}, DB: {settings.redis_db}")
+    # If Redis class is patched with new_callable=AsyncMock, the instantiation call needs to be awaited.
+    return await aioredis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port or 6379,
+        password=settings.redis_password,
+        db=settings.redis_db or 0,
+        ssl=settings.redis_ssl_enabled or False,
+        encoding="utf-8",
+        decode_responses=decode_responses
+    )
+
 class RedisStorage(Storage):
     """
     A Storage provider that uses an asynchronous Redis client for state persistence.
-    It stores bot state data as JSON strings in Redis.
+    It stores bot state data as StateCodec-encoded bytes in Redis (legacy values: JSON strings).
+    Each item's version lives in a companion "etag:<key>" counter and is returned as its
+    e_tag; writes carrying an e_tag are compare-and-set (see state_concurrency).
     """
 
-    def __init__(self, app_settings: AppSettings):
+    def __init__(self, app_settings: AppSettings, codec: Optional[StateCodec] = None):
         """
         Initializes a new instance of the RedisStorage class.
 
         Args:
             app_settings: The application settings containing Redis configuration.
+            codec: Serializer for stored items (default: built from the STATE_CODEC_* settings).
         """
         super().__init__()
         self._app_settings = app_settings
         self._redis_client: Optional[aioredis.Redis] = None
         self._is_initializing = False # Flag to prevent re-entrant initialization
         self._redis_prefix = self._app_settings.redis_prefix # Storing prefix for convenience
+        self.codec = codec or StateCodec.from_settings(app_settings)
+        self._compare_and_set = None  # Lua script, registered with the client
+
+    def _etag_key(self, key: str) -> str:
+        return f"{self._redis_prefix}{ETAG_KEY_PREFIX}{key}"
 
     # --- START: Interface Adapter Methods for ToolCallAdapter ---
     async def get_app_state(self, session_id: str) -> Optional['AppState']:
@@ -139,29 +198,12 @@ class RedisStorage(Storage):
         settings = self._app_settings
 
         try:
-            if settings.redis_url:
-                log.info(f"Connecting to Redis using URL: {settings.redis_url}")
-                # If from_url is patched with new_callable=AsyncMock, the call itself needs to be awaited.
-                self._redis_client = await aioredis.from_url(
-                    str(settings.redis_url),
-                    encoding="utf-8",
-                    decode_responses=True 
-                )
-            else:
-                log.info(f"Connecting to Redis using host: {settings.redis_host}, port: {settings.redis_port}, DB: {settings.redis_db}")
-                # If Redis class is patched with new_callable=AsyncMock, the instantiation call needs to be awaited.
-                self._redis_client = await aioredis.Redis(
-                    host=settings.redis_host,
-                    port=settings.redis_port or 6379,
-                    password=settings.redis_password,
-                    db=settings.redis_db or 0,
-                    ssl=settings.redis_ssl_enabled or False,
-                    encoding="utf-8",
-                    decode_responses=True
-                )
-            
+            # Binary client: encoded state is not valid UTF-8 text
+            self._redis_client = await create_redis_client(settings, decode_responses=False)
+
             # Now self._redis_client should be the actual client object (or mock client object)
             await self._redis_client.ping()
+            self._compare_and_set = self._redis_client.register_script(_COMPARE_AND_SET_LUA)
             log.info("Successfully connected to Redis and pinged server.")
             log.info(f"Redis client type after initialization: {type(self._redis_client)}")
 
@@ -195,21 +237,23 @@ class RedisStorage(Storage):
         prefixed_keys = [self._redis_prefix + key for key in keys]
         try:
             log.debug(f"Reading prefixed keys from Redis: {prefixed_keys}")
-            values = await self._redis_client.mget(prefixed_keys)
-            
+            values = await self._redis_client.mget(prefixed_keys + [self._etag_key(key) for key in keys])
+            versions = values[len(keys):]
+
             for i, original_key in enumerate(keys):
                 value = values[i]
                 if value is not None:
                     try:
-                        log.debug(f"RedisRead: Raw value for key '{original_key}' (prefixed: {prefixed_keys[i]}): {value}")
-                        deserialized_item = json.loads(value)
-                        log.debug(f"RedisRead: Loaded data for key '{original_key}': {pprint.pformat(deserialized_item)}")
+                        deserialized_item = self.codec.decode(value)
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug(f"RedisRead: Loaded data for key '{original_key}': {pprint.pformat(deserialized_item)}")
                         if not isinstance(deserialized_item, dict):
-                            log.warning(f"Deserialized item for key '{original_key}' is not a dict, skipping. Value: {value[:200]}")
+                            log.warning(f"Deserialized item for key '{original_key}' is not a dict, skipping. Value: {value[:200]!r}")
                             continue
+                        set_etag(deserialized_item, int(versions[i] or 0))
                         state[original_key] = deserialized_item
-                    except json.JSONDecodeError as e:
-                        log.error(f"Failed to deserialize JSON for key '{original_key}' (prefixed: {prefixed_keys[i]}). Value: '{value[:500]}'. Error: {e}")
+                    except StateCodecError as e:
+                        log.error(f"Failed to deserialize value for key '{original_key}' (prefixed: {prefixed_keys[i]}). Value: '{value[:500]!r}'. Error: {e}")
                         continue
                     except Exception as e:
                         log.error(f"Unexpected error processing key '{original_key}' (prefixed: {prefixed_keys[i]}). Value: {value[:500]}. Error: {e}")
@@ -242,51 +286,46 @@ class RedisStorage(Storage):
 
         try:
             log.debug(f"Writing {len(changes)} items to Redis.")
-            # For Bot Framework, StoreItem has an eTag. Redis doesn't inherently use eTags
-            # like CosmosDB or Table Storage. If optimistic locking is needed, it must be
-            # implemented using WATCH/MULTI/EXEC or Lua scripts.
-            # For basic storage, we just serialize the whole StoreItem (or dict).
-
-            # Using a pipeline for atomic writes if multiple changes
+            # Each item is a compare-and-set Lua call on its data and version keys, so a
+            # stale e_tag cannot overwrite another worker's save.
+            queued = []
             async with self._redis_client.pipeline(transaction=True) as pipe:
                 for key, store_item_data in changes.items():
                     if not isinstance(store_item_data, dict) and not isinstance(store_item_data, BaseModel):
                         log.warning(f"Item for key '{key}' is not a dict or Pydantic BaseModel, skipping write. Type: {type(store_item_data)}")
                         continue
                     
-                    temp_store_item_dict = {}
-                    if isinstance(store_item_data, dict):
-                        for item_key, item_val in store_item_data.items():
-                            if isinstance(item_val, BaseModel):
-                                temp_store_item_dict[item_key] = item_val.model_dump(mode='json')
-                            else:
-                                temp_store_item_dict[item_key] = item_val
-                        data_to_serialize = temp_store_item_dict
-                    else: 
-                        data_to_serialize = store_item_data
-                        if isinstance(store_item_data, BaseModel):
-                             data_to_serialize = store_item_data.model_dump(mode='json')
-                    
                     prefixed_key = self._redis_prefix + key
                     try:
-                        log.debug(f"RedisWrite: Key: {key} (prefixed: {prefixed_key}), Type of store_item_data: {type(store_item_data)}")
-                        
-                        log.debug(f"RedisWrite: Type of data_to_serialize: {type(data_to_serialize)}")
-                        if isinstance(data_to_serialize, dict):
-                            log.debug(f"RedisWrite: data_to_serialize (dict): {pprint.pformat(data_to_serialize)}")
-                        else:
-                            log.debug(f"RedisWrite: data_to_serialize (str): {str(data_to_serialize)[:500]}")
-
-                        serialized_value = json.dumps(data_to_serialize)
-                        log.debug(f"RedisWrite: JSON data to write for key {key} (prefixed: {prefixed_key}): {serialized_value[:500]}")
-                        await pipe.set(prefixed_key, serialized_value)
-                        log.debug(f"Queued SET for key: {key} (prefixed: {prefixed_key})")
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug(f"RedisWrite: Key: {key} (prefixed: {prefixed_key}), data: {pprint.pformat(store_item_data)}")
+                        # The codec dumps Pydantic models nested in the StoreItem (e.g. AppState)
+                        serialized_value = self.codec.encode(without_etag(store_item_data))
+                        await self._compare_and_set(
+                            keys=[prefixed_key, self._etag_key(key)],
+                            args=[expected_etag(store_item_data) or "", serialized_value],
+                            client=pipe,
+                        )
+                        queued.append(key)
+                        log.debug(f"Queued compare-and-set for key: {key} (prefixed: {prefixed_key})")
                     except TypeError as e:
-                        log.error(f"Failed to serialize item for key '{key}' (prefixed: {prefixed_key}) to JSON. Object type: {type(data_to_serialize)}. Error: {e}", exc_info=True)
+                        log.error(f"Failed to serialize item for key '{key}' (prefixed: {prefixed_key}) Object type: {type(store_item_data)}. Error: {e}", exc_info=True)
                         raise RedisStorageError(f"Serialization failed for key '{key}': {e}") from e
-                await pipe.execute()
+                versions = await pipe.execute()
+
+            conflicts = []
+            for key, version in zip(queued, versions):
+                if version == -1:
+                    conflicts.append(key)
+                else:
+                    set_etag(changes[key], version)
+            if conflicts:
+                log.warning(f"RedisWrite: e_tag conflict, not written: {conflicts}")
+                raise ETagConflictError(conflicts)
             log.info(f"Successfully wrote {len(changes)} items to Redis.")
 
+        except ETagConflictError:
+            raise
         except redis.exceptions.RedisError as e:
             log.error(f"Redis write operation failed: {e}", exc_info=True)
             raise RedisStorageError(f"Redis write failed: {e}") from e
@@ -309,7 +348,7 @@ class RedisStorage(Storage):
         if not self._redis_client:
             raise RedisStorageError("Redis client not available for delete operation.")
         
-        prefixed_keys = [self._redis_prefix + key for key in keys]
+        prefixed_keys = [self._redis_prefix + key for key in keys] + [self._etag_key(key) for key in keys]
         try:
             log.debug(f"Deleting prefixed keys from Redis: {prefixed_keys}")
             deleted_count = await self._redis_client.delete(*prefixed_keys)
@@ -337,4 +376,5 @@ class RedisStorage(Storage):
                 log.error(f"Unexpected error during Redis client close: {e}", exc_info=True)
             finally:
                 self._redis_client = None
+                self._compare_and_set = None
 
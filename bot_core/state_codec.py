@@ -0,0 +1,192 @@
+"""
+Versioned codec for persisted bot state.
+
+Storage backends used to write every StoreItem as ``json.dumps`` text. With
+long conversations the AppState inside grows to hundreds of KB, so each turn
+pays for a slow stdlib encode/decode and a large row. ``StateCodec`` writes a
+small binary envelope instead:
+
+    byte 0  FORMAT_VERSION
+    byte 1  encoding      (0 = json, 1 = orjson, 2 = msgpack)
+    byte 2  compression   (0 = none, 1 = zlib, 2 = zstd)
+    rest    payload
+
+Payloads larger than ``compress_min_bytes`` are compressed. JSON text never
+starts with the version byte, so rows written before the codec existed (str,
+or bytes from a binary Redis client) are still decoded as plain JSON.
+
+orjson, msgpack and zstandard are optional; an unavailable choice falls back
+to the closest available one (orjson -> json, zstd -> zlib).
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+LEGACY_JSON = "legacy_json"  # Plain JSON text without an envelope, as written before the codec
+ENCODINGS = {"json": 0, "orjson": 1, "msgpack": 2}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2}
+DEFAULT_COMPRESS_MIN_BYTES = 16 * 1024
+
+
+class StateCodecError(ValueError):
+    """Raised when stored state cannot be decoded."""
+
+
+def _to_jsonable(obj: Any) -> Any:
+    """Serializer hook: Pydantic models (e.g. AppState inside a StoreItem) dump themselves."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_to_jsonable, separators=(",", ":")).encode("utf-8")
+
+
+class StateCodec:
+    """Encodes StoreItems to versioned bytes and decodes both new and legacy rows."""
+
+    def __init__(
+        self,
+        encoding: str = "orjson",
+        compression: str = "zlib",
+        compress_min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES,
+        compression_level: Optional[int] = None,
+    ):
+        """
+        Args:
+            encoding: "orjson", "msgpack", "json", or "legacy_json" to keep writing plain JSON text
+            compression: "zlib", "zstd" or "none"
+            compress_min_bytes: Only payloads at least this large are compressed
+            compression_level: Codec-specific level (default: zlib 6, zstd 3)
+        """
+        if encoding == "orjson" and not ORJSON_AVAILABLE:
+            log.warning("orjson not installed; state codec falls back to stdlib json")
+            encoding = "json"
+        if encoding == "msgpack" and not MSGPACK_AVAILABLE:
+            log.warning("msgpack not installed; state codec falls back to orjson/json")
+            encoding = "orjson" if ORJSON_AVAILABLE else "json"
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            log.warning("zstandard not installed; state codec falls back to zlib compression")
+            compression = "zlib"
+        if encoding != LEGACY_JSON and encoding not in ENCODINGS:
+            raise ValueError(f"Unknown state encoding: {encoding}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown state compression: {compression}")
+
+        self.encoding = encoding
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self.compression_level = compression_level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=compression_level or 3) if compression == "zstd" else None
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "StateCodec":
+        """Build from AppSettings (STATE_CODEC_* fields); missing or invalid fields use the defaults."""
+        encoding = getattr(settings, "state_codec_encoding", None)
+        compression = getattr(settings, "state_codec_compression", None)
+        min_bytes = getattr(settings, "state_codec_compress_min_bytes", None)
+        return cls(
+            encoding=encoding if encoding in ENCODINGS or encoding == LEGACY_JSON else "orjson",
+            compression=compression if compression in COMPRESSIONS else "zlib",
+            compress_min_bytes=min_bytes if isinstance(min_bytes, int) else DEFAULT_COMPRESS_MIN_BYTES,
+        )
+
+    # --- Encoding ---
+
+    def encode(self, value: Any) -> Union[bytes, str]:
+        """Serialize a StoreItem (dict, possibly holding Pydantic models). Raises TypeError if unserializable."""
+        if self.encoding == LEGACY_JSON:
+            return json.dumps(value, default=_to_jsonable)
+
+        payload = self._dumps(value)
+        compression = "none"
+        if self.compression != "none" and len(payload) >= self.compress_min_bytes:
+            compressed = self._compress(payload)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+        return bytes((FORMAT_VERSION, ENCODINGS[self.encoding], COMPRESSIONS[compression])) + payload
+
+    def _dumps(self, value: Any) -> bytes:
+        if self.encoding == "orjson":
+            return orjson.dumps(value, default=_to_jsonable)
+        if self.encoding == "msgpack":
+            return msgpack.packb(value, default=_to_jsonable, use_bin_type=True)
+        return _stdlib_dumps(value)
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd_compressor.compress(payload)
+        return zlib.compress(payload, self.compression_level if self.compression_level is not None else 6)
+
+    # --- Decoding ---
+
+    def decode(self, raw: Union[bytes, bytearray, memoryview, str, None]) -> Any:
+        """Deserialize a stored value written by any codec version, or legacy JSON text."""
+        if raw is None:
+            return None
+        if isinstance(raw, str):
+            return self._loads_json(raw)
+        raw = bytes(raw)
+        if not raw or raw[0] != FORMAT_VERSION:
+            return self._loads_json(raw)
+        if len(raw) < 3:
+            raise StateCodecError("Truncated state envelope")
+
+        encoding_id, compression_id, payload = raw[1], raw[2], raw[3:]
+        try:
+            if compression_id == COMPRESSIONS["zlib"]:
+                payload = zlib.decompress(payload)
+            elif compression_id == COMPRESSIONS["zstd"]:
+                if not ZSTD_AVAILABLE:
+                    raise StateCodecError("State is zstd-compressed but zstandard is not installed")
+                payload = zstandard.ZstdDecompressor().decompress(payload)
+            elif compression_id != COMPRESSIONS["none"]:
+                raise StateCodecError(f"Unknown state compression id {compression_id}")
+
+            if encoding_id == ENCODINGS["msgpack"]:
+                if not MSGPACK_AVAILABLE:
+                    raise StateCodecError("State is msgpack-encoded but msgpack is not installed")
+                return msgpack.unpackb(payload, raw=False)
+            if encoding_id in (ENCODINGS["orjson"], ENCODINGS["json"]):
+                return self._loads_json(payload)  # Both are plain UTF-8 JSON
+            raise StateCodecError(f"Unknown state encoding id {encoding_id}")
+        except StateCodecError:
+            raise
+        except Exception as e:
+            raise StateCodecError(f"Could not decode stored state: {e}") from e
+
+    @staticmethod
+    def _loads_json(data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+        except ValueError as e:
+            raise StateCodecError(f"Could not decode stored JSON state: {e}") from e
@@ -0,0 +1,222 @@
+"""
+Optimistic concurrency for bot state storage.
+
+The storages return each item with an ``e_tag`` (the row/key version), the
+same field Bot Framework's MemoryStorage uses. A write whose item carries an
+``e_tag`` only succeeds if the stored version still matches; otherwise the
+storage raises ``ETagConflictError`` for that key. Items without an ``e_tag``,
+or with ``"*"``, are written unconditionally.
+
+``ConflictMergingStorage`` sits on top and turns a conflict into a merge:
+it re-reads the stored item and merges it with ours using a resolver
+(``merge_conversation_items`` by default), then retries with the fresh
+``e_tag``. This lets several workers handle turns of the same conversation.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from botbuilder.core import Storage
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+ETAG_FIELD = "e_tag"
+DEFAULT_STATE_PROPERTY = "AugieConversationState"
+DEFAULT_MAX_MERGE_ATTEMPTS = 3
+
+# (key, our item, stored item) -> item to write
+ConflictResolver = Callable[[Any, Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+
+class ETagConflictError(KeyError):
+    """Stored items changed since they were read. ``keys`` are the items that were not written."""
+
+    def __init__(self, keys: Iterable[Any]):
+        self.keys = list(keys)
+        super().__init__(f"Etag conflict for {self.keys}")
+
+
+def expected_etag(item: Any) -> Optional[str]:
+    """The version a write must match, or None for an unconditional write."""
+    etag = item.get(ETAG_FIELD) if isinstance(item, dict) else None
+    return None if etag in (None, "*") else str(etag)
+
+
+def without_etag(item: Any) -> Any:
+    """The item as stored: the e_tag lives in the row/key version, not in the payload."""
+    if isinstance(item, dict) and ETAG_FIELD in item:
+        return {k: v for k, v in item.items() if k != ETAG_FIELD}
+    return item
+
+
+def set_etag(item: Any, etag: Any) -> None:
+    """Record the new version on the caller's item so a second save in the same turn does not conflict."""
+    if isinstance(item, dict):
+        item[ETAG_FIELD] = str(etag)
+
+
+def sqlite_compare_and_set(conn, namespace: str, id_: str, data: Any, etag: Optional[str]) -> Optional[int]:
+    """
+    Write one ``bot_state`` row inside the caller's transaction.
+
+    Returns the row's new version, or None if ``etag`` no longer matches the
+    stored version. A missing row is inserted whatever the e_tag.
+    """
+    if etag is None:
+        row = conn.execute(
+            """
+            INSERT INTO bot_state (namespace, id, data, version) VALUES (?, ?, ?, 1)
+            ON CONFLICT(namespace, id) DO UPDATE
+                SET data=excluded.data, version=bot_state.version + 1, updated_at=datetime('now')
+            RETURNING version
+            """,
+            (namespace, id_, data),
+        ).fetchone()
+        return row[0]
+    try:
+        expected = int(etag)
+    except ValueError:
+        expected = -1  # Not one of our e_tags: can only conflict with an existing row
+    row = conn.execute(
+        """
+        UPDATE bot_state SET data=?, version=version + 1, updated_at=datetime('now')
+        WHERE namespace=? AND id=? AND version=?
+        RETURNING version
+        """,
+        (data, namespace, id_, expected),
+    ).fetchone()
+    if row is None:
+        row = conn.execute(
+            """
+            INSERT INTO bot_state (namespace, id, data, version) VALUES (?, ?, ?, 1)
+            ON CONFLICT(namespace, id) DO NOTHING
+            RETURNING version
+            """,
+            (namespace, id_, data),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def _state_dict(state: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(state, BaseModel):
+        return state.model_dump(mode='json')
+    return dict(state) if isinstance(state, dict) else None
+
+
+def merge_app_states(ours: Dict[str, Any], theirs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge two AppState dicts that diverged from a common read.
+
+    Scalar fields come from ours (the turn being saved). Messages are theirs
+    followed by our messages they do not have yet. Workflows are the union,
+    and a workflow completed on either side is no longer active.
+    """
+    merged = dict(ours)
+
+    their_messages = list(theirs.get("messages") or [])
+    their_ids = {message.get("id") for message in their_messages}
+    our_new = [
+        message for message in ours.get("messages") or []
+        if message.get("log_seq") is None and message.get("id") not in their_ids
+    ]
+    merged["messages"] = their_messages + our_new
+    for bookkeeping in ("message_log_length", "message_log_offset"):
+        if bookkeeping in theirs:
+            merged[bookkeeping] = theirs[bookkeeping]
+
+    completed = list(theirs.get("completed_workflows") or [])
+    completed_ids = {workflow.get("workflow_id") for workflow in completed}
+    completed += [w for w in ours.get("completed_workflows") or [] if w.get("workflow_id") not in completed_ids]
+    completed_ids.update(workflow.get("workflow_id") for workflow in completed)
+    active = {**(theirs.get("active_workflows") or {}), **(ours.get("active_workflows") or {})}
+    merged["completed_workflows"] = completed
+    merged["active_workflows"] = {wf_id: wf for wf_id, wf in active.items() if wf_id not in completed_ids}
+    return merged
+
+
+def merge_conversation_items(
+    key: Any, ours: Dict[str, Any], theirs: Dict[str, Any], state_property: str = DEFAULT_STATE_PROPERTY
+) -> Dict[str, Any]:
+    """Default resolver: merge the AppState under ``state_property``; other properties come from ours."""
+    merged = dict(ours)
+    merged[ETAG_FIELD] = theirs.get(ETAG_FIELD, "*")
+    our_state, their_state = _state_dict(ours.get(state_property)), _state_dict(theirs.get(state_property))
+    if our_state is not None and their_state is not None:
+        merged[state_property] = merge_app_states(our_state, their_state)
+    return merged
+
+
+class ConflictMergingStorage(Storage):
+    """``Storage`` wrapper that resolves ``ETagConflictError`` by re-reading, merging and retrying."""
+
+    def __init__(
+        self,
+        inner: Storage,
+        resolver: ConflictResolver = merge_conversation_items,
+        max_attempts: int = DEFAULT_MAX_MERGE_ATTEMPTS,
+    ):
+        """
+        Args:
+            inner: Storage with optimistic concurrency (raises ETagConflictError)
+            resolver: Builds the item to write from ours and the stored one
+            max_attempts: Merge-and-retry rounds before the conflict is raised
+        """
+        super().__init__()
+        self.inner = inner
+        self.resolver = resolver
+        self.max_attempts = max_attempts
+        self.conflicts = 0
+        self.merges = 0
+
+    async def read(self, keys: List[str]) -> Dict[str, Any]:
+        return await self.inner.read(keys)
+
+    async def write(self, changes: Dict[str, Any]) -> None:
+        original, pending = changes, changes
+        for attempt in range(self.max_attempts + 1):
+            try:
+                await self.inner.write(pending)
+                self._copy_etags(original, pending, [])
+                return
+            except ETagConflictError as e:
+                # The inner storage committed every key but the conflicting ones
+                self._copy_etags(original, pending, e.keys)
+                self.conflicts += 1
+                if attempt == self.max_attempts:
+                    logger.warning(f"State conflict for {e.keys} still unresolved after {attempt} merges")
+                    raise
+                stored = await self.inner.read(e.keys)
+                pending = {}
+                for key in e.keys:
+                    ours, theirs = changes[key], stored.get(key)
+                    if theirs is None:  # Deleted meanwhile: write ours as a new item
+                        pending[key] = {k: v for k, v in _state_dict(ours).items() if k != ETAG_FIELD}
+                    else:
+                        pending[key] = self.resolver(key, _state_dict(ours), theirs)
+                    self.merges += 1
+                logger.info(f"Merged concurrent state changes for {e.keys} (attempt {attempt + 1})")
+                changes = {**changes, **pending}
+
+    @staticmethod
+    def _copy_etags(original: Dict[str, Any], written: Dict[str, Any], skipped: List[Any]) -> None:
+        """Give the caller's items the versions of the merged items written in their place."""
+        for key, item in written.items():
+            if key not in skipped and item is not original[key] and isinstance(item, dict) and ETAG_FIELD in item:
+                set_etag(original[key], item[ETAG_FIELD])
+
+    async def delete(self, keys: List[str]) -> None:
+        await self.inner.delete(keys)
+
+    async def get_app_state(self, session_id: str):
+        return await self.inner.get_app_state(session_id)
+
+    async def save_app_state(self, session_id: str, app_state) -> bool:
+        return await self.inner.save_app_state(session_id, app_state)
+
+    async def aclose(self) -> None:
+        close = getattr(self.inner, "aclose", None) or getattr(self.inner, "close", None)
+        if close is not None:
+            result = close()
+            if hasattr(result, "__await__"):
+                await result
@@ -0,0 +1,157 @@
+"""
+Progressive delivery of streamed LLM text to Teams.
+
+StreamingReplyWriter sends the first partial answer as a new message
+activity and then updates that activity in place as more text arrives,
+throttled by a flush interval and a minimum chunk size. When streaming is
+disabled it buffers the text and sends one message per segment.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from botbuilder.core import MessageFactory, TurnContext
+from botbuilder.schema import Activity, ActivityTypes
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_MS = 750
+DEFAULT_MIN_CHUNK_CHARS = 40
+DEFAULT_MAX_UPDATE_CHARS = 1000  # Longer activities are updated unreliably; continue in a new one
+
+
+class StreamingReplyWriter:
+    """Streams one bot reply into progressively updated Teams activities."""
+
+    def __init__(
+        self,
+        turn_context: TurnContext,
+        enabled: bool = True,
+        flush_interval_ms: float = DEFAULT_FLUSH_INTERVAL_MS,
+        min_chunk_chars: int = DEFAULT_MIN_CHUNK_CHARS,
+        max_update_chars: int = DEFAULT_MAX_UPDATE_CHARS,
+        started_at: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            turn_context: Turn to send and update activities on
+            enabled: Stream partial text; if False, send each segment once when it ends
+            flush_interval_ms: Minimum time between updates of the same activity
+            min_chunk_chars: Minimum amount of new text before sending or updating
+            max_update_chars: Start a new activity once the current one would exceed this
+            started_at: time.monotonic() at which the turn started, for time-to-first-token
+            logger: Logger to report metrics on (defaults to this module's logger)
+        """
+        self.turn_context = turn_context
+        self.enabled = enabled
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.min_chunk_chars = max(1, min_chunk_chars)
+        self.max_update_chars = max_update_chars
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.log = logger or log
+
+        self.activity_id: Optional[str] = None  # Activity currently being updated
+        self.delivered = False  # Whether any text has reached the user
+        self.time_to_first_token_ms: Optional[int] = None
+        self.time_to_first_send_ms: Optional[int] = None
+        self.sends = 0
+        self.updates = 0
+
+        self._segment = ""  # Text of the current activity
+        self._flushed_len = 0  # How much of _segment the user has already seen
+        self._last_flush = 0.0
+
+    @classmethod
+    def from_config(cls, turn_context: TurnContext, config: Any, **kwargs: Any) -> "StreamingReplyWriter":
+        """Build a writer from the STREAMING_REPLY section of the app config."""
+        settings = getattr(config, "STREAMING_REPLY", None)
+        if not isinstance(settings, dict):
+            settings = {}
+        return cls(
+            turn_context,
+            enabled=settings.get("enabled", True),
+            flush_interval_ms=settings.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS),
+            min_chunk_chars=settings.get("min_chunk_chars", DEFAULT_MIN_CHUNK_CHARS),
+            max_update_chars=settings.get("max_update_chars", DEFAULT_MAX_UPDATE_CHARS),
+            **kwargs,
+        )
+
+    @property
+    def pending_text(self) -> str:
+        """Text of the current segment the user has not seen yet."""
+        return self._segment[self._flushed_len:]
+
+    async def append(self, text: str) -> None:
+        """Add a chunk of LLM output, flushing it to Teams when due."""
+        if not text:
+            return
+        if self.time_to_first_token_ms is None:
+            self.time_to_first_token_ms = int((time.monotonic() - self.started_at) * 1000)
+            self.log.info(
+                f"Time to first token: {self.time_to_first_token_ms}ms",
+                extra={"event_type": "time_to_first_token", "details": {"ttft_ms": self.time_to_first_token_ms, "streaming": self.enabled}},
+            )
+        if self._segment and len(self._segment) + len(text) > self.max_update_chars:
+            await self.end_message()
+        self._segment += text
+
+        if not self.enabled or len(self.pending_text) < self.min_chunk_chars:
+            return
+        if self.activity_id is None or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send or update the current activity with everything received so far."""
+        text = self._segment.strip()
+        if not text or not self.pending_text:
+            return
+        if self.activity_id is not None:
+            try:
+                await self.turn_context.update_activity(
+                    Activity(id=self.activity_id, type=ActivityTypes.message, text=text)
+                )
+                self.updates += 1
+                self._mark_flushed()
+                return
+            except Exception as e:
+                self.log.warning(
+                    f"Failed to update streamed activity {self.activity_id}, sending a new one. Error: {e}",
+                    extra={"event_type": "activity_update_failed", "details": {"activity_id": self.activity_id, "error": str(e)}},
+                )
+        response = await self.turn_context.send_activity(MessageFactory.text(text))
+        self.activity_id = response.id if response else None
+        self.sends += 1
+        self._mark_flushed()
+
+    def _mark_flushed(self) -> None:
+        self._flushed_len = len(self._segment)
+        self._last_flush = time.monotonic()
+        if not self.delivered:
+            self.delivered = True
+            self.time_to_first_send_ms = int((self._last_flush - self.started_at) * 1000)
+
+    async def end_message(self) -> None:
+        """Deliver the rest of the current activity; later text starts a new one."""
+        await self.flush()
+        self._segment = ""
+        self._flushed_len = 0
+        self.activity_id = None
+
+    async def finalize(self) -> None:
+        """Deliver any remaining text and log delivery metrics for the reply."""
+        await self.end_message()
+        if self.delivered:
+            self.log.info(
+                "Streamed reply delivered.",
+                extra={"event_type": "streaming_reply_delivered", "details": self.metrics()},
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "streaming": self.enabled,
+            "ttft_ms": self.time_to_first_token_ms,
+            "first_send_ms": self.time_to_first_send_ms,
+            "sends": self.sends,
+            "updates": self.updates,
+        }
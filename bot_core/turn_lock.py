@@ -0,0 +1,298 @@
+"""
+Per-conversation turn locks.
+
+Two activities arriving together in one conversation (e.g. two people posting
+in a Teams group chat) would otherwise load the same AppState, process in
+parallel and race on ``save_changes``. ``TurnLockManager.hold(conversation_id)``
+serializes turns of one conversation while turns of other conversations run
+fully in parallel:
+
+- ``TurnLockManager``: in-process ``asyncio.Lock`` per conversation, created on
+  first use and dropped once nobody holds or waits for it.
+- ``RedisTurnLockManager``: the same local lock (so waiters on one replica
+  queue without polling Redis), plus a Redis lease (``SET NX PX``) shared by all
+  replicas. The lease is renewed while the turn runs and released with a
+  token check. If Redis is unavailable, or the lease cannot be acquired within
+  the timeout, the turn proceeds on the local lock alone; state writes are
+  still protected by e_tags (see ``state_concurrency``).
+
+Queue depth and wait times are exposed via ``metrics()``.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACQUIRE_TIMEOUT_SECONDS = 120.0
+DEFAULT_LEASE_SECONDS = 60.0
+REDIS_POLL_SECONDS = (0.02, 0.5)  # First and longest sleep between lease attempts
+REDIS_RETRY_AFTER_SECONDS = 30.0  # Back-off after a Redis failure before using it again
+SLOW_WAIT_LOG_SECONDS = 1.0
+
+# KEYS: lease key. ARGV: token[, lease ms]. Only the holder's token may release or renew.
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class _KeyLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # Holder plus waiters
+
+
+class TurnLockManager:
+    """Serializes turns per conversation within this process."""
+
+    def __init__(self, acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT_SECONDS):
+        """
+        Args:
+            acquire_timeout: Longest wait for another turn of the same conversation
+                before this one proceeds anyway (logged as a timeout)
+        """
+        self.acquire_timeout = acquire_timeout
+        self._locks: Dict[str, _KeyLock] = {}
+
+        self.acquisitions = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> Optional["TurnLockManager"]:
+        """Build the manager selected by TURN_LOCK_BACKEND, or None when disabled."""
+        backend = getattr(settings, "turn_lock_backend", "memory")
+        if backend not in ("memory", "redis", "none"):
+            backend = "memory"
+        if backend == "none":
+            return None
+        timeout = getattr(settings, "turn_lock_timeout_seconds", DEFAULT_ACQUIRE_TIMEOUT_SECONDS)
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            timeout = DEFAULT_ACQUIRE_TIMEOUT_SECONDS
+        if backend == "redis":
+            lease = getattr(settings, "turn_lock_lease_seconds", DEFAULT_LEASE_SECONDS)
+            if not isinstance(lease, (int, float)) or lease <= 0:
+                lease = DEFAULT_LEASE_SECONDS
+            return RedisTurnLockManager(settings, acquire_timeout=timeout, lease_seconds=lease)
+        return cls(acquire_timeout=timeout)
+
+    @asynccontextmanager
+    async def hold(self, conversation_id: Optional[str]) -> AsyncIterator[None]:
+        """Run the body as the only turn of ``conversation_id``. A missing id is not locked."""
+        if not conversation_id:
+            yield
+            return
+        entry = self._locks.get(conversation_id)
+        if entry is None:
+            entry = self._locks[conversation_id] = _KeyLock()
+        entry.users += 1
+        self.max_queue_depth = max(self.max_queue_depth, entry.users - 1)
+        start = time.monotonic()
+        acquired = False
+        try:
+            if entry.users > 1:  # Another turn holds or waits for this conversation
+                self.contended += 1
+            self.waiting += 1
+            try:
+                acquired = await self._acquire_local(entry, conversation_id)
+                if acquired:
+                    await self._acquire_shared(conversation_id, start + self.acquire_timeout)
+            finally:
+                self.waiting -= 1
+            self._record_wait(conversation_id, time.monotonic() - start)
+            try:
+                yield
+            finally:
+                if acquired:
+                    await self._release_shared(conversation_id)
+        finally:
+            if acquired:
+                entry.lock.release()
+            entry.users -= 1
+            if entry.users == 0 and self._locks.get(conversation_id) is entry:
+                del self._locks[conversation_id]
+
+    async def _acquire_local(self, entry: _KeyLock, conversation_id: str) -> bool:
+        try:
+            await asyncio.wait_for(entry.lock.acquire(), timeout=self.acquire_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(
+                f"Turn lock for conversation {conversation_id} not acquired within {self.acquire_timeout:.0f}s; proceeding without it",
+                extra={"event_type": "turn_lock_timeout", "details": {"conversation_id": conversation_id}},
+            )
+            return False
+
+    async def _acquire_shared(self, conversation_id: str, deadline: float) -> None:
+        """Hook for cross-process locking; the in-process manager has none."""
+
+    async def _release_shared(self, conversation_id: str) -> None:
+        """Hook for cross-process locking; the in-process manager has none."""
+
+    def _record_wait(self, conversation_id: str, waited: float) -> None:
+        self.acquisitions += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        if waited >= SLOW_WAIT_LOG_SECONDS:
+            logger.info(
+                f"Turn for conversation {conversation_id} waited {waited:.2f}s for a previous turn",
+                extra={"event_type": "turn_lock_wait", "details": {"conversation_id": conversation_id, "wait_ms": round(waited * 1000, 1)}},
+            )
+
+    def queue_depth(self, conversation_id: str) -> int:
+        """Turns of ``conversation_id`` waiting behind the one that holds the lock."""
+        entry = self._locks.get(conversation_id)
+        return max(0, entry.users - 1) if entry else 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "active_conversations": len(self._locks),
+            "waiting": self.waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_seconds * 1000 / self.acquisitions, 2) if self.acquisitions else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisTurnLockManager(TurnLockManager):
+    """
+    Turn lock shared by all replicas through a Redis lease.
+
+    Connects lazily with the REDIS_* settings used by RedisStorage. Any Redis
+    failure is logged and the shared lease is skipped for a short back-off
+    period, so an unavailable Redis degrades to per-replica locking.
+    """
+
+    def __init__(
+        self,
+        app_settings: Any,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        key_prefix: Optional[str] = None,
+    ):
+        """
+        Args:
+            app_settings: Settings with the REDIS_* connection values
+            acquire_timeout: Longest wait for the lock before proceeding without it
+            lease_seconds: Lease length; renewed every third of it while the turn runs
+            key_prefix: Redis key prefix (default: "<REDIS_PREFIX>turn_lock:")
+        """
+        super().__init__(acquire_timeout=acquire_timeout)
+        self._app_settings = app_settings
+        self.lease_ms = int(lease_seconds * 1000)
+        from .redis_storage import TURN_LOCK_KEY_PREFIX  # Lazy import: needs redis
+        self.key_prefix = key_prefix or f"{getattr(app_settings, 'redis_prefix', '') or ''}{TURN_LOCK_KEY_PREFIX}"
+        self._client: Any = None
+        self._release_script = None
+        self._renew_script = None
+        self._retry_after = 0.0
+        self._leases: Dict[str, tuple] = {}  # conversation id -> (token, renewal task)
+        self.redis_errors = 0
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            if time.monotonic() < self._retry_after:
+                return None
+            from .redis_storage import create_redis_client  # Lazy import: needs redis
+            self._client = await create_redis_client(self._app_settings)
+            self._release_script = self._client.register_script(_RELEASE_LUA)
+            self._renew_script = self._client.register_script(_RENEW_LUA)
+        return self._client
+
+    def _record_failure(self, operation: str, error: Exception) -> None:
+        self.redis_errors += 1
+        self._client = None
+        self._retry_after = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+        logger.warning(
+            f"Turn lock: Redis {operation} failed, using per-replica locks for {REDIS_RETRY_AFTER_SECONDS:.0f}s. Error: {error}",
+            extra={"event_type": "turn_lock_redis_error", "details": {"operation": operation, "error": str(error)}},
+        )
+
+    async def _acquire_shared(self, conversation_id: str, deadline: float) -> None:
+        key = self.key_prefix + conversation_id
+        token = uuid.uuid4().hex
+        delay = REDIS_POLL_SECONDS[0]
+        try:
+            client = await self._get_client()
+            if client is None:
+                return
+            while not await client.set(key, token, nx=True, px=self.lease_ms):
+                if time.monotonic() >= deadline:
+                    self.timeouts += 1
+                    logger.warning(
+                        f"Turn lease for conversation {conversation_id} held elsewhere for over {self.acquire_timeout:.0f}s; proceeding without it",
+                        extra={"event_type": "turn_lock_timeout", "details": {"conversation_id": conversation_id, "backend": "redis"}},
+                    )
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, REDIS_POLL_SECONDS[1])
+        except Exception as e:
+            self._record_failure("acquire", e)
+            return
+        renewal = asyncio.create_task(self._renew(key, token))
+        self._leases[conversation_id] = (token, renewal)
+
+    async def _renew(self, key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_ms / 3000)
+            try:
+                if not await self._renew_script(keys=[key], args=[token, self.lease_ms]):
+                    logger.warning(f"Turn lease {key} expired before the turn finished")
+                    return
+            except Exception as e:
+                self._record_failure("renew", e)
+                return
+
+    async def _release_shared(self, conversation_id: str) -> None:
+        lease = self._leases.pop(conversation_id, None)
+        if lease is None:
+            return
+        token, renewal = lease
+        renewal.cancel()
+        try:
+            if self._release_script is not None:
+                await self._release_script(keys=[self.key_prefix + conversation_id], args=[token])
+        except Exception as e:
+            self._record_failure("release", e)
+
+    def metrics(self) -> Dict[str, Any]:
+        metrics = super().metrics()
+        metrics.update(backend="redis", leases_held=len(self._leases), redis_errors=self.redis_errors)
+        return metrics
+
+    async def close(self) -> None:
+        for conversation_id in list(self._leases):
+            await self._release_shared(conversation_id)
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception as e:
+                logger.debug(f"Error closing turn lock Redis client: {e}")
+            self._client = None
@@ -0,0 +1,153 @@
+"""
+Concurrent turn stages with a per-stage timing breakdown.
+
+A message turn is a small dependency graph rather than a straight line: the
+conversation state and the user profile load independently of each other,
+the query embedding needs only the message text, and intent classification
+needs only the message plus a few flags from state and profile.
+``TurnPipeline.start`` runs each stage as an asyncio task as soon as it is
+created, so independent stages overlap, and records when every stage started
+and finished relative to the start of the turn.
+
+Stages started with ``speculative=True`` compute something the turn may turn
+out not to need (an active workflow answers the message without intent
+classification; "help" never selects tools). ``short_circuit`` records why
+the turn ended early and cancels the speculative stages still running;
+``finish`` does the same for anything left at the end of the turn and logs
+the breakdown as one ``turn_pipeline_timings`` event.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class _Stage:
+    __slots__ = ("name", "speculative", "task", "started_at", "finished_at", "status")
+
+    def __init__(self, name: str, speculative: bool):
+        self.name = name
+        self.speculative = speculative
+        self.task: Optional[asyncio.Task] = None
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.status = "running"
+
+
+class TurnPipeline:
+    """Named asyncio stages of one turn, with timings and speculative cancellation."""
+
+    def __init__(self, speculation_enabled: bool = True, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            speculation_enabled: Whether callers should start speculative stages
+                early; when False they start every stage where its result is used
+            logger: Logger for the timing breakdown (defaults to this module's)
+        """
+        self.speculation_enabled = speculation_enabled
+        self.log = logger or log
+        self.started_at = time.monotonic()
+        self.outcome: Optional[str] = None
+        self._stages: Dict[str, _Stage] = {}
+        self._cancelled: List[str] = []
+
+    def start(self, name: str, awaitable: Awaitable[Any], speculative: bool = False) -> asyncio.Task:
+        """Run ``awaitable`` as stage ``name`` in a new task and return the task."""
+        if name in self._stages:
+            raise ValueError(f"Turn stage '{name}' already started")
+        stage = _Stage(name, speculative)
+        self._stages[name] = stage
+        stage.task = asyncio.ensure_future(self._run(stage, awaitable))
+        return stage.task
+
+    async def run(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """Run ``awaitable`` as stage ``name`` and wait for its result."""
+        return await self.start(name, awaitable)
+
+    def task(self, name: str) -> Optional[asyncio.Task]:
+        """The task of stage ``name``, or None if it was never started."""
+        stage = self._stages.get(name)
+        return stage.task if stage else None
+
+    async def _run(self, stage: _Stage, awaitable: Awaitable[Any]) -> Any:
+        try:
+            result = await awaitable
+        except asyncio.CancelledError:
+            stage.status = "cancelled"
+            raise
+        except Exception:
+            stage.status = "failed"
+            raise
+        else:
+            stage.status = "completed"
+            return result
+        finally:
+            if stage.finished_at is None:
+                stage.finished_at = time.monotonic()
+
+    def short_circuit(self, reason: str) -> List[str]:
+        """
+        Record that the turn is ending early because of ``reason`` and cancel
+        the speculative stages still running. Returns the cancelled stage names.
+        """
+        if self.outcome is None:
+            self.outcome = reason
+        return self._cancel_speculative()
+
+    def _cancel_speculative(self) -> List[str]:
+        cancelled = []
+        for stage in self._stages.values():
+            if stage.speculative and stage.status == "running" and not stage.task.done():
+                stage.task.cancel()
+                stage.status = "cancelled"
+                stage.finished_at = time.monotonic()
+                cancelled.append(stage.name)
+        self._cancelled.extend(cancelled)
+        return cancelled
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        """Start offset, duration and status of every stage, in start order."""
+        now = time.monotonic()
+        return {
+            stage.name: {
+                "start_ms": round((stage.started_at - self.started_at) * 1000, 1),
+                "duration_ms": round(((stage.finished_at or now) - stage.started_at) * 1000, 1),
+                "status": stage.status,
+                "speculative": stage.speculative,
+            }
+            for stage in self._stages.values()
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Cancel any speculative stage still running, log the timing breakdown
+        and return it.
+        """
+        self._cancel_speculative()
+        for stage in self._stages.values():
+            # Retrieve exceptions of stages nobody awaited so asyncio does not warn about them
+            if stage.task and stage.task.done() and not stage.task.cancelled():
+                stage.task.exception()
+
+        total_ms = round((time.monotonic() - self.started_at) * 1000, 1)
+        stages = self.timings()
+        details = {
+            "outcome": self.outcome or "completed",
+            "total_ms": total_ms,
+            "speculation_enabled": self.speculation_enabled,
+            "stages": stages,
+            "cancelled": list(self._cancelled),
+        }
+        breakdown = ", ".join(
+            f"{name} +{timing['start_ms']:.0f}ms/{timing['duration_ms']:.0f}ms"
+            + ("" if timing["status"] == "completed" else f" ({timing['status']})")
+            for name, timing in stages.items()
+        )
+        self.log.info(
+            f"Turn {details['outcome']} in {total_ms:.0f}ms: {breakdown or 'no stages'}",
+            extra={"event_type": "turn_pipeline_timings", "details": details},
+        )
+        return details
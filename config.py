@@ -299,6 +299,8 @@ class AppSettings(BaseSettings):
     gemini_api_key: str = Field(..., alias="GEMINI_API_KEY")
     gemini_model: str = Field(DEFAULT_GEMINI_MODEL, alias="GEMINI_MODEL")
     llm_max_history_items: int = Field(50, alias="LLM_MAX_HISTORY_ITEMS", gt=0)
+    llm_history_token_budget: int = Field(16000, alias="LLM_HISTORY_TOKEN_BUDGET", ge=0)
+    llm_max_function_response_tokens: int = Field(2000, alias="LLM_MAX_FUNCTION_RESPONSE_TOKENS", ge=0)
 
     # MODIFIED: Default system prompt placeholder, will be replaced by the new DEFAULT_SYSTEM_PROMPT constant.
     system_prompt: str = Field(
@@ -308,7 +310,47 @@ class AppSettings(BaseSettings):
     max_consecutive_tool_calls: int = Field(5, alias="MAX_CONSECUTIVE_TOOL_CALLS", gt=0)
     default_api_timeout_seconds: int = Field(90, alias="DEFAULT_API_TIMEOUT_SECONDS", gt=0)
     default_api_max_retries: int = Field(2, alias="DEFAULT_API_MAX_RETRIES", ge=0)
+    llm_max_concurrent_calls: int = Field(8, alias="LLM_MAX_CONCURRENT_CALLS", gt=0)
     break_on_critical_tool_error: bool = Field(True, alias="BREAK_ON_CRITICAL_TOOL_ERROR")
+
+    # Streaming reply delivery (partial LLM text sent, then updated in place)
+    streaming_reply_enabled: bool = Field(True, alias="STREAMING_REPLY_ENABLED")
+    streaming_flush_interval_ms: int = Field(750, alias="STREAMING_FLUSH_INTERVAL_MS", ge=0)
+    streaming_min_chunk_chars: int = Field(40, alias="STREAMING_MIN_CHUNK_CHARS", gt=0)
+    streaming_max_update_chars: int = Field(1000, alias="STREAMING_MAX_UPDATE_CHARS", gt=0)
+
+    # LLM response cache (in-process LRU, optionally backed by Redis)
+    llm_response_cache_enabled: bool = Field(True, alias="LLM_RESPONSE_CACHE_ENABLED")
+    llm_response_cache_backend: Literal["memory", "redis"] = Field("memory", alias="LLM_RESPONSE_CACHE_BACKEND")
+    llm_response_cache_max_entries: int = Field(256, alias="LLM_RESPONSE_CACHE_MAX_ENTRIES", ge=0)
+    llm_response_cache_max_bytes: int = Field(8 * 1024 * 1024, alias="LLM_RESPONSE_CACHE_MAX_BYTES", ge=0)
+    llm_response_cache_ttl_seconds: int = Field(600, alias="LLM_RESPONSE_CACHE_TTL_SECONDS", gt=0)
+
+    # Concurrent execution of the tool calls requested in one LLM turn
+    tool_parallel_execution_enabled: bool = Field(False, alias="TOOL_PARALLEL_EXECUTION_ENABLED")
+    tool_max_concurrency_per_service: int = Field(2, alias="TOOL_MAX_CONCURRENCY_PER_SERVICE", gt=0)
+    tool_sync_offload_enabled: bool = Field(True, alias="TOOL_SYNC_OFFLOAD_ENABLED")
+    tool_sync_pool_size: int = Field(8, alias="TOOL_SYNC_POOL_SIZE", gt=0)
+    tool_sync_pool_sizes: str = Field("", alias="TOOL_SYNC_POOL_SIZES")  # e.g. "perplexity=4,github=8"
+    workflow_timeout_seconds: float = Field(60.0, alias="WORKFLOW_TIMEOUT_SECONDS", gt=0)
+
+    # Shared async HTTP client used by the Perplexity and Greptile tools
+    http_client_max_connections_per_host: int = Field(10, alias="HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST", gt=0)
+    http_client_connect_timeout_seconds: float = Field(10.0, alias="HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS", gt=0)
+    http_client_max_retries: int = Field(2, alias="HTTP_CLIENT_MAX_RETRIES", ge=0)
+    http_client_max_response_bytes: int = Field(10 * 1024 * 1024, alias="HTTP_CLIENT_MAX_RESPONSE_BYTES", gt=0)
+
+    # Local intent model answering confident classifications without an LLM call
+    intent_local_classifier_enabled: bool = Field(True, alias="INTENT_LOCAL_CLASSIFIER_ENABLED")
+    intent_local_confidence_threshold: float = Field(0.8, alias="INTENT_LOCAL_CONFIDENCE_THRESHOLD", ge=0, le=1)
+
+    # Message turns: start independent stages (query embedding, intent classification) before they are known to be needed
+    turn_speculation_enabled: bool = Field(True, alias="TURN_SPECULATION_ENABLED")
+
+    # User profile repository (thread-pooled DB access, write-behind for last_active and tool metrics)
+    profile_write_behind_enabled: bool = Field(True, alias="PROFILE_WRITE_BEHIND_ENABLED")
+    profile_flush_interval_seconds: float = Field(30.0, alias="PROFILE_FLUSH_INTERVAL_SECONDS", gt=0)
+    profile_db_max_workers: int = Field(4, alias="PROFILE_DB_MAX_WORKERS", gt=0)
     
     MicrosoftAppId: Optional[str] = Field(None, alias="MICROSOFT_APP_ID")
     MicrosoftAppPassword: Optional[str] = Field(None, alias="MICROSOFT_APP_PASSWORD")
@@ -346,6 +388,9 @@ class AppSettings(BaseSettings):
     tool_selector_debug_logging: bool = Field(True, alias="TOOL_SELECTOR_DEBUG_LOGGING")
     tool_selector_default_fallback: bool = Field(True, alias="TOOL_SELECTOR_DEFAULT_FALLBACK")
     tool_selector_embedding_model: str = Field("all-MiniLM-L6-v2", alias="TOOL_SELECTOR_EMBEDDING_MODEL")
+    tool_selector_query_cache_size: int = Field(1024, alias="TOOL_SELECTOR_QUERY_CACHE_SIZE")
+    tool_selector_query_batch_window_ms: float = Field(5.0, alias="TOOL_SELECTOR_QUERY_BATCH_WINDOW_MS")
+    tool_selector_query_max_batch_size: int = Field(32, alias="TOOL_SELECTOR_QUERY_MAX_BATCH_SIZE")
     # Cache path might still be constructed, but could be based on a configurable base data directory if needed
     # For now, constructed path is in Config.TOOL_SELECTOR property, which is fine.
 
@@ -403,7 +448,18 @@ class AppSettings(BaseSettings):
     admin_user_name: Optional[str] = Field(None, alias="ADMIN_USER_NAME") 
     admin_user_email: Optional[EmailStr] = Field(None, alias="ADMIN_USER_EMAIL")
 
-    memory_type: Literal["sqlite", "redis"] = Field("sqlite", alias="MEMORY_TYPE")
+    memory_type: Literal["sqlite", "sqlite_async", "redis"] = Field("sqlite", alias="MEMORY_TYPE")
+    sqlite_read_pool_size: int = Field(4, alias="SQLITE_READ_POOL_SIZE", gt=0)
+    sqlite_write_batch_size: int = Field(64, alias="SQLITE_WRITE_BATCH_SIZE", gt=0)
+    state_codec_encoding: Literal["orjson", "msgpack", "json", "legacy_json"] = Field("orjson", alias="STATE_CODEC_ENCODING")
+    state_codec_compression: Literal["zlib", "zstd", "none"] = Field("zlib", alias="STATE_CODEC_COMPRESSION")
+    state_codec_compress_min_bytes: int = Field(16384, alias="STATE_CODEC_COMPRESS_MIN_BYTES", ge=0)
+    message_log_enabled: bool = Field(False, alias="MESSAGE_LOG_ENABLED")
+    message_log_tail_size: int = Field(200, alias="MESSAGE_LOG_TAIL_SIZE", gt=0)
+    state_conflict_max_merges: int = Field(3, alias="STATE_CONFLICT_MAX_MERGES", ge=0)
+    turn_lock_backend: Literal["memory", "redis", "none"] = Field("memory", alias="TURN_LOCK_BACKEND")
+    turn_lock_timeout_seconds: float = Field(120.0, alias="TURN_LOCK_TIMEOUT_SECONDS", gt=0)
+    turn_lock_lease_seconds: float = Field(60.0, alias="TURN_LOCK_LEASE_SECONDS", gt=0)
     redis_url: Optional[str] = Field(None, alias="REDIS_URL")
     redis_host: Optional[str] = Field("localhost", alias="REDIS_HOST")
     redis_port: Optional[int] = Field(6379, alias="REDIS_PORT")
@@ -730,10 +786,22 @@ class Config:
     def DEFAULT_API_MAX_RETRIES(self) -> int:
         return self.settings.default_api_max_retries
 
+    @property
+    def LLM_MAX_CONCURRENT_CALLS(self) -> int:
+        return self.settings.llm_max_concurrent_calls
+
     @property
     def LLM_MAX_HISTORY_ITEMS(self) -> int:
         return self.settings.llm_max_history_items
 
+    @property
+    def LLM_HISTORY_TOKEN_BUDGET(self) -> int:
+        return self.settings.llm_history_token_budget
+
+    @property
+    def LLM_MAX_FUNCTION_RESPONSE_TOKENS(self) -> int:
+        return self.settings.llm_max_function_response_tokens
+
     @property
     def MAX_CONSECUTIVE_TOOL_CALLS(self) -> int:
         return self.settings.max_consecutive_tool_calls
@@ -821,14 +889,90 @@ class Config:
             "flatten_nested_objects": False
         }
 
+    @property
+    def STREAMING_REPLY(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.streaming_reply_enabled,
+            "flush_interval_ms": self.settings.streaming_flush_interval_ms,
+            "min_chunk_chars": self.settings.streaming_min_chunk_chars,
+            "max_update_chars": self.settings.streaming_max_update_chars,
+        }
+
+    @property
+    def LLM_RESPONSE_CACHE(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.llm_response_cache_enabled,
+            "backend": self.settings.llm_response_cache_backend,
+            "max_entries": self.settings.llm_response_cache_max_entries,
+            "max_bytes": self.settings.llm_response_cache_max_bytes,
+            "ttl_seconds": self.settings.llm_response_cache_ttl_seconds,
+        }
+
+    @property
+    def TOOL_PARALLEL_EXECUTION(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.tool_parallel_execution_enabled,
+            "max_concurrency_per_service": self.settings.tool_max_concurrency_per_service,
+        }
+
+    @property
+    def TOOL_SYNC_OFFLOAD(self) -> Dict[str, Any]:
+        pool_sizes: Dict[str, int] = {}
+        for entry in self.settings.tool_sync_pool_sizes.split(","):
+            service, _, size = entry.partition("=")
+            if service.strip() and size.strip().isdigit() and int(size) > 0:
+                pool_sizes[service.strip().lower()] = int(size)
+            elif entry.strip():
+                log.warning(f"Ignoring invalid TOOL_SYNC_POOL_SIZES entry '{entry.strip()}' (expected service=size)")
+        return {
+            "enabled": self.settings.tool_sync_offload_enabled,
+            "default_pool_size": self.settings.tool_sync_pool_size,
+            "pool_sizes": pool_sizes,
+        }
+
+    @property
+    def HTTP_CLIENT(self) -> Dict[str, Any]:
+        return {
+            "timeout": self.settings.default_api_timeout_seconds,
+            "connect_timeout": self.settings.http_client_connect_timeout_seconds,
+            "max_retries": self.settings.http_client_max_retries,
+            "max_response_bytes": self.settings.http_client_max_response_bytes,
+            "limit_per_host": self.settings.http_client_max_connections_per_host,
+        }
+
+    @property
+    def INTENT_CLASSIFIER(self) -> Dict[str, Any]:
+        return {
+            "local_enabled": self.settings.intent_local_classifier_enabled,
+            "local_confidence_threshold": self.settings.intent_local_confidence_threshold,
+            "examples_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_examples.jsonl"),
+        }
+
+    @property
+    def TURN_PIPELINE(self) -> Dict[str, Any]:
+        return {
+            "speculation_enabled": self.settings.turn_speculation_enabled,
+        }
+
+    @property
+    def PROFILE_REPOSITORY(self) -> Dict[str, Any]:
+        return {
+            "write_behind_enabled": self.settings.profile_write_behind_enabled,
+            "flush_interval_seconds": self.settings.profile_flush_interval_seconds,
+            "max_workers": self.settings.profile_db_max_workers,
+        }
+
+    @property
+    def WORKFLOW_TIMEOUT_SECONDS(self) -> float:
+        return self.settings.workflow_timeout_seconds
+
     @property
     def TOOL_SELECTOR(self) -> Dict[str, Any]:
         # Construct this dict using values from self.settings where appropriate
-        cache_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "data",
-            "tool_embeddings.json"
-        )
+        # config.py lives in the project root, so data/ is a direct child
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+        # Binary embedding matrix (memory-mapped, stored as tool_embeddings.<sha>.npy) + tool_embeddings.meta.json sidecar
+        cache_path = os.path.join(data_dir, "tool_embeddings.npy")
         os.makedirs(os.path.dirname(cache_path), exist_ok=True)
         return {
             "enabled": self.settings.tool_selector_enabled,
@@ -838,9 +982,13 @@ class Config:
             "debug_logging": self.settings.tool_selector_debug_logging,
             "default_fallback": self.settings.tool_selector_default_fallback,
             "cache_path": cache_path, # Constructed path
+            "legacy_cache_path": os.path.join(data_dir, "tool_embeddings.json"), # Pre-2.0 JSON cache, migrated on load
             "auto_save_interval_seconds": 300, # Could be AppSettings field
             "rebuild_cache_on_startup": False, # Could be AppSettings field
-            "embedding_model": self.settings.tool_selector_embedding_model
+            "embedding_model": self.settings.tool_selector_embedding_model,
+            "query_cache_size": self.settings.tool_selector_query_cache_size,
+            "query_batch_window_ms": self.settings.tool_selector_query_batch_window_ms,
+            "query_max_batch_size": self.settings.tool_selector_query_max_batch_size,
         }
 
     @property
@@ -25,7 +25,7 @@ from .constants import (
 # Updated to use the new history preparation function
 from .history_utils import prepare_messages_for_llm_from_appstate, HistoryResetRequiredError
 from .llm_interactions import (
-    _perform_llm_interaction, _prepare_tool_definitions, _update_session_stats
+    _embed_query_for_tool_selection, _perform_llm_interaction, _prepare_tool_definitions, _update_session_stats
 )
 from .tool_processing import _execute_tool_calls  # This is async
 
@@ -598,13 +598,17 @@ async def start_streaming_response(
                     extra={"event_type": "general_agent_force_text_response"}
                 )
             
+            user_query = app_state.messages[-1].text if app_state.messages and app_state.messages[-1].role == "user" else None
+            # Tool selection is synchronous; embed the query first so the encoder never runs on the event loop
+            query_embedding = await _embed_query_for_tool_selection(user_query, config) if provide_tools_for_this_llm_call else None
             current_tool_definitions = _prepare_tool_definitions(
                 tool_executor.get_available_tool_definitions(),
                 is_initial_decision_call=is_initial_llm_call_this_cycle,
                 provide_tools=provide_tools_for_this_llm_call,
-                user_query=app_state.messages[-1].text if app_state.messages and app_state.messages[-1].role == "user" else None,
+                user_query=user_query,
                 config=config,
-                app_state=app_state
+                app_state=app_state,
+                query_embedding=query_embedding
             )
             log.debug(
                 "Tool definitions prepared for LLM.",
@@ -616,7 +620,9 @@ async def start_streaming_response(
                 extra={"event_type": "general_agent_history_preparation_start", "details": {"message_count": len(app_state.messages)}}
             )
             current_llm_history, history_errors = prepare_messages_for_llm_from_appstate(
-                app_state, config_max_history_items=config.LLM_MAX_HISTORY_ITEMS
+                app_state, config_max_history_items=config.LLM_MAX_HISTORY_ITEMS,
+                config_token_budget=getattr(config, 'LLM_HISTORY_TOKEN_BUDGET', None),
+                config_max_function_response_tokens=getattr(config, 'LLM_MAX_FUNCTION_RESPONSE_TOKENS', None)
             )
             log.debug(
                 "History prepared for LLM.",
@@ -679,7 +685,8 @@ async def start_streaming_response(
                     app_state=app_state,
                     is_initial_decision_call=is_initial_llm_call_this_cycle,
                     stage_name=None,
-                    config=config
+                    config=config,
+                    query_embedding=query_embedding
                 )
                 for event_type_llm, event_data_llm in llm_stream_iter_general:
                     if event_type_llm == "text":
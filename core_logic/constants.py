@@ -15,6 +15,18 @@ MAX_TOOL_ARG_PREVIEW_LEN = 100
 MAX_SCRATCHPAD_ITEMS = 10
 """Maximum number of items to keep in the scratchpad memory."""
 
+DEFAULT_HISTORY_TOKEN_BUDGET = 16000
+"""
+Default approximate token budget for the conversation history sent to the
+LLM (0 disables token budgeting).
+"""
+
+DEFAULT_MAX_FUNCTION_RESPONSE_TOKENS = 2000
+"""
+Default approximate size above which a tool result in the history is
+truncated before being sent to the LLM (0 disables truncation).
+"""
+
 MAX_GENERAL_TOOL_CYCLES = 5
 """Maximum number of general tool execution cycles allowed in a single turn
 before a workflow takes over or the turn ends."""
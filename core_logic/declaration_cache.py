@@ -0,0 +1,120 @@
+# core_logic/declaration_cache.py
+
+"""
+Function Declaration Cache
+
+Converting a tool definition into an SDK ``FunctionDeclaration`` walks its
+JSON schema recursively and builds one ``Schema`` object per parameter.
+Tool definitions are static once ToolExecutor has validated them, so
+``LLMInterface.prepare_tools_for_sdk`` compiles each one once and, per LLM
+call, only gathers the cached declarations for the selected tools.
+
+Entries are keyed by tool name and a hash of the definition's description
+and parameters, so an edited definition compiles afresh. The hash is
+computed once per definition object and reused until the catalog is
+re-validated, so a lookup does not re-serialize the schema. The whole cache
+is dropped when ToolExecutor re-validates the tool catalog
+(``invalidate_tool_declarations``) or the LLM model changes (``clear``).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MAX_MEMOIZED_HASHES = 1024  # Definitions are the catalog's own dicts; this only bounds ad-hoc copies
+
+# Bumped whenever the tool catalog is re-validated; caches built under an older
+# generation are cleared on their next lookup
+_catalog_generation = 0
+_generation_lock = threading.Lock()
+
+
+def invalidate_tool_declarations() -> None:
+    """Mark every compiled declaration in the process as stale."""
+    global _catalog_generation
+    with _generation_lock:
+        _catalog_generation += 1
+
+
+def tool_schema_hash(tool_def: Dict[str, Any]) -> str:
+    """Hash of the parts of a tool definition that end up in its declaration."""
+    payload = json.dumps(
+        {"description": tool_def.get("description"), "parameters": tool_def.get("parameters")},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FunctionDeclarationCache:
+    """Compiled SDK declarations keyed by ``(tool name, schema hash)``."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Any] = {}
+        # id(tool_def) -> (tool_def, hash); holding the definition keeps its id from being reused
+        self._schema_hashes: Dict[int, Tuple[Dict[str, Any], str]] = {}
+        self._generation = _catalog_generation
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(self, tool_def: Dict[str, Any], build: Callable[[Dict[str, Any]], Optional[Any]]) -> Optional[Any]:
+        """
+        Return the cached declaration for ``tool_def``, compiling it with
+        ``build`` on a miss. Failed builds (None) are not cached.
+        """
+        with self._lock:
+            if self._generation != _catalog_generation:
+                self._entries.clear()
+                self._schema_hashes.clear()
+                self._generation = _catalog_generation
+                self._invalidations += 1
+            key = (tool_def["name"], self._schema_hash(tool_def))
+            declaration = self._entries.get(key)
+            if declaration is not None:
+                self._hits += 1
+                return declaration
+            self._misses += 1
+
+        declaration = build(tool_def)
+        if declaration is not None:
+            with self._lock:
+                self._entries[key] = declaration
+        return declaration
+
+    def _schema_hash(self, tool_def: Dict[str, Any]) -> str:
+        """``tool_schema_hash`` memoized per definition object. Caller holds ``_lock``."""
+        memoized = self._schema_hashes.get(id(tool_def))
+        if memoized is not None and memoized[0] is tool_def:
+            return memoized[1]
+        if len(self._schema_hashes) >= MAX_MEMOIZED_HASHES:
+            self._schema_hashes.clear()
+        schema_hash = tool_schema_hash(tool_def)
+        self._schema_hashes[id(tool_def)] = (tool_def, schema_hash)
+        return schema_hash
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._schema_hashes.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,105 @@
+# core_logic/history_cache.py
+
+"""
+History Conversion Cache
+
+``prepare_messages_for_llm_from_appstate`` turns every ``Message`` in the
+conversation into a plain dict (for optimization and budgeting) and a
+``glm.Content`` (for the SDK). Messages are immutable once they are part of
+the history, so both forms are memoized here, keyed by message id and a
+content fingerprint. Each turn then only converts the messages appended
+since the previous turn.
+
+The cache is process-wide rather than stored on the AppState object,
+because AppState is reloaded from storage at the start of every turn.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class ConvertedMessage:
+    """Prepared forms of one history message."""
+
+    __slots__ = ("msg_dict", "token_count", "content", "notes")
+
+    def __init__(self, msg_dict: Dict[str, Any], token_count: int, content: Any = None, notes: Optional[List[str]] = None):
+        self.msg_dict = msg_dict  # Shared between turns: treat as read-only
+        self.token_count = token_count
+        self.content = content  # glm.Content, or None if the message had no convertible parts
+        self.notes = notes or []
+
+
+def message_fingerprint(message: Any) -> Hashable:
+    """
+    Cheap identity of everything that affects how a message is converted.
+
+    Avoids a full model_dump: only the fields the converter reads are hashed.
+    """
+    parts = []
+    for part in getattr(message, "parts", None) or []:
+        part_type = getattr(part, "type", None)
+        if part_type == "text":
+            parts.append((part_type, part.text))
+        elif part_type == "function_call":
+            parts.append((part_type, part.function_call.name, json.dumps(part.function_call.args, sort_keys=True, default=str)))
+        elif part_type == "function_response":
+            content = part.function_response.response.content
+            parts.append((part_type, part.function_response.name, content if isinstance(content, str) else json.dumps(content, sort_keys=True, default=str)))
+        else:
+            parts.append((str(part_type), repr(part)))
+    return hash((
+        getattr(message, "role", None),
+        getattr(message, "message_type", None),
+        getattr(message, "is_internal", None),
+        str(getattr(message, "timestamp", None)),
+        getattr(message, "raw_text", None),
+        tuple(parts),
+    ))
+
+
+class HistoryConversionCache:
+    """Bounded LRU of ConvertedMessage entries."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, ConvertedMessage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[ConvertedMessage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: ConvertedMessage) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
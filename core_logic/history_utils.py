@@ -12,7 +12,8 @@ from importlib import import_module
 import uuid
 
 # Renamed 'state' to 'state_models' as per project structure and migration plan
-from state_models import AppState, ScratchpadEntry, Message, WorkflowContext  # Corrected import
+from core_logic.history_cache import ConvertedMessage, HistoryConversionCache, message_fingerprint
+from state_models import AppState, ScratchpadEntry, Message, WorkflowContext, CHARS_PER_TOKEN, MESSAGE_TOKEN_OVERHEAD, approximate_token_count, part_text_for_token_count  # Corrected import
 from bot_core.message_handler import SafeTextPart
 # Removed: from llm_interface import glm  # For glm.glm.Content, glm.glm.Part etc.
 
@@ -130,6 +131,8 @@ from .constants import (
     THOUGHT_MESSAGE_TYPE,
     REFLECTION_MESSAGE_TYPE,
     PLAN_MESSAGE_TYPE,
+    DEFAULT_HISTORY_TOKEN_BUDGET,
+    DEFAULT_MAX_FUNCTION_RESPONSE_TOKENS,
     # MAX_HISTORY_MESSAGES is defined in config.py, not constants.py
 )
 
@@ -336,6 +339,139 @@ def _optimize_message_history(
     return optimized_messages
 
 
+def _estimate_message_dict_tokens(msg: Dict[str, Any], token_counts: Optional[Dict[str, int]] = None) -> int:
+    """Approximate prompt tokens of a message dict, using the Message's cached count when known."""
+    if token_counts and msg.get('id') in token_counts:
+        return token_counts[msg['id']]
+    parts = msg.get('parts')
+    if not isinstance(parts, list):
+        return MESSAGE_TOKEN_OVERHEAD + approximate_token_count(str(msg.get('raw_text') or msg.get('content') or ''))
+    return MESSAGE_TOKEN_OVERHEAD + sum(approximate_token_count(part_text_for_token_count(p)) for p in parts)
+
+
+def _truncate_text_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of an oversized tool result, marking what was cut."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head_chars = int(max_chars * 0.75)
+    tail_chars = max_chars - head_chars
+    omitted = len(text) - head_chars - tail_chars
+    return f"{text[:head_chars]}\n[... {omitted} characters of tool output omitted ...]\n{text[-tail_chars:] if tail_chars else ''}"
+
+
+def _truncate_oversized_function_responses(
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    token_counts: Optional[Dict[str, int]] = None
+) -> int:
+    """
+    Truncate tool results larger than ``max_tokens`` in place.
+
+    Applies to function_response parts and to text parts of tool/function
+    messages. Truncated messages are dropped from ``token_counts`` so they are
+    re-estimated. Returns the number of parts truncated.
+    """
+    if max_tokens <= 0:
+        return 0
+    truncated = 0
+    for msg in messages:
+        is_tool_message = msg.get('role') in ('tool', 'function')
+        parts = msg.get('parts')
+        if not isinstance(parts, list):
+            continue
+        for part in parts:
+            if not isinstance(part, dict):
+                continue
+            if part.get('type') == 'function_response':
+                response = (part.get('function_response') or {}).get('response') or {}
+                content = response.get('content')
+                content_text = content if isinstance(content, str) else json.dumps(content, default=str)
+                if approximate_token_count(content_text) > max_tokens:
+                    response['content'] = _truncate_text_to_tokens(content_text, max_tokens)
+                    truncated += 1
+                    if token_counts: token_counts.pop(msg.get('id'), None)
+            elif is_tool_message and part.get('type') == 'text':
+                text = part.get('text') or ''
+                if approximate_token_count(text) > max_tokens:
+                    part['text'] = _truncate_text_to_tokens(text, max_tokens)
+                    truncated += 1
+                    if token_counts: token_counts.pop(msg.get('id'), None)
+    return truncated
+
+
+def _fit_history_to_token_budget(
+    messages: List[Dict[str, Any]],
+    token_budget: int,
+    token_counts: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Drop the oldest history so the prompt fits an approximate token budget.
+
+    Always kept, even if they alone exceed the budget: system messages, plan
+    and workflow-stage messages, and the current turn (the last user message
+    and everything after it). The remaining budget is filled with the most
+    recent earlier messages; a tool/function result is kept or dropped
+    together with the message that requested it, so calls stay paired.
+
+    Args:
+        messages: Chronological message dictionaries
+        token_budget: Approximate token limit (0 or less disables budgeting)
+        token_counts: Cached per-message counts keyed by message id
+
+    Returns:
+        The kept messages, in their original order
+    """
+    if token_budget <= 0 or not messages:
+        return messages
+    sizes = [_estimate_message_dict_tokens(m, token_counts) for m in messages]
+    total = sum(sizes)
+    if total <= token_budget:
+        return messages
+
+    last_user_idx = max((i for i, m in enumerate(messages) if m.get('role') == 'user' and not m.get('is_internal')), default=len(messages))
+    pinned_types = (PLAN_MESSAGE_TYPE, WORKFLOW_STAGE_MESSAGE_TYPE, "workflow_context_injection")
+    keep = [False] * len(messages)
+    for i, m in enumerate(messages):
+        if i >= last_user_idx or m.get('role') == 'system' or m.get('message_type') in pinned_types:
+            keep[i] = True
+    used = sum(size for size, kept in zip(sizes, keep) if kept)
+
+    # Group each tool/function result with the message before it
+    groups: List[List[int]] = []
+    for i, m in enumerate(messages[:last_user_idx]):
+        if groups and m.get('role') in ('tool', 'function'):
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+
+    for group in reversed(groups):
+        candidates = [i for i in group if not keep[i]]
+        cost = sum(sizes[i] for i in candidates)
+        if used + cost > token_budget:
+            break  # Keep the retained history contiguous
+        for i in candidates:
+            keep[i] = True
+        used += cost
+
+    kept_messages = [m for m, kept in zip(messages, keep) if kept]
+    log.info(
+        "Fitted history to token budget.",
+        extra={
+            "event_type": "history_token_budget_applied",
+            "details": {
+                "token_budget": token_budget,
+                "original_tokens": total,
+                "kept_tokens": used,
+                "original_count": len(messages),
+                "kept_count": len(kept_messages),
+                "over_budget": used > token_budget,
+            }
+        }
+    )
+    return kept_messages
+
+
 def add_tool_usage_reminder(messages: List[glm.Content]) -> List[glm.Content]:
     """
     Add a tool usage reminder to the conversation history to encourage the AI to use available tools
@@ -378,30 +514,143 @@ def add_tool_usage_reminder(messages: List[glm.Content]) -> List[glm.Content]:
     return new_messages
 
 
-def prepare_messages_for_llm_from_appstate(app_state: AppState, config_max_history_items: Optional[int] = None) -> Tuple[List[RuntimeContentType], List[str]]:
+# Converted forms of history messages, reused across turns (see core_logic/history_cache.py)
+_history_conversion_cache = HistoryConversionCache()
+
+
+def _convert_history_message(msg_obj: Message, max_function_response_tokens: int) -> ConvertedMessage:
+    """
+    Dict form, token count and SDK content of one history message, memoized
+    by message id and content fingerprint.
+    """
+    cache_key = (msg_obj.id, message_fingerprint(msg_obj), max_function_response_tokens)
+    cached = _history_conversion_cache.get(cache_key) if msg_obj.id else None
+    if cached is not None:
+        return cached
+
+    # Ensure timestamp is a float (Unix timestamp) if _optimize_message_history expects that for sorting
+    # The Message model uses datetime, so convert it.
+    msg_dict = msg_obj.model_dump(mode='json') # mode='json' handles datetime to ISO string
+    # Let's ensure timestamp is present for sorting in _optimize_message_history
+    if 'timestamp' not in msg_dict or msg_dict['timestamp'] is None:
+        msg_dict['timestamp'] = datetime.datetime.utcnow().isoformat() + "Z" # Fallback timestamp
+    if _truncate_oversized_function_responses([msg_dict], max_function_response_tokens):
+        msg_dict['_truncated_tool_output'] = True
+        token_count = _estimate_message_dict_tokens(msg_dict)
+    else:
+        token_count = msg_obj.token_count()
+    sdk_content, notes = _message_dict_to_sdk_content(msg_dict)
+    converted = ConvertedMessage(msg_dict, token_count, sdk_content, notes)
+    if msg_obj.id:
+        _history_conversion_cache.put(cache_key, converted)
+    return converted
+
+
+def _message_dict_to_sdk_content(msg_dict_from_history: Dict[str, Any]) -> Tuple[Optional[RuntimeContentType], List[str]]:
+    """Convert one message dict to glm.Content; returns the content (or None) and preparation notes."""
+    notes: List[str] = []
+    sdk_parts = []
+    # Ensure parts is a list of dicts, as MessagePart is a Union of Pydantic models
+    parts_list = msg_dict_from_history.get('parts', [])
+    if not isinstance(parts_list, list):
+        log.warning(f"Message {msg_dict_from_history.get('id')} has parts of type {type(parts_list)}, expected list. Converting text.")
+        # Fallback: try to get text from raw_text or content if parts is not a list
+        raw_text_content = msg_dict_from_history.get('raw_text', msg_dict_from_history.get('content'))
+        if isinstance(raw_text_content, str):
+            parts_list = [{'type': 'text', 'text': raw_text_content}]
+        else:
+            parts_list = [] # Cannot determine parts
+    
+    for part_data_dict in parts_list: # part_data_dict should be a dict here
+        part_type = part_data_dict.get('type')
+        if part_type == "text":
+            sdk_parts.append(glm.Part(text=part_data_dict.get('text', '')))
+        elif part_type == "function_call":
+            fc_data = part_data_dict.get('function_call', {})
+            sdk_parts.append(glm.Part(function_call=glm.FunctionCall(
+                name=fc_data.get('name'),
+                args=fc_data.get('args') 
+            )))
+        elif part_type == "function_response":
+            fr_data = part_data_dict.get('function_response', {})
+            fr_response_data = fr_data.get('response', {})
+            sdk_parts.append(glm.Part(function_response=glm.FunctionResponse(
+                name=fr_data.get('name'),
+                response={'content': fr_response_data.get('content')} 
+            )))
+    
+    if not sdk_parts:
+        note = f"Message (role '{msg_dict_from_history.get('role')}') had no convertible parts after processing. Skipped"
+        log.warning(note, extra={"event_type": "message_no_convertible_parts_final"})
+        return None, [note]
+
+    role_for_sdk = msg_dict_from_history.get('role', 'user')
+    
+    # Handle system messages since Gemini doesn't support them directly
+    if role_for_sdk == "system":
+        if msg_dict_from_history.get("message_type") == "workflow_context_injection":
+            # For workflow context, keep as is but convert to user message
+            role_for_sdk = "user"
+            # Prepend context indicator to make it clear this is system information
+            for part in sdk_parts:
+                if hasattr(part, 'text') and part.text:
+                    part.text = f"[SYSTEM CONTEXT]: {part.text}"
+            notes.append("Converted workflow context system message to user message")
+        else:
+            # For regular system messages, convert to user message with clear system prompt indicator
+            role_for_sdk = "user"
+            for part in sdk_parts:
+                if hasattr(part, 'text') and part.text:
+                    part.text = f"[SYSTEM INSTRUCTION]: You are Aughie, an AI development assistant. {part.text}"
+            notes.append("Converted system message to user message with system instruction prefix")
+    elif role_for_sdk == "function": # Gemini uses 'function' role for tool responses
+        pass # Keep as 'function' if parts are FunctionResponse as per Gemini examples
+
+    try:
+        return glm.Content(parts=sdk_parts, role=role_for_sdk), notes
+    except Exception as e_glm_content:
+        note = f"Error creating glm.Content for message (Role: {role_for_sdk}): {e_glm_content}"
+        log.error(note, exc_info=True)
+        notes.append(note)
+        return None, notes
+
+
+def prepare_messages_for_llm_from_appstate(
+    app_state: AppState,
+    config_max_history_items: Optional[int] = None,
+    config_token_budget: Optional[int] = None,
+    config_max_function_response_tokens: Optional[int] = None
+) -> Tuple[List[RuntimeContentType], List[str]]:
     """
     Prepares messages from AppState for LLM consumption using the new Message structure.
-    Integrates history optimization and active workflow context.
+    Integrates history optimization, token budgeting and active workflow context.
+
+    Args:
+        app_state: Conversation state holding the messages
+        config_max_history_items: Maximum number of messages to send
+        config_token_budget: Approximate token budget for the history (0 disables)
+        config_max_function_response_tokens: Tool results above this size are truncated (0 disables)
     """
     preparation_notes = []
     formatted_messages: List[RuntimeContentType] = []
     
     max_items = config_max_history_items if config_max_history_items is not None else (app_state.config.LLM_MAX_HISTORY_ITEMS if hasattr(app_state, 'config') and app_state.config and hasattr(app_state.config, 'LLM_MAX_HISTORY_ITEMS') else 30)
+    token_budget = config_token_budget if isinstance(config_token_budget, int) else DEFAULT_HISTORY_TOKEN_BUDGET
+    max_function_response_tokens = config_max_function_response_tokens if isinstance(config_max_function_response_tokens, int) else DEFAULT_MAX_FUNCTION_RESPONSE_TOKENS
+    token_counts: Dict[str, int] = {}  # Message.id -> cached approximate token count
 
     # Convert Pydantic Message objects to dictionaries for _optimize_message_history
-    # as it currently expects List[Dict[str, Any]]
+    # as it currently expects List[Dict[str, Any]]. Messages seen on earlier turns
+    # come from the conversion cache, so only new messages are converted here.
     messages_as_dicts: List[Dict[str, Any]] = []
+    converted_by_dict: Dict[int, ConvertedMessage] = {}  # id(msg_dict) -> cached conversion
     for msg_obj in app_state.messages:
         try:
-            # Ensure timestamp is a float (Unix timestamp) if _optimize_message_history expects that for sorting
-            # The Message model uses datetime, so convert it.
-            msg_dict = msg_obj.model_dump(mode='json') # mode='json' handles datetime to ISO string
-            # If _optimize_message_history needs float timestamp, convert msg_dict['timestamp']
-            # For now, assuming _optimize_message_history can handle ISO string or can be adapted.
-            # Let's ensure timestamp is present for sorting in _optimize_message_history
-            if 'timestamp' not in msg_dict or msg_dict['timestamp'] is None:
-                msg_dict['timestamp'] = datetime.utcnow().isoformat() + "Z" # Fallback timestamp
-            messages_as_dicts.append(msg_dict)
+            converted = _convert_history_message(msg_obj, max_function_response_tokens)
+            if converted.msg_dict.get('id'):
+                token_counts[converted.msg_dict['id']] = converted.token_count
+            converted_by_dict[id(converted.msg_dict)] = converted
+            messages_as_dicts.append(converted.msg_dict)
         except Exception as e_dump:
             log.warning(f"Error converting Message object to dict for history prep: {e_dump}. Skipping message.")
             preparation_notes.append(f"Skipped one message due to conversion error: {e_dump}")
@@ -461,75 +710,26 @@ def prepare_messages_for_llm_from_appstate(app_state: AppState, config_max_histo
         log.debug(note, extra={"event_type": "workflow_context_injected"})
         preparation_notes.append(note)
 
+    # 2b. Fit the history to the token budget (oversized tool results were truncated during conversion)
+    truncated_parts = sum(1 for d in history_to_convert_dicts if d.get('_truncated_tool_output'))
+    if truncated_parts:
+        preparation_notes.append(f"Truncated {truncated_parts} oversized tool result(s) to ~{max_function_response_tokens} tokens.")
+    count_before_budget = len(history_to_convert_dicts)
+    history_to_convert_dicts = _fit_history_to_token_budget(history_to_convert_dicts, token_budget, token_counts)
+    if len(history_to_convert_dicts) < count_before_budget:
+        preparation_notes.append(f"History trimmed from {count_before_budget} to {len(history_to_convert_dicts)} messages to fit ~{token_budget} tokens.")
+
     # 3. Convert to glm.Content (or SDK dicts)
     for msg_index, msg_dict_from_history in enumerate(history_to_convert_dicts):
-        sdk_parts = []
-        # Ensure parts is a list of dicts, as MessagePart is a Union of Pydantic models
-        parts_list = msg_dict_from_history.get('parts', [])
-        if not isinstance(parts_list, list):
-            log.warning(f"Message at index {msg_index} has parts of type {type(parts_list)}, expected list. Converting text.")
-            # Fallback: try to get text from raw_text or content if parts is not a list
-            raw_text_content = msg_dict_from_history.get('raw_text', msg_dict_from_history.get('content'))
-            if isinstance(raw_text_content, str):
-                parts_list = [{'type': 'text', 'text': raw_text_content}]
-            else:
-                parts_list = [] # Cannot determine parts
-        
-        for part_data_dict in parts_list: # part_data_dict should be a dict here
-            part_type = part_data_dict.get('type')
-            if part_type == "text":
-                sdk_parts.append(glm.Part(text=part_data_dict.get('text', '')))
-            elif part_type == "function_call":
-                fc_data = part_data_dict.get('function_call', {})
-                sdk_parts.append(glm.Part(function_call=glm.FunctionCall(
-                    name=fc_data.get('name'),
-                    args=fc_data.get('args') 
-                )))
-            elif part_type == "function_response":
-                fr_data = part_data_dict.get('function_response', {})
-                fr_response_data = fr_data.get('response', {})
-                sdk_parts.append(glm.Part(function_response=glm.FunctionResponse(
-                    name=fr_data.get('name'),
-                    response={'content': fr_response_data.get('content')} 
-                )))
-        
-        if sdk_parts:
-            role_for_sdk = msg_dict_from_history.get('role', 'user')
-            
-            # Handle system messages since Gemini doesn't support them directly
-            if role_for_sdk == "system":
-                if msg_dict_from_history.get("message_type") == "workflow_context_injection":
-                    # For workflow context, keep as is but convert to user message
-                    role_for_sdk = "user"
-                    # Prepend context indicator to make it clear this is system information
-                    for part in sdk_parts:
-                        if hasattr(part, 'text') and part.text:
-                            part.text = f"[SYSTEM CONTEXT]: {part.text}"
-                    note = f"Converted workflow context system message to user message at index {msg_index}"
-                    log.debug(note)
-                    preparation_notes.append(note)
-                else:
-                    # For regular system messages, convert to user message with clear system prompt indicator
-                    role_for_sdk = "user"
-                    for part in sdk_parts:
-                        if hasattr(part, 'text') and part.text:
-                            part.text = f"[SYSTEM INSTRUCTION]: You are Aughie, an AI development assistant. {part.text}"
-                    note = f"Converted system message to user message with system instruction prefix at index {msg_index}"
-                    log.debug(note)
-                    preparation_notes.append(note)
-            elif role_for_sdk == "function": # Gemini uses 'function' role for tool responses
-                pass # Keep as 'function' if parts are FunctionResponse as per Gemini examples
-
-            try:
-                formatted_messages.append(glm.Content(parts=sdk_parts, role=role_for_sdk))
-            except Exception as e_glm_content:
-                note = f"Error creating glm.Content for message at index {msg_index} (Role: {role_for_sdk}): {e_glm_content}"
-                log.error(note, exc_info=True)
-                preparation_notes.append(note)
+        converted = converted_by_dict.get(id(msg_dict_from_history))
+        if converted is not None:
+            sdk_content, conversion_notes = converted.content, converted.notes
         else:
-            note = f"Message at index {msg_index} (role '{msg_dict_from_history.get('role')}') had no convertible parts after processing. Skipping."
-            log.warning(note, extra={"event_type": "message_no_convertible_parts_final"})
-            preparation_notes.append(note)
+            sdk_content, conversion_notes = _message_dict_to_sdk_content(msg_dict_from_history)
+        for conversion_note in conversion_notes:
+            preparation_notes.append(f"{conversion_note} at index {msg_index}")
+        if sdk_content is not None:
+            formatted_messages.append(sdk_content)
             
     # Basic sequence validation/repair (simplified from guide for now)
     # The Gemini SDK is more flexible, but some models might still prefer strict alternation.
@@ -3,17 +3,28 @@ Intent Classification System for Aughie Bot
 
 This module provides intelligent intent classification using the LLM rather than 
 hardcoded string matching, giving the bot natural language understanding capabilities.
+Messages a small local model (see local_intent_model) classifies confidently
+are answered without an LLM round trip; the LLM handles everything else.
 """
 
 import json
 import logging
+import os
+import time
 from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
 import asyncio
 import re
 
+from .local_intent_model import load_local_intent_model
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_INTENT_EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "intent_examples.jsonl"
+)
+DEFAULT_LOCAL_CONFIDENCE_THRESHOLD = 0.8
+
 class UserIntent(Enum):
     """User intent classifications"""
     # Onboarding intents
@@ -52,9 +63,51 @@ class IntentClassifier:
     to make intelligent decisions about user intent without rigid string matching.
     """
     
+    # Intents the local model may only return when the context makes them meaningful
+    LOCAL_INTENT_CONTEXT_FLAGS = {
+        "ONBOARDING_ACCEPT": "pending_onboarding_decision",
+        "ONBOARDING_DECLINE": "pending_onboarding_decision",
+        "ONBOARDING_POSTPONE": "pending_onboarding_decision",
+    }
+    # Intents with destructive handlers need a more confident local prediction
+    LOCAL_INTENT_MIN_CONFIDENCE = {
+        "COMMAND_RESET_CHAT": 0.95,
+    }
+
     def __init__(self, llm_interface):
         self.llm_interface = llm_interface
         self.classification_cache = {}  # Simple cache for recent classifications
+
+        settings = getattr(getattr(llm_interface, "config", None), "INTENT_CLASSIFIER", None)
+        if not isinstance(settings, dict):
+            settings = {}
+        self.local_confidence_threshold = settings.get("local_confidence_threshold", DEFAULT_LOCAL_CONFIDENCE_THRESHOLD)
+        self.local_model = (
+            load_local_intent_model(settings.get("examples_path") or DEFAULT_INTENT_EXAMPLES_PATH)
+            if settings.get("local_enabled", True) is not False else None
+        )
+
+    def _classify_locally(self, user_message: str, context: Dict[str, Any]) -> Optional[Tuple[UserIntent, float]]:
+        """Classify with the local model; None if it is unavailable or not confident enough."""
+        if self.local_model is None:
+            return None
+        started = time.perf_counter()
+        allowed = [
+            label for label in self.local_model.labels
+            if label not in self.LOCAL_INTENT_CONTEXT_FLAGS or context.get(self.LOCAL_INTENT_CONTEXT_FLAGS[label])
+        ]
+        label, confidence = self.local_model.predict(user_message, allowed_labels=allowed)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        threshold = max(self.local_confidence_threshold, self.LOCAL_INTENT_MIN_CONFIDENCE.get(label, 0.0))
+        if label is None or confidence < threshold or label not in UserIntent.__members__:
+            logger.debug(f"Local intent model unsure ({label}, {confidence:.2f}); asking the LLM")
+            return None
+        logger.info(
+            f"Classified intent locally: {label} ({confidence:.2f}) in {elapsed_ms:.2f}ms",
+            extra={"event_type": "intent_classified_locally", "details": {
+                "intent": label, "confidence": round(confidence, 3), "latency_ms": round(elapsed_ms, 3)}},
+        )
+        return UserIntent[label], confidence
         
     def get_intent_classification_prompt(self, context: Dict[str, Any]) -> str:
         """Generate a prompt for intent classification based on context"""
@@ -176,6 +229,10 @@ Analyze the user's message and classify their intent. Consider the current conte
             if re.match(perms_pattern, user_input_lower):
                 return UserIntent.COMMAND_PERMISSIONS, 0.9
 
+            local_result = self._classify_locally(user_message, context)
+            if local_result is not None:
+                return local_result
+
             # For more complex requests, use LLM
             system_prompt = """You are an intent classification system. Your job is to categorize user messages into the following intents:
 - COMMAND_HELP: User is asking for help about the bot's capabilities
@@ -76,7 +76,7 @@ from .constants import (
 )
 from .history_utils import _reset_conversation_if_broken, HistoryResetRequiredError
 from .tool_processing import _generate_tool_call_id, _serialize_arguments  # For _process_llm_stream
-from .tool_selector import ToolSelector # IMPORT TOOL SELECTOR
+from .tool_selector_registry import get_tool_selector # Process-wide ToolSelector
 
 # from utils.logging_config import get_logger # Removed this as we use standard logging now
 
@@ -366,13 +366,34 @@ def _should_provide_tools(
     return True
 
 
+def _tool_selector_enabled(config: Optional[Any]) -> bool:
+    return bool(config and hasattr(config, 'TOOL_SELECTOR') and config.TOOL_SELECTOR.get("enabled"))
+
+
+async def _embed_query_for_tool_selection(user_query: Optional[str], config: Optional[Any] = None) -> Optional[Any]:
+    """
+    Embeds the user query off the event loop (cached and micro-batched), so
+    the synchronous tool selection in _prepare_tool_definitions never runs
+    the encoder on the loop. Returns None when no tools will be selected or
+    no embedding model is available.
+    """
+    if not user_query or not _tool_selector_enabled(config):
+        return None
+    try:
+        return await get_tool_selector(config).embed_query_async(user_query)
+    except Exception as e:
+        log.warning(f"Query embedding for tool selection failed: {e}", extra={"event_type": "tool_selector_embedding_failed"})
+        return None
+
+
 def _prepare_tool_definitions(
     available_tool_definitions: List[Dict[str, Any]],
     is_initial_decision_call: bool,
     provide_tools: bool,  # This flag is now determined by _should_provide_tools
     user_query: Optional[str] = None,
     config: Optional[Any] = None, # Added config
-    app_state: Optional[Any] = None # Added app_state
+    app_state: Optional[Any] = None, # Added app_state
+    query_embedding: Optional[Any] = None # From _embed_query_for_tool_selection
 ) -> Optional[List[Dict[str, Any]]]:
     """
     Prepares the final tool definitions to provide to the LLM.
@@ -388,6 +409,8 @@ def _prepare_tool_definitions(
                     trigger should be added.
         config: Configuration object for additional processing
         app_state: Current application state for additional processing
+        query_embedding: Precomputed embedding of user_query; without it the
+                         tool selector encodes the query on the calling thread
 
     Returns:
         Optional[List[Dict[str, Any]]]: Final tool definitions or None if no
@@ -400,14 +423,15 @@ def _prepare_tool_definitions(
     final_tool_definitions = list(available_tool_definitions)
 
     # --- Apply ToolSelector if enabled ---
-    if config and hasattr(config, 'TOOL_SELECTOR') and config.TOOL_SELECTOR.get("enabled") and app_state and user_query:
+    if _tool_selector_enabled(config) and app_state and user_query:
         log.info("Tool selector is enabled. Selecting relevant tools.", extra={"event_type": "tool_selector_invoked"})
         try:
-            tool_selector_instance = ToolSelector(config) # Assumes ToolSelector takes config
+            tool_selector_instance = get_tool_selector(config) # Shared per process; model and index are loaded once
             selected_tools = tool_selector_instance.select_tools(
                 query=user_query,
                 app_state=app_state, # app_state should be passed here
-                available_tools=final_tool_definitions # Pass the current full list
+                available_tools=final_tool_definitions, # Pass the current full list
+                query_embedding=query_embedding
             )
             if selected_tools is not None: # select_tools might return None if it fails and default_fallback is False
                 log.info(f"ToolSelector selected {len(selected_tools)} tools out of {len(final_tool_definitions)}.", extra={"event_type": "tool_selector_completed", "details": {"selected_count": len(selected_tools), "original_count": len(final_tool_definitions)}})
@@ -419,7 +443,7 @@ def _prepare_tool_definitions(
             log.error(f"Error during tool selection: {e}. Falling back to using all tools.", exc_info=True, extra={"event_type": "tool_selector_error"})
             # Fallback to using the original list if selector fails
             # final_tool_definitions remains the full list from copy above
-    elif config and hasattr(config, 'TOOL_SELECTOR') and config.TOOL_SELECTOR.get("enabled"):
+    elif _tool_selector_enabled(config):
         log.warning("Tool selector is enabled in config, but not applied due to missing app_state or user_query for selection process.", extra={"event_type": "tool_selector_skipped_missing_context"})
 
 
@@ -879,7 +903,8 @@ def _perform_llm_interaction(
     app_state: AppState,
     is_initial_decision_call: bool = False,  # For first call in general agent loop
     stage_name: Optional[str] = None,  # Name of the current workflow stage, if any
-    config: Optional[Any] = None # Added config for pass-through
+    config: Optional[Any] = None, # Added config for pass-through
+    query_embedding: Optional[Any] = None # Embedding of the latest user message, if precomputed
 ) -> Iterable[Tuple[str, Any]]:
     """
     Perform an interaction with the LLM, handling both text generation and tool calls.
@@ -893,6 +918,8 @@ def _perform_llm_interaction(
         is_initial_decision_call: Whether this is the initial decision call
         stage_name: Optional name of the current workflow stage
         config: Configuration object for additional processing
+        query_embedding: Precomputed embedding of the latest user message,
+                         passed on to tool selection
         
     Yields:
         Tuples of (event_type, event_data) for streaming responses
@@ -914,7 +941,8 @@ def _perform_llm_interaction(
         provide_tools=provide_tools_flag,
         user_query=user_query,
         config=config,
-        app_state=app_state
+        app_state=app_state,
+        query_embedding=query_embedding
     )
     
     # --- START OF NEW LOGGING ---
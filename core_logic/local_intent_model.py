@@ -0,0 +1,198 @@
+# core_logic/local_intent_model.py
+
+"""
+Local Intent Model
+
+A small multinomial logistic regression over word, word-bigram and
+character-trigram features, trained at load time from the labeled examples
+in ``data/intent_examples.jsonl`` (one ``{"text": ..., "intent": ...}``
+object per line, intents named as in ``UserIntent``).
+
+Training takes well under a second on the shipped examples and prediction
+is a sparse dot product, so IntentClassifier can answer confident
+classifications in microseconds and reserve the LLM for the rest. numpy is
+required; without it ``load_local_intent_model`` returns None and every
+message goes to the LLM as before.
+"""
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+DEFAULT_EPOCHS = 400
+DEFAULT_LEARNING_RATE = 10.0
+DEFAULT_L2 = 1e-5
+
+
+def extract_features(text: str) -> Dict[str, float]:
+    """Sparse, L2-normalized feature weights for ``text``."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    counts: Counter = Counter()
+    for token in tokens:
+        counts["w:" + token] += 1
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            counts["c:" + padded[i:i + 3]] += 1
+    for first, second in zip(tokens, tokens[1:]):
+        counts[f"b:{first} {second}"] += 1
+    if not tokens:
+        counts["empty"] = 1
+    weights = {feature: 1.0 + math.log(count) for feature, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {feature: w / norm for feature, w in weights.items()}
+
+
+def read_examples(path: str) -> List[Tuple[str, str]]:
+    """``(text, label)`` pairs from a JSONL example file; malformed lines are skipped."""
+    examples: List[Tuple[str, str]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                text, label = record["text"], record["intent"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                log.warning(f"Skipping malformed intent example at {path}:{line_number}")
+                continue
+            if isinstance(text, str) and isinstance(label, str) and text.strip():
+                examples.append((text, label))
+    return examples
+
+
+class LocalIntentModel:
+    """Softmax regression over a vocabulary built from the training examples."""
+
+    def __init__(self, labels: Sequence[str], vocabulary: Dict[str, int], weights, bias):
+        self.labels: List[str] = list(labels)
+        self.vocabulary = vocabulary
+        self.weights = weights  # (features, labels)
+        self.bias = bias  # (labels,)
+        self.training_seconds = 0.0
+        self.training_examples = 0
+
+    @classmethod
+    def train(
+        cls,
+        examples: Sequence[Tuple[str, str]],
+        epochs: int = DEFAULT_EPOCHS,
+        learning_rate: float = DEFAULT_LEARNING_RATE,
+        l2: float = DEFAULT_L2,
+    ) -> "LocalIntentModel":
+        """Fit on ``(text, label)`` pairs with full-batch gradient descent."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for LocalIntentModel")
+        if not examples:
+            raise ValueError("No intent examples to train on")
+
+        started = time.perf_counter()
+        labels = sorted({label for _, label in examples})
+        label_index = {label: i for i, label in enumerate(labels)}
+        featurized = [extract_features(text) for text, _ in examples]
+        vocabulary: Dict[str, int] = {}
+        for features in featurized:
+            for feature in features:
+                vocabulary.setdefault(feature, len(vocabulary))
+
+        x = np.zeros((len(examples), len(vocabulary)), dtype=np.float32)
+        for row, features in enumerate(featurized):
+            for feature, value in features.items():
+                x[row, vocabulary[feature]] = value
+        y = np.zeros((len(examples), len(labels)), dtype=np.float32)
+        y[np.arange(len(examples)), [label_index[label] for _, label in examples]] = 1.0
+
+        weights = np.zeros((len(vocabulary), len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        n = float(len(examples))
+        for _ in range(epochs):
+            probabilities = _softmax(x @ weights + bias)
+            error = (probabilities - y) / n
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        model = cls(labels, vocabulary, weights, bias)
+        model.training_seconds = time.perf_counter() - started
+        model.training_examples = len(examples)
+        return model
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probability of every label for ``text``. Features unseen in training are ignored."""
+        rows: List[int] = []
+        values: List[float] = []
+        for feature, value in extract_features(text).items():
+            row = self.vocabulary.get(feature)
+            if row is not None:
+                rows.append(row)
+                values.append(value)
+        scores = self.bias.astype(np.float64)
+        if rows:
+            scores = scores + np.asarray(values, dtype=np.float32) @ self.weights[rows]
+        probabilities = _softmax(scores)
+        return {label: float(p) for label, p in zip(self.labels, probabilities)}
+
+    def predict(self, text: str, allowed_labels: Optional[Sequence[str]] = None) -> Tuple[Optional[str], float]:
+        """
+        Most likely label and its probability, considering only
+        ``allowed_labels`` if given. Probabilities are not renormalized after
+        excluding labels, so a message that mostly matches an excluded label
+        comes back with low confidence.
+        """
+        probabilities = self.predict_proba(text)
+        if allowed_labels is not None:
+            allowed = set(allowed_labels)
+            probabilities = {label: p for label, p in probabilities.items() if label in allowed}
+        if not probabilities:
+            return None, 0.0
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+
+def _softmax(scores):
+    shifted = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+_models: Dict[str, Optional[LocalIntentModel]] = {}
+_models_lock = threading.Lock()
+
+
+def load_local_intent_model(path: str) -> Optional[LocalIntentModel]:
+    """
+    The model trained from ``path``, trained once per process. Returns None if
+    numpy is unavailable or the example file is missing or empty.
+    """
+    with _models_lock:
+        if path in _models:
+            return _models[path]
+        model: Optional[LocalIntentModel] = None
+        if not NUMPY_AVAILABLE:
+            log.info("numpy not available; intents will be classified by the LLM only")
+        else:
+            try:
+                model = LocalIntentModel.train(read_examples(path))
+                log.info(
+                    f"Trained local intent model on {model.training_examples} examples "
+                    f"({len(model.labels)} intents) in {model.training_seconds * 1000:.0f}ms"
+                )
+            except (OSError, ValueError) as e:
+                log.warning(f"Local intent model unavailable ({e}); intents will be classified by the LLM only")
+        _models[path] = model
+        return model
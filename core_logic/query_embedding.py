@@ -0,0 +1,233 @@
+# core_logic/query_embedding.py
+
+"""
+Query Embedding Service
+
+Front-end for the sentence-transformers model used by ToolSelector:
+
+* a bounded LRU cache keyed on normalized query text, so repeated phrasing
+  ("show my tickets", "list my repos") never reaches the model twice;
+* a micro-batcher that gathers concurrent ``encode`` requests for a few
+  milliseconds and runs them through the model as a single batch;
+* a dedicated worker thread for the model, so the aiohttp event loop never
+  blocks on inference.
+
+Cache hit rate and batch-size counters are exposed via ``metrics()``.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH_SIZE = 32
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercased with whitespace collapsed."""
+    return _WHITESPACE_RE.sub(" ", (query or "").strip()).lower()
+
+
+class QueryEmbeddingService:
+    """
+    LRU-cached, micro-batched query encoder.
+
+    ``encode_batch`` receives a list of normalized query texts and must
+    return one embedding per text, in order. It is only ever called from
+    the service's worker thread (async path) or the caller's thread
+    (``encode_sync``).
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Sequence[Any]],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            encode_batch: Function encoding a list of texts in one model call
+            cache_size: Maximum number of cached query embeddings (0 disables caching)
+            batch_window_ms: How long the first request of a batch waits for company
+            max_batch_size: Flush a batch early once it reaches this many texts
+        """
+        self._encode_batch = encode_batch
+        self.cache_size = cache_size
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Micro-batch state; only touched from the event loop thread
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._max_batch_seen = 0
+
+    # --- Cache ---
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            return embedding
+
+    def _cache_put(self, key: str, embedding: Any) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached embeddings, e.g. after the embedding model changes."""
+        with self._lock:
+            self._cache.clear()
+
+    # --- Encoding ---
+
+    def _run_batch(self, texts: List[str]) -> List[Any]:
+        embeddings = list(self._encode_batch(texts))
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Encoder returned {len(embeddings)} embeddings for {len(texts)} texts")
+        with self._lock:
+            self._batches += 1
+            self._batched_texts += len(texts)
+            self._max_batch_seen = max(self._max_batch_seen, len(texts))
+        for text, embedding in zip(texts, embeddings):
+            self._cache_put(text, embedding)
+        return embeddings
+
+    def encode_sync(self, query: str) -> Any:
+        """Encode one query on the calling thread, using the cache."""
+        key = normalize_query(query)
+        embedding = self._cache_get(key)
+        if embedding is None:
+            embedding = self._run_batch([key])[0]
+        return embedding
+
+    async def encode(self, query: str) -> Any:
+        """
+        Encode one query without blocking the event loop.
+
+        Cache hits return immediately. Misses join an identical request
+        already queued or running, or are added to the current micro-batch,
+        which runs on the worker thread once the batch window closes or the
+        batch is full.
+        """
+        key = normalize_query(query)
+        embedding = self._cache_get(key)
+        if embedding is not None:
+            return embedding
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset_batch_state(loop)
+
+        future = self._pending.get(key) or self._in_flight.get(key)
+        if future is not None:
+            self._coalesced += 1
+        else:
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(max(0.0, self.batch_window_ms) / 1000.0, self._flush)
+        # Shield so a cancelled caller does not cancel the shared result
+        return await asyncio.shield(future)
+
+    def _reset_batch_state(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._loop = loop
+        self._pending = OrderedDict()
+        self._in_flight = {}
+        self._flush_handle = None
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch: List[Tuple[str, asyncio.Future]] = list(self._pending.items())
+        self._pending = OrderedDict()
+        self._in_flight.update(batch)
+        self._loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await self._loop.run_in_executor(self._get_executor(), self._run_batch, texts)
+        except Exception as e:
+            log.error(f"Query embedding batch of {len(texts)} failed: {e}", exc_info=True)
+            for text, future in batch:
+                self._in_flight.pop(text, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (text, future), embedding in zip(batch, embeddings):
+            self._in_flight.pop(text, None)
+            if not future.done():
+                future.set_result(embedding)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # One worker: the model is not re-entrant-friendly and batching
+        # already amortizes the per-call overhead
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embed")
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker thread. Safe to call more than once."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # --- Metrics ---
+
+    def metrics(self) -> Dict[str, Any]:
+        """Cache and batching counters since the service was created."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "cache_size": len(self._cache),
+                "cache_capacity": self.cache_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self._coalesced,
+                "batches": self._batches,
+                "encoded_texts": self._batched_texts,
+                "avg_batch_size": round(self._batched_texts / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+            }
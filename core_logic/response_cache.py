@@ -0,0 +1,318 @@
+# core_logic/response_cache.py
+
+"""
+LLM Response Cache
+
+Caches the event list produced by ``LLMInterface.generate_content_stream``
+for identical requests:
+
+* an in-process LRU bounded by entry count and by serialized size, with a
+  per-entry TTL so stale replies are never served;
+* an optional Redis tier (configured through the same REDIS_* settings as
+  RedisStorage) so a reply cached by one replica is a hit on every replica;
+* ``build_cache_key``, which fingerprints every message part (text,
+  function calls and function responses), the tool declarations and the
+  generation config.
+
+Hit, miss, eviction and expiry counters are exposed via ``metrics()``.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 600
+REDIS_RETRY_AFTER_SECONDS = 30.0  # Back-off after a Redis failure before trying the tier again
+
+_PART_FIELDS = ("text", "function_call", "function_response", "inline_data", "file_data")
+
+CachedEvents = List[Dict[str, Any]]
+
+
+def _canonical(value: Any) -> Any:
+    """Convert SDK objects, dataclasses and mappings into plain JSON-able data."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _canonical(dataclasses.asdict(value))
+    to_dict = getattr(type(value), "to_dict", None)  # proto-plus messages (glm.Content, glm.Part, ...)
+    if callable(to_dict):
+        try:
+            return _canonical(to_dict(value))
+        except Exception:
+            pass
+    if hasattr(value, "items"):  # proto MapComposite (function call args)
+        try:
+            return {str(k): _canonical(v) for k, v in value.items()}
+        except Exception:
+            pass
+    if any(hasattr(value, field) for field in _PART_FIELDS):  # Part-like objects without to_dict
+        return {field: _canonical(getattr(value, field)) for field in _PART_FIELDS if getattr(value, field, None)}
+    return str(value)
+
+
+def _message_fingerprint(message: Any) -> Dict[str, Any]:
+    if isinstance(message, dict):
+        role, parts = message.get("role"), message.get("parts", [])
+    else:
+        role, parts = getattr(message, "role", None), getattr(message, "parts", [])
+    if isinstance(parts, (str, bytes)) or not hasattr(parts, "__iter__"):
+        parts = [parts]
+    return {"role": str(role), "parts": [_canonical(part) for part in parts]}
+
+
+def build_cache_key(
+    messages: Sequence[Any],
+    model_name: str,
+    tools: Optional[Sequence[Dict[str, Any]]] = None,
+    generation_config: Any = None,
+    system_prompt: Optional[str] = None,
+) -> str:
+    """
+    Deterministic cache key for one LLM request.
+
+    Two requests share a key only if they have the same model, system prompt,
+    generation config, tool declarations and message parts, including any
+    function calls and function responses in the history.
+    """
+    payload = {
+        "model": model_name,
+        "system": system_prompt,
+        "config": _canonical(generation_config),
+        "tools": sorted((_canonical(t) for t in tools or []), key=lambda t: json.dumps(t, sort_keys=True, default=str)),
+        "messages": [_message_fingerprint(m) for m in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class RedisResponseCacheTier:
+    """
+    Shared second-level cache stored in Redis.
+
+    Connects lazily with the REDIS_* settings used by RedisStorage. Any Redis
+    failure is logged and the tier is skipped for a short back-off period, so
+    an unavailable Redis only costs cache hits, never a reply.
+    """
+
+    def __init__(self, app_settings: Any, key_prefix: Optional[str] = None):
+        self._app_settings = app_settings
+        from bot_core.redis_storage import RESPONSE_CACHE_KEY_PREFIX  # Lazy import: needs redis + botbuilder
+        self.key_prefix = key_prefix or f"{getattr(app_settings, 'redis_prefix', 'botstate:')}{RESPONSE_CACHE_KEY_PREFIX}"
+        self._client: Any = None
+        self._retry_after = 0.0
+        self.errors = 0
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            if time.monotonic() < self._retry_after:
+                return None
+            from bot_core.redis_storage import create_redis_client  # Lazy import: needs redis + botbuilder
+            self._client = await create_redis_client(self._app_settings)
+        return self._client
+
+    def _record_failure(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        self._client = None
+        self._retry_after = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+        log.warning(
+            f"LLM response cache: Redis {operation} failed, skipping the shared tier for {REDIS_RETRY_AFTER_SECONDS:.0f}s. Error: {error}",
+            extra={"event_type": "llm_response_cache_redis_error", "details": {"operation": operation, "error": str(error)}},
+        )
+
+    async def get(self, key: str) -> Optional[Tuple[CachedEvents, float]]:
+        """Return ``(events, remaining_ttl_seconds)`` for ``key``, or None."""
+        try:
+            client = await self._get_client()
+            if client is None:
+                return None
+            raw = await client.get(self.key_prefix + key)
+            if raw is None:
+                return None
+            remaining_ttl = await client.ttl(self.key_prefix + key)
+        except Exception as e:
+            self._record_failure("read", e)
+            return None
+        try:
+            events = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(events, list) or not isinstance(remaining_ttl, (int, float)) or remaining_ttl <= 0:
+            return None
+        return events, float(remaining_ttl)
+
+    async def set(self, key: str, serialized_events: str, ttl_seconds: float) -> None:
+        try:
+            client = await self._get_client()
+            if client is None:
+                return
+            await client.set(self.key_prefix + key, serialized_events, ex=max(1, int(ttl_seconds)))
+        except Exception as e:
+            self._record_failure("write", e)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception as e:
+                log.debug(f"Error closing LLM response cache Redis client: {e}")
+            self._client = None
+
+
+class LLMResponseCache:
+    """
+    Bounded, TTL-aware LRU cache of streamed LLM responses.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (size of the serialized events) is exceeded. A response
+    larger than ``max_bytes`` is not cached in memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        shared_tier: Optional[RedisResponseCacheTier] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached responses (0 disables the in-process tier)
+            max_bytes: Maximum total serialized size of cached responses
+            ttl_seconds: How long a cached response may be served
+            shared_tier: Optional Redis tier consulted on in-process misses
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared_tier = shared_tier
+
+        # key -> (expires_at, size_bytes, events)
+        self._entries: "OrderedDict[str, Tuple[float, int, CachedEvents]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stores = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "LLMResponseCache":
+        """Build a cache from the LLM_RESPONSE_CACHE section of the app config."""
+        settings = getattr(config, "LLM_RESPONSE_CACHE", None)
+        if not isinstance(settings, dict):
+            settings = {}
+        shared_tier = None
+        if settings.get("backend") == "redis":
+            app_settings = getattr(config, "settings", None)
+            if app_settings is not None:
+                shared_tier = RedisResponseCacheTier(app_settings)
+            else:
+                log.warning("LLM response cache backend is 'redis' but no Redis settings are available; using memory only.")
+        return cls(
+            max_entries=settings.get("max_entries", DEFAULT_MAX_ENTRIES),
+            max_bytes=settings.get("max_bytes", DEFAULT_MAX_BYTES),
+            ttl_seconds=settings.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+            shared_tier=shared_tier,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def _get_local(self, key: str) -> Optional[CachedEvents]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, events = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return events
+
+    def _put_local(self, key: str, events: CachedEvents, size: int, ttl_seconds: float) -> None:
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (time.monotonic() + ttl_seconds, size, events)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    async def get(self, key: str) -> Optional[CachedEvents]:
+        """Return the cached events for ``key``, or None if missing or expired."""
+        events = self._get_local(key)
+        if events is not None:
+            self.hits += 1
+            return events
+        if self.shared_tier is not None:
+            shared = await self.shared_tier.get(key)
+            if shared is not None:
+                events, remaining_ttl = shared
+                self.shared_hits += 1
+                # The local copy expires together with the Redis entry
+                self._put_local(key, events, len(json.dumps(events, default=str)), min(remaining_ttl, self.ttl_seconds))
+                return events
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, events: CachedEvents) -> None:
+        """Cache the events of a completed response."""
+        serialized = json.dumps(events, default=str)
+        self._put_local(key, events, len(serialized), self.ttl_seconds)
+        self.stores += 1
+        if self.shared_tier is not None:
+            await self.shared_tier.set(key, serialized, self.ttl_seconds)
+
+    def clear(self) -> None:
+        """Drop all in-process entries (the shared tier expires on its own)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stores": self.stores,
+            "shared_tier": "redis" if self.shared_tier is not None else None,
+            "shared_tier_errors": self.shared_tier.errors if self.shared_tier is not None else 0,
+        }
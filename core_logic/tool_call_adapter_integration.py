@@ -17,7 +17,7 @@ from tools.tool_executor import ToolExecutor
 from core_logic.tool_call_adapter import ToolCallAdapter
 
 # Import for saving UserProfile
-from user_auth import db_manager # For saving UserProfile
+from user_auth.profile_repository import get_profile_repository
 from user_auth.utils import _user_profile_cache, _cache_lock # For updating cache
 import time # For cache timestamp
 
@@ -170,19 +170,17 @@ async def process_service_tool_calls(
                 # Assuming _record_selection_outcome was called if app_state was provided to process_llm_tool_call
                 # and metrics are part of current_user. A more explicit flag from _record_selection_outcome would be robust.
                 try:
-                    user_profile_data = app_state.current_user.model_dump(mode='json')
-                    if db_manager.save_user_profile(user_profile_data):
-                        log.info(f"Saved updated UserProfile (with tool metrics) for {app_state.current_user.user_id} after adapter call.")
-                        # Update cache as well
-                        with _cache_lock:
-                            _user_profile_cache.put(
-                                app_state.current_user.user_id,
-                                user_profile_data, # The dumped data
-                                time.time()
-                            )
-                            log.debug(f"Updated UserProfile cache for {app_state.current_user.user_id}.")
-                    else:
-                        log.error(f"Failed to save updated UserProfile for {app_state.current_user.user_id} after adapter call.")
+                    # Buffered and coalesced with other activity updates; flushed by the profile repository
+                    await get_profile_repository(config).record_tool_metrics(app_state.current_user)
+                    log.debug(f"Recorded tool metrics for {app_state.current_user.user_id} after adapter call.")
+                    # Update cache as well
+                    with _cache_lock:
+                        _user_profile_cache.put(
+                            app_state.current_user.user_id,
+                            app_state.current_user.model_dump(mode='json'),
+                            time.time()
+                        )
+                        log.debug(f"Updated UserProfile cache for {app_state.current_user.user_id}.")
                 except Exception as e_save_profile:
                     log.error(f"Error saving/caching UserProfile after adapter call for {app_state.current_user.user_id if app_state.current_user else 'UnknownUser'}: {e_save_profile}", exc_info=True)
             # --- End UserProfile Save ---
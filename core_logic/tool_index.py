@@ -0,0 +1,487 @@
+# core_logic/tool_index.py
+
+"""
+Vectorized Tool Similarity Index
+
+Holds every tool embedding in one pre-normalized float32 matrix so that a
+query can be scored against the whole catalog with a single matrix-vector
+product. Keyword, category and web-search adjustments used by
+ToolSelector are compiled once per tool catalog into boost tables and
+applied as array operations instead of per-tool Python loops.
+
+The index is persisted as a binary cache: a ``.npy`` matrix that workers
+memory-map read-only at startup, plus a small JSON sidecar holding tool
+names, optimized tool metadata and a content hash per tool. The matrix file
+is named after a hash of its contents and the sidecar names it, so
+replacing the sidecar switches both at once.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+# Tools whose score is damped so that specific tools win over generic web search
+WEB_SEARCH_TOOL_NAMES = ("search_web", "perplexity_web_search")
+WEB_SEARCH_DAMPING_FACTOR = 0.85
+WEB_SEARCH_STRONG_MATCH = 0.8
+CATEGORY_BOOST = 0.1
+KEYWORD_BOOST_BASE = 0.3
+KEYWORD_BOOST_COVERAGE = 0.2
+KEYWORD_BOOST_CAP = 0.5
+
+
+def normalize_rows(matrix: Any) -> Any:
+    """L2-normalize each row as float32; zero rows stay zero (cosine 0.0)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    safe_norms = np.where(norms == 0, 1.0, norms).astype(np.float32)
+    return matrix / safe_norms
+
+
+def permitted_by_mask(required_bits: Sequence[int], granted_mask: int) -> List[bool]:
+    """
+    For each tool's required permission bitset (0 = none, -1 = never permitted),
+    whether every required bit is set in ``granted_mask``.
+    """
+    if NUMPY_AVAILABLE and 0 <= granted_mask < 2 ** 63:
+        required = np.asarray(required_bits, dtype=np.int64)
+        return ((required >= 0) & ((required & np.int64(granted_mask)) == required)).tolist()
+    return [bits >= 0 and bits & granted_mask == bits for bits in required_bits]
+
+
+class ToolBoostProfile:
+    """
+    Per-catalog boost tables compiled from the available tool definitions.
+
+    A profile is tied to one index (row order) and one list of tool
+    definitions; ToolSimilarityIndex caches the most recent profile so
+    repeated queries against the same catalog do no per-tool work.
+    """
+
+    def __init__(
+        self,
+        available_mask: Any,
+        keyword_rows: Dict[str, Any],
+        category_counts: Dict[str, Any],
+        web_search_mask: Any,
+    ):
+        self.available_mask = available_mask
+        # keyword (lowercased) -> row indices of tools declaring it
+        self.keyword_rows = keyword_rows
+        # tool category (lowercased) -> per-row count of that category
+        self.category_counts = category_counts
+        self.web_search_mask = web_search_mask
+
+
+class ToolSimilarityIndex:
+    """
+    Pre-normalized embedding matrix plus a name index for fast tool scoring.
+    """
+
+    def __init__(self, names: Sequence[str], vectors: Any, normalized: bool = False):
+        """
+        Build the index.
+
+        Args:
+            names: Tool names, one per row of ``vectors``
+            vectors: 2-D array-like of embeddings (rows align with ``names``)
+            normalized: True if ``vectors`` is already an L2-normalized float32
+                matrix (e.g. a memory-mapped cache); it is then used without copying
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for ToolSimilarityIndex")
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(names):
+            raise ValueError(
+                f"Embedding matrix shape {matrix.shape} does not match {len(names)} tool names"
+            )
+
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.names: List[str] = list(names)
+        self.name_to_row: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+
+        self._profile_key: Optional[Tuple[Tuple[str, int], ...]] = None
+        self._profile_defs: Optional[List[Dict[str, Any]]] = None
+        self._profile: Optional[ToolBoostProfile] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def dimension(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.size else 0
+
+    @classmethod
+    def from_embeddings(cls, embeddings: Dict[str, Any]) -> Optional["ToolSimilarityIndex"]:
+        """
+        Build an index from a ``tool_name -> embedding`` mapping.
+
+        Embeddings that are not 1-D or whose dimension differs from the first
+        valid embedding are skipped with a warning, mirroring the per-tool
+        validation that ToolSelector used to do on every query.
+
+        Returns:
+            The index, or None if numpy is unavailable or no embedding is valid
+        """
+        if not NUMPY_AVAILABLE or not embeddings:
+            return None
+
+        names: List[str] = []
+        rows: List[Any] = []
+        dimension: Optional[int] = None
+        for name, embedding in embeddings.items():
+            vector = np.asarray(embedding, dtype=np.float32)
+            if vector.ndim != 1 or vector.size == 0:
+                log.warning(f"Skipping tool {name} due to invalid embedding format: {type(embedding)}")
+                continue
+            if dimension is None:
+                dimension = vector.shape[0]
+            elif vector.shape[0] != dimension:
+                log.warning(
+                    f"Skipping tool {name}: embedding dimension {vector.shape[0]} != {dimension}"
+                )
+                continue
+            names.append(name)
+            rows.append(vector)
+
+        if not rows:
+            return None
+        return cls(names, np.vstack(rows))
+
+    def cosine_scores(self, query_embedding: Any) -> Any:
+        """
+        Cosine similarity between the query and every indexed tool.
+
+        Returns:
+            float64 array aligned with ``self.names``
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            log.warning(
+                f"Query embedding dimension {query.shape[0]} does not match index dimension {self.dimension}"
+            )
+            return np.zeros(len(self.names), dtype=np.float64)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return np.zeros(len(self.names), dtype=np.float64)
+        return (self.matrix @ (query / query_norm)).astype(np.float64)
+
+    def top_k(self, query_embedding: Any, threshold: float, max_results: int) -> List[Tuple[str, float]]:
+        """Plain cosine ranking used by ToolSelector.find_similar_tools."""
+        scores = self.cosine_scores(query_embedding)
+        return self._ranked(scores, scores >= threshold, max_results)
+
+    def compile_profile(
+        self,
+        tool_name_to_def: Dict[str, Dict[str, Any]],
+        get_tool_categories: Callable[[str, Dict[str, Any]], List[str]],
+    ) -> ToolBoostProfile:
+        """
+        Compile (or reuse) the boost tables for a set of available tools.
+
+        The profile is cached against the identity of the definition objects,
+        which ToolExecutor keeps stable for the life of the process.
+        """
+        defs = list(tool_name_to_def.items())
+        key = tuple((name, id(tool_def)) for name, tool_def in defs)
+        if self._profile is not None and key == self._profile_key:
+            return self._profile
+
+        n_rows = len(self.names)
+        available_mask = np.zeros(n_rows, dtype=bool)
+        keyword_row_lists: Dict[str, List[int]] = {}
+        category_row_lists: Dict[str, List[int]] = {}
+        web_search_mask = np.zeros(n_rows, dtype=bool)
+
+        for name, tool_def in defs:
+            row = self.name_to_row.get(name)
+            if row is None:
+                continue
+            available_mask[row] = True
+            if name in WEB_SEARCH_TOOL_NAMES:
+                web_search_mask[row] = True
+
+            metadata = tool_def.get("metadata", {}) or {}
+            for keyword in metadata.get("keywords", []) or []:
+                keyword_row_lists.setdefault(keyword.lower(), []).append(row)
+
+            for category in get_tool_categories(name, tool_def) or []:
+                category_row_lists.setdefault(category.lower(), []).append(row)
+
+        category_counts = {
+            category: np.bincount(np.asarray(rows, dtype=np.intp), minlength=n_rows)
+            for category, rows in category_row_lists.items()
+        }
+
+        profile = ToolBoostProfile(
+            available_mask=available_mask,
+            keyword_rows={kw: np.asarray(rows, dtype=np.intp) for kw, rows in keyword_row_lists.items()},
+            category_counts=category_counts,
+            web_search_mask=web_search_mask,
+        )
+        self._profile_key = key
+        # Keep the definitions alive so their ids cannot be reused while cached
+        self._profile_defs = [tool_def for _, tool_def in defs]
+        self._profile = profile
+        return profile
+
+    def keyword_boosts(self, query: str, profile: ToolBoostProfile) -> Any:
+        """
+        Keyword boost per row: 0.3 + 0.2 * coverage for the best matching
+        keyword, capped at 0.5 (same rule as ToolSelector._check_direct_keyword_match).
+        """
+        boosts = np.zeros(len(self.names), dtype=np.float64)
+        query_lower = query.lower()
+        if not query_lower:
+            return boosts
+        query_length = len(query_lower)
+        for keyword, rows in profile.keyword_rows.items():
+            if keyword in query_lower:
+                coverage = len(keyword) / query_length
+                np.maximum.at(boosts, rows, KEYWORD_BOOST_BASE + KEYWORD_BOOST_COVERAGE * coverage)
+        return np.minimum(boosts, KEYWORD_BOOST_CAP)
+
+    def score_query(
+        self,
+        query: str,
+        query_embedding: Any,
+        profile: ToolBoostProfile,
+        query_categories: Iterable[str],
+        threshold: float,
+        exclude: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Score every available tool for a query and return ``(name, score)``
+        pairs at or above ``threshold``, best first.
+
+        Scoring matches the historical per-tool loop: cosine similarity, plus
+        keyword boost, damped for web-search tools unless it is a strong
+        match, plus 0.1 for each tool category detected in the query.
+        """
+        scores = self.cosine_scores(query_embedding)
+        scores = scores + self.keyword_boosts(query, profile)
+
+        damp = profile.web_search_mask & (scores > threshold) & (scores < WEB_SEARCH_STRONG_MATCH)
+        scores = np.where(damp, scores * WEB_SEARCH_DAMPING_FACTOR, scores)
+
+        query_category_set = {category.lower() for category in query_categories}
+        matched_counts = [
+            counts for category, counts in profile.category_counts.items()
+            if category in query_category_set
+        ]
+        if matched_counts:
+            total_counts = np.sum(matched_counts, axis=0)
+            # Add the boost one step at a time so scores are bit-for-bit the
+            # same as repeated `similarity += 0.1` in the original loop
+            for step in range(int(total_counts.max())):
+                scores = np.where(total_counts > step, scores + CATEGORY_BOOST, scores)
+
+        candidate_mask = profile.available_mask.copy()
+        if exclude:
+            for name in exclude:
+                row = self.name_to_row.get(name)
+                if row is not None:
+                    candidate_mask[row] = False
+
+        return self._ranked(scores, candidate_mask & (scores >= threshold), None)
+
+    def _ranked(self, scores: Any, mask: Any, max_results: Optional[int]) -> List[Tuple[str, float]]:
+        rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return []
+        # Stable sort keeps catalog order for ties, like list.sort did
+        order = rows[np.argsort(-scores[rows], kind="stable")]
+        if max_results is not None:
+            order = order[:max_results]
+        return [(self.names[row], float(scores[row])) for row in order]
+
+
+# --- Binary embedding cache ---
+
+EMBEDDING_CACHE_VERSION = "3.0"
+
+
+class EmbeddingCacheData:
+    """Contents of a binary embedding cache as returned by read_embedding_cache."""
+
+    def __init__(
+        self,
+        names: List[str],
+        matrix: Any,
+        metadata: Dict[str, Dict[str, Any]],
+        content_hashes: Dict[str, Optional[str]],
+        model_name: Optional[str],
+    ):
+        self.names = names
+        # Read-only memory map of L2-normalized float32 rows
+        self.matrix = matrix
+        self.metadata = metadata
+        self.content_hashes = content_hashes
+        self.model_name = model_name
+
+
+def sidecar_path_for(matrix_path: str) -> str:
+    """``data/tool_embeddings.npy`` -> ``data/tool_embeddings.meta.json``"""
+    base, _ = os.path.splitext(matrix_path)
+    return f"{base}.meta.json"
+
+
+def _matrix_file_prefix(matrix_path: str) -> str:
+    """``data/tool_embeddings.npy`` -> ``tool_embeddings.``; versions are ``tool_embeddings.<sha>.npy``"""
+    base, _ = os.path.splitext(os.path.basename(matrix_path))
+    return f"{base}."
+
+
+def _write_atomically(path: str, write: Callable[[Any], None], mode: str = "wb") -> None:
+    """Write ``path`` via a uniquely named temporary in the same directory, then rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_embedding_cache(
+    matrix_path: str,
+    names: Sequence[str],
+    matrix: Any,
+    metadata: Dict[str, Dict[str, Any]],
+    content_hashes: Dict[str, Optional[str]],
+    model_name: Optional[str],
+) -> None:
+    """
+    Atomically write the matrix and its sidecar.
+
+    The matrix goes to a content-addressed file next to ``matrix_path``
+    (``tool_embeddings.<sha256 prefix>.npy``) that the sidecar names, and the
+    sidecar is renamed into place last. A reader therefore sees either the
+    old pair or the new one, never the new matrix with the old names. Workers
+    that memory-mapped an older matrix keep reading its inode. Matrix files
+    no longer named by the current or the previous sidecar are removed. Rows
+    are stored L2-normalized so readers can map them directly into a
+    ToolSimilarityIndex.
+    """
+    normalized = normalize_rows(matrix) if len(names) else np.zeros((0, 0), dtype=np.float32)
+    normalized = np.ascontiguousarray(normalized, dtype=np.float32)
+    cache_dir = os.path.dirname(matrix_path)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    matrix_sha256 = hashlib.sha256(normalized.tobytes()).hexdigest()
+    matrix_file = f"{_matrix_file_prefix(matrix_path)}{matrix_sha256[:16]}.npy"
+    versioned_path = os.path.join(cache_dir, matrix_file)
+    if not os.path.exists(versioned_path):
+        _write_atomically(versioned_path, lambda f: np.save(f, normalized, allow_pickle=False))
+
+    sidecar_path = sidecar_path_for(matrix_path)
+    previous = _read_sidecar(sidecar_path)
+    sidecar = {
+        "version": EMBEDDING_CACHE_VERSION,
+        "format": "npy-float32-normalized",
+        "matrix_file": matrix_file,
+        "matrix_sha256": matrix_sha256,
+        "rows": len(names),
+        "dimension": int(normalized.shape[1]) if normalized.ndim == 2 else 0,
+        "model": model_name,
+        "names": list(names),
+        "content_hashes": {name: content_hashes.get(name) for name in names},
+        "metadata": metadata,
+        "timestamp": time.time(),
+    }
+    _write_atomically(sidecar_path, lambda f: json.dump(sidecar, f), mode="w")
+
+    # A reader that loaded the previous sidecar may not have opened its matrix yet
+    keep = {matrix_file, previous.get("matrix_file") if isinstance(previous, dict) else None}
+    stale = re.compile(re.escape(_matrix_file_prefix(matrix_path)) + r"[0-9a-f]{16}\.npy")
+    legacy_matrix = os.path.basename(matrix_path)  # Unversioned matrix of format 2.0
+    for entry in os.listdir(cache_dir or "."):
+        if (stale.fullmatch(entry) or entry == legacy_matrix) and entry not in keep:
+            try:
+                os.unlink(os.path.join(cache_dir, entry))
+            except OSError as e:
+                log.debug(f"Could not remove stale embeddings matrix {entry}: {e}")
+
+
+def _read_sidecar(sidecar_path: str) -> Optional[Any]:
+    try:
+        with open(sidecar_path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def read_embedding_cache(matrix_path: str) -> Optional[EmbeddingCacheData]:
+    """
+    Memory-map a binary embedding cache.
+
+    Returns:
+        The cache contents, or None if it is missing, from another format
+        version, or the sidecar and matrix disagree
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    sidecar_path = sidecar_path_for(matrix_path)
+    if not os.path.exists(sidecar_path):
+        return None
+
+    try:
+        with open(sidecar_path, "r") as f:
+            sidecar = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log.error(f"Invalid embeddings cache sidecar {sidecar_path}: {e}")
+        return None
+
+    if not isinstance(sidecar, dict) or sidecar.get("version") != EMBEDDING_CACHE_VERSION:
+        log.warning(
+            f"Embeddings cache version {sidecar.get('version') if isinstance(sidecar, dict) else None} "
+            f"!= {EMBEDDING_CACHE_VERSION}; ignoring {matrix_path}"
+        )
+        return None
+
+    matrix_file = sidecar.get("matrix_file")
+    if not isinstance(matrix_file, str) or os.path.basename(matrix_file) != matrix_file:
+        log.warning(f"Embeddings cache sidecar {sidecar_path} names no valid matrix file; ignoring it")
+        return None
+    versioned_path = os.path.join(os.path.dirname(matrix_path), matrix_file)
+    try:
+        matrix = np.load(versioned_path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError) as e:
+        log.error(f"Failed to memory-map embeddings cache {versioned_path}: {e}")
+        return None
+
+    names = list(sidecar.get("names") or [])
+    if matrix.ndim != 2 or matrix.shape[0] != len(names) or matrix.dtype != np.float32:
+        log.warning(
+            f"Embeddings cache matrix {matrix.shape}/{matrix.dtype} does not match "
+            f"{len(names)} names in sidecar; ignoring {matrix_path}"
+        )
+        return None
+
+    return EmbeddingCacheData(
+        names=names,
+        matrix=matrix,
+        metadata=sidecar.get("metadata") or {},
+        content_hashes=sidecar.get("content_hashes") or {},
+        model_name=sidecar.get("model"),
+    )
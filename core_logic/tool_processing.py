@@ -74,6 +74,12 @@ async def _execute_tool_calls(
     
     This function handles both detailed tool calls (e.g., "github_list_repositories") 
     and service-level tool calls (e.g., "github") via the ToolCallAdapter.
+
+    Detailed tool calls run one after another unless TOOL_PARALLEL_EXECUTION is
+    enabled, in which case the calls that pass validation run concurrently (at
+    most ``max_concurrency_per_service`` per service). Either way results are
+    returned in request order, and with BREAK_ON_CRITICAL_TOOL_ERROR nothing
+    after the first critical error is reported.
     
     Args:
         tool_calls: The tool calls from the LLM
@@ -185,8 +191,151 @@ async def _execute_tool_calls(
     has_critical_error = False
     updated_previous_calls = list(previous_calls)
 
+    # Parsing, circular-call detection and validation need no tool I/O, so every
+    # call is checked up front, in order. The calls cleared to run are then known
+    # before any of them starts and can be executed concurrently.
+    planned_calls = _plan_tool_calls(tool_calls, tool_executor, previous_calls, config, available_tool_definitions)
+
+    parallel_settings = _parallel_execution_settings(config)
+    executions: Dict[int, "asyncio.Task"] = {}
+    if parallel_settings["enabled"] and sum(1 for planned in planned_calls if planned["execute"]) > 1:
+        executions = _start_parallel_executions(planned_calls, tool_executor, app_state, config, parallel_settings["max_concurrency_per_service"])
+
+    try:
+        # Results are applied in the order the LLM requested the calls, whether
+        # they ran one after another or concurrently.
+        for idx, planned in enumerate(planned_calls):
+            tool_call_id = planned["tool_call_id"]
+            effective_tool_name_for_part = planned["tool_name"]
+            result_content_for_output = planned["content"]
+            current_call_is_error = planned["is_error"]
+
+            if planned["critical"]:
+                has_critical_error = True
+                if planned["step_error"] and app_state and hasattr(app_state, 'current_step_error'):
+                    app_state.current_step_error = planned["step_error"]
+
+            if planned["tool_message"] is not None:
+                # Malformed call without a 'function' field: reported, never recorded as a previous call
+                tool_result_messages.append(planned["tool_message"])
+                internal_messages.append(planned["internal_message"])
+                if has_critical_error: break
+                continue
+
+            if planned["execute"]:
+                task = executions.get(idx)
+                outcome = await task if task is not None else await _run_tool_with_retries(planned, tool_executor, app_state, config)
+                result_content_for_output = outcome["content"]
+                current_call_is_error = outcome["is_error"]
+                if outcome["is_critical"]:
+                    has_critical_error = True
+
+                if outcome["permission_denied_message"] is not None:
+                    _record_permission_denial(planned, outcome, app_state)
+
+            if planned["count_stats"] and not (planned["execute"] and outcome["permission_denied_message"] is not None):
+                # Permission denials record their own stats above
+                execution_duration_ms = outcome["execution_time_ms"] if planned["execute"] else 0
+                if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
+                    tool_name_for_stats = effective_tool_name_for_part
+                    is_success_for_stats = not current_call_is_error
+                    app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
+                    app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_duration_ms
+                    if current_call_is_error: app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
+                    if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
+                        app_state.update_tool_usage(tool_name_for_stats, execution_duration_ms, is_success_for_stats)
+                    else:
+                        log.warning(
+                            f"AppState missing 'update_tool_usage' method. Cannot update detailed tool stats for {tool_name_for_stats}.",
+                            extra={"event_type": "missing_update_tool_usage_method", "details": {"tool_name": tool_name_for_stats}}
+                        )
+
+            if planned["count_stats"] and current_call_is_error and not has_critical_error:
+                try:
+                    error_payload_check = json.loads(result_content_for_output)
+                    log.debug(
+                        "Checking tool error payload for 'is_critical'.",
+                        extra={"event_type": "check_tool_error_payload_critical", "details": {"payload": error_payload_check, "is_critical_type": str(type(error_payload_check.get('is_critical'))), "is_critical_value": error_payload_check.get('is_critical')}}
+                    )
+                    if isinstance(error_payload_check, dict) and error_payload_check.get("is_critical") is True:
+                        log.warning(
+                            f"Tool '{effective_tool_name_for_part}' (ID: {tool_call_id}) reported a critical error in its response. Setting has_critical_error=True.",
+                            extra={"event_type": "tool_reported_critical_error_response", "details": {"tool_name": effective_tool_name_for_part, "tool_call_id": tool_call_id}}
+                        )
+                        has_critical_error = True
+                except Exception as e_parse:
+                    log.warning(
+                        f"Could not parse tool's error response for '{effective_tool_name_for_part}' (ID: {tool_call_id}) to check 'is_critical'.",
+                        exc_info=True, # Add exc_info
+                        extra={"event_type": "parse_tool_error_response_failed_critical_check", "details": {"tool_name": effective_tool_name_for_part, "tool_call_id": tool_call_id, "error": str(e_parse)}}
+                    )
+
+            tool_result_messages.append({"role": "tool", "tool_call_id": tool_call_id, "name": effective_tool_name_for_part, "content": result_content_for_output, "is_error": current_call_is_error})
+            internal_messages.append({"role": "system", "content": f"Tool Execution: Name='{effective_tool_name_for_part}', ID='{tool_call_id}', Success={not current_call_is_error}, Result (preview)='{result_content_for_output[:100]}...'"})
+            updated_previous_calls.append(planned["previous_call"])
+
+            if not current_call_is_error and app_state and hasattr(app_state, 'scratchpad'):
+                try:
+                    parsed_output_for_summary = json.loads(result_content_for_output)
+                    summary = _summarize_tool_result(parsed_output_for_summary)
+                except (json.JSONDecodeError, TypeError):
+                    summary = f"Tool '{effective_tool_name_for_part}' executed. Raw output (preview): {result_content_for_output[:100]}..."
+                scratchpad_input_args_str = json.dumps(planned["args_dict"])
+                app_state.scratchpad.append(ScratchpadEntry(tool_name=effective_tool_name_for_part, tool_input=scratchpad_input_args_str, result=result_content_for_output, is_error=current_call_is_error, summary=summary))
+                log.debug(f"Added to scratchpad: {effective_tool_name_for_part}", extra={"event_type": "scratchpad_entry_added", "details": {"tool_name": effective_tool_name_for_part}})
+
+            # If a critical error occurred during this tool call's processing, break the loop.
+            if has_critical_error:
+                log.info(f"Critical error flag is set after processing tool '{effective_tool_name_for_part}'. Breaking from tool call loop.", extra={"event_type": "critical_error_break_loop", "details": {"tool_name": effective_tool_name_for_part, "tool_call_id": tool_call_id}})
+                break
+    finally:
+        # Concurrent calls ordered after a critical error are not reported; stop any still running
+        pending = [task for task in executions.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            log.info(
+                f"Cancelled {len(pending)} concurrent tool call(s) after the tool call loop stopped.",
+                extra={"event_type": "parallel_tool_calls_cancelled", "details": {"cancelled_count": len(pending)}}
+            )
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    log.debug(
+        "_execute_tool_calls: Completed.",
+        extra={"event_type": "tool_execution_end", "details": {"result_message_count": len(tool_result_messages), "has_critical_error": has_critical_error, "parallel": bool(executions)}}
+    )
+    return tool_result_messages, internal_messages, has_critical_error, updated_previous_calls
+
+
+def _plan_tool_calls(
+    tool_calls: List[Dict[str, Any]],
+    tool_executor: ToolExecutor,
+    previous_calls: List[Tuple[str, str, str, str]],
+    config: Config,
+    available_tool_definitions: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Parses, circular-checks and validates tool calls in order, without executing them.
+
+    Returns one dict per call, up to and including the first call with a critical
+    pre-execution error when BREAK_ON_CRITICAL_TOOL_ERROR is set. Calls that passed
+    every check have ``execute`` set; the others already carry their error result.
+    """
+    break_on_critical = bool(config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False))
+    planned_calls: List[Dict[str, Any]] = []
+    # Calls planned so far count as previous calls for circular detection, as they did when executed one by one
+    planning_previous_calls = list(previous_calls)
+
     for idx, tool_call in enumerate(tool_calls):
         tool_call_id = tool_call.get("id", f"tool_call_{idx}_{int(time.time())}")
+        planned: Dict[str, Any] = {
+            "tool_call_id": tool_call_id, "tool_name": None, "function_name": None,
+            "args_dict": {}, "validated_args": None, "content": "", "is_error": False,
+            "critical": False, "step_error": None, "execute": False, "count_stats": False,
+            "tool_message": None, "internal_message": None, "previous_call": None,
+        }
+        planned_calls.append(planned)
+
         function_call_dict = tool_call.get("function")
         if not function_call_dict:
             log.warning(
@@ -195,19 +344,18 @@ async def _execute_tool_calls(
             )
             error_payload = {"error": "MalformedToolCall", "tool_call_id": tool_call_id, "message": "Tool call is missing the 'function' field."}
             tool_part = {"tool_call_id": tool_call_id, "tool_name": "unknown_malformed_call", "output": json.dumps(error_payload), "is_error": True}
-            tool_result_messages.append({"role": "tool", "parts": [tool_part]})
-            internal_messages.append({"role": "system", "content": f"Tool Execution: Malformed call, ID='{tool_call_id}', Error: {error_payload.get('message')}"})
-            if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
-                has_critical_error = True
+            planned["tool_message"] = {"role": "tool", "parts": [tool_part]}
+            planned["internal_message"] = {"role": "system", "content": f"Tool Execution: Malformed call, ID='{tool_call_id}', Error: {error_payload.get('message')}"}
+            if break_on_critical:
+                planned["critical"] = True
+                planned["step_error"] = f"Critical: Malformed tool call (ID: {tool_call_id}): {error_payload.get('message')}"
                 log.error(
                     f"Critical error: Malformed tool call (ID: {tool_call_id}) missing 'function' field. Breaking execution.",
                     extra={"event_type": "critical_tool_error_malformed", "details": {"tool_call_id": tool_call_id}}
                 )
-                if app_state and hasattr(app_state, 'current_step_error'):
-                    app_state.current_step_error = f"Critical: Malformed tool call (ID: {tool_call_id}): {error_payload.get('message')}"
-            if has_critical_error: break
+                break
             continue
- 
+
         function_name = function_call_dict.get("name")
         function_args_json_str = function_call_dict.get("arguments")
         args_dict_for_processing: Dict[str, Any] = {}
@@ -248,9 +396,9 @@ async def _execute_tool_calls(
                 }
             }
         )
-        result_content_for_output = ""
-        current_call_is_error = False
         effective_tool_name_for_part = function_name
+        planned["function_name"] = function_name
+        planned["args_dict"] = args_dict_for_processing
 
         if not function_name:
             log.warning(
@@ -259,18 +407,17 @@ async def _execute_tool_calls(
             )
             effective_tool_name_for_part = "unknown_invalid_function_name"
             error_payload = {"error": "MalformedToolCall", "tool_call_id": tool_call_id, "message": "Tool call is missing a valid function name.", "attempted_name": function_name}
-            result_content_for_output = json.dumps(error_payload)
-            current_call_is_error = True
-            if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
-                has_critical_error = True
+            planned["content"] = json.dumps(error_payload)
+            planned["is_error"] = True
+            if break_on_critical:
+                planned["critical"] = True
+                planned["step_error"] = f"Critical: Malformed tool call (ID: {tool_call_id}): Invalid function name '{function_name}'."
                 log.error(
                     f"Critical error: Malformed tool call (ID: {tool_call_id}) with invalid function name. Breaking execution.",
                     extra={"event_type": "critical_tool_error_invalid_name", "details": {"tool_call_id": tool_call_id}}
                 )
-                if app_state and hasattr(app_state, 'current_step_error'):
-                    app_state.current_step_error = f"Critical: Malformed tool call (ID: {tool_call_id}): Invalid function name '{function_name}'."
         else:
-            previous_calls_for_detection_transformed = [(p_name, p_args, p_hash) for _, p_name, p_args, p_hash in updated_previous_calls]
+            previous_calls_for_detection_transformed = [(p_name, p_args, p_hash) for _, p_name, p_args, p_hash in planning_previous_calls]
             is_circular, circular_message = _detect_circular_calls(function_name, effective_args_json_str_for_log_hash, previous_calls_for_detection_transformed)
 
             if is_circular:
@@ -279,14 +426,14 @@ async def _execute_tool_calls(
                     extra={"event_type": "circular_tool_call_detected", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "message": circular_message}}
                 )
                 error_payload = {"error": "CircularToolCallDetected", "tool_call_id": tool_call_id, "tool_name": function_name, "message": circular_message}
-                result_content_for_output = json.dumps(error_payload)
-                current_call_is_error = True
-                if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
+                planned["content"] = json.dumps(error_payload)
+                planned["is_error"] = True
+                if break_on_critical:
                     log.error(
                         f"Critical error: Circular tool call detected for '{function_name}' (ID: {tool_call_id}). Breaking execution.",
                         extra={"event_type": "critical_tool_error_circular_call", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}}
                     )
-                    has_critical_error = True
+                    planned["critical"] = True
             elif not hasattr(tool_executor, 'execute_tool'):
                 err_msg = "Tool executor misconfiguration: 'execute_tool' method not available."
                 log.error(
@@ -294,17 +441,17 @@ async def _execute_tool_calls(
                     extra={"event_type": "tool_executor_misconfiguration", "details": {"tool_call_id": tool_call_id, "tool_name": function_name}}
                 )
                 error_payload = {"error": "ToolExecutorConfigurationError", "tool_call_id": tool_call_id, "tool_name": function_name, "message": err_msg}
-                result_content_for_output = json.dumps(error_payload)
-                current_call_is_error = True
-                if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
-                    has_critical_error = True
+                planned["content"] = json.dumps(error_payload)
+                planned["is_error"] = True
+                if break_on_critical:
+                    planned["critical"] = True
+                    planned["step_error"] = f"Critical: ToolExecutor misconfiguration for tool '{function_name}'."
                     log.error(
                         f"Critical error: ToolExecutor misconfiguration for tool '{function_name}'. Breaking execution.",
                         extra={"event_type": "critical_tool_error_executor_misconfig", "details": {"tool_name": function_name}}
                     )
-                    if app_state and hasattr(app_state, 'current_step_error'):
-                        app_state.current_step_error = f"Critical: ToolExecutor misconfiguration for tool '{function_name}'."
             else:
+                planned["count_stats"] = True
                 is_valid, validation_error_msg, validated_args_dict = _validate_tool_parameters(function_name, args_dict_for_processing, available_tool_definitions)
                 if not is_valid:
                     log.warning(
@@ -312,224 +459,251 @@ async def _execute_tool_calls(
                         extra={"event_type": "tool_parameter_validation_failed", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "error_message": validation_error_msg}}
                     )
                     error_payload = {"error": "ToolParameterValidationError", "tool_call_id": tool_call_id, "tool_name": function_name, "message": validation_error_msg}
-                    result_content_for_output = json.dumps(error_payload)
-                    current_call_is_error = True
-                    if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
-                        has_critical_error = True
+                    planned["content"] = json.dumps(error_payload)
+                    planned["is_error"] = True
+                    if break_on_critical:
+                        planned["critical"] = True
+                        planned["step_error"] = f"Critical: Parameter validation failed for tool '{function_name}'."
                         log.error(
                             f"Critical error: Parameter validation failed for tool '{function_name}'. Breaking execution.",
                             extra={"event_type": "critical_tool_error_param_validation", "details": {"tool_name": function_name}}
                         )
-                        if app_state and hasattr(app_state, 'current_step_error'):
-                            app_state.current_step_error = f"Critical: Parameter validation failed for tool '{function_name}'."
                 else:
-                    last_exception = None
-                    was_permission_denied_in_retry_loop = False # Flag to indicate if permission was denied in the retry loop
-                    for attempt in range(MAX_TOOL_EXECUTION_RETRIES):
-                        try:
-                            log.info(
-                                f"Attempt {attempt + 1}/{MAX_TOOL_EXECUTION_RETRIES} for tool '{function_name}' (ID: {tool_call_id})",
-                                extra={"event_type": "tool_execution_attempt", "details": {"attempt_num": attempt + 1, "max_attempts": MAX_TOOL_EXECUTION_RETRIES, "tool_name": function_name, "tool_call_id": tool_call_id}}
-                            )
-                            raw_result_content = await tool_executor.execute_tool(function_name, validated_args_dict, app_state=app_state)
-                            attempt_produced_error = False
-
-                            # --- BEGIN PERMISSION_DENIED HANDLING ---
-                            if isinstance(raw_result_content, dict) and raw_result_content.get("status") == "PERMISSION_DENIED":
-                                permission_denied_message = raw_result_content.get('message', 'No reason provided')
-                                user_id_for_log = app_state.current_user.user_id if app_state and app_state.current_user else "unknown_user" # Corrected .id to .user_id
-                                log.warning(
-                                    f"Permission denied for tool '{function_name}' for user '{user_id_for_log}'. Reason: {permission_denied_message}",
-                                    extra={
-                                        "event_type": "permission_denied_tool_call",
-                                        "details": {
-                                            "tool_name": function_name,
-                                            "tool_call_id": tool_call_id,
-                                            "user_id": user_id_for_log,
-                                            "denial_message": permission_denied_message
-                                        }
-                                    }
-                                )
-                                user_facing_denial_message = f"Sorry, you don't have permission to use the '{function_name}' tool for this action."
-                                if app_state and hasattr(app_state, 'add_message') and callable(app_state.add_message):
-                                    app_state.add_message(
-                                        role="assistant", # Or other appropriate role for bot's user-facing messages
-                                        content=user_facing_denial_message,
-                                        message_type="permission_denial" # Custom type for easier filtering/UI
-                                    )
-                                else:
-                                    log.error(f"AppState missing 'add_message' method. Cannot add permission denial message for user for tool {function_name}.")
-
-                                error_payload = {
-                                    "status": "PERMISSION_DENIED", # Ensure MyBot can detect this
-                                    "error": "PermissionDenied",
-                                    "tool_call_id": tool_call_id,
-                                    "tool_name": function_name,
-                                    "message": permission_denied_message # Message from the decorator
-                                }
-                                result_content_for_output = json.dumps(error_payload)
-                                current_call_is_error = True
-                                last_exception = None # Not an exception, but a handled denial
-
-                                # Update stats for failed tool call due to permission denial
-                                execution_duration_ms_denied = raw_result_content.get("execution_time_ms", 0)
-                                if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
-                                    app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
-                                    app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_duration_ms_denied
-                                    app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
-                                    if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
-                                        app_state.update_tool_usage(function_name, execution_duration_ms_denied, False) # False for is_success
-                                    was_permission_denied_in_retry_loop = True # Mark that permission was denied and handled
-                                 
-                                # Add to tool_result_messages and internal_messages
-                                # This part is moved outside the try-except block for tool execution attempts
-                                # and will be handled by the main loop's message appending logic.
-                                # However, we need to ensure current_call_is_error and result_content_for_output are set.
-                                
-                                # Break from the retry loop for this tool call as it's a definitive denial
-                                break # from the for attempt in range(MAX_TOOL_EXECUTION_RETRIES) loop
-
-                            # --- END PERMISSION_DENIED HANDLING ---
-
-                            if isinstance(raw_result_content, dict):
-                                result_content_for_output = json.dumps(raw_result_content)
-                                # Check for general errors *after* specific PERMISSION_DENIED handling
-                                if raw_result_content.get("error") is not None or raw_result_content.get("status", "").upper() == "ERROR":
-                                    attempt_produced_error = True
-                                    log.warning(
-                                        f"ToolExecutor returned an error structure for tool '{function_name}' (ID: {tool_call_id}) on attempt {attempt + 1}.",
-                                        extra={"event_type": "tool_executor_error_structure", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:200]}}
-                                    )
-                                    if isinstance(raw_result_content, dict) and raw_result_content.get("is_critical") is True:
-                                        log.warning(f"Tool '{function_name}' (ID: {tool_call_id}) reported a critical error in its response (is_critical=True). Setting has_critical_error=True.", extra={"event_type": "tool_reported_critical_error", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}})
-                                        has_critical_error = True
-                                else:
-                                    log.info(
-                                        f"Tool '{function_name}' (ID: {tool_call_id}) returned a successful dictionary on attempt {attempt + 1}.",
-                                        extra={"event_type": "tool_execution_success_dict", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
-                                    )
-                            elif isinstance(raw_result_content, list):
-                                result_content_for_output = json.dumps(raw_result_content)
-                                log.info(
-                                    f"Tool '{function_name}' (ID: {tool_call_id}) returned a list (assumed success) on attempt {attempt + 1}.",
-                                    extra={"event_type": "tool_execution_success_list", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
-                                )
-                            else:
-                                result_content_for_output = str(raw_result_content)
-                                log.info(
-                                    f"Tool '{function_name}' (ID: {tool_call_id}) returned a primitive (assumed success) on attempt {attempt + 1}.",
-                                    extra={"event_type": "tool_execution_success_primitive", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
-                                )
-                            
-                            current_call_is_error = attempt_produced_error
-                            if current_call_is_error: # This is for general tool errors, not PERMISSION_DENIED
-                                last_exception = None
-                                break
-                            else: # Successful execution
-                                last_exception = None
-                                break
-                        except Exception as exec_e:
-                            last_exception = exec_e
-                            log.warning(
-                                f"Exception on attempt {attempt + 1}/{MAX_TOOL_EXECUTION_RETRIES} for tool '{function_name}' (ID: {tool_call_id}).",
-                                exc_info=True, # Add exc_info
-                                extra={"event_type": "tool_execution_exception_attempt", "details": {"attempt": attempt + 1, "max_attempts": MAX_TOOL_EXECUTION_RETRIES, "tool_name": function_name, "tool_call_id": tool_call_id, "error": str(exec_e)}}
-                            )
-                            if attempt < MAX_TOOL_EXECUTION_RETRIES - 1:
-                                delay = min(TOOL_RETRY_INITIAL_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-                                log.info(f"Retrying in {delay:.2f} seconds...", extra={"event_type": "tool_execution_retry_delay", "details": {"delay_seconds": delay}})
-                                await asyncio.sleep(delay)
-                            else:
-                                log.error(
-                                    f"All {MAX_TOOL_EXECUTION_RETRIES} retries failed for tool '{function_name}' (ID: {tool_call_id}).",
-                                    exc_info=True, # Add exc_info
-                                    extra={"event_type": "tool_execution_all_retries_failed", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "last_exception": str(exec_e)}}
-                                )
-                                error_payload = {"error": "ToolExecutionExceptionAfterRetries", "tool_call_id": tool_call_id, "tool_name": function_name, "exception_type": type(exec_e).__name__, "details": str(exec_e), "attempts": MAX_TOOL_EXECUTION_RETRIES}
-                                result_content_for_output = json.dumps(error_payload)
-                                current_call_is_error = True
-                                if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False):
-                                    has_critical_error = True
-                                    log.error(
-                                        f"Critical exception after retries for tool '{function_name}' (ID: {tool_call_id}). Breaking execution.",
-                                        extra={"event_type": "critical_tool_error_after_retries", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}}
-                                    )
-                    if last_exception and current_call_is_error is False:
-                        log.error(
-                            f"Tool '{function_name}' (ID: {tool_call_id}) failed after all retries. Final exception: {last_exception}",
-                            exc_info=True, # Add exc_info
-                            extra={"event_type": "tool_execution_failed_catchall_after_retries", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "final_exception": str(last_exception)}}
-                        )
-                        error_payload = {"error": "ToolExecutionFailedAfterRetriesCatchAll", "tool_call_id": tool_call_id, "tool_name": function_name, "exception_type": type(last_exception).__name__, "details": str(last_exception), "attempts": MAX_TOOL_EXECUTION_RETRIES}
-                        result_content_for_output = json.dumps(error_payload)
-                        current_call_is_error = True
-                        if config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False): has_critical_error = True
-                
-                # If permission was denied, the specific stats update already occurred. Skip general one.
-                if not was_permission_denied_in_retry_loop:
-                    execution_duration_ms = 0
-                    if 'raw_result_content' in locals() and isinstance(raw_result_content, dict): # Check if raw_result_content is defined
-                        execution_duration_ms = raw_result_content.get("execution_time_ms", 0)
-                    
-                    if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
-                        tool_name_for_stats = effective_tool_name_for_part
-                        is_success_for_stats = not current_call_is_error
-                        app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
-                        app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_duration_ms
-                        if current_call_is_error: app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
-                        if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
-                            app_state.update_tool_usage(tool_name_for_stats, execution_duration_ms, is_success_for_stats)
-                        else:
-                            log.warning(
-                                f"AppState missing 'update_tool_usage' method. Cannot update detailed tool stats for {tool_name_for_stats}.",
-                                extra={"event_type": "missing_update_tool_usage_method", "details": {"tool_name": tool_name_for_stats}}
-                            )
-
-                if current_call_is_error and not has_critical_error:
-                    try:
-                        error_payload_check = json.loads(result_content_for_output)
-                        log.debug(
-                            "Checking tool error payload for 'is_critical'.",
-                            extra={"event_type": "check_tool_error_payload_critical", "details": {"payload": error_payload_check, "is_critical_type": str(type(error_payload_check.get('is_critical'))), "is_critical_value": error_payload_check.get('is_critical')}}
-                        )
-                        if isinstance(error_payload_check, dict) and error_payload_check.get("is_critical") is True:
-                            log.warning(
-                                f"Tool '{function_name}' (ID: {tool_call_id}) reported a critical error in its response. Setting has_critical_error=True.",
-                                extra={"event_type": "tool_reported_critical_error_response", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}}
-                            )
-                            has_critical_error = True
-                    except Exception as e_parse:
-                        log.warning(
-                            f"Could not parse tool's error response for '{function_name}' (ID: {tool_call_id}) to check 'is_critical'.",
-                            exc_info=True, # Add exc_info
-                            extra={"event_type": "parse_tool_error_response_failed_critical_check", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "error": str(e_parse)}}
-                        )
+                    planned["execute"] = True
+                    planned["validated_args"] = validated_args_dict
 
-        tool_result_messages.append({"role": "tool", "tool_call_id": tool_call_id, "name": effective_tool_name_for_part, "content": result_content_for_output, "is_error": current_call_is_error})
-        internal_messages.append({"role": "system", "content": f"Tool Execution: Name='{effective_tool_name_for_part}', ID='{tool_call_id}', Success={not current_call_is_error}, Result (preview)='{result_content_for_output[:100]}...'"})
+        planned["tool_name"] = effective_tool_name_for_part
         current_call_hash_for_history = _compute_tool_call_hash(effective_tool_name_for_part, effective_args_json_str_for_log_hash)
-        updated_previous_calls.append((tool_call_id, effective_tool_name_for_part, effective_args_json_str_for_log_hash, current_call_hash_for_history))
+        planned["previous_call"] = (tool_call_id, effective_tool_name_for_part, effective_args_json_str_for_log_hash, current_call_hash_for_history)
+        planning_previous_calls.append(planned["previous_call"])
 
-        if not current_call_is_error and app_state and hasattr(app_state, 'scratchpad'):
-            try:
-                parsed_output_for_summary = json.loads(result_content_for_output)
-                summary = _summarize_tool_result(parsed_output_for_summary)
-            except (json.JSONDecodeError, TypeError):
-                summary = f"Tool '{effective_tool_name_for_part}' executed. Raw output (preview): {result_content_for_output[:100]}..."
-            scratchpad_input_args_str = json.dumps(args_dict_for_processing)
-            app_state.scratchpad.append(ScratchpadEntry(tool_name=effective_tool_name_for_part, tool_input=scratchpad_input_args_str, result=result_content_for_output, is_error=current_call_is_error, summary=summary))
-            log.debug(f"Added to scratchpad: {effective_tool_name_for_part}", extra={"event_type": "scratchpad_entry_added", "details": {"tool_name": effective_tool_name_for_part}})
- 
-        # If a critical error occurred during this tool call's processing, break the loop.
-        if has_critical_error:
-            log.info(f"Critical error flag is set after processing tool '{effective_tool_name_for_part}'. Breaking from tool call loop.", extra={"event_type": "critical_error_break_loop", "details": {"tool_name": effective_tool_name_for_part, "tool_call_id": tool_call_id}})
+        if planned["critical"]:
             break
- 
-    log.debug(
-        "_execute_tool_calls: Completed.",
-        extra={"event_type": "tool_execution_end", "details": {"result_message_count": len(tool_result_messages), "has_critical_error": has_critical_error}}
+
+    return planned_calls
+
+
+def _parallel_execution_settings(config: Config) -> Dict[str, Any]:
+    """Reads TOOL_PARALLEL_EXECUTION from config, tolerating partial or mocked configs."""
+    settings = getattr(config, 'TOOL_PARALLEL_EXECUTION', None) if config else None
+    if not isinstance(settings, dict):
+        settings = {}
+    max_per_service = settings.get("max_concurrency_per_service", 2)
+    return {
+        "enabled": settings.get("enabled") is True,
+        "max_concurrency_per_service": max_per_service if isinstance(max_per_service, int) and max_per_service > 0 else 2,
+    }
+
+
+def _tool_service_name(function_name: str) -> str:
+    """Service a tool belongs to, from its name prefix (e.g. 'github_list_repositories' -> 'github')."""
+    return function_name.split("_", 1)[0].lower()
+
+
+def _start_parallel_executions(
+    planned_calls: List[Dict[str, Any]],
+    tool_executor: ToolExecutor,
+    app_state: AppState,
+    config: Config,
+    max_concurrency_per_service: int
+) -> Dict[int, "asyncio.Task"]:
+    """
+    Starts every planned call as a task, keyed by its position in planned_calls.
+
+    Calls to the same service share a semaphore so one turn cannot flood a
+    single API (or its rate limit) with requests.
+    """
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run_limited(planned: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphores[_tool_service_name(planned["function_name"])]:
+            return await _run_tool_with_retries(planned, tool_executor, app_state, config)
+
+    executions: Dict[int, asyncio.Task] = {}
+    for idx, planned in enumerate(planned_calls):
+        if not planned["execute"]:
+            continue
+        service_name = _tool_service_name(planned["function_name"])
+        if service_name not in semaphores:
+            semaphores[service_name] = asyncio.Semaphore(max_concurrency_per_service)
+        executions[idx] = asyncio.ensure_future(run_limited(planned))
+
+    log.info(
+        f"Executing {len(executions)} tool calls concurrently across {len(semaphores)} service(s).",
+        extra={"event_type": "parallel_tool_execution_start", "details": {"tool_call_count": len(executions), "services": sorted(semaphores), "max_concurrency_per_service": max_concurrency_per_service}}
     )
-    return tool_result_messages, internal_messages, has_critical_error, updated_previous_calls
+    return executions
+
+
+async def _run_tool_with_retries(
+    planned: Dict[str, Any],
+    tool_executor: ToolExecutor,
+    app_state: AppState,
+    config: Config
+) -> Dict[str, Any]:
+    """
+    Executes one validated tool call, retrying exceptions with exponential backoff.
+
+    Only the tool itself runs here; AppState bookkeeping (stats, denial messages,
+    scratchpad) is left to the caller so that concurrent calls are recorded in
+    request order.
+
+    Returns a dict with the serialized ``content``, ``is_error``, ``is_critical``,
+    ``execution_time_ms`` and ``permission_denied_message`` (None unless denied).
+    """
+    function_name = planned["function_name"]
+    tool_call_id = planned["tool_call_id"]
+    validated_args_dict = planned["validated_args"]
+    break_on_critical = bool(config and getattr(config, 'BREAK_ON_CRITICAL_TOOL_ERROR', False))
+
+    result_content_for_output = ""
+    current_call_is_error = False
+    is_critical = False
+    permission_denied_message = None
+    raw_result_content = None
+    last_exception = None
+    for attempt in range(MAX_TOOL_EXECUTION_RETRIES):
+        try:
+            log.info(
+                f"Attempt {attempt + 1}/{MAX_TOOL_EXECUTION_RETRIES} for tool '{function_name}' (ID: {tool_call_id})",
+                extra={"event_type": "tool_execution_attempt", "details": {"attempt_num": attempt + 1, "max_attempts": MAX_TOOL_EXECUTION_RETRIES, "tool_name": function_name, "tool_call_id": tool_call_id}}
+            )
+            raw_result_content = await tool_executor.execute_tool(function_name, validated_args_dict, app_state=app_state)
+            attempt_produced_error = False
+
+            if isinstance(raw_result_content, dict) and raw_result_content.get("status") == "PERMISSION_DENIED":
+                permission_denied_message = raw_result_content.get('message', 'No reason provided')
+                error_payload = {
+                    "status": "PERMISSION_DENIED", # Ensure MyBot can detect this
+                    "error": "PermissionDenied",
+                    "tool_call_id": tool_call_id,
+                    "tool_name": function_name,
+                    "message": permission_denied_message # Message from the decorator
+                }
+                result_content_for_output = json.dumps(error_payload)
+                current_call_is_error = True
+                last_exception = None # Not an exception, but a handled denial
+                # Break from the retry loop for this tool call as it's a definitive denial
+                break
+
+            if isinstance(raw_result_content, dict):
+                result_content_for_output = json.dumps(raw_result_content)
+                # Check for general errors *after* specific PERMISSION_DENIED handling
+                if raw_result_content.get("error") is not None or raw_result_content.get("status", "").upper() == "ERROR":
+                    attempt_produced_error = True
+                    log.warning(
+                        f"ToolExecutor returned an error structure for tool '{function_name}' (ID: {tool_call_id}) on attempt {attempt + 1}.",
+                        extra={"event_type": "tool_executor_error_structure", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:200]}}
+                    )
+                    if raw_result_content.get("is_critical") is True:
+                        log.warning(f"Tool '{function_name}' (ID: {tool_call_id}) reported a critical error in its response (is_critical=True). Setting has_critical_error=True.", extra={"event_type": "tool_reported_critical_error", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}})
+                        is_critical = True
+                else:
+                    log.info(
+                        f"Tool '{function_name}' (ID: {tool_call_id}) returned a successful dictionary on attempt {attempt + 1}.",
+                        extra={"event_type": "tool_execution_success_dict", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
+                    )
+            elif isinstance(raw_result_content, list):
+                result_content_for_output = json.dumps(raw_result_content)
+                log.info(
+                    f"Tool '{function_name}' (ID: {tool_call_id}) returned a list (assumed success) on attempt {attempt + 1}.",
+                    extra={"event_type": "tool_execution_success_list", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
+                )
+            else:
+                result_content_for_output = str(raw_result_content)
+                log.info(
+                    f"Tool '{function_name}' (ID: {tool_call_id}) returned a primitive (assumed success) on attempt {attempt + 1}.",
+                    extra={"event_type": "tool_execution_success_primitive", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "attempt": attempt + 1, "result_preview": result_content_for_output[:100]}}
+                )
+
+            # A returned result, error or not, ends the retries; only exceptions are retried
+            current_call_is_error = attempt_produced_error
+            last_exception = None
+            break
+        except Exception as exec_e:
+            last_exception = exec_e
+            log.warning(
+                f"Exception on attempt {attempt + 1}/{MAX_TOOL_EXECUTION_RETRIES} for tool '{function_name}' (ID: {tool_call_id}).",
+                exc_info=True, # Add exc_info
+                extra={"event_type": "tool_execution_exception_attempt", "details": {"attempt": attempt + 1, "max_attempts": MAX_TOOL_EXECUTION_RETRIES, "tool_name": function_name, "tool_call_id": tool_call_id, "error": str(exec_e)}}
+            )
+            if attempt < MAX_TOOL_EXECUTION_RETRIES - 1:
+                delay = min(TOOL_RETRY_INITIAL_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
+                log.info(f"Retrying in {delay:.2f} seconds...", extra={"event_type": "tool_execution_retry_delay", "details": {"delay_seconds": delay}})
+                await asyncio.sleep(delay)
+            else:
+                log.error(
+                    f"All {MAX_TOOL_EXECUTION_RETRIES} retries failed for tool '{function_name}' (ID: {tool_call_id}).",
+                    exc_info=True, # Add exc_info
+                    extra={"event_type": "tool_execution_all_retries_failed", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "last_exception": str(exec_e)}}
+                )
+                error_payload = {"error": "ToolExecutionExceptionAfterRetries", "tool_call_id": tool_call_id, "tool_name": function_name, "exception_type": type(exec_e).__name__, "details": str(exec_e), "attempts": MAX_TOOL_EXECUTION_RETRIES}
+                result_content_for_output = json.dumps(error_payload)
+                current_call_is_error = True
+                if break_on_critical:
+                    is_critical = True
+                    log.error(
+                        f"Critical exception after retries for tool '{function_name}' (ID: {tool_call_id}). Breaking execution.",
+                        extra={"event_type": "critical_tool_error_after_retries", "details": {"tool_name": function_name, "tool_call_id": tool_call_id}}
+                    )
+    if last_exception and current_call_is_error is False:
+        log.error(
+            f"Tool '{function_name}' (ID: {tool_call_id}) failed after all retries. Final exception: {last_exception}",
+            exc_info=True, # Add exc_info
+            extra={"event_type": "tool_execution_failed_catchall_after_retries", "details": {"tool_name": function_name, "tool_call_id": tool_call_id, "final_exception": str(last_exception)}}
+        )
+        error_payload = {"error": "ToolExecutionFailedAfterRetriesCatchAll", "tool_call_id": tool_call_id, "tool_name": function_name, "exception_type": type(last_exception).__name__, "details": str(last_exception), "attempts": MAX_TOOL_EXECUTION_RETRIES}
+        result_content_for_output = json.dumps(error_payload)
+        current_call_is_error = True
+        if break_on_critical: is_critical = True
+
+    execution_time_ms = 0
+    if isinstance(raw_result_content, dict):
+        execution_time_ms = raw_result_content.get("execution_time_ms", 0)
+    return {
+        "content": result_content_for_output,
+        "is_error": current_call_is_error,
+        "is_critical": is_critical,
+        "execution_time_ms": execution_time_ms,
+        "permission_denied_message": permission_denied_message,
+    }
+
+
+def _record_permission_denial(planned: Dict[str, Any], outcome: Dict[str, Any], app_state: AppState) -> None:
+    """Tells the user a tool call was denied and records it as a failed call."""
+    function_name = planned["function_name"]
+    permission_denied_message = outcome["permission_denied_message"]
+    user_id_for_log = app_state.current_user.user_id if app_state and app_state.current_user else "unknown_user" # Corrected .id to .user_id
+    log.warning(
+        f"Permission denied for tool '{function_name}' for user '{user_id_for_log}'. Reason: {permission_denied_message}",
+        extra={
+            "event_type": "permission_denied_tool_call",
+            "details": {
+                "tool_name": function_name,
+                "tool_call_id": planned["tool_call_id"],
+                "user_id": user_id_for_log,
+                "denial_message": permission_denied_message
+            }
+        }
+    )
+    user_facing_denial_message = f"Sorry, you don't have permission to use the '{function_name}' tool for this action."
+    if app_state and hasattr(app_state, 'add_message') and callable(app_state.add_message):
+        app_state.add_message(
+            role="assistant", # Or other appropriate role for bot's user-facing messages
+            content=user_facing_denial_message,
+            message_type="permission_denial" # Custom type for easier filtering/UI
+        )
+    else:
+        log.error(f"AppState missing 'add_message' method. Cannot add permission denial message for user for tool {function_name}.")
+
+    # Update stats for failed tool call due to permission denial
+    execution_duration_ms_denied = outcome["execution_time_ms"]
+    if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
+        app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
+        app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_duration_ms_denied
+        app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
+        if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
+            app_state.update_tool_usage(function_name, execution_duration_ms_denied, False) # False for is_success
  
 # --- Tool Parameter Validation ---
  
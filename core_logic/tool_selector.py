@@ -10,6 +10,7 @@ generation, and semantic search capabilities to dynamically select the most
 relevant tools for a given query.
 """
 
+import hashlib
 import logging
 import os
 import json
@@ -34,7 +35,9 @@ except ImportError:
 # Adjust if your project structure is different.
 from config import Config
 from state_models import AppState # Added for type hinting
-from user_auth.permissions import Permission # Added for converting string to Permission enum
+from user_auth.permissions import PERMISSION_BITS, Permission # Added for converting string to Permission enum
+from .query_embedding import QueryEmbeddingService
+from .tool_index import ToolSimilarityIndex, permitted_by_mask, read_embedding_cache, write_embedding_cache
 
 log = logging.getLogger(__name__)
 
@@ -45,12 +48,21 @@ class ToolSelector:
     and performs semantic search to identify relevant tools.
     """
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        embedding_model: Any = None,
+        embeddings_from: Optional["ToolSelector"] = None,
+    ):
         """
         Initialize the ToolSelector.
 
         Args:
             config: Application configuration
+            embedding_model: Already loaded embedding model to use instead of
+                loading ``embedding_model`` from config (see tool_selector_registry)
+            embeddings_from: Selector whose tool embeddings were built with the
+                same model and cache; they are shared instead of re-read from disk
         """
         self.config = config
         self.embedding_model = None
@@ -58,6 +70,16 @@ class ToolSelector:
         self.tool_embeddings: Dict[str, Union[Any, List[float]]] = {}
         # tool_name -> metadata
         self.tool_metadata: Dict[str, Dict[str, Any]] = {}
+        # tool_name -> hash of the text the embedding was generated from (None if unknown)
+        self.tool_content_hashes: Dict[str, Optional[str]] = {}
+        # Identity of the last tool catalog reconciled by sync_tool_embeddings
+        self._synced_catalog_key: Optional[Tuple[Tuple[str, int], ...]] = None
+        self._synced_catalog_defs: List[Dict[str, Any]] = []
+        # Normalized embedding matrix built lazily from tool_embeddings
+        self._similarity_index: Optional[ToolSimilarityIndex] = None
+        self._similarity_index_source: Optional[Dict[str, Any]] = None
+        self._similarity_index_source_size = 0
+        self._permission_bits: Dict[str, int] = {}  # Tool name -> required permission bit
         
         # Get configuration settings
         self.settings = config.TOOL_SELECTOR
@@ -69,28 +91,50 @@ class ToolSelector:
         self.debug_logging = self.settings.get("debug_logging", False)
         self.default_fallback = self.settings.get("default_fallback", True)
         
-        # Setup cache path
+        # Setup cache paths: binary matrix (+ .meta.json sidecar) and the
+        # legacy JSON cache it replaces, which is migrated on first load
+        data_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            # Moves up two levels from core_logic/tool_selector.py
+            # to project root
+            "data"
+        )
         self.embedding_cache_path = self.settings.get(
-            "cache_path", 
-            os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                # Moves up two levels from core_logic/tool_selector.py
-                # to project root
-                "data",
-                "tool_embeddings.json"
-            )
+            "cache_path", os.path.join(data_dir, "tool_embeddings.npy")
         )
+        self.legacy_embedding_cache_path = self.settings.get(
+            "legacy_cache_path", os.path.join(data_dir, "tool_embeddings.json")
+        )
+        self.embedding_model_name = self.settings.get("embedding_model", "all-MiniLM-L6-v2")
         
         # Cache management
         self._cache_dirty = False  # Flag to track if embeddings have changed
         self._last_save_time = time.time()  # Track when we last saved embeddings
         self._auto_save_interval = self.settings.get("auto_save_interval_seconds", 300)  # Default 5 minutes
+
+        # LRU-cached, micro-batched query encoder running on its own worker thread
+        self.query_embeddings = QueryEmbeddingService(
+            self._encode_query_batch,
+            cache_size=self.settings.get("query_cache_size", 1024),
+            batch_window_ms=self.settings.get("query_batch_window_ms", 5.0),
+            max_batch_size=self.settings.get("query_max_batch_size", 32),
+        )
         
         # Initialize the embedding model
-        self._initialize_embedding_model()
+        if embedding_model is not None:
+            self.embedding_model = embedding_model
+        else:
+            self._initialize_embedding_model()
         
         # Load cached embeddings if available
-        if not self._load_embeddings_cache() and self.settings.get("rebuild_cache_on_startup", False):
+        if embeddings_from is not None:
+            self._publish_embeddings(
+                embeddings_from.tool_embeddings,
+                embeddings_from.tool_metadata,
+                embeddings_from.tool_content_hashes,
+            )
+            self._last_save_time = embeddings_from._last_save_time
+        elif not self._load_embeddings_cache() and self.settings.get("rebuild_cache_on_startup", False):
             log.info("No embedding cache found or rebuild requested. Will build on first tool selection.")
             # We'll build embeddings lazily when first needed
 
@@ -350,139 +394,160 @@ class ToolSelector:
         
         return min(boost, 0.5)  # Cap at 0.5
 
+    def _tool_content_hash(self, tool_def: Dict[str, Any]) -> str:
+        """
+        Hash of everything that determines a tool's embedding: the embedding
+        model and the text representation built from the tool definition.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.embedding_model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self._create_tool_text_representation(tool_def).encode("utf-8"))
+        return digest.hexdigest()
+
     def _save_embeddings_cache(self) -> bool:
         """
-        Save embeddings and metadata to cache file.
+        Save embeddings and metadata to the binary cache (matrix + sidecar).
         
         Returns:
             bool: True if saved successfully, False otherwise
         """
+        if not np:
+            log.debug("numpy not available; not saving embeddings cache")
+            return False
         try:
-            # Create the parent directory if it doesn't exist
-            cache_dir = os.path.dirname(self.embedding_cache_path)
-            if not os.path.exists(cache_dir):
-                try:
-                    os.makedirs(cache_dir, exist_ok=True)
-                    log.info(f"Created cache directory: {cache_dir}")
-                except PermissionError as pe:
-                    log.error(f"Permission error creating cache directory {cache_dir}: {pe}")
-                    return False
-                except OSError as ose:
-                    log.error(f"OS error creating cache directory {cache_dir}: {ose}")
-                    return False
-
-            # Convert numpy arrays to lists for serialization
-            serializable_embeddings = {}
-            for name, embedding in self.tool_embeddings.items():
-                if ML_DEPENDENCIES_AVAILABLE and np and isinstance(embedding, np.ndarray):
-                    serializable_embeddings[name] = embedding.tolist()
-                else:
-                    serializable_embeddings[name] = embedding
-
-            cache_data = {
-                "embeddings": serializable_embeddings,
-                "metadata": self.tool_metadata,
-                "timestamp": time.time(),
-                "version": "1.1"  # Version tracking for cache format
-            }
-
-            # Use a temporary file to avoid corruption if writing is interrupted
-            temp_file = f"{self.embedding_cache_path}.tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(cache_data, f)
-            
-            # Atomic rename to avoid partial writes
-            if os.path.exists(self.embedding_cache_path):
-                # Create a backup before overwriting
-                backup_file = f"{self.embedding_cache_path}.bak"
-                try:
-                    if os.path.exists(backup_file):
-                        os.remove(backup_file)
-                    os.rename(self.embedding_cache_path, backup_file)
-                except OSError as ose:
-                    log.warning(f"Failed to create backup of embeddings cache: {ose}")
-            
-            # Now do the final rename
-            os.rename(temp_file, self.embedding_cache_path)
-            
+            index = self._get_similarity_index()
+            if index is None:
+                log.warning("No valid embeddings to save")
+                return False
+
+            write_embedding_cache(
+                self.embedding_cache_path,
+                names=index.names,
+                matrix=index.matrix,
+                metadata={name: self.tool_metadata.get(name, {}) for name in index.names},
+                content_hashes=self.tool_content_hashes,
+                model_name=self.embedding_model_name,
+            )
+
             # Update state tracking
             self._cache_dirty = False
             self._last_save_time = time.time()
 
-            log.info(f"Saved embeddings cache to {self.embedding_cache_path}")
+            log.info(f"Saved embeddings cache for {len(index)} tools to {self.embedding_cache_path}")
             return True
             
+        except PermissionError as pe:
+            log.error(f"Permission error writing embeddings cache {self.embedding_cache_path}: {pe}")
+            return False
         except Exception as e:
             log.error(f"Failed to save embeddings cache: {e}", exc_info=True)
             return False
 
     def _load_embeddings_cache(self) -> bool:
         """
-        Load embeddings and metadata from cache file.
+        Load embeddings and metadata from the binary cache.
+
+        The matrix is memory-mapped read-only, so every worker shares the same
+        physical pages and nothing is parsed or copied at startup. Falls back
+        to the legacy JSON cache and migrates it to the binary format.
 
         Returns:
             bool: True if cache was loaded successfully, False otherwise
         """
         try:
-            if not os.path.exists(self.embedding_cache_path):
-                log.info("No embeddings cache file found")
-                return False
-                
-            # Check if cache file is empty or too small to be valid
-            if os.path.getsize(self.embedding_cache_path) < 10:
-                log.warning(f"Embeddings cache file is too small to be valid: {self.embedding_cache_path}")
-                return False
-
-            with open(self.embedding_cache_path, 'r') as f:
-                try:
-                    cache_data = json.load(f)
-                except json.JSONDecodeError as jde:
-                    log.error(f"Invalid JSON in embeddings cache: {jde}")
-                    # Try loading backup if it exists
-                    backup_file = f"{self.embedding_cache_path}.bak"
-                    if os.path.exists(backup_file):
-                        log.info(f"Attempting to load from backup cache file: {backup_file}")
-                        try:
-                            with open(backup_file, 'r') as bf:
-                                cache_data = json.load(bf)
-                            log.info("Successfully loaded embeddings from backup cache")
-                        except Exception as backup_err:
-                            log.error(f"Failed to load backup cache: {backup_err}")
-                            return False
-                    else:
-                        return False
+            cache = read_embedding_cache(self.embedding_cache_path)
+            if cache is None:
+                return self._load_legacy_embeddings_cache()
 
-            if not isinstance(cache_data, dict):
-                log.warning("Invalid embeddings cache format")
+            if cache.model_name and cache.model_name != self.embedding_model_name:
+                log.warning(
+                    f"Embeddings cache was built with model '{cache.model_name}', "
+                    f"configured model is '{self.embedding_model_name}'. Ignoring cache."
+                )
                 return False
 
-            # Extract the data
-            self.tool_embeddings = cache_data.get("embeddings", {})
-            self.tool_metadata = cache_data.get("metadata", {})
-            
-            # Validate the loaded data
-            if not self.tool_embeddings or not self.tool_metadata:
-                log.warning("Empty or incomplete embeddings cache")
+            if not cache.names:
+                log.warning("Empty embeddings cache")
                 return False
 
-            # Convert lists back to numpy arrays
-            for name, embedding_list in self.tool_embeddings.items():
-                if isinstance(embedding_list, list) and ML_DEPENDENCIES_AVAILABLE and np:
-                    self.tool_embeddings[name] = np.array(embedding_list)
+            # Rows are views into the memory map, not copies
+            self.tool_embeddings = {name: cache.matrix[row] for row, name in enumerate(cache.names)}
+            self.tool_metadata = cache.metadata
+            self.tool_content_hashes = dict(cache.content_hashes)
+            self._similarity_index = ToolSimilarityIndex(cache.names, cache.matrix, normalized=True)
+            self._similarity_index_source = self.tool_embeddings
+            self._similarity_index_source_size = len(self.tool_embeddings)
+            self._synced_catalog_key = None
 
             log.info(
-                f"Loaded embeddings for {len(self.tool_embeddings)} tools "
-                f"from cache"
+                f"Memory-mapped embeddings for {len(self.tool_embeddings)} tools "
+                f"from {self.embedding_cache_path}"
             )
-            
+
             # Initialize state tracking after successful load
             self._cache_dirty = False
             self._last_save_time = time.time()
-            
             return True
         except Exception as e:
             log.error(f"Failed to load embeddings cache: {e}", exc_info=True)
             return False
+
+    def _load_legacy_embeddings_cache(self) -> bool:
+        """
+        Load the pre-2.0 JSON cache and rewrite it in the binary format.
+
+        Legacy entries have no content hash; sync_tool_embeddings adopts the
+        current hash for them instead of re-embedding.
+
+        Returns:
+            bool: True if cache was loaded successfully, False otherwise
+        """
+        cache_path = self.legacy_embedding_cache_path
+        if not cache_path or not os.path.exists(cache_path):
+            log.info("No embeddings cache file found")
+            return False
+
+        # Check if cache file is empty or too small to be valid
+        if os.path.getsize(cache_path) < 10:
+            log.warning(f"Embeddings cache file is too small to be valid: {cache_path}")
+            return False
+
+        try:
+            with open(cache_path, 'r') as f:
+                cache_data = json.load(f)
+        except json.JSONDecodeError as jde:
+            log.error(f"Invalid JSON in embeddings cache: {jde}")
+            return False
+
+        if not isinstance(cache_data, dict):
+            log.warning("Invalid embeddings cache format")
+            return False
+
+        # Extract the data
+        self.tool_embeddings = cache_data.get("embeddings", {})
+        self.tool_metadata = cache_data.get("metadata", {})
+
+        # Validate the loaded data
+        if not self.tool_embeddings or not self.tool_metadata:
+            log.warning("Empty or incomplete embeddings cache")
+            return False
+
+        # Convert lists back to numpy arrays
+        for name, embedding_list in self.tool_embeddings.items():
+            if isinstance(embedding_list, list) and ML_DEPENDENCIES_AVAILABLE and np:
+                self.tool_embeddings[name] = np.array(embedding_list, dtype=np.float32)
+        self.tool_content_hashes = {name: None for name in self.tool_embeddings}
+        self._invalidate_similarity_index()
+
+        log.info(
+            f"Loaded embeddings for {len(self.tool_embeddings)} tools "
+            f"from legacy cache {cache_path}; migrating to binary format"
+        )
+
+        self._last_save_time = time.time()
+        self._cache_dirty = not self._save_embeddings_cache()
+        return True
             
     def _check_auto_save(self) -> None:
         """Check if we should auto-save the embeddings cache based on time or changes."""
@@ -501,40 +566,166 @@ class ToolSelector:
         """
         Build embeddings for all tools.
 
+        Tools whose content hash matches the cached one keep their existing
+        embedding; only new or changed definitions are re-embedded. The new
+        embedding set replaces the old one in a single step once complete.
+
         Args:
             all_tools: List of all tool definitions
         """
         log.info(f"Building embeddings for {len(all_tools)} tools")
 
-        self.tool_metadata = {}
-        self.tool_embeddings = {}
+        embeddings: Dict[str, Any] = {}
+        metadata: Dict[str, Dict[str, Any]] = {}
+        content_hashes: Dict[str, Optional[str]] = {}
+        reused, _ = self._embed_tools(
+            all_tools, self.tool_embeddings, self.tool_content_hashes, embeddings, metadata, content_hashes
+        )
+        self._publish_embeddings(embeddings, metadata, content_hashes)
         self._cache_dirty = True
 
+        log.info(f"Built embeddings for {len(self.tool_embeddings)} tools ({reused} reused from cache)")
+
+        # Save embeddings to cache file
+        self._save_embeddings_cache()
+
+    def sync_tool_embeddings(self, all_tools: List[Dict[str, Any]]) -> int:
+        """
+        Re-embed only the tools that are new or whose definition changed.
+
+        The check runs once per tool catalog (by definition identity), so it
+        costs nothing on the per-query path once the catalog is stable.
+        Changes are made on copies and published together, so concurrent
+        select_tools calls never see a half-updated embedding set.
+
+        Returns:
+            int: Number of tools that were (re-)embedded
+        """
+        catalog_key = tuple((t.get("name", ""), id(t)) for t in all_tools)
+        if catalog_key == self._synced_catalog_key:
+            return 0
+
+        embedded = 0
+        if self.embedding_model:
+            embeddings = dict(self.tool_embeddings)
+            metadata = dict(self.tool_metadata)
+            content_hashes = dict(self.tool_content_hashes)
+            embedded = self._embed_tools(
+                all_tools, self.tool_embeddings, self.tool_content_hashes, embeddings, metadata, content_hashes
+            )[1]
+            if embedded or content_hashes != self.tool_content_hashes:
+                if embedded:
+                    log.info(f"Re-embedded {embedded} new or changed tools out of {len(all_tools)}")
+                self._publish_embeddings(embeddings, metadata, content_hashes)
+                self._cache_dirty = True
+                self._save_embeddings_cache()
+            else:
+                self.tool_metadata = metadata
+
+        self._synced_catalog_key = catalog_key
+        # Keep the definitions alive so their ids cannot be reused while cached
+        self._synced_catalog_defs = list(all_tools)
+        return embedded
+
+    def _embed_tools(
+        self,
+        all_tools: List[Dict[str, Any]],
+        previous_embeddings: Dict[str, Any],
+        previous_hashes: Dict[str, Optional[str]],
+        embeddings: Dict[str, Any],
+        metadata: Dict[str, Dict[str, Any]],
+        content_hashes: Dict[str, Optional[str]],
+    ) -> Tuple[int, int]:
+        """
+        Store metadata and embeddings for ``all_tools`` in the given dicts,
+        reusing previous embeddings whose content hash is unchanged (or
+        unknown, for entries migrated from the legacy cache).
+
+        Returns:
+            Tuple of (embeddings reused, embeddings generated)
+        """
+        reused = 0
+        generated = 0
         for tool_def in all_tools:
             name = tool_def.get("name")
             if not name:
                 continue
 
             try:
-                # Store the optimized tool definition
-                optimized_def = self.optimize_tool_definition(tool_def)
-                self.tool_metadata[name] = optimized_def
-
-                # Generate and store the embedding
-                # Use original for embedding
-                embedding = self.generate_tool_embedding(tool_def)
-                # Convert to list for serialization
-                self.tool_embeddings[name] = embedding.tolist()
+                content_hash = self._tool_content_hash(tool_def)
+                previous = previous_embeddings.get(name)
+                if previous is not None and previous_hashes.get(name) in (None, content_hash):
+                    embedding = previous
+                    reused += 1
+                else:
+                    # Use original for embedding
+                    embedding = self.generate_tool_embedding(tool_def)
+                    if embedding is None:
+                        continue
+                    generated += 1
+                    if self.debug_logging:
+                        log.debug(f"Generated embedding for tool: {name}")
 
-                if self.debug_logging:
-                    log.debug(f"Generated embedding for tool: {name}")
+                # Store the optimized tool definition
+                metadata[name] = self.optimize_tool_definition(tool_def)
+                embeddings[name] = embedding
+                content_hashes[name] = content_hash
             except Exception as e:
                 log.error(f"Failed to process tool {name}: {e}", exc_info=True)
+        return reused, generated
 
-        log.info(f"Built embeddings for {len(self.tool_embeddings)} tools")
+    def _publish_embeddings(
+        self,
+        embeddings: Dict[str, Any],
+        metadata: Dict[str, Dict[str, Any]],
+        content_hashes: Dict[str, Optional[str]],
+    ) -> None:
+        """
+        Replace the embedding set. The dicts are never mutated afterwards, and
+        the similarity index is rebuilt from whichever set a reader sees.
+        """
+        self.tool_metadata = metadata
+        self.tool_content_hashes = content_hashes
+        self.tool_embeddings = embeddings
+        self._invalidate_similarity_index()
 
-        # Save embeddings to cache file
-        self._save_embeddings_cache()
+    def warm_up(self, all_tools: List[Dict[str, Any]]) -> None:
+        """
+        Do the first-query work ahead of time: embed the tool catalog, build
+        the similarity index and run the model once.
+        """
+        if not self.enabled or not self.embedding_model:
+            return
+        if all_tools:
+            if self.tool_embeddings:
+                self.sync_tool_embeddings(all_tools)
+            else:
+                self.build_tool_embeddings(all_tools)
+        self._get_similarity_index()
+        self.embed_query("warm up")
+
+    def _invalidate_similarity_index(self) -> None:
+        """Drop the cached similarity matrix so it is rebuilt from tool_embeddings."""
+        self._similarity_index = None
+        self._similarity_index_source = None
+
+    def _get_similarity_index(self) -> Optional[ToolSimilarityIndex]:
+        """
+        Return the normalized embedding matrix for the current tool_embeddings,
+        building it on first use or when the embeddings have been replaced.
+        """
+        if not ML_DEPENDENCIES_AVAILABLE or not np or not self.tool_embeddings:
+            return None
+        index = self._similarity_index
+        if index is None or self._similarity_index_source is not self.tool_embeddings \
+                or self._similarity_index_source_size != len(self.tool_embeddings):
+            index = ToolSimilarityIndex.from_embeddings(self.tool_embeddings)
+            self._similarity_index = index
+            self._similarity_index_source = self.tool_embeddings
+            self._similarity_index_source_size = len(self.tool_embeddings)
+            if index is not None:
+                log.debug(f"Built tool similarity index: {len(index)} tools x {index.dimension} dims")
+        return index
 
     def _initialize_embedding_model(self):
         """Initialize the embedding model for semantic search."""
@@ -548,7 +739,7 @@ class ToolSelector:
             
         try:
             # Get model name from config
-            model_name = self.settings.get("embedding_model", "all-MiniLM-L6-v2")
+            model_name = self.embedding_model_name
             self.embedding_model = SentenceTransformer(model_name)
             log.info(f"Initialized embedding model: {model_name}")
         except Exception as e:
@@ -558,12 +749,42 @@ class ToolSelector:
             )
             self.embedding_model = None
 
+    def _encode_query_batch(self, texts: List[str]) -> List[Any]:
+        """Encode query texts with the embedding model in a single call."""
+        if not self.embedding_model:
+            raise RuntimeError("Embedding model not initialized")
+        if len(texts) == 1:
+            return [self.embedding_model.encode(texts[0])]
+        return list(self.embedding_model.encode(texts))
+
+    def embed_query(self, query: str) -> Optional[Any]:
+        """Embed a query on the calling thread via the query embedding cache."""
+        if not ML_DEPENDENCIES_AVAILABLE or not self.embedding_model:
+            return None
+        return self.query_embeddings.encode_sync(query)
+
+    async def embed_query_async(self, query: str) -> Optional[Any]:
+        """
+        Embed a query without blocking the event loop.
+
+        Concurrent calls are batched into one model call on a worker thread;
+        returns None when no embedding model is available.
+        """
+        if not ML_DEPENDENCIES_AVAILABLE or not self.embedding_model or not self.enabled:
+            return None
+        try:
+            return await self.query_embeddings.encode(query)
+        except Exception as e:
+            log.warning(f"Async query embedding failed, select_tools will encode inline: {e}")
+            return None
+
     def select_tools(
         self,
         query: str,
         app_state: AppState,
         available_tools: Optional[List[Dict[str, Any]]] = None,
-        max_tools: Optional[int] = None
+        max_tools: Optional[int] = None,
+        query_embedding: Optional[Any] = None
     ) -> List[Dict[str, Any]]:
         """
         Select the most relevant tools for a given query, considering user permissions.
@@ -573,6 +794,7 @@ class ToolSelector:
             app_state: The current application state, used for permission checking.
             available_tools: List of all available tool definitions (should include permission metadata)
             max_tools: Maximum number of tools to select (overrides config if provided)
+            query_embedding: Precomputed embedding of the query (see embed_query_async)
 
         Returns:
             List of selected tool definitions that the user has permission to use.
@@ -612,6 +834,8 @@ class ToolSelector:
         if not self.tool_embeddings:
             log.info("Tool embeddings not loaded. Building embeddings...")
             self.build_tool_embeddings(available_tools)
+        else:
+            self.sync_tool_embeddings(available_tools)
             
         # Make a map of tool names to definitions for quick lookup
         tool_name_to_def = {
@@ -683,7 +907,8 @@ class ToolSelector:
                 return available_tools[:min(max_tool_count, len(available_tools))]
             return selected_tools[:max_tool_count]
             
-        query_embedding = self.embedding_model.encode(query)
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
 
         # Calculate similarity scores between query and all tools
         similarities = []
@@ -700,84 +925,18 @@ class ToolSelector:
                 return available_tools[:min(max_tool_count, len(available_tools))]
             return []
 
-        # Then calculate similarity for remaining tools
-        for tool_name, tool_embedding_data in self.tool_embeddings.items():
-            # Skip if this tool is already in the selected set
-            if tool_name in selected_tool_names:
-                continue
-                
-            # Skip if tool is not in available tools
-            if tool_name not in tool_name_to_def:
-                continue
-
-            # Only proceed with similarity if ML dependencies are available
-            if not ML_DEPENDENCIES_AVAILABLE or not np:
-                continue
-                
-            tool_embedding = np.array(tool_embedding_data) \
-                if isinstance(tool_embedding_data, list) \
-                else tool_embedding_data
-
-            # Check if it's a valid numpy array
-            if not isinstance(tool_embedding, np.ndarray) \
-                    or tool_embedding.ndim == 0:
-                log.warning(
-                    f"Skipping tool {tool_name} due to invalid embedding "
-                    f"format: {type(tool_embedding)}"
-                )
-                continue
-
-            # Calculate cosine similarity
-            # Ensure query_embedding is also a numpy array
-            if not isinstance(query_embedding, np.ndarray):
-                query_embedding_np = np.array(query_embedding)
-            else:
-                query_embedding_np = query_embedding
-
-            # Check for zero vectors to avoid division by zero in norm
-            norm_query = np.linalg.norm(query_embedding_np)
-            norm_tool = np.linalg.norm(tool_embedding)
-
-            if norm_query == 0 or norm_tool == 0:
-                similarity = 0.0
-            else:
-                similarity = np.dot(query_embedding_np, tool_embedding) / \
-                             (norm_query * norm_tool)
-
-            # Apply keyword boost if available
-            # This helps prioritize specific tools over general ones like search_web
-            keyword_boost = self._check_direct_keyword_match(query, tool_name_to_def[tool_name])
-            if keyword_boost > 0:
-                similarity = similarity + keyword_boost 
-                if self.debug_logging:
-                    log.debug(f"Applied keyword boost of {keyword_boost} to {tool_name}, new score: {similarity:.4f}")
-
-            # Special case: reduce prominence of search_web when more specific tools are available
-            if tool_name == "search_web" or tool_name == "perplexity_web_search":
-                if similarity > self.similarity_threshold:
-                    # Slightly reduce the search_web score unless it's a very strong match
-                    if similarity < 0.8:  # Still prioritize search for very explicit web search queries
-                        adjusted_similarity = similarity * 0.85  # Reduce by 15%
-                        similarity = adjusted_similarity
-                        if self.debug_logging:
-                            log.debug(f"Reduced score for {tool_name} to {similarity:.4f}")
-
-            # Add boost for tools from already detected relevant categories
-            categories = self._get_tool_categories(tool_name, tool_name_to_def[tool_name])
-            if categories:
-                for cat in categories:
-                    # Increase similarity for tool if its category was detected in our entity matching
-                    if cat.lower() in [c.lower() for c in self._extract_query_categories(query)]:
-                        similarity += 0.1
-                        if self.debug_logging:
-                            log.debug(f"Added category boost to {tool_name} for category {cat}, new score: {similarity:.4f}")
-
-            # Only consider tools that meet the threshold
-            if similarity >= self.similarity_threshold:
-                similarities.append((tool_name, float(similarity)))
-
-        # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # Score all remaining tools at once against the normalized embedding matrix
+        similarity_index = self._get_similarity_index()
+        if similarity_index is not None:
+            boost_profile = similarity_index.compile_profile(tool_name_to_def, self._get_tool_categories)
+            similarities = similarity_index.score_query(
+                query,
+                query_embedding,
+                boost_profile,
+                query_categories=self._extract_query_categories(query),
+                threshold=self.similarity_threshold,
+                exclude=selected_tool_names,
+            )
 
         if self.debug_logging:
             log.debug(f"Top similarity scores: {similarities[:5]}")
@@ -874,38 +1033,48 @@ class ToolSelector:
                 log.warning("No permission-free tools available. Returning empty list.")
                 return []
 
-        final_permitted_tools: List[Dict[str, Any]] = []
-        for tool_def in relevant_tools:
-            tool_name = tool_def.get("name", "unknown_tool")
-            metadata = tool_def.get("metadata", {})
-            required_permission_name_str = metadata.get("required_permission_name") # e.g., "GITHUB_READ_REPO"
-
-            if not required_permission_name_str:
-                # If a tool definition has no permission metadata, assume it's accessible by default (e.g. help tool)
-                # This policy can be made stricter if needed (e.g., require explicit PUBLIC_ACCESS permission)
-                log.debug(f"Tool '{tool_name}' has no required_permission_name in metadata. Assuming accessible.")
-                final_permitted_tools.append(tool_def)
-                continue
-
-            try:
-                permission_enum_member = Permission[required_permission_name_str]
-                if app_state.has_permission(permission_enum_member):
-                    final_permitted_tools.append(tool_def)
-                    if self.debug_logging:
-                        log.debug(f"User has permission for tool '{tool_name}' ({required_permission_name_str}). Adding to final list.")
-                else:
-                    if self.debug_logging:
-                        log.debug(f"User LACKS permission for tool '{tool_name}' ({required_permission_name_str}). Filtering out.")
-            except KeyError:
-                log.warning(f"Tool '{tool_name}' has an invalid required_permission_name '{required_permission_name_str}' in metadata. Filtering out.")
-            except Exception as e:
-                log.error(f"Error checking permission for tool '{tool_name}' ({required_permission_name_str}): {e}. Filtering out.", exc_info=True)
+        try:
+            granted_mask = app_state.granted_permission_mask()
+        except Exception as e:
+            log.error(f"Error resolving permissions for tool filtering: {e}. Filtering out permission-gated tools.", exc_info=True)
+            granted_mask = 0
+        final_permitted_tools = self._filter_by_permission_mask(relevant_tools, granted_mask)
+        if self.debug_logging:
+            permitted_names = {tool_def.get("name") for tool_def in final_permitted_tools}
+            for tool_def in relevant_tools:
+                if tool_def.get("name") not in permitted_names:
+                    log.debug(f"User LACKS permission for tool '{tool_def.get('name', 'unknown_tool')}'. Filtering out.")
         
         log.info(f"After permission filtering, {len(final_permitted_tools)} tools selected out of {len(relevant_tools)} relevant tools.")
         # --- END PERMISSION FILTERING ---
             
         return final_permitted_tools
     
+    def _required_permission_bit(self, tool_def: Dict[str, Any]) -> int:
+        """
+        Bit of the permission a tool requires: 0 if it requires none, -1 if its
+        required_permission_name is invalid (never permitted). Cached per tool name.
+        """
+        tool_name = tool_def.get("name", "unknown_tool")
+        bit = self._permission_bits.get(tool_name)
+        if bit is None:
+            required_permission_name_str = tool_def.get("metadata", {}).get("required_permission_name") # e.g., "GITHUB_READ_REPO"
+            if not required_permission_name_str:
+                # If a tool definition has no permission metadata, assume it's accessible by default (e.g. help tool)
+                bit = 0
+            elif required_permission_name_str in Permission.__members__:
+                bit = PERMISSION_BITS[Permission[required_permission_name_str]]
+            else:
+                log.warning(f"Tool '{tool_name}' has an invalid required_permission_name '{required_permission_name_str}' in metadata. Filtering out.")
+                bit = -1
+            self._permission_bits[tool_name] = bit
+        return bit
+
+    def _filter_by_permission_mask(self, tools: List[Dict[str, Any]], granted_mask: int) -> List[Dict[str, Any]]:
+        """Tools whose required permission bit is set in ``granted_mask``, as one array operation over the catalog."""
+        required = [self._required_permission_bit(tool_def) for tool_def in tools]
+        return [tool_def for tool_def, keep in zip(tools, permitted_by_mask(required, granted_mask)) if keep]
+
     def _identify_entity_mentions(self, query: str, tool_dict: Dict[str, Dict[str, Any]]) -> List[str]:
         """
         Identifies entity mentions in the query using simple keyword matching.
@@ -1108,34 +1277,9 @@ class ToolSelector:
             return []
             
         # Generate query embedding
-        query_embedding = self.embedding_model.encode(query)
+        query_embedding = self.embed_query(query)
         
-        # Calculate similarity for all tools
-        similarities = []
-        for tool_name, tool_embedding_data in self.tool_embeddings.items():
-            if not np:
-                continue
-                
-            tool_embedding = np.array(tool_embedding_data) \
-                if isinstance(tool_embedding_data, list) \
-                else tool_embedding_data
-                
-            # Skip invalid embeddings
-            if not isinstance(tool_embedding, np.ndarray) or tool_embedding.ndim == 0:
-                continue
-                
-            # Calculate cosine similarity
-            norm_query = np.linalg.norm(query_embedding)
-            norm_tool = np.linalg.norm(tool_embedding)
-            
-            if norm_query == 0 or norm_tool == 0:
-                similarity = 0.0
-            else:
-                similarity = np.dot(query_embedding, tool_embedding) / (norm_query * norm_tool)
-                
-            if similarity >= threshold:
-                similarities.append((tool_name, float(similarity)))
-                
-        # Sort by similarity (highest first) and return top results
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:max_results]
+        similarity_index = self._get_similarity_index()
+        if similarity_index is None:
+            return []
+        return similarity_index.top_k(query_embedding, threshold, max_results)
@@ -0,0 +1,179 @@
+# core_logic/tool_selector_registry.py
+
+"""
+Process-wide ToolSelector
+
+Constructing a ToolSelector loads the sentence-transformers model and maps
+the embedding cache, which is far too slow to repeat per turn.
+``get_tool_selector`` hands every caller (LLMInterface and
+_prepare_tool_definitions) the same instance, and ``warm_up_tool_selector``
+runs once at app startup to embed the tool catalog, build the similarity
+index and exercise the model before the first message arrives.
+
+When the TOOL_SELECTOR settings change, a replacement selector is built next
+to the current one, reusing the loaded model if the model name is unchanged
+and its embeddings if the cache is shared too, and swapped in with a single
+reference assignment; turns already holding the old selector finish with it.
+Tool catalog changes go through ToolSelector.sync_tool_embeddings, which
+re-embeds only changed tools and publishes the new embedding set in one step.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .tool_selector import ToolSelector
+
+log = logging.getLogger(__name__)
+
+# Settings that, when unchanged, let a replacement selector share loaded state
+MODEL_SETTING_KEYS = ("embedding_model",)
+CACHE_SETTING_KEYS = ("embedding_model", "cache_path", "legacy_cache_path")
+
+
+class _Entry(NamedTuple):
+    settings_key: str
+    settings: Dict[str, Any]
+    selector: ToolSelector
+    ready: bool
+
+
+class ToolSelectorRegistry:
+    """Holds the current ToolSelector and the settings it was built from."""
+
+    def __init__(self):
+        self._entry: Optional[_Entry] = None
+        # Serializes builds and warm-ups; lookups of the current selector never take it
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.swaps = 0
+        self.warm_up_seconds: Optional[float] = None
+
+    @staticmethod
+    def _settings_of(config: Any) -> Dict[str, Any]:
+        settings = getattr(config, "TOOL_SELECTOR", None) if config is not None else None
+        return settings if isinstance(settings, dict) else {}
+
+    @staticmethod
+    def _settings_key(config: Any, settings: Dict[str, Any]) -> str:
+        schema_settings = getattr(config, "SCHEMA_OPTIMIZATION", None) if config is not None else None
+        return json.dumps(
+            {"tool_selector": settings, "schema_optimization": schema_settings if isinstance(schema_settings, dict) else {}},
+            sort_keys=True,
+            default=str,
+        )
+
+    @property
+    def ready(self) -> bool:
+        """True once the current selector has been warmed up."""
+        entry = self._entry
+        return entry is not None and entry.ready
+
+    def get(self, config: Any) -> ToolSelector:
+        """The shared selector for ``config``, building or replacing it if the settings changed."""
+        settings = self._settings_of(config)
+        key = self._settings_key(config, settings)
+        entry = self._entry
+        if entry is not None and entry.settings_key == key:
+            return entry.selector
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry.settings_key != key:
+                entry = self._replace(config, settings, key)
+            return entry.selector
+
+    def warm_up(self, config: Any, tool_definitions: List[Dict[str, Any]]) -> ToolSelector:
+        """Get the selector for ``config``, prepare it for ``tool_definitions`` and mark it ready."""
+        selector = self.get(config)
+        with self._lock:
+            started = time.monotonic()
+            selector.warm_up(tool_definitions)
+            entry = self._entry
+            if entry is not None and entry.selector is selector:
+                self._entry = entry._replace(ready=True)
+            self.warm_up_seconds = time.monotonic() - started
+        log.info(
+            f"Tool selector ready: {len(selector.tool_embeddings)} tools embedded in {self.warm_up_seconds:.2f}s",
+            extra={"event_type": "tool_selector_ready", "details": {
+                "tools": len(selector.tool_embeddings),
+                "warm_up_ms": round(self.warm_up_seconds * 1000, 1),
+                "embedding_model": selector.embedding_model_name,
+            }},
+        )
+        return selector
+
+    def _replace(self, config: Any, settings: Dict[str, Any], key: str) -> _Entry:
+        previous = self._entry
+        same_model = previous is not None and all(
+            previous.settings.get(name) == settings.get(name) for name in MODEL_SETTING_KEYS)
+        same_cache = previous is not None and all(
+            previous.settings.get(name) == settings.get(name) for name in CACHE_SETTING_KEYS)
+        selector = ToolSelector(
+            config,
+            embedding_model=previous.selector.embedding_model if same_model else None,
+            embeddings_from=previous.selector if same_cache else None,
+        )
+        # An unwarmed replacement of a warm selector stays ready only if it inherited the model and embeddings
+        ready = previous is not None and previous.ready and same_cache and selector.embedding_model is not None
+        entry = _Entry(key, dict(settings), selector, ready)
+        self._entry = entry
+        self.builds += 1
+        if previous is not None:
+            self.swaps += 1
+            previous.selector.query_embeddings.shutdown()
+            log.info(
+                "Tool selector settings changed; swapped in a new selector",
+                extra={"event_type": "tool_selector_swapped", "details": {
+                    "reused_model": same_model, "reused_embeddings": same_cache}},
+            )
+        return entry
+
+    def close(self) -> None:
+        """Persist unsaved embeddings and stop the query embedding worker."""
+        with self._lock:
+            entry, self._entry = self._entry, None
+        if entry is None:
+            return
+        if entry.selector._cache_dirty:
+            entry.selector._save_embeddings_cache()
+        entry.selector.query_embeddings.shutdown()
+
+    def metrics(self) -> Dict[str, Any]:
+        entry = self._entry
+        selector = entry.selector if entry is not None else None
+        return {
+            "ready": entry is not None and entry.ready,
+            "builds": self.builds,
+            "swaps": self.swaps,
+            "warm_up_ms": round(self.warm_up_seconds * 1000, 1) if self.warm_up_seconds is not None else None,
+            "embedding_model": selector.embedding_model_name if selector is not None else None,
+            "model_loaded": selector is not None and selector.embedding_model is not None,
+            "tools_embedded": len(selector.tool_embeddings) if selector is not None else 0,
+        }
+
+
+_registry = ToolSelectorRegistry()
+
+
+def get_tool_selector(config: Any) -> ToolSelector:
+    """The process-wide ToolSelector for ``config``."""
+    return _registry.get(config)
+
+
+def warm_up_tool_selector(config: Any, tool_definitions: List[Dict[str, Any]]) -> ToolSelector:
+    """Load and prepare the process-wide ToolSelector (blocking; run it off the event loop)."""
+    return _registry.warm_up(config, tool_definitions)
+
+
+def tool_selector_ready() -> bool:
+    return _registry.ready
+
+
+def tool_selector_metrics() -> Dict[str, Any]:
+    return _registry.metrics()
+
+
+def close_tool_selector() -> None:
+    _registry.close()
@@ -8,7 +8,7 @@ requiring sequential tool calls and intelligent information synthesis.
 import asyncio
 import logging
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from config import Config
 from state_models import AppState
@@ -16,6 +16,8 @@ from tools.tool_executor import ToolExecutor
 
 log = logging.getLogger("core_logic.workflow_orchestrator")
 
+DEFAULT_WORKFLOW_TIMEOUT_SECONDS = 60.0
+
 @dataclass
 class WorkflowStep:
     """Represents a single step in a multi-tool workflow."""
@@ -33,6 +35,31 @@ class WorkflowResult:
     results: Dict[str, Any]  # step_id -> result
     final_synthesis: str
     execution_time_ms: int
+    step_timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # step_id -> status, start_ms, end_ms, duration_ms (ms since workflow start)
+    skipped_steps: List[str] = field(default_factory=list)
+    timed_out: bool = False
+
+
+def topological_order(steps: List[WorkflowStep]) -> List[str]:
+    """
+    Order step ids so that every step comes after the steps it depends on.
+    
+    Declaration order is kept among independent steps. Steps with unknown
+    dependencies, on a dependency cycle, or depending on such steps are left out.
+    """
+    step_ids = {step.step_id for step in steps}
+    remaining = {step.step_id: set(step.depends_on or []) for step in steps}
+    ordered: List[str] = []
+    progressed = True
+    while progressed:
+        progressed = False
+        for step in steps:
+            deps = remaining.get(step.step_id)
+            if deps is not None and deps <= step_ids and all(dep in ordered for dep in deps):
+                ordered.append(step.step_id)
+                del remaining[step.step_id]
+                progressed = True
+    return ordered
 
 class WorkflowOrchestrator:
     """
@@ -226,69 +253,19 @@ class WorkflowOrchestrator:
         
         workflow_steps = self.workflow_patterns[workflow_type]
         results = {}
-        executed_steps = []
+        step_timings: Dict[str, Dict[str, Any]] = {}
+        skipped_steps: List[str] = []
+        timed_out = False
         
         log.info(f"Starting workflow '{workflow_type}' with {len(workflow_steps)} steps")
         
         try:
-            # Execute steps in dependency order
-            for step in workflow_steps:
-                if step.depends_on:
-                    # Wait for dependencies to complete
-                    missing_deps = [dep for dep in step.depends_on if dep not in results]
-                    if missing_deps:
-                        log.warning(f"Step {step.step_id} has unmet dependencies: {missing_deps}")
-                        continue
-                
-                # Inject parameters from previous results and context
-                injected_params = self._inject_parameters(
-                    step.parameters, 
-                    results, 
-                    app_state, 
-                    context or {}
-                )
-                
-                log.info(f"Executing step '{step.step_id}': {step.description}")
-                
-                # Execute the tool
-                step_result = await self.tool_executor.execute_tool(
-                    step.tool_name,
-                    injected_params,
-                    app_state=app_state
-                )
-                
-                # Update session statistics for workflow tool execution
-                if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
-                    # Determine success for stats
-                    is_success = self._determine_success(step_result)
-                    
-                    # Extract execution time if available
-                    execution_time_ms = 0
-                    if isinstance(step_result, dict):
-                        execution_time_ms = step_result.get("execution_time_ms", 0)
-                    
-                    # Update session stats
-                    app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
-                    app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_time_ms
-                    
-                    if not is_success:
-                        app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
-                    
-                    # Update tool usage tracking if available
-                    if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
-                        app_state.update_tool_usage(step.tool_name, execution_time_ms, is_success)
-                
-                results[step.step_id] = {
-                    "tool_name": step.tool_name,
-                    "parameters": injected_params,
-                    "result": step_result,
-                    "success": self._determine_success(step_result)
-                }
-                
-                executed_steps.append(step.step_id)
-                
-                if not results[step.step_id]["success"]:
-                    log.warning(f"Step '{step.step_id}' failed, continuing workflow")
+            timed_out = await self._run_steps(
+                workflow_steps, results, step_timings, skipped_steps, app_state, context or {}, start_time
+            )
+            # Report steps in declaration order, whatever order they finished in
+            executed_steps = [step.step_id for step in workflow_steps if step.step_id in results]
+            results = {step_id: results[step_id] for step_id in executed_steps}
             
             # Synthesize final result
             final_synthesis = await self._synthesize_workflow_results(
@@ -296,6 +273,8 @@ class WorkflowOrchestrator:
                 results, 
                 app_state
             )
+            if timed_out:
+                final_synthesis += f"\n\n⏱️ Some steps did not finish in time: {', '.join(skipped_steps)}"
             
             execution_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
             
@@ -304,21 +283,175 @@ class WorkflowOrchestrator:
                 steps_executed=executed_steps,
                 results=results,
                 final_synthesis=final_synthesis,
-                execution_time_ms=execution_time
+                execution_time_ms=execution_time,
+                step_timings=step_timings,
+                skipped_steps=skipped_steps,
+                timed_out=timed_out
             )
             
         except Exception as e:
             log.error(f"Workflow '{workflow_type}' failed: {e}", exc_info=True)
             execution_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
+            executed_steps = [step.step_id for step in workflow_steps if step.step_id in results]
             
             return WorkflowResult(
                 success=False,
                 steps_executed=executed_steps,
                 results=results,
                 final_synthesis=f"Workflow failed: {str(e)}",
-                execution_time_ms=execution_time
+                execution_time_ms=execution_time,
+                step_timings=step_timings,
+                skipped_steps=skipped_steps,
+                timed_out=timed_out
             )
     
+    def _workflow_timeout_seconds(self) -> float:
+        """Per-workflow deadline from config, or the default for partial/mocked configs."""
+        timeout = getattr(self.config, 'WORKFLOW_TIMEOUT_SECONDS', DEFAULT_WORKFLOW_TIMEOUT_SECONDS)
+        if isinstance(timeout, (int, float)) and not isinstance(timeout, bool) and timeout > 0:
+            return float(timeout)
+        return DEFAULT_WORKFLOW_TIMEOUT_SECONDS
+    
+    async def _run_steps(
+        self,
+        workflow_steps: List[WorkflowStep],
+        results: Dict[str, Any],
+        step_timings: Dict[str, Dict[str, Any]],
+        skipped_steps: List[str],
+        app_state: AppState,
+        context: Dict[str, Any],
+        start_time: float
+    ) -> bool:
+        """
+        Run workflow steps as a dependency graph.
+        
+        Every step whose dependencies have succeeded is started at once, so the
+        workflow takes about as long as its critical path. Steps depending on a
+        failed or skipped step are skipped, as are steps with unknown or cyclic
+        dependencies. When the workflow deadline passes, running steps are
+        cancelled and everything unfinished is skipped.
+        
+        Fills ``results``, ``step_timings`` and ``skipped_steps`` in place and
+        returns True if the deadline was hit.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = start_time + self._workflow_timeout_seconds()
+        steps_by_id = {step.step_id: step for step in workflow_steps}
+        
+        # Validate the graph up front: Kahn's algorithm leaves steps on a cycle unordered
+        for step in workflow_steps:
+            unknown_deps = [dep for dep in (step.depends_on or []) if dep not in steps_by_id]
+            if unknown_deps:
+                log.warning(f"Step {step.step_id} has unmet dependencies: {unknown_deps}")
+        ordered_ids = set(topological_order(workflow_steps))
+        
+        def elapsed_ms(timestamp: float) -> int:
+            return int((timestamp - start_time) * 1000)
+        
+        def skip(step_id: str, reason: str) -> None:
+            skipped_steps.append(step_id)
+            step_timings[step_id] = {"status": "skipped", "reason": reason}
+            log.warning(f"Skipping step '{step_id}': {reason}")
+        
+        pending: Dict[str, WorkflowStep] = {}
+        for step in workflow_steps:
+            if step.step_id in ordered_ids:
+                pending[step.step_id] = step
+            else:
+                skip(step.step_id, "unknown or circular dependencies")
+        
+        running: Dict[asyncio.Task, str] = {}
+        launched_params: Dict[str, Dict[str, Any]] = {}
+        
+        def launch_ready_steps() -> None:
+            progressed = True
+            while progressed:
+                progressed = False
+                for step_id, step in list(pending.items()):
+                    deps = step.depends_on or []
+                    blocked_by = [dep for dep in deps if dep in skipped_steps or (dep in results and not results[dep]["success"])]
+                    if blocked_by:
+                        del pending[step_id]
+                        skip(step_id, f"dependencies did not succeed: {blocked_by}")
+                        progressed = True  # Its own dependents can now be skipped too
+                    elif all(dep in results for dep in deps):
+                        del pending[step_id]
+                        # Inject parameters from completed results and context
+                        injected_params = self._inject_parameters(step.parameters, results, app_state, context)
+                        log.info(f"Executing step '{step_id}': {step.description}")
+                        step_timings[step_id] = {"status": "running", "start_ms": elapsed_ms(loop.time())}
+                        task = asyncio.ensure_future(
+                            self.tool_executor.execute_tool(step.tool_name, injected_params, app_state=app_state)
+                        )
+                        launched_params[step_id] = injected_params
+                        running[task] = step_id
+        
+        launch_ready_steps()
+        while running:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(list(running), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step_id = running.pop(task)
+                step = steps_by_id[step_id]
+                try:
+                    step_result = task.result()
+                except Exception as e:
+                    log.error(f"Step '{step_id}' raised: {e}", exc_info=True)
+                    step_result = {"status": "ERROR", "message": str(e)}
+                self._record_step_stats(step, step_result, app_state)
+                
+                timing = step_timings[step_id]
+                timing["end_ms"] = elapsed_ms(loop.time())
+                timing["duration_ms"] = timing["end_ms"] - timing["start_ms"]
+                
+                results[step_id] = {
+                    "tool_name": step.tool_name,
+                    "parameters": launched_params[step_id],
+                    "result": step_result,
+                    "success": self._determine_success(step_result)
+                }
+                timing["status"] = "succeeded" if results[step_id]["success"] else "failed"
+                
+                if not results[step_id]["success"]:
+                    log.warning(f"Step '{step_id}' failed, skipping steps that depend on it")
+            launch_ready_steps()
+        
+        if not running and not pending:
+            return False
+        
+        log.warning(f"Workflow deadline of {self._workflow_timeout_seconds():.0f}s reached; cancelling {len(running)} running step(s)")
+        for task, step_id in running.items():
+            task.cancel()
+            skip(step_id, "workflow deadline reached")
+        await asyncio.gather(*running, return_exceptions=True)
+        for step_id in list(pending):
+            skip(step_id, "workflow deadline reached")
+        return True
+    
+    def _record_step_stats(self, step: WorkflowStep, step_result: Any, app_state: AppState) -> None:
+        """Update session statistics for workflow tool execution."""
+        if app_state and hasattr(app_state, 'session_stats') and app_state.session_stats:
+            # Determine success for stats
+            is_success = self._determine_success(step_result)
+            
+            # Extract execution time if available
+            execution_time_ms = 0
+            if isinstance(step_result, dict):
+                execution_time_ms = step_result.get("execution_time_ms", 0)
+            
+            # Update session stats
+            app_state.session_stats.tool_calls = getattr(app_state.session_stats, 'tool_calls', 0) + 1
+            app_state.session_stats.tool_execution_ms = getattr(app_state.session_stats, 'tool_execution_ms', 0) + execution_time_ms
+            
+            if not is_success:
+                app_state.session_stats.failed_tool_calls = getattr(app_state.session_stats, 'failed_tool_calls', 0) + 1
+            
+            # Update tool usage tracking if available
+            if hasattr(app_state, 'update_tool_usage') and callable(app_state.update_tool_usage):
+                app_state.update_tool_usage(step.tool_name, execution_time_ms, is_success)
+    
     def _inject_parameters(
         self, 
         template_params: Dict[str, Any],
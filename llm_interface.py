@@ -4,10 +4,11 @@ import os
 import uuid
 import time
 import json
-import hashlib
 import re
 import asyncio
 import random
+import threading
+import weakref
 from typing import Dict, List, Any, Optional, Union, TypeVar, AsyncIterable, Callable, Tuple, cast
 from typing import Iterable, TypeAlias, TYPE_CHECKING
 
@@ -30,6 +31,9 @@ from utils.log_sanitizer import sanitize_data
 
 # Import function call utility
 from utils.function_call_utils import safe_extract_function_call
+from utils.async_bridge import iterate_in_thread
+from core_logic.response_cache import LLMResponseCache, build_cache_key
+from core_logic.declaration_cache import FunctionDeclarationCache
 
 # --- Safe SDK Object Representation for Logging ---
 def _safe_sdk_object_repr_for_log(sdk_obj: Any, max_len: int = 500) -> str:
@@ -160,6 +164,21 @@ except ImportError:
 
 log = get_logger("llm_interface")
 
+# --- Per-process LLM transport limits ---
+# The SDK stream is blocking, so each in-flight call occupies one worker thread.
+# A process-wide semaphore (one per event loop) caps concurrent calls; callers
+# beyond the limit wait on the loop instead of piling up threads.
+_LLM_CALL_SLOTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_llm_call_slots(limit: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _LLM_CALL_SLOTS.get(loop)
+    if slots is None:
+        slots = asyncio.Semaphore(limit)
+        _LLM_CALL_SLOTS[loop] = slots
+    return slots
+
 class LLMInterface:
     """
     Handles interactions with the configured Google Gemini LLM API
@@ -174,10 +193,12 @@ class LLMInterface:
         self.api_key: str = config.GEMINI_API_KEY
         self.model_name: str = config.GEMINI_MODEL
         self.timeout: int = config.DEFAULT_API_TIMEOUT_SECONDS
+        max_concurrent = getattr(config, 'LLM_MAX_CONCURRENT_CALLS', 8)
+        self.max_concurrent_calls: int = max_concurrent if isinstance(max_concurrent, int) and max_concurrent > 0 else 8
 
         try:
-            from core_logic.tool_selector import ToolSelector # Lazy import
-            self.tool_selector = ToolSelector(config)
+            from core_logic.tool_selector_registry import get_tool_selector # Lazy import
+            self.tool_selector = get_tool_selector(config) # Shared with _prepare_tool_definitions
         except ImportError as e:
             log.warning(f"Could not import ToolSelector: {e}. Tool selection will be disabled.")
             class MockToolSelector: # type: ignore
@@ -187,9 +208,10 @@ class LLMInterface:
                     return []
             self.tool_selector = MockToolSelector(config) # type: ignore
 
-        self.response_cache: Dict[str, List[Dict[str,Any]]] = {}
-        self.CACHE_MAX_SIZE = 50
-        self.CACHE_ENABLED = True
+        self.response_cache = LLMResponseCache.from_config(config)
+        self.declaration_cache = FunctionDeclarationCache()  # Compiled FunctionDeclarations, reused across calls
+        cache_settings = getattr(config, 'LLM_RESPONSE_CACHE', None)
+        self.CACHE_ENABLED = cache_settings.get("enabled", True) if isinstance(cache_settings, dict) else True
 
         try:
             genai.configure(api_key=self.api_key)
@@ -282,6 +304,7 @@ class LLMInterface:
                 log.debug(f"Model {model_name} updated without system instruction (not supported)")
 
             self.model_name = model_name
+            self.declaration_cache.clear()
             log.info(f"Successfully updated LLM client to use model: {self.model_name}")
         except (google_exceptions.NotFound, google_exceptions.InvalidArgument) as e:
              log.error(f"Failed to update to model '{model_name}'. It might be invalid or inaccessible: {e}", exc_info=True)
@@ -461,7 +484,24 @@ class LLMInterface:
             log.error(f"Parameter '{param_name}': Failed to create schema: {e}. Using string fallback.", exc_info=True)
             return glm.Schema(type_=glm.Type.STRING, description=param_details.get("description", f"Error processing schema for {param_name}"), nullable=True)
 
-    def prepare_tools_for_sdk(self, tool_definitions: List[Dict[str, Any]], query: Optional[str] = None, app_state: Optional[AppState] = None) -> Optional[ToolType]:
+    def _build_function_declaration(self, tool_dict: Dict[str, Any]) -> Optional[FunctionDeclarationType]:
+        """Compile one tool definition into an SDK FunctionDeclaration (cached by prepare_tools_for_sdk)."""
+        name, desc = tool_dict["name"], tool_dict["description"]
+        params_schema = self._convert_parameters_to_schema(name, tool_dict.get("parameters", {})) if tool_dict.get("parameters") else None
+        try:
+            decl_args = {"name": name, "description": desc}
+            if params_schema: decl_args["parameters"] = params_schema
+            # Ensure parameters is at least an empty object if not None, for some SDK versions
+            elif 'parameters' not in decl_args :
+                 try: decl_args["parameters"] = glm.Schema(type=glm.Type.OBJECT, properties={}) # type: ignore
+                 except: pass # If this fails, it means parameters=None is acceptable
+
+            return glm.FunctionDeclaration(**decl_args) # type: ignore
+        except Exception as e:
+            log.error(f"Failed FunctionDeclaration for '{name}': {e}", exc_info=True)
+            return None
+
+    def prepare_tools_for_sdk(self, tool_definitions: List[Dict[str, Any]], query: Optional[str] = None, app_state: Optional[AppState] = None, query_embedding: Optional[Any] = None) -> Optional[ToolType]:
         # (Implementation from previous corrected version, ensuring ToolSelector check is safe)
         if not tool_definitions: log.debug("No tool definitions to prepare_tools_for_sdk."); return None
         if not SDK_AVAILABLE: log.error("SDK not available for prepare_tools_for_sdk."); return None
@@ -469,7 +509,9 @@ class LLMInterface:
 
         processing_tools: List[Dict[str, Any]]
         if query and self.tool_selector and hasattr(self.tool_selector, 'enabled') and self.tool_selector.enabled:
-            selected_detailed_tools = self.tool_selector.select_tools(query, app_state=app_state, available_tools=tool_definitions)
+            select_kwargs: Dict[str, Any] = {"app_state": app_state, "available_tools": tool_definitions}
+            if query_embedding is not None: select_kwargs["query_embedding"] = query_embedding
+            selected_detailed_tools = self.tool_selector.select_tools(query, **select_kwargs)
             processing_tools = selected_detailed_tools if selected_detailed_tools else tool_definitions
             log.info(f"ToolSelector selected {len(processing_tools)} tools.")
         else:
@@ -485,18 +527,8 @@ class LLMInterface:
         for tool_dict in processing_tools:
             if not (isinstance(tool_dict, dict) and "name" in tool_dict and "description" in tool_dict):
                 log.warning(f"Skipping invalid tool def: {_safe_sdk_object_repr_for_log(tool_dict)}"); continue
-            name, desc = tool_dict["name"], tool_dict["description"]
-            params_schema = self._convert_parameters_to_schema(name, tool_dict.get("parameters", {})) if tool_dict.get("parameters") else None
-            try:
-                decl_args = {"name": name, "description": desc}
-                if params_schema: decl_args["parameters"] = params_schema
-                # Ensure parameters is at least an empty object if not None, for some SDK versions
-                elif 'parameters' not in decl_args :
-                     try: decl_args["parameters"] = glm.Schema(type=glm.Type.OBJECT, properties={}) # type: ignore
-                     except: pass # If this fails, it means parameters=None is acceptable
-
-                declarations.append(glm.FunctionDeclaration(**decl_args)) # type: ignore
-            except Exception as e: log.error(f"Failed FunctionDeclaration for '{name}': {e}", exc_info=True)
+            declaration = self.declaration_cache.get_or_build(tool_dict, self._build_function_declaration)
+            if declaration is not None: declarations.append(declaration)
         
         if not declarations: log.warning("No valid function declarations prepared."); return None
         log.info(f"Prepared {len(declarations)} declarations: {[d.name for d in declarations]}")
@@ -513,9 +545,14 @@ class LLMInterface:
             model_info = genai.get_model(model_path)
             elapsed = time.monotonic() - start_time
             log.info(f"Gemini health check successful for model: {self.model_name} (took {elapsed:.3f}s)")
+            details = {"display_name": getattr(model_info, 'display_name', 'N/A'), "version": getattr(model_info, 'version', 'N/A')}
+            query_embeddings = getattr(self.tool_selector, 'query_embeddings', None)
+            if query_embeddings is not None: details["query_embedding_cache"] = query_embeddings.metrics()
+            details["response_cache"] = self.response_cache.metrics()
+            details["function_declaration_cache"] = self.declaration_cache.metrics()
             return {
                 "status": "OK", "message": f"Model '{self.model_name}' available via SDK.", "component": "LLM",
-                "details": {"display_name": getattr(model_info, 'display_name', 'N/A'), "version": getattr(model_info, 'version', 'N/A')}
+                "details": details
             }
         except google_exceptions.NotFound as e:
             log.warning(f"Gemini health check: Model '{self.model_name}' not found. Error: {e}", exc_info=False)
@@ -548,29 +585,54 @@ class LLMInterface:
             log.debug(f"Using prompt for persona: {persona_name}")
         return prompt
 
-    def _create_cache_key(self, messages: List[RuntimeContentType], tools: Optional[List[Dict[str,Any]]] = None, model_name: Optional[str] = None) -> str:
-        # Simplified version from previous response, ensure robustness if original was more complex and needed.
-        # The key is to make this deterministic and avoid errors.
-        try:
-            msg_digests = []
-            for msg in messages:
-                role = str(getattr(msg, 'role', msg.get('role') if isinstance(msg, dict) else 'unknown_role'))
-                parts_content = ""
-                msg_parts = getattr(msg, 'parts', msg.get('parts') if isinstance(msg, dict) else [])
-                if isinstance(msg_parts, list):
-                    for part_item in msg_parts:
-                        parts_content += str(getattr(part_item, 'text', part_item.get('text') if isinstance(part_item, dict) else ''))
-                msg_digests.append(f"r:{role[:1]}_c:{hashlib.md5(parts_content.encode()).hexdigest()[:8]}")
-
-            tool_names_str = "no_tools"
-            if tools:
-                tool_names_str = ",".join(sorted([t.get("name","") for t in tools]))
-
-            key_string = f"m:{model_name or self.model_name}|msgs:{'|'.join(msg_digests)}|t:{tool_names_str}"
-            return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
-        except Exception as e:
-            log.warning(f"Error creating cache key, using fallback: {e}")
-            return f"fallback_key_{time.time()}" # Basic fallback
+    def _create_cache_key(
+        self, messages: List[RuntimeContentType], tools: Optional[List[Dict[str,Any]]] = None,
+        model_name: Optional[str] = None, generation_config: Any = None
+    ) -> str:
+        """Key covering every message part (incl. function calls/responses), tools and generation config."""
+        return build_cache_key(
+            messages,
+            model_name or self.model_name,
+            tools=tools,
+            generation_config=generation_config if generation_config is not None else getattr(self, 'generation_config', None),
+            system_prompt=getattr(self.config, 'DEFAULT_SYSTEM_PROMPT', None),
+        )
+
+    async def _stream_sdk_response(
+        self, sdk_messages: List[Any], generation_config: Any, tools: Optional[ToolType],
+        tool_config: Any, llm_call_id: str
+    ) -> AsyncIterable[GenerateContentResponseType]:
+        """
+        Run the blocking SDK streaming call on a worker thread and yield its chunks.
+
+        Holds one of the process-wide LLM call slots for the whole stream. If the
+        consumer stops early (turn abandoned, task cancelled), the worker stops
+        reading the SDK stream after its current chunk.
+        """
+        slots = _get_llm_call_slots(self.max_concurrent_calls)
+        wait_start = time.monotonic()
+        async with slots:
+            waited_ms = int((time.monotonic() - wait_start) * 1000)
+            if waited_ms > 50:
+                log.info(f"LLM Call [{llm_call_id}] - Waited {waited_ms}ms for an LLM call slot (limit {self.max_concurrent_calls}).")
+
+            def open_stream() -> Iterable[Any]:
+                return self.model.generate_content(
+                    sdk_messages,
+                    generation_config=generation_config,
+                    tools=tools,
+                    stream=True,
+                    request_options={"timeout": self.timeout},
+                    tool_config=tool_config
+                )
+
+            cancel_event = threading.Event()
+            chunks = iterate_in_thread(open_stream, cancel_event=cancel_event, thread_name=f"llm-stream-{llm_call_id}")
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
 
     async def generate_content(
         self, messages: List[RuntimeContentType], app_state: Optional[AppState] = None,
@@ -605,10 +667,11 @@ class LLMInterface:
         if self.CACHE_ENABLED:
             try:
                 cache_key = self._create_cache_key(messages, tools, self.model_name)
-                if cache_key in self.response_cache:
+                cached_events = await self.response_cache.get(cache_key)
+                if cached_events is not None:
                     log.info(f"LLM Call [{llm_call_id}] - Cache HIT: {cache_key[:10]}...")
-                    for event_part in self.response_cache[cache_key]: yield event_part
-                    self.response_cache[cache_key] = self.response_cache.pop(cache_key)
+                    for event_part in cached_events: yield event_part
+                    yield {"type": "completed", "content": {"status": "COMPLETED_OK", "cached": True}}
                     clear_llm_call_id(); return
                 log.info(f"LLM Call [{llm_call_id}] - Cache MISS: {cache_key[:10]}...")
             except Exception as e_cache: log.warning(f"LLM Call [{llm_call_id}] - Cache error: {e_cache}. Proceeding without.", exc_info=True); cache_key = None
@@ -616,7 +679,11 @@ class LLMInterface:
         prepared_tools_sdk: Optional[ToolType] = None
         if tools:
             try:
-                prepared_tools_sdk = self.prepare_tools_for_sdk(tools, query=query, app_state=app_state)
+                # Embed the query off the event loop (cached + micro-batched) before the sync selection step
+                query_embedding = None
+                if query and hasattr(self.tool_selector, 'embed_query_async') and not is_greeting_or_chitchat(query.strip().lower()):
+                    query_embedding = await self.tool_selector.embed_query_async(query)
+                prepared_tools_sdk = self.prepare_tools_for_sdk(tools, query=query, app_state=app_state, query_embedding=query_embedding)
                 if prepared_tools_sdk and hasattr(prepared_tools_sdk, 'function_declarations'): log.info(f"LLM Call [{llm_call_id}] - Tools for SDK: {[decl.name for decl in prepared_tools_sdk.function_declarations]}") # type: ignore
                 else: log.info(f"LLM Call [{llm_call_id}] - No tools prepared for SDK.")
             except Exception as e_tool_prep:
@@ -644,96 +711,99 @@ class LLMInterface:
                 if prepared_tools_sdk and hasattr(glm, 'ToolConfig') and hasattr(glm, 'FunctionCallingConfig'):
                     tool_config_for_api = glm.ToolConfig(function_calling_config=glm.FunctionCallingConfig(mode=glm.FunctionCallingConfig.Mode.AUTO))
 
-                api_response_stream = self.model.generate_content(
+                api_response_stream = self._stream_sdk_response(
                     sdk_messages,
                     generation_config=current_generation_config,
                     tools=prepared_tools_sdk,
-                    stream=True,
-                    request_options={"timeout": self.timeout},
-                    tool_config=tool_config_for_api
+                    tool_config=tool_config_for_api,
+                    llm_call_id=llm_call_id
                 )
 
                 all_chunks_for_cache: List[Dict[str, Any]] = []
-                for sdk_response_chunk_obj in api_response_stream: # sdk_response_chunk_obj is GenerateContentResponse
-                    try:
-                        # Convert the entire GenerateContentResponse chunk from SDK to dict immediately
-                        response_chunk_dict = sdk_response_chunk_obj.to_dict() if hasattr(sdk_response_chunk_obj, 'to_dict') else {}
-
-                        # Now operate on response_chunk_dict
-                        text_from_chunk = response_chunk_dict.get('text')
-                        if text_from_chunk: # Check if text key exists and is not empty
-                            event = {"type": "text_chunk", "content": text_from_chunk}
-                            all_chunks_for_cache.append(event); yield event
+                try:
+                    async for sdk_response_chunk_obj in api_response_stream: # sdk_response_chunk_obj is GenerateContentResponse
+                        try:
+                            # Convert the entire GenerateContentResponse chunk from SDK to dict immediately
+                            response_chunk_dict = sdk_response_chunk_obj.to_dict() if hasattr(sdk_response_chunk_obj, 'to_dict') else {}
+
+                            # Now operate on response_chunk_dict
+                            text_from_chunk = response_chunk_dict.get('text')
+                            if text_from_chunk: # Check if text key exists and is not empty
+                                event = {"type": "text_chunk", "content": text_from_chunk}
+                                all_chunks_for_cache.append(event); yield event
                         
-                        candidates_list_from_dict = response_chunk_dict.get('candidates')
-                        if candidates_list_from_dict: # Check if candidates key exists and is not empty
-                            for candidate_dict in candidates_list_from_dict: # candidate_dict is a dict from a Candidate
-                                content_dict = candidate_dict.get('content', {}) # content_dict is a dict from a Content
-                                list_of_part_dicts = content_dict.get('parts', []) # list_of_part_dicts is list of dicts from Parts
+                            candidates_list_from_dict = response_chunk_dict.get('candidates')
+                            if candidates_list_from_dict: # Check if candidates key exists and is not empty
+                                for candidate_dict in candidates_list_from_dict: # candidate_dict is a dict from a Candidate
+                                    content_dict = candidate_dict.get('content', {}) # content_dict is a dict from a Content
+                                    list_of_part_dicts = content_dict.get('parts', []) # list_of_part_dicts is list of dicts from Parts
                                 
-                                for part_dict in list_of_part_dicts: # part_dict is a dict from a Part
-                                    # ---- SAFE processing of each part_dict (from user's original fix) ----
-                                    try:
-                                        fc_dict = part_dict.get("functionCall")  # camel-case in SDK
-                                        if fc_dict:
-                                            # ---------- it really is a function-call part ----------
-                                            fn_name = fc_dict.get("name")
-                                            if fn_name:
-                                                args_dict = safe_extract_function_call(
-                                                    fc_dict.get("args", {})
-                                                )
-                                                fc_event = {
-                                                    "id": f"tc_{uuid.uuid4().hex[:8]}",
-                                                    "function": {"name": fn_name, "arguments": args_dict},
-                                                }
-                                                event = {"type": "tool_calls", "content": [fc_event]}
+                                    for part_dict in list_of_part_dicts: # part_dict is a dict from a Part
+                                        # ---- SAFE processing of each part_dict (from user's original fix) ----
+                                        try:
+                                            fc_dict = part_dict.get("functionCall")  # camel-case in SDK
+                                            if fc_dict:
+                                                # ---------- it really is a function-call part ----------
+                                                fn_name = fc_dict.get("name")
+                                                if fn_name:
+                                                    args_dict = safe_extract_function_call(
+                                                        fc_dict.get("args", {})
+                                                    )
+                                                    fc_event = {
+                                                        "id": f"tc_{uuid.uuid4().hex[:8]}",
+                                                        "function": {"name": fn_name, "arguments": args_dict},
+                                                    }
+                                                    event = {"type": "tool_calls", "content": [fc_event]}
+                                                    all_chunks_for_cache.append(event)
+                                                    yield event
+                                                    log.info(
+                                                        f"LLM Call [{llm_call_id}] - Processed tool call: {fn_name}"
+                                                    )
+                                                # If fn_name missing, just ignore—malformed but harmless
+                                                continue  # go to next part_dict
+
+                                            # ---------- plain text (or something else) ----------
+                                            text_payload = part_dict.get("text")
+                                            if text_payload:
+                                                event = {"type": "text_chunk", "content": text_payload}
                                                 all_chunks_for_cache.append(event)
                                                 yield event
-                                                log.info(
-                                                    f"LLM Call [{llm_call_id}] - Processed tool call: {fn_name}"
-                                                )
-                                            # If fn_name missing, just ignore—malformed but harmless
-                                            continue  # go to next part_dict
-
-                                        # ---------- plain text (or something else) ----------
-                                        text_payload = part_dict.get("text")
-                                        if text_payload:
-                                            event = {"type": "text_chunk", "content": text_payload}
-                                            all_chunks_for_cache.append(event)
-                                            yield event
-
-                                        # Anything else (images, citations, etc.) is skipped for now.
-
-                                    except Exception as e_inner_part_processing:
-                                        # Absolutely no fatal exits here—log and continue
-                                        log.error(
-                                            f"LLM Call [{llm_call_id}] - Skipped a response part_dict due to "
-                                            f"parsing error: {e_inner_part_processing}",
-                                            exc_info=True, # Keep exc_info=True for detailed debugging
-                                        )
-                                        continue
-                                    # --------------------------------------------------------------------
-                    except Exception as e_stream_part_iteration: # Outer catch for errors during chunk iteration/processing
-                        err_str = str(e_stream_part_iteration)
-                        log.error(f"LLM Call [{llm_call_id}] - Error processing streamed GenerateContentResponse chunk: {err_str}", exc_info=True)
-                        # If this outer exception is hit, it might be due to sdk_response_chunk_obj.to_dict() failing
-                        # or some other issue not caught by the inner part processing.
-                        # Avoid re-throwing "function_call" errors if they somehow still occur here,
-                        # as the primary goal is robust handling of those.
-                        if "functionCall" not in err_str and "function_call" not in err_str:
-                            recovery_msg = "Problem processing LLM response stream chunk."
-                            # Use a more specific error code if this path is hit.
-                            error_event = {"type": "error", "content": {"code": "STREAM_CHUNK_PROCESSING_ERROR", "message": recovery_msg}}
-                            all_chunks_for_cache.append(error_event); yield error_event
-                        # No critical stop here to allow other parts of the stream (if any) to be processed if possible,
-                        # unless the error is from the .to_dict() call itself, in which case the loop might break.
-
-                if self.CACHE_ENABLED and cache_key and all_chunks_for_cache:
-                    if len(self.response_cache) >= self.CACHE_MAX_SIZE:
-                        try: self.response_cache.pop(next(iter(self.response_cache)))
-                        except: pass
-                    self.response_cache[cache_key] = all_chunks_for_cache
-                    log.info(f"LLM Call [{llm_call_id}] - Response cached: {cache_key[:10]}...")
+
+                                            # Anything else (images, citations, etc.) is skipped for now.
+
+                                        except Exception as e_inner_part_processing:
+                                            # Absolutely no fatal exits here—log and continue
+                                            log.error(
+                                                f"LLM Call [{llm_call_id}] - Skipped a response part_dict due to "
+                                                f"parsing error: {e_inner_part_processing}",
+                                                exc_info=True, # Keep exc_info=True for detailed debugging
+                                            )
+                                            continue
+                                        # --------------------------------------------------------------------
+                        except Exception as e_stream_part_iteration: # Outer catch for errors during chunk iteration/processing
+                            err_str = str(e_stream_part_iteration)
+                            log.error(f"LLM Call [{llm_call_id}] - Error processing streamed GenerateContentResponse chunk: {err_str}", exc_info=True)
+                            # If this outer exception is hit, it might be due to sdk_response_chunk_obj.to_dict() failing
+                            # or some other issue not caught by the inner part processing.
+                            # Avoid re-throwing "function_call" errors if they somehow still occur here,
+                            # as the primary goal is robust handling of those.
+                            if "functionCall" not in err_str and "function_call" not in err_str:
+                                recovery_msg = "Problem processing LLM response stream chunk."
+                                # Use a more specific error code if this path is hit.
+                                error_event = {"type": "error", "content": {"code": "STREAM_CHUNK_PROCESSING_ERROR", "message": recovery_msg}}
+                                all_chunks_for_cache.append(error_event); yield error_event
+                            # No critical stop here to allow other parts of the stream (if any) to be processed if possible,
+                            # unless the error is from the .to_dict() call itself, in which case the loop might break.
+                finally:
+                    # Release the LLM call slot and stop the SDK worker even if our consumer bailed out
+                    await api_response_stream.aclose()
+
+                # Responses that hit chunk-processing errors are not worth replaying
+                if self.CACHE_ENABLED and cache_key and all_chunks_for_cache and not any(e.get("type") == "error" for e in all_chunks_for_cache):
+                    try:
+                        await self.response_cache.set(cache_key, all_chunks_for_cache)
+                        log.info(f"LLM Call [{llm_call_id}] - Response cached: {cache_key[:10]}...")
+                    except Exception as e_cache: log.warning(f"LLM Call [{llm_call_id}] - Failed to cache response: {e_cache}")
                 log.info(f"LLM Call [{llm_call_id}] - Stream completed successfully.")
                 yield {"type": "completed", "content": {"status": "COMPLETED_OK"}}
                 clear_llm_call_id(); return
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Move conversation messages from existing state blobs into the message log.
+
+With MESSAGE_LOG_ENABLED=true each conversation is moved on its next save;
+this script does all of them at once. It reads and re-saves every stored
+state through MessageLogStorage, using the configured MEMORY_TYPE and
+STATE_DB_PATH / REDIS_* settings. States already in the log are not rewritten.
+
+Once moved, the state blobs no longer hold the messages, so keep
+MESSAGE_LOG_ENABLED=true afterwards.
+
+Usage:
+    python scripts/backfill_message_log.py [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bot_core.message_log import DEFAULT_STATE_PROPERTY, MessageLogStorage, RedisMessageLog, SQLiteMessageLog
+from bot_core.my_bot import SQLiteStorage
+from bot_core.state_codec import StateCodec
+from config import get_config
+
+
+async def list_keys(config) -> list:
+    if config.settings.memory_type == "redis":
+        from bot_core.redis_storage import NON_STATE_KEY_PREFIXES, create_redis_client
+        client = await create_redis_client(config.settings)
+        prefix = config.settings.redis_prefix or ""
+        skipped = tuple(f"{prefix}{non_state}" for non_state in NON_STATE_KEY_PREFIXES)
+        keys = [key[len(prefix):] async for key in client.scan_iter(match=f"{prefix}*") if not key.startswith(skipped)]
+        await client.close()
+        return keys
+    with sqlite3.connect(config.STATE_DB_PATH) as conn:
+        return [f"{namespace}/{id_}" for namespace, id_ in conn.execute("SELECT namespace, id FROM bot_state")]
+
+
+def build_storage(config) -> MessageLogStorage:
+    settings = config.settings
+    codec = StateCodec.from_settings(settings)
+    if settings.memory_type == "redis":
+        from bot_core.redis_storage import RedisStorage
+        inner, message_log = RedisStorage(app_settings=settings, codec=codec), RedisMessageLog(settings)
+    else:
+        inner, message_log = SQLiteStorage(db_path=config.STATE_DB_PATH, codec=codec), SQLiteMessageLog(config.STATE_DB_PATH)
+    return MessageLogStorage(inner, message_log, tail_size=settings.message_log_tail_size)
+
+
+async def backfill(dry_run: bool) -> None:
+    config = get_config()
+    keys = await list_keys(config)
+    storage = build_storage(config)
+    moved = 0
+    try:
+        for key in keys:
+            item = (await storage.read([key])).get(key)
+            state = item.get(DEFAULT_STATE_PROPERTY) if isinstance(item, dict) else None
+            if not isinstance(state, dict) or state.get("message_log_length") or not state.get("messages"):
+                continue
+            print(f"{'Would move' if dry_run else 'Moving'} {len(state['messages'])} messages of {key}")
+            if not dry_run:
+                await storage.write({key: item})
+            moved += 1
+    finally:
+        await storage.aclose()
+    print(f"✅ {moved} of {len(keys)} stored states {'need' if dry_run else 'moved to'} the message log")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only report which states would be moved")
+    asyncio.run(backfill(parser.parse_args().dry_run))
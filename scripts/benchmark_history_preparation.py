@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+History Preparation Benchmark
+Measures prepare_messages_for_llm_from_appstate latency per turn on
+conversations of 50, 200 and 1,000 messages.
+
+"full" converts every message (conversion cache cleared before each run,
+which is what every turn cost before incremental preparation). "incremental"
+simulates the next turn: the AppState is reloaded from its serialized form,
+two messages are appended, and only those are converted.
+
+Usage:
+    python scripts/benchmark_history_preparation.py [--repeats 20]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core_logic import history_utils
+from core_logic.history_utils import prepare_messages_for_llm_from_appstate
+from state_models import AppState, Message
+
+SIZES = [50, 200, 1000]
+
+
+def build_state(n_messages: int) -> AppState:
+    state = AppState(session_id=f"bench-{n_messages}")
+    for i in range(n_messages):
+        if i % 4 == 3:
+            message = Message(role="tool", parts=[{"type": "text", "text": f'{{"issues": ["PROJ-{i}"], "summary": "{"detail " * 60}"}}'}])
+        else:
+            message = Message(role="user" if i % 2 == 0 else "assistant", parts=[{"type": "text", "text": f"message {i} " + "word " * 40}])
+        state.messages.append(message)
+    return state
+
+
+def next_turn(serialized: dict) -> AppState:
+    """Reload the state as a new turn would, then append a user/assistant exchange."""
+    state = AppState.model_validate(serialized)
+    state.messages.append(Message(role="user", parts=[{"type": "text", "text": "and what about the next sprint?"}]))
+    state.messages.append(Message(role="assistant", parts=[{"type": "text", "text": "Here is the plan for the next sprint."}]))
+    return state
+
+
+def measure(prepare: Callable[[], None], repeats: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        prepare()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=20, help="Runs per measurement (median reported)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'messages':>8} | {'full (ms)':>10} | {'incremental (ms)':>16} | {'speedup':>7}")
+    print("-" * 52)
+    for size in SIZES:
+        state = build_state(size)
+        serialized = state.model_dump(mode="json")
+        # Send the whole conversation so the cost scales with its length
+        limits = dict(config_max_history_items=size + 10, config_token_budget=0)
+
+        def full() -> None:
+            history_utils._history_conversion_cache.clear()
+            prepare_messages_for_llm_from_appstate(next_turn(serialized), **limits)
+
+        history_utils._history_conversion_cache.clear()
+        prepare_messages_for_llm_from_appstate(AppState.model_validate(serialized), **limits)  # Previous turn
+
+        def incremental() -> None:
+            prepare_messages_for_llm_from_appstate(next_turn(serialized), **limits)
+
+        # Reloading the state is paid in both modes; measure it separately and subtract
+        reload_ms = measure(lambda: next_turn(serialized), args.repeats)
+        full_ms = measure(full, args.repeats) - reload_ms
+        incremental_ms = measure(incremental, args.repeats) - reload_ms
+        print(f"{size:>8} | {full_ms:>10.2f} | {incremental_ms:>16.2f} | {full_ms / max(incremental_ms, 1e-6):>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
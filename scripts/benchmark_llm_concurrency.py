@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+LLM Concurrency Load Test
+Simulates N concurrent conversations against a local fake Gemini model in
+which one conversation's completion is slow, and reports the latency seen
+by the other conversations.
+
+Compares the legacy transport (SDK stream iterated on the event loop) with
+the threaded transport used by LLMInterface.generate_content_stream.
+
+Usage:
+    python scripts/benchmark_llm_concurrency.py [--sessions 20] [--slow-seconds 3]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import List
+from unittest.mock import Mock
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import Config
+from llm_interface import LLMInterface
+from state_models import AppState
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+    def to_dict(self):
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+
+
+class FakeModel:
+    """Blocking streaming model: prompts containing 'slow' take much longer per chunk."""
+
+    def __init__(self, fast_chunk_seconds: float, slow_chunk_seconds: float, chunks: int = 5):
+        self.fast_chunk_seconds = fast_chunk_seconds
+        self.slow_chunk_seconds = slow_chunk_seconds
+        self.chunks = chunks
+
+    def generate_content(self, messages, **kwargs):
+        prompt = messages[-1]["parts"][0]["text"]
+        delay = self.slow_chunk_seconds if "slow" in prompt else self.fast_chunk_seconds
+
+        def stream():
+            for i in range(self.chunks):
+                time.sleep(delay)
+                yield FakeChunk(f"chunk{i} ")
+        return stream()
+
+
+async def legacy_stream_sdk_response(self, sdk_messages, generation_config, tools, tool_config, llm_call_id):
+    """The pre-threading transport: blocking iteration directly on the event loop."""
+    for chunk in self.model.generate_content(sdk_messages, stream=True):
+        yield chunk
+
+
+def build_llm(model: FakeModel, sessions: int) -> LLMInterface:
+    config = Mock(spec=Config)
+    config.GEMINI_API_KEY = "benchmark-key"
+    config.GEMINI_MODEL = "gemini-1.5-flash"
+    config.DEFAULT_API_TIMEOUT_SECONDS = 30
+    config.DEFAULT_API_MAX_RETRIES = 0
+    config.DEFAULT_SYSTEM_PROMPT = "Benchmark assistant."
+    config.LLM_MAX_CONCURRENT_CALLS = sessions
+    config.TOOL_SELECTOR = {"enabled": False}
+    config.SCHEMA_OPTIMIZATION = {}
+    llm = LLMInterface(config)
+    llm.CACHE_ENABLED = False
+    llm.model = model
+    return llm
+
+
+async def run_session(llm: LLMInterface, prompt: str, arrival: float) -> float:
+    """Latency from the moment the message arrived until the reply finished."""
+    messages = [{"role": "user", "parts": [{"text": prompt}]}]
+    async for _ in llm.generate_content_stream(messages, AppState()):
+        pass
+    return time.perf_counter() - arrival
+
+
+async def run_load(llm: LLMInterface, sessions: int) -> List[float]:
+    start = time.perf_counter()
+    slow = asyncio.create_task(run_session(llm, "slow request", start))
+    # The other conversations arrive just after the slow call started; if the
+    # loop is blocked they cannot even begin until it is released
+    await asyncio.sleep(0.01)
+    arrival = start + 0.01
+    fast = await asyncio.gather(*(run_session(llm, f"request {i}", arrival) for i in range(sessions - 1)))
+    await slow
+    return list(fast)
+
+
+def summarize(label: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"{label:>9} | {statistics.median(ordered) * 1000:>9.0f} | {p95 * 1000:>9.0f} | {ordered[-1] * 1000:>9.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated conversations")
+    parser.add_argument("--slow-seconds", type=float, default=3.0, help="Total duration of the slow completion")
+    parser.add_argument("--fast-ms", type=float, default=20.0, help="Per-chunk latency of normal completions")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # Per-call INFO logs would swamp the table
+
+    model = FakeModel(args.fast_ms / 1000.0, args.slow_seconds / 5)
+    print(f"{args.sessions} sessions, one slow completion of {args.slow_seconds:.1f}s; latency of the other sessions (ms)")
+    print(f"{'transport':>9} | {'p50':>9} | {'p95':>9} | {'max':>9}")
+    print("-" * 45)
+
+    llm = build_llm(model, args.sessions)
+    original = LLMInterface._stream_sdk_response
+    LLMInterface._stream_sdk_response = legacy_stream_sdk_response  # type: ignore[assignment]
+    try:
+        summarize("legacy", asyncio.run(run_load(llm, args.sessions)))
+    finally:
+        LLMInterface._stream_sdk_response = original  # type: ignore[assignment]
+    summarize("threaded", asyncio.run(run_load(llm, args.sessions)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Permission Check Micro-Benchmark
+Measures the per-call overhead of @requires_permission for sync and async
+tools, called from a running event loop (as ToolExecutor does), against the
+legacy path: a new ThreadPoolExecutor plus asyncio.run per sync call, and a
+role parse plus set lookup per check.
+
+Usage:
+    python scripts/benchmark_permission_checks.py [--calls 2000]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import state_models
+from state_models import AppState
+from user_auth import tool_access
+from user_auth.models import UserProfile
+from user_auth.permissions import ROLE_PERMISSIONS, Permission, UserRole
+from user_auth.tool_access import requires_permission
+
+PERMISSION = Permission.GITHUB_READ_REPO
+
+
+class BenchTools:
+    @requires_permission(PERMISSION)
+    def sync_tool(self, app_state, value):
+        return value
+
+    @requires_permission(PERMISSION)
+    async def async_tool(self, app_state, value):
+        return value
+
+
+def legacy_has_permission(app_state: AppState, permission: Permission) -> bool:
+    """The check PermissionManager.has_permission did for every call."""
+    try:
+        role = UserRole(app_state.current_user.assigned_role.upper())
+    except ValueError:
+        role = UserRole.NONE
+    return permission in ROLE_PERMISSIONS.get(role, set())
+
+
+def legacy_sync_call(func, app_state, value):
+    """The old sync_wrapper: a fresh executor and event loop per call when a loop is running."""
+    async def check_and_call():
+        if not legacy_has_permission(app_state, PERMISSION):
+            return {"status": "PERMISSION_DENIED"}
+        return func(None, app_state, value)
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        return executor.submit(lambda: asyncio.run(check_and_call())).result()
+
+
+async def legacy_async_call(func, app_state, value):
+    if not legacy_has_permission(app_state, PERMISSION):
+        return {"status": "PERMISSION_DENIED"}
+    return await func(None, app_state, value)
+
+
+async def measure(label: str, calls: int, call) -> None:
+    start = time.perf_counter()
+    for i in range(calls):
+        result = call(i)
+        if asyncio.iscoroutine(result):
+            await result
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1e6 / calls:>10.1f} us/call")
+
+
+async def main(calls: int) -> None:
+    config = SimpleNamespace(settings=SimpleNamespace(security_rbac_enabled=True))
+    tool_access.get_config = lambda: config
+    state_models.get_config = lambda: config
+
+    app_state = AppState(session_id="bench", current_user=UserProfile(user_id="u1", display_name="Bench", assigned_role="DEVELOPER"))
+    tools = BenchTools()
+    raw_sync = BenchTools.sync_tool.__wrapped__
+    raw_async = BenchTools.async_tool.__wrapped__
+
+    print(f"Permission check overhead over {calls} calls (RBAC enabled, role DEVELOPER)")
+    await measure("sync tool, legacy", max(1, calls // 10), lambda i: legacy_sync_call(raw_sync, app_state, i))
+    await measure("sync tool, requires_permission", calls, lambda i: tools.sync_tool(app_state=app_state, value=i))
+    await measure("async tool, legacy", calls, lambda i: legacy_async_call(raw_async, app_state, i))
+    await measure("async tool, requires_permission", calls, lambda i: tools.async_tool(app_state=app_state, value=i))
+    await measure("undecorated sync call", calls, lambda i: raw_sync(tools, app_state, i))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().calls))
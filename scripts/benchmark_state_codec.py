@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+State Codec Benchmark
+Encodes and decodes a conversation StoreItem (AppState with a long message
+history) with each StateCodec configuration and reports stored size and
+per-turn encode/decode time, including AppState.model_validate on read.
+
+The "legacy_json" row is the format written before the codec existed
+(model_dump + json.dumps / json.loads).
+
+Usage:
+    python scripts/benchmark_state_codec.py [--messages 400] [--repeats 20]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bot_core.state_codec import MSGPACK_AVAILABLE, ZSTD_AVAILABLE, StateCodec
+from state_models import AppState
+
+STATE_PROPERTY = "AugieConversationState"
+
+
+def build_item(messages: int) -> dict:
+    state = AppState(session_id="bench")
+    for i in range(messages):
+        state.add_message(role="user" if i % 2 == 0 else "assistant", content=f"message {i} " + "word " * 60)
+    return {STATE_PROPERTY: state, "e_tag": "*"}
+
+
+def measure(codec: StateCodec, item: dict, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        encoded = codec.encode(item)
+    encode_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        AppState.model_validate(codec.decode(encoded)[STATE_PROPERTY])
+    decode_ms = (time.perf_counter() - start) * 1000 / repeats
+    return len(encoded), encode_ms, decode_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=400, help="Messages in the conversation state")
+    parser.add_argument("--repeats", type=int, default=20, help="Encode/decode rounds per codec")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    configs = [("legacy_json", "none"), ("orjson", "none"), ("orjson", "zlib")]
+    if MSGPACK_AVAILABLE:
+        configs.append(("msgpack", "none"))
+    if ZSTD_AVAILABLE:
+        configs.append(("orjson", "zstd"))
+
+    item = build_item(args.messages)
+    print(f"{'codec':>20} | {'size (KB)':>9} | {'encode (ms)':>11} | {'decode+validate (ms)':>20}")
+    print("-" * 70)
+    for encoding, compression in configs:
+        size, encode_ms, decode_ms = measure(StateCodec(encoding, compression), item, args.repeats)
+        print(f"{encoding + '/' + compression:>20} | {size / 1024:>9.1f} | {encode_ms:>11.2f} | {decode_ms:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
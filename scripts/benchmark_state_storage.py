@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+State Storage Throughput Benchmark
+Simulates 1, 10 and 100 concurrent conversations, each running turns that
+read its conversation state, append a message and save it, and reports
+turns/second plus the worst event-loop stall observed during the run.
+
+Compares SQLiteStorage (blocking sqlite3 calls on the event loop) with
+AsyncSQLiteStorage (read pool + group-committing writer thread), each on a
+fresh database file.
+
+Usage:
+    python scripts/benchmark_state_storage.py [--turns 20] [--history 40]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bot_core.async_sqlite_storage import AsyncSQLiteStorage
+from bot_core.my_bot import SQLiteStorage
+from state_models import AppState
+
+CONVERSATIONS = [1, 10, 100]
+STATE_PROPERTY = "AugieConversationState"
+
+
+def seed_state(session_id: str, history: int) -> AppState:
+    state = AppState(session_id=session_id)
+    for i in range(history):
+        state.add_message(role="user" if i % 2 == 0 else "assistant", content=f"message {i} " + "word " * 30)
+    return state
+
+
+async def run_conversation(storage, key: str, turns: int) -> None:
+    for turn in range(turns):
+        item = (await storage.read([key]))[key]
+        state = AppState.model_validate(item[STATE_PROPERTY])
+        state.add_message(role="user", content=f"turn {turn}")
+        await storage.write({key: {STATE_PROPERTY: state, "e_tag": "*"}})
+
+
+async def measure_loop_stall(stop: asyncio.Event) -> float:
+    """Longest gap between ticks of a 5ms timer, i.e. how long the loop was blocked."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - start - 0.005)
+    return worst
+
+
+async def run(make_storage: Callable[[str], object], conversations: int, turns: int, history: int) -> Tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = make_storage(os.path.join(tmp, "state.sqlite"))
+        keys = [f"msteams/conversations/bench-{i}" for i in range(conversations)]
+        await storage.write({key: {STATE_PROPERTY: seed_state(key, history), "e_tag": "*"} for key in keys})
+
+        stop = asyncio.Event()
+        stall_probe = asyncio.create_task(measure_loop_stall(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(storage, key, turns) for key in keys))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        worst_stall = await stall_probe
+        storage.close()
+    return conversations * turns / elapsed, worst_stall * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--history", type=int, default=40, help="Messages already in each conversation")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    backends = {
+        "SQLiteStorage": lambda path: SQLiteStorage(db_path=path),
+        "AsyncSQLiteStorage": lambda path: AsyncSQLiteStorage(path),
+    }
+    print(f"{'conversations':>13} | {'backend':>18} | {'turns/s':>8} | {'worst loop stall (ms)':>21}")
+    print("-" * 70)
+    for conversations in CONVERSATIONS:
+        for name, make_storage in backends.items():
+            turns_per_second, stall_ms = asyncio.run(run(make_storage, conversations, args.turns, args.history))
+            print(f"{conversations:>13} | {name:>18} | {turns_per_second:>8.0f} | {stall_ms:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
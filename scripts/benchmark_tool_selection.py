@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tool Selection Micro-Benchmark
+Measures per-query scoring latency of the vectorized ToolSimilarityIndex
+against the legacy per-tool loop at 10, 100 and 1,000 registered tools.
+
+Uses synthetic embeddings so it runs without sentence-transformers.
+
+Usage:
+    python scripts/benchmark_tool_selection.py [--dim 384] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from core_logic.tool_index import ToolSimilarityIndex
+from core_logic.tool_selector import ToolSelector
+
+SERVICES = ["github", "jira", "greptile", "perplexity", "misc"]
+QUERIES = [
+    "show my open jira tickets",
+    "list my github repositories",
+    "search code for the login function",
+    "what is the latest news on python",
+    "summarize the database table design",
+]
+
+
+def build_catalog(n_tools: int, dim: int, rng) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    tool_defs: List[Dict[str, Any]] = []
+    embeddings: Dict[str, Any] = {}
+    for i in range(n_tools):
+        service = SERVICES[i % len(SERVICES)]
+        name = f"{service}_tool_{i}"
+        tool_defs.append({
+            "name": name,
+            "description": f"Synthetic {service} tool {i}",
+            "metadata": {
+                "keywords": [f"{service}", f"keyword {i % 11}"],
+                "categories": [service],
+            },
+        })
+        embeddings[name] = rng.normal(size=dim)
+    return tool_defs, embeddings
+
+
+def legacy_scores(selector: ToolSelector, query: str, query_embedding, tool_name_to_def, embeddings):
+    """The per-tool loop ToolSelector.select_tools used before the index."""
+    similarities = []
+    for tool_name, tool_embedding_data in embeddings.items():
+        if tool_name not in tool_name_to_def:
+            continue
+        tool_embedding = np.array(tool_embedding_data)
+        norm_query = np.linalg.norm(query_embedding)
+        norm_tool = np.linalg.norm(tool_embedding)
+        if norm_query == 0 or norm_tool == 0:
+            similarity = 0.0
+        else:
+            similarity = np.dot(query_embedding, tool_embedding) / (norm_query * norm_tool)
+        keyword_boost = selector._check_direct_keyword_match(query, tool_name_to_def[tool_name])
+        if keyword_boost > 0:
+            similarity = similarity + keyword_boost
+        if tool_name in ("search_web", "perplexity_web_search"):
+            if similarity > selector.similarity_threshold and similarity < 0.8:
+                similarity = similarity * 0.85
+        for cat in selector._get_tool_categories(tool_name, tool_name_to_def[tool_name]):
+            if cat.lower() in [c.lower() for c in selector._extract_query_categories(query)]:
+                similarity += 0.1
+        if similarity >= selector.similarity_threshold:
+            similarities.append((tool_name, float(similarity)))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities
+
+
+def indexed_scores(selector: ToolSelector, index: ToolSimilarityIndex, query: str, query_embedding, tool_name_to_def):
+    profile = index.compile_profile(tool_name_to_def, selector._get_tool_categories)
+    return index.score_query(
+        query,
+        query_embedding,
+        profile,
+        query_categories=selector._extract_query_categories(query),
+        threshold=selector.similarity_threshold,
+    )
+
+
+def time_per_query(fn, n_queries: int) -> float:
+    start = time.perf_counter()
+    for i in range(n_queries):
+        fn(i)
+    return (time.perf_counter() - start) / n_queries * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (all-MiniLM-L6-v2 is 384)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        TOOL_SELECTOR={"similarity_threshold": 0.1, "cache_path": os.devnull},
+        SCHEMA_OPTIMIZATION={},
+    )
+    selector = ToolSelector(config)
+    rng = np.random.default_rng(42)
+    query_embeddings = [rng.normal(size=args.dim).astype(np.float32) for _ in QUERIES]
+
+    print(f"{'tools':>6} | {'legacy ms/query':>16} | {'index ms/query':>15} | {'speedup':>8} | ranking")
+    print("-" * 66)
+    for n_tools in (10, 100, 1000):
+        tool_defs, embeddings = build_catalog(n_tools, args.dim, rng)
+        tool_name_to_def = {t["name"]: t for t in tool_defs}
+        index = ToolSimilarityIndex.from_embeddings(embeddings)
+
+        same_ranking = all(
+            [n for n, _ in legacy_scores(selector, q, e, tool_name_to_def, embeddings)]
+            == [n for n, _ in indexed_scores(selector, index, q, e, tool_name_to_def)]
+            for q, e in zip(QUERIES, query_embeddings)
+        )
+
+        def run_legacy(i: int) -> None:
+            legacy_scores(selector, QUERIES[i % len(QUERIES)], query_embeddings[i % len(QUERIES)],
+                          tool_name_to_def, embeddings)
+
+        def run_index(i: int) -> None:
+            indexed_scores(selector, index, QUERIES[i % len(QUERIES)], query_embeddings[i % len(QUERIES)],
+                           tool_name_to_def)
+
+        # The legacy loop is slow at 1,000 tools, so it gets fewer iterations
+        legacy_ms = time_per_query(run_legacy, max(5, args.queries // max(1, n_tools // 10)))
+        index_ms = time_per_query(run_index, args.queries)
+        print(f"{n_tools:>6} | {legacy_ms:>16.3f} | {index_ms:>15.3f} | {legacy_ms / index_ms:>7.1f}x | "
+              f"{'identical' if same_ranking else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tool Selector Per-Turn Latency Benchmark
+Compares the per-turn cost of tool selection when every turn constructs its
+own ToolSelector (as _prepare_tool_definitions used to) against the shared,
+warmed-up selector from core_logic.tool_selector_registry.
+
+Uses sentence-transformers when installed. Otherwise a synthetic hashing
+encoder stands in, with --model-load-ms simulating the model load.
+
+Usage:
+    python scripts/benchmark_tool_selector_registry.py [--tools 60] [--turns 50] [--model-load-ms 800]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from core_logic import tool_selector as tool_selector_module
+from core_logic.tool_selector import ToolSelector
+from core_logic.tool_selector_registry import ToolSelectorRegistry
+
+QUERIES = [
+    "show my open jira tickets",
+    "list my github repositories",
+    "search code for the login function",
+    "what is the latest news on python",
+    "summarize the database table design",
+]
+
+
+def synthetic_model_class(load_ms: float, dim: int = 384):
+    class HashingEncoder:
+        def __init__(self, name):
+            time.sleep(load_ms / 1000.0)
+
+        def encode(self, text):
+            if isinstance(text, list):
+                return np.stack([self.encode(t) for t in text])
+            rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+            return rng.normal(size=dim).astype(np.float32)
+
+    return HashingEncoder
+
+
+def build_tools(n_tools: int):
+    services = ["github", "jira", "greptile", "perplexity", "misc"]
+    return [
+        {
+            "name": f"{services[i % len(services)]}_tool_{i}",
+            "description": f"Synthetic {services[i % len(services)]} tool {i}",
+            "metadata": {"keywords": [services[i % len(services)]]},
+        }
+        for i in range(n_tools)
+    ]
+
+
+def time_turns(turns: int, run_turn) -> float:
+    start = time.perf_counter()
+    for i in range(turns):
+        run_turn(QUERIES[i % len(QUERIES)])
+    return (time.perf_counter() - start) / turns * 1000.0
+
+
+def run(args, cache_dir: str) -> None:
+    config = SimpleNamespace(
+        TOOL_SELECTOR={
+            "similarity_threshold": 0.1,
+            "cache_path": os.path.join(cache_dir, "tool_embeddings.npy"),
+            "legacy_cache_path": os.path.join(cache_dir, "missing.json"),
+        },
+        SCHEMA_OPTIMIZATION={},
+    )
+    tools = build_tools(args.tools)
+
+    # Build the on-disk embedding cache once, like a previous run of the bot would have
+    ToolSelector(config).build_tool_embeddings(tools)
+
+    def per_turn_selector(query: str) -> None:
+        selector = ToolSelector(config)
+        selector.select_tools(query, app_state=None, available_tools=tools)
+        selector.query_embeddings.shutdown()
+
+    registry = ToolSelectorRegistry()
+    warm_start = time.perf_counter()
+    registry.warm_up(config, tools)
+    warm_up_ms = (time.perf_counter() - warm_start) * 1000.0
+
+    def shared_selector(query: str) -> None:
+        registry.get(config).select_tools(query, app_state=None, available_tools=tools)
+
+    before = time_turns(max(1, args.turns // 10), per_turn_selector)
+    after = time_turns(args.turns, shared_selector)
+    registry.close()
+
+    print(f"Tool selection latency per turn ({args.tools} tools)")
+    print(f"{'selector built per turn':<28} {before:>10.2f} ms/turn")
+    print(f"{'shared warmed-up selector':<28} {after:>10.2f} ms/turn  ({before / after:.0f}x)")
+    print(f"{'one-time startup warm-up':<28} {warm_up_ms:>10.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=60)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--model-load-ms", type=float, default=800.0,
+                        help="Simulated model load time when sentence-transformers is not installed")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # Per-turn selection logs would dominate the output
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if tool_selector_module.ML_DEPENDENCIES_AVAILABLE:
+            run(args, cache_dir)
+        else:
+            print("sentence-transformers not installed; using a synthetic encoder")
+            with patch.multiple(tool_selector_module, ML_DEPENDENCIES_AVAILABLE=True, np=np,
+                                SentenceTransformer=synthetic_model_class(args.model_load_ms)):
+                run(args, cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,17 @@ except ImportError as e:
     print(f"⚠️  Could not import bot modules: {e}")
     print("Some features may not work properly.")
 
+try:
+    from bot_core.state_codec import StateCodec
+    _state_codec = StateCodec()
+except ImportError:
+    _state_codec = None
+
+
+def decode_state(value):
+    """Decode a stored conversation value (StateCodec envelope or legacy JSON)."""
+    return _state_codec.decode(value) if _state_codec else json.loads(value)
+
 class DatabaseInspector:
     def __init__(self, config_path: str = None, environment: str = "auto"):
         """Initialize the database inspector.
@@ -241,7 +252,7 @@ class DatabaseInspector:
             for i, (key, value) in enumerate(key_info[:limit]):
                 print(f"\n💬 Conversation {i+1}: {key}")
                 try:
-                    data = json.loads(value)
+                    data = decode_state(value)
                     if isinstance(data, dict):
                         # Try to parse as AppState
                         session_id = data.get('session_id', 'Unknown')
@@ -298,13 +309,13 @@ class DatabaseInspector:
             for key in keys:
                 try:
                     value = r.get(key)
-                    if value and search_term.lower() in value.decode().lower():
+                    if value and search_term.lower() in json.dumps(decode_state(value)).lower():
                         found += 1
                         print(f"\n✅ Found in: {key.decode()}")
                         
                         # Try to show context
                         try:
-                            data = json.loads(value)
+                            data = decode_state(value)
                             if isinstance(data, dict) and 'messages' in data:
                                 for msg in data['messages']:
                                     if isinstance(msg, dict) and search_term.lower() in msg.get('content', '').lower():
@@ -371,7 +382,7 @@ class DatabaseInspector:
                 try:
                     value = r.get(key)
                     if value:
-                        export_data["conversations"][key.decode()] = json.loads(value)
+                        export_data["conversations"][key.decode()] = decode_state(value)
                 except Exception as e:
                     print(f"⚠️  Could not export key {key}: {e}")
                     
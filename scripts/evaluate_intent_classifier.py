@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Local Intent Model Evaluation
+Cross-validates the local intent model on the labeled examples and reports,
+for a range of confidence thresholds, how many messages it would answer
+without the LLM (coverage) and how accurate those answers are, plus
+per-intent precision/recall at the configured threshold and training and
+prediction latency.
+
+Context gating (onboarding answers only while a decision is pending) is not
+applied here; every intent is a candidate for every message.
+
+Usage:
+    python scripts/evaluate_intent_classifier.py [--examples data/intent_examples.jsonl] [--folds 5] [--threshold 0.8]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core_logic.intent_classifier import DEFAULT_INTENT_EXAMPLES_PATH, DEFAULT_LOCAL_CONFIDENCE_THRESHOLD
+from core_logic.local_intent_model import LocalIntentModel, read_examples
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+def cross_validate(examples, folds: int, seed: int) -> Tuple[List[Tuple[str, str, float]], List[float], List[float]]:
+    """Held-out ``(true, predicted, confidence)`` for every example, plus training and prediction times."""
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    predictions: List[Tuple[str, str, float]] = []
+    train_seconds: List[float] = []
+    predict_seconds: List[float] = []
+    for fold in range(folds):
+        held_out = shuffled[fold::folds]
+        training = [example for i, example in enumerate(shuffled) if i % folds != fold]
+        model = LocalIntentModel.train(training)
+        train_seconds.append(model.training_seconds)
+        for text, label in held_out:
+            started = time.perf_counter()
+            predicted, confidence = model.predict(text)
+            predict_seconds.append(time.perf_counter() - started)
+            predictions.append((label, predicted, confidence))
+    return predictions, train_seconds, predict_seconds
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", default=DEFAULT_INTENT_EXAMPLES_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_LOCAL_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    examples = read_examples(args.examples)
+    label_counts = Counter(label for _, label in examples)
+    print(f"{len(examples)} examples, {len(label_counts)} intents, {args.folds}-fold cross-validation")
+
+    predictions, train_seconds, predict_seconds = cross_validate(examples, args.folds, args.seed)
+    correct = sum(1 for true, predicted, _ in predictions if true == predicted)
+    print(f"Top-1 accuracy (no threshold): {correct / len(predictions):.1%}\n")
+
+    print(f"{'threshold':>9} | {'answered locally':>16} | {'accuracy when answered':>22}")
+    print("-" * 55)
+    for threshold in sorted(set(THRESHOLDS) | {args.threshold}):
+        answered = [(true, predicted) for true, predicted, confidence in predictions if confidence >= threshold]
+        accuracy = sum(1 for true, predicted in answered if true == predicted) / len(answered) if answered else 0.0
+        marker = "  <- configured" if threshold == args.threshold else ""
+        print(f"{threshold:>9.2f} | {len(answered) / len(predictions):>16.1%} | {accuracy:>22.1%}{marker}")
+
+    print(f"\nPer intent at threshold {args.threshold:.2f} (precision over local answers, recall over all examples):")
+    stats = defaultdict(lambda: {"tp": 0, "answered": 0})
+    for true, predicted, confidence in predictions:
+        if confidence >= args.threshold:
+            stats[predicted]["answered"] += 1
+            if true == predicted:
+                stats[predicted]["tp"] += 1
+    for label in sorted(label_counts):
+        tp, answered = stats[label]["tp"], stats[label]["answered"]
+        precision = f"{tp / answered:.1%}" if answered else "-"
+        print(f"  {label:<22} precision {precision:>6}  recall {tp / label_counts[label]:>6.1%}  ({label_counts[label]} examples)")
+
+    print(f"\nTraining: {statistics.mean(train_seconds) * 1000:.0f} ms per fold")
+    print(
+        f"Prediction: p50 {percentile(predict_seconds, 50) * 1e6:.0f} us, "
+        f"p95 {percentile(predict_seconds, 95) * 1e6:.0f} us, "
+        f"p99 {percentile(predict_seconds, 99) * 1e6:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ from pydantic_core import PydanticCustomError  # For custom validation errors
 log = logging.getLogger("state")
 
 from user_auth.models import UserProfile # Added import
-from user_auth.permissions import Permission, PermissionManager # Added imports
+from user_auth.permissions import ALL_PERMISSIONS_MASK, PERMISSION_BITS, Permission, PermissionManager, user_permission_mask # Added imports
 from config import get_config # Added for RBAC check
 
 # Import our new safe message handler
@@ -60,6 +60,35 @@ class FunctionResponsePart(BaseModel):
 
 MessagePart = Union[TextPart, FunctionCallPart, FunctionResponsePart]
 
+CHARS_PER_TOKEN = 4
+"""Rough characters-per-token ratio for Gemini on English text and JSON."""
+
+MESSAGE_TOKEN_OVERHEAD = 4
+"""Approximate per-message framing cost (role, part boundaries)."""
+
+
+def approximate_token_count(text: str) -> int:
+    """Cheap token estimate for prompt budgeting; no tokenizer call."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def part_text_for_token_count(part: Any) -> str:
+    """Text of a message part (model or dict) as the LLM would see it."""
+    if isinstance(part, BaseModel):
+        part = part.model_dump()
+    if not isinstance(part, dict):
+        return str(part)
+    if part.get("type") == "function_call" or "function_call" in part:
+        fc = part.get("function_call") or {}
+        return f"{fc.get('name', '')}{json.dumps(fc.get('args', {}), default=str)}"
+    if part.get("type") == "function_response" or "function_response" in part:
+        fr = part.get("function_response") or {}
+        content = (fr.get("response") or {}).get("content")
+        return f"{fr.get('name', '')}{content if isinstance(content, str) else json.dumps(content, default=str)}"
+    return str(part.get("text", ""))
+
 class Message(BaseModel):
     """Enhanced Message model with safe validation and backward compatibility"""
     model_config = ConfigDict(extra='forbid', validate_assignment=True)
@@ -78,6 +107,23 @@ class Message(BaseModel):
     message_type: Optional[str] = Field(default=None, description="Type of message for workflow context")
     tool_calls: Optional[List[Dict[str, Any]]] = Field(default=None, description="Tool calls if this is a model message with tools")
     tool_call_id: Optional[str] = Field(default=None, description="Tool call ID if this is a tool response")
+    log_seq: Optional[int] = Field(default=None, description="Position in the persisted message log (None until logged)")
+
+    # Cached approximate prompt cost; reset whenever the parts are reassigned
+    _token_count: Optional[int] = None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "parts":
+            self._token_count = None
+
+    def token_count(self) -> int:
+        """Approximate number of prompt tokens this message costs (cached)."""
+        if self._token_count is None:
+            self._token_count = MESSAGE_TOKEN_OVERHEAD + sum(
+                approximate_token_count(part_text_for_token_count(part)) for part in self.parts
+            )
+        return self._token_count
     
     # CRITICAL FIX: Add backward compatibility methods expected by legacy code
     def get(self, key: str, default: Any = None) -> Any:
@@ -119,7 +165,7 @@ class Message(BaseModel):
             for part in safe_msg.parts:
                 text_parts.append(TextPart(text=part.content, type="text"))
             
-            return {
+            validated = {
                 "role": safe_msg.role,
                 "parts": text_parts,
                 "raw_text": safe_msg.raw_text,
@@ -131,6 +177,14 @@ class Message(BaseModel):
                 "tool_calls": None,
                 "tool_call_id": None
             }
+            # Keep the message's identity when it is re-validated (e.g. state reloaded from storage)
+            source = value if isinstance(value, dict) else getattr(value, '__dict__', {})
+            for identity_field in ("id", "timestamp"):
+                if source.get(identity_field):
+                    validated[identity_field] = source[identity_field]
+            if source.get("log_seq") is not None:
+                validated["log_seq"] = source["log_seq"]
+            return validated
         except Exception as e:
             log.warning(f"Message validation fallback triggered: {e}")
             # Ultimate fallback
@@ -345,6 +399,11 @@ class AppState(BaseModel):
     session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+
+    # Message log bookkeeping (see bot_core/message_log.py): number of logged
+    # messages, and how many of the oldest are not loaded into `messages`
+    message_log_length: int = 0
+    message_log_offset: int = 0
     
     def add_message(self, role: str, content: Any) -> None:
         """Safely add a message with enhanced validation"""
@@ -582,10 +641,32 @@ class AppState(BaseModel):
             self._permission_manager_instance = PermissionManager(db_path=get_config().STATE_DB_PATH)
         return self._permission_manager_instance
 
+    # (profile, assigned_role, mask) of the current user; AppState and its profile are loaded per turn,
+    # so role permissions and custom grants are merged once per turn
+    _permission_mask_cache: Optional[Tuple[UserProfile, str, int]] = None
+
+    def permission_mask(self) -> int:
+        """Bitset of the current user's permissions (see user_auth.permissions.PERMISSION_BITS); 0 without a user."""
+        user = self.current_user
+        if not user:
+            return 0
+        cached = self._permission_mask_cache
+        if cached is not None and cached[0] is user and cached[1] == user.assigned_role:
+            return cached[2]
+        mask = user_permission_mask(user)
+        self._permission_mask_cache = (user, user.assigned_role, mask)
+        return mask
+
+    def granted_permission_mask(self) -> int:
+        """Mask has_permission checks against: every permission when RBAC is disabled, else permission_mask()."""
+        if not get_config().settings.security_rbac_enabled:
+            return ALL_PERMISSIONS_MASK
+        return self.permission_mask()
+
     def has_permission(self, permission_key: Permission) -> bool:
         """
         Checks if the current user (from app_state.current_user) has the specified permission.
-        Uses the PermissionManager for the actual check.
+        Uses the user's compiled permission bitset, cached for the turn.
         Logs permission check attempts.
         If RBAC is disabled via config, this check will always return True.
         
@@ -610,34 +691,27 @@ class AppState(BaseModel):
             )
             return False
 
-        # Use the cached PermissionManager instance
-        manager = self.permission_manager
-        
-        # Track permission check metrics (could be expanded for analytics)
-        # This could be used to identify most-used permissions and optimize roles
-        log_start_time = time.time()
-        
-        # Perform the check
+        # Perform the check against the user's compiled permission bitset
         try:
-            user_has_perm = manager.has_permission(self.current_user, permission_key)
+            user_has_perm = bool(self.permission_mask() & PERMISSION_BITS[permission_key])
         except Exception as e:
             log.error(
                 f"Error checking permission '{permission_key.value}' for user '{self.current_user.user_id}': {e}",
                 exc_info=True
             )
             return False  # Fail closed (deny access) on errors
-        
-        # Calculate time spent on permission check
-        check_duration_ms = int((time.time() - log_start_time) * 1000)
-        
-        # Enhanced logging with more context
-        log_level = logging.DEBUG if user_has_perm else logging.INFO
-        log.log(
-            log_level,
-            f"Permission check for User '{self.current_user.user_id}' (Role: {self.current_user.assigned_role}) "
-            f"on Permission '{permission_key.value}': {'GRANTED' if user_has_perm else 'DENIED'}. "
-            f"(Session: {self.session_id}, Duration: {check_duration_ms}ms)"
-        )
+
+        if user_has_perm:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    f"Permission check for User '{self.current_user.user_id}' (Role: {self.current_user.assigned_role}) "
+                    f"on Permission '{permission_key.value}': GRANTED. (Session: {self.session_id})"
+                )
+        else:
+            log.info(
+                f"Permission check for User '{self.current_user.user_id}' (Role: {self.current_user.assigned_role}) "
+                f"on Permission '{permission_key.value}': DENIED. (Session: {self.session_id})"
+            )
         
         return user_has_perm
 
@@ -0,0 +1,107 @@
+"""
+Tests for AsyncSQLiteStorage: Storage round trips, group commit of concurrent
+writes and compatibility with SQLiteStorage databases.
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core.async_sqlite_storage import AsyncSQLiteStorage
+from state_models import AppState
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = AsyncSQLiteStorage(str(tmp_path / "state.sqlite"))
+    yield store
+    store.close()
+
+
+async def test_write_read_delete_round_trip(storage):
+    app_state = AppState(session_id="s1")
+    app_state.add_message(role="user", content="hello")
+    await storage.write({"msteams/conversations/c1": {"AugieConversationState": app_state, "e_tag": "*"}})
+
+    stored = (await storage.read(["msteams/conversations/c1", "msteams/conversations/missing"]))
+    assert stored["msteams/conversations/missing"] is None
+    restored = AppState.model_validate(stored["msteams/conversations/c1"]["AugieConversationState"])
+    assert restored.messages[0].text == "hello"
+
+    await storage.delete([{"namespace": "msteams", "id": "conversations/c1"}])
+    assert (await storage.read(["msteams/conversations/c1"]))["msteams/conversations/c1"] is None
+
+
+async def test_concurrent_writes_are_group_committed(storage):
+    await asyncio.gather(*(storage.write({f"ns/conv-{i}": {"turn": i}}) for i in range(50)))
+
+    values = await storage.read([f"ns/conv-{i}" for i in range(50)])
+    assert [values[f"ns/conv-{i}"]["turn"] for i in range(50)] == list(range(50))
+    metrics = storage.metrics()
+    assert metrics["committed_ops"] == 50
+    assert metrics["commits"] < 50
+
+
+async def test_bad_write_fails_only_its_caller(storage):
+    results = await asyncio.gather(
+        storage.write({"ns/good": {"value": 1}}),
+        storage.write({"ns/bad": {"value": object()}}),
+        return_exceptions=True,
+    )
+    assert results[0] is None
+    assert isinstance(results[1], TypeError)
+    assert (await storage.read(["ns/good"]))["ns/good"] == {"value": 1, "e_tag": "1"}
+
+
+async def test_app_state_adapter_methods(storage):
+    assert await storage.get_app_state("ns/session") is None
+    assert await storage.save_app_state("ns/session", AppState(session_id="session"))
+    assert (await storage.get_app_state("ns/session")).session_id == "session"
+
+
+async def test_reads_rows_written_by_sqlite_storage(tmp_path):
+    pytest.importorskip("botbuilder.core")
+    from bot_core.my_bot import SQLiteStorage
+
+    db_path = str(tmp_path / "legacy.sqlite")
+    legacy = SQLiteStorage(db_path=db_path)
+    await legacy.write({"ns/conv": {"turn": 7}})
+    legacy.close()
+
+    store = AsyncSQLiteStorage(db_path)
+    try:
+        assert (await store.read(["ns/conv"]))["ns/conv"]["turn"] == 7
+    finally:
+        store.close()
+
+
+async def test_reads_legacy_json_text_rows(storage):
+    with sqlite3.connect(storage.db_path) as conn:  # A row as written before the state codec
+        conn.execute("INSERT INTO bot_state (namespace, id, data) VALUES (?, ?, ?)", ("ns", "old", '{"turn": 3}'))
+    await storage.write({"ns/new": {"turn": 4}})
+
+    values = await storage.read(["ns/old", "ns/new"])
+    assert values == {"ns/old": {"turn": 3, "e_tag": "0"}, "ns/new": {"turn": 4, "e_tag": "1"}}
+
+
+async def test_aclose_drains_queued_writes_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    store = AsyncSQLiteStorage(path)
+    await store.write({"ns/conv": {"turn": 1}})
+    closed_on = []
+    close = store.close
+    store.close = lambda: closed_on.append(threading.current_thread()) or close()
+
+    await store.aclose()
+
+    assert closed_on and closed_on[0] is not threading.main_thread()
+    reopened = AsyncSQLiteStorage(path)
+    try:
+        assert (await reopened.read(["ns/conv"]))["ns/conv"]["turn"] == 1
+    finally:
+        reopened.close()
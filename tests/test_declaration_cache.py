@@ -0,0 +1,98 @@
+"""
+Tests for the compiled FunctionDeclaration cache used by
+LLMInterface.prepare_tools_for_sdk.
+"""
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.declaration_cache import FunctionDeclarationCache, invalidate_tool_declarations
+
+TOOLS = [
+    {
+        "name": f"tool_{i}",
+        "description": f"Tool {i}",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string", "description": "Query"}, "limit": {"type": "integer"}},
+            "required": ["query"],
+        },
+    }
+    for i in range(3)
+]
+
+
+def test_cache_keys_on_schema_and_invalidates_with_catalog():
+    cache = FunctionDeclarationCache()
+    built = []
+
+    def build(tool_def):
+        built.append(tool_def["name"])
+        return object()
+
+    first = cache.get_or_build(TOOLS[0], build)
+    assert cache.get_or_build(dict(TOOLS[0]), build) is first  # Equal definition, different dict
+    edited = dict(TOOLS[0], description="Edited")
+    assert cache.get_or_build(edited, build) is not first
+    assert built == ["tool_0", "tool_0"]
+
+    invalidate_tool_declarations()
+    assert cache.get_or_build(TOOLS[0], build) is not first
+    assert cache.metrics() == {"entries": 1, "hits": 1, "misses": 3, "hit_rate": 0.25, "invalidations": 1}
+
+
+def test_schema_hash_is_computed_once_per_definition():
+    cache = FunctionDeclarationCache()
+    with patch("core_logic.declaration_cache.tool_schema_hash", side_effect=lambda tool_def: tool_def["name"]) as schema_hash:
+        for _ in range(5):
+            for tool_def in TOOLS:
+                cache.get_or_build(tool_def, lambda tool_def: object())
+        assert schema_hash.call_count == len(TOOLS)
+
+        invalidate_tool_declarations()  # Re-validated catalog: definitions are hashed afresh
+        cache.get_or_build(TOOLS[0], lambda tool_def: object())
+        assert schema_hash.call_count == len(TOOLS) + 1
+    assert cache.metrics()["hits"] == 4 * len(TOOLS)
+
+
+def test_failed_builds_are_not_cached():
+    cache = FunctionDeclarationCache()
+    assert cache.get_or_build(TOOLS[1], lambda tool_def: None) is None
+    assert len(cache) == 0
+
+
+def test_prepare_tools_for_sdk_compiles_each_tool_once():
+    llm_interface = pytest.importorskip("llm_interface")
+    if not llm_interface.SDK_AVAILABLE:
+        pytest.skip("google-generativeai SDK not installed")
+    from config import Config
+
+    config = Mock(spec=Config)
+    config.GEMINI_API_KEY = "test-key"
+    config.GEMINI_MODEL = "gemini-1.5-flash"
+    config.DEFAULT_API_TIMEOUT_SECONDS = 5
+    config.DEFAULT_SYSTEM_PROMPT = "You are a test assistant."
+    config.LLM_MAX_CONCURRENT_CALLS = 2
+    config.LLM_RESPONSE_CACHE = {"enabled": False}
+    config.TOOL_SELECTOR = {"enabled": False}
+    config.MAX_FUNCTION_DECLARATIONS = 64
+    llm = llm_interface.LLMInterface(config)
+
+    conversions = []
+    convert = llm._convert_parameters_to_schema
+    llm._convert_parameters_to_schema = lambda name, params: conversions.append(name) or convert(name, params)
+
+    full = llm.prepare_tools_for_sdk(TOOLS)
+    subset = llm.prepare_tools_for_sdk(TOOLS[1:])
+    assert [d.name for d in full.function_declarations] == ["tool_0", "tool_1", "tool_2"]
+    assert [d.name for d in subset.function_declarations] == ["tool_1", "tool_2"]
+    assert list(full.function_declarations[0].parameters.required) == ["query"]
+    assert conversions == ["tool_0", "tool_1", "tool_2"]
+
+    llm.update_model("gemini-1.5-pro")
+    llm.prepare_tools_for_sdk(TOOLS[:1])
+    assert conversions == ["tool_0", "tool_1", "tool_2", "tool_0"]
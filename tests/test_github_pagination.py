@@ -0,0 +1,78 @@
+"""
+Tests that GitHubTools listings consume PyGithub's lazily paginated lists
+entirely on a worker thread, and stop at the result cap without touching
+the next page.
+"""
+import inspect
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.github_tools import GITHUB_PAGE_SIZE, MAX_LIST_RESULTS, MAX_SEARCH_RESULTS, GitHubTools
+
+
+class FakePaginatedList:
+    """Iterable that records which threads pulled items, like PyGithub fetching pages."""
+
+    def __init__(self, make_item, total=100):
+        self.make_item = make_item
+        self.total = total
+        self.pulled = 0
+        self.threads = set()
+
+    def __iter__(self):
+        for i in range(self.total):
+            self.pulled += 1
+            self.threads.add(threading.current_thread().name)
+            yield self.make_item(i)
+
+
+def _tools():
+    return GitHubTools(SimpleNamespace(settings=SimpleNamespace(github_accounts=[])))
+
+
+async def test_search_code_collects_off_loop_up_to_cap():
+    tools = _tools()
+    items = FakePaginatedList(lambda i: SimpleNamespace(
+        name=f"f{i}.py", path=f"src/f{i}.py", html_url="u", git_url="g", repository=SimpleNamespace(full_name="o/r")))
+    client = MagicMock()
+    client.search_code.return_value = items
+    tools.get_account_client = lambda app_state, **kwargs: client
+
+    results = await inspect.unwrap(GitHubTools.search_code)(tools, MagicMock(), query="parse_config")
+
+    assert len(results) == MAX_SEARCH_RESULTS
+    assert items.pulled == MAX_SEARCH_RESULTS  # Never pulls into a second page
+    assert threading.current_thread().name not in items.threads
+
+
+async def test_list_pull_requests_collects_off_loop_up_to_cap():
+    tools = _tools()
+    user = SimpleNamespace(login="dev")
+    stamp = MagicMock(isoformat=lambda: "2024-01-01T00:00:00")
+    pulls = FakePaginatedList(lambda i: SimpleNamespace(
+        number=i, title="t", state="open", html_url="u", user=user, created_at=stamp, updated_at=stamp,
+        head=SimpleNamespace(ref="feature"), base=SimpleNamespace(ref="main")))
+    repository = MagicMock()
+    repository.get_pulls.return_value = pulls
+
+    async def get_repo(*args, **kwargs):
+        return repository
+
+    tools._get_repo = get_repo
+    results = await inspect.unwrap(GitHubTools.list_pull_requests)(tools, MagicMock(), owner="o", repo="r")
+
+    assert [pr["number"] for pr in results] == list(range(MAX_LIST_RESULTS))
+    assert pulls.pulled == MAX_LIST_RESULTS
+    assert threading.current_thread().name not in pulls.threads
+
+
+def test_clients_request_one_page_per_capped_listing():
+    tools = _tools()
+    tools.config = SimpleNamespace(DEFAULT_API_TIMEOUT_SECONDS=5)
+    assert tools._init_single_client("token", None, "default", testing_mode=True)
+    assert tools.github_clients["default"].per_page == GITHUB_PAGE_SIZE >= MAX_LIST_RESULTS
@@ -0,0 +1,73 @@
+"""
+Tests for incremental history preparation: converted messages are reused
+across turns and only new or changed messages are converted.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic import history_utils
+from core_logic.history_utils import prepare_messages_for_llm_from_appstate
+from state_models import AppState, Message
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    history_utils._history_conversion_cache.clear()
+    yield
+    history_utils._history_conversion_cache.clear()
+
+
+def _state(n):
+    state = AppState(session_id="cache-test")
+    for i in range(n):
+        state.messages.append(Message(role="user" if i % 2 == 0 else "assistant", parts=[{"type": "text", "text": f"message {i}"}]))
+    return state
+
+
+def _texts(contents):
+    return [(c.role, c.parts[0].text) for c in contents if not c.parts[0].text.startswith("[TOOL REMINDER]")]
+
+
+def test_message_identity_survives_reload():
+    state = _state(2)
+    reloaded = AppState.model_validate(state.model_dump(mode="json"))
+    assert [m.id for m in reloaded.messages] == [m.id for m in state.messages]
+    assert [m.timestamp for m in reloaded.messages] == [m.timestamp for m in state.messages]
+
+
+def test_next_turn_only_converts_new_messages(monkeypatch):
+    state = _state(10)
+    first, _ = prepare_messages_for_llm_from_appstate(state, 50)
+
+    converted = []
+    original = history_utils._message_dict_to_sdk_content
+    monkeypatch.setattr(history_utils, "_message_dict_to_sdk_content", lambda d: converted.append(d["id"]) or original(d))
+
+    next_turn = AppState.model_validate(state.model_dump(mode="json"))
+    next_turn.messages.append(Message(role="user", parts=[{"type": "text", "text": "new question"}]))
+    second, _ = prepare_messages_for_llm_from_appstate(next_turn, 50)
+
+    assert converted == [next_turn.messages[-1].id]
+    assert _texts(second) == _texts(first) + [("user", "new question")]
+
+
+def test_cached_and_fresh_preparation_match():
+    state = _state(30)
+    prepare_messages_for_llm_from_appstate(state, 20)
+    warm, warm_notes = prepare_messages_for_llm_from_appstate(state, 20)
+    history_utils._history_conversion_cache.clear()
+    cold, cold_notes = prepare_messages_for_llm_from_appstate(state, 20)
+    assert _texts(warm) == _texts(cold)
+    assert warm_notes == cold_notes
+
+
+def test_edited_message_is_reconverted():
+    state = _state(3)
+    prepare_messages_for_llm_from_appstate(state, 50)
+    state.messages[0].parts = [{"type": "text", "text": "edited"}]
+    contents, _ = prepare_messages_for_llm_from_appstate(state, 50)
+    assert "edited" in [text for _, text in _texts(contents)]
@@ -0,0 +1,84 @@
+"""
+Tests for token-budgeted history assembly: cached per-message token counts,
+priority rules and truncation of oversized tool results.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.history_utils import (
+    _fit_history_to_token_budget,
+    _truncate_oversized_function_responses,
+    prepare_messages_for_llm_from_appstate,
+)
+from state_models import AppState, Message
+
+
+def _msg(i, role, text, **extra):
+    return {"id": f"m{i}", "role": role, "parts": [{"type": "text", "text": text}], "timestamp": f"2024-01-01T00:00:{i:02d}", **extra}
+
+
+def test_message_token_count_is_cached_and_reset_on_new_parts():
+    message = Message(role="user", parts=[{"type": "text", "text": "x" * 400}])
+    first = message.token_count()
+    assert first >= 100
+    assert message._token_count == first
+
+    message.parts = [{"type": "text", "text": "short"}]
+    assert message._token_count is None
+    assert message.token_count() < first
+
+
+def test_budget_keeps_system_plan_and_current_turn():
+    messages = [
+        _msg(0, "system", "rules"),
+        _msg(1, "assistant", "the plan", is_internal=True, message_type="plan"),
+        _msg(2, "user", "old question " * 100),
+        _msg(3, "assistant", "old answer " * 100),
+        _msg(4, "user", "recent question"),
+        _msg(5, "assistant", "recent answer"),
+        _msg(6, "user", "current question"),
+    ]
+    kept = _fit_history_to_token_budget(messages, token_budget=60)
+    assert [m["id"] for m in kept] == ["m0", "m1", "m4", "m5", "m6"]
+
+
+def test_budget_keeps_tool_results_with_their_call():
+    messages = [
+        _msg(0, "user", "first"),
+        _msg(1, "assistant", "calling tool", tool_calls=[{"id": "c1"}]),
+        _msg(2, "tool", "result " * 50, tool_call_id="c1"),
+        _msg(3, "assistant", "done"),
+        _msg(4, "user", "next"),
+    ]
+    kept_ids = [m["id"] for m in _fit_history_to_token_budget(messages, token_budget=40)]
+    # The large tool result does not fit, so its call is dropped with it
+    assert "m1" not in kept_ids and "m2" not in kept_ids
+    assert kept_ids == ["m3", "m4"]
+
+
+def test_oversized_tool_results_are_truncated():
+    big = "row," * 5000
+    messages = [
+        _msg(0, "user", "search"),
+        _msg(1, "tool", big),
+        {"id": "m2", "role": "function", "parts": [{"type": "function_response", "function_response": {"name": "jira_search", "response": {"content": {"rows": [big]}}}}]},
+    ]
+    assert _truncate_oversized_function_responses(messages, max_tokens=100) == 2
+    assert len(messages[1]["parts"][0]["text"]) < 500
+    assert "omitted" in messages[1]["parts"][0]["text"]
+    assert len(messages[2]["parts"][0]["function_response"]["response"]["content"]) < 500
+    assert messages[0]["parts"][0]["text"] == "search"
+
+
+def test_prepare_messages_applies_token_budget():
+    app_state = AppState(session_id="budget-test")
+    for i in range(20):
+        app_state.messages.append(Message(role="user" if i % 2 == 0 else "assistant", parts=[{"type": "text", "text": f"message {i} " + "words " * 200}]))
+
+    unbudgeted, _ = prepare_messages_for_llm_from_appstate(app_state, 50, config_token_budget=0)
+    budgeted, notes = prepare_messages_for_llm_from_appstate(app_state, 50, config_token_budget=1000)
+    assert len(budgeted) < len(unbudgeted)
+    assert any("fit ~1000 tokens" in note for note in notes)
+    assert "message 19" in budgeted[-1].parts[0].text
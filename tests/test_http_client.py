@@ -0,0 +1,180 @@
+"""
+Tests for the shared async HTTP client against a local stub server:
+connection reuse, Retry-After handling, backoff on 5xx, size limits,
+timeouts, and the Perplexity/Greptile tools ported onto it.
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import _http_client
+from tools._http_client import AsyncHTTPClient, HTTPTransportError, ResponseTooLargeError, parse_retry_after
+from tools.greptile_tools import GreptileTools
+from tools.perplexity_tools import PerplexityTools
+
+
+@pytest.fixture
+async def stub():
+    """Local server whose routes answer from per-test scripted responses."""
+    state = {"peers": set(), "calls": {}, "script": {}}
+
+    async def handler(request):
+        path = request.path
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["calls"][path] = state["calls"].get(path, 0) + 1
+        script = state["script"].get(path, [])
+        step = script.pop(0) if script else {}
+        if step.get("delay"):
+            await asyncio.sleep(step["delay"])
+        if "json" in step:
+            return web.json_response(step["json"], status=step.get("status", 200), headers=step.get("headers"))
+        return web.Response(body=step.get("body", b"ok"), status=step.get("status", 200), headers=step.get("headers"))
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    state["url"] = str(server.make_url("")).rstrip("/")
+    yield state
+    await server.close()
+
+
+@pytest.fixture
+async def client():
+    client = AsyncHTTPClient("test", timeout=2, max_retries=2, backoff_base=0.01)
+    yield client
+    await client.close()
+
+
+@pytest.fixture
+def shared_clients():
+    yield
+    _http_client._clients.clear()
+
+
+async def test_connections_are_pooled(stub, client):
+    for _ in range(5):
+        response = await client.request("GET", f"{stub['url']}/ping")
+        assert response.status == 200 and response.text == "ok"
+    assert len(stub["peers"]) == 1  # One keep-alive connection served every request
+    assert client.metrics()["requests"] == 5
+
+
+async def test_retry_after_is_honored(stub, client):
+    stub["script"]["/limited"] = [{"status": 429, "headers": {"Retry-After": "0.2"}}, {"json": {"ok": True}}]
+    start = time.monotonic()
+    response = await client.request("GET", f"{stub['url']}/limited")
+
+    assert response.json() == {"ok": True}
+    assert time.monotonic() - start >= 0.2
+    assert stub["calls"]["/limited"] == 2 and client.retries == 1
+
+
+async def test_server_errors_are_retried_then_returned(stub, client):
+    stub["script"]["/flaky"] = [{"status": 503}, {"status": 200}]
+    assert (await client.request("POST", f"{stub['url']}/flaky", json_body={"a": 1})).status == 200
+
+    stub["script"]["/down"] = [{"status": 502}] * 3
+    response = await client.request("GET", f"{stub['url']}/down")
+    assert response.status == 502 and stub["calls"]["/down"] == 3
+
+    stub["script"]["/missing"] = [{"status": 404}]
+    assert (await client.request("GET", f"{stub['url']}/missing")).status == 404
+    assert stub["calls"]["/missing"] == 1  # Client errors are not retried
+
+
+async def test_long_retry_after_is_not_waited_for(stub):
+    client = AsyncHTTPClient("test", max_retries=2, max_backoff=1)
+    stub["script"]["/slow-down"] = [{"status": 429, "headers": {"Retry-After": "120"}}]
+    assert (await client.request("GET", f"{stub['url']}/slow-down")).status == 429
+    assert stub["calls"]["/slow-down"] == 1
+    await client.close()
+
+
+async def test_response_size_limit(stub):
+    client = AsyncHTTPClient("test", max_response_bytes=1024)
+    stub["script"]["/big"] = [{"body": b"x" * 4096}]
+    with pytest.raises(ResponseTooLargeError):
+        await client.request("GET", f"{stub['url']}/big")
+    await client.close()
+
+
+async def test_timeouts_are_retried_then_raised(stub, client):
+    stub["script"]["/hang"] = [{"delay": 0.5}] * 3
+    with pytest.raises(HTTPTransportError):
+        await client.request("GET", f"{stub['url']}/hang", timeout=0.1)
+    assert stub["calls"]["/hang"] == 3 and client.metrics()["failures"] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # Date in the past
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+
+def _config(values):
+    config = MagicMock()
+    config.get_env_value.side_effect = values.get
+    config.DEFAULT_API_TIMEOUT_SECONDS = 2
+    config.HTTP_CLIENT = {"max_retries": 1}
+    return config
+
+
+async def test_perplexity_request_via_shared_client(stub, shared_clients):
+    tools = PerplexityTools(_config({"PERPLEXITY_API_KEY": "key", "PERPLEXITY_API_URL": stub["url"]}))
+    tools.http.backoff_base = 0.01
+    stub["script"]["/chat/completions"] = [
+        {"status": 503},
+        {"json": {"choices": [{"message": {"content": "hi"}}]}, "headers": {"X-RateLimit-Remaining": "9"}},
+        {"status": 401, "json": {"error": {"message": "bad key"}}},
+    ]
+
+    result = await tools._send_request("chat/completions", data={"model": "sonar"}, include_headers=True)
+    assert result["data"]["choices"][0]["message"]["content"] == "hi"
+    assert result["rate_limit"] == {"X-RateLimit-Remaining": "9"}
+
+    with pytest.raises(RuntimeError, match="authentication failed"):
+        await tools._send_request("chat/completions", data={"model": "sonar"})
+    await tools.http.close()
+
+
+async def test_greptile_request_via_shared_client(stub, shared_clients):
+    tools = GreptileTools(_config({"GREPTILE_API_KEY": "key", "GREPTILE_API_URL": f"{stub['url']}/v2"}))
+    assert tools.http is GreptileTools(_config({"GREPTILE_API_KEY": "key"})).http
+    stub["script"]["/v2/query"] = [{"status": 429, "headers": {"Retry-After": "0"}}, {"json": {"message": "answer"}}]
+
+    assert await tools._send_request("query", method="POST", data={"messages": []}) == {"message": "answer"}
+    assert stub["calls"]["/v2/query"] == 2
+    await tools.http.close()
+
+
+def test_greptile_health_check_runs_without_loop(shared_clients):
+    # Health checks are called from worker threads with no running loop; serve the stub from this one
+    loop = asyncio.new_event_loop()
+    server = TestServer(web.Application(), host="127.0.0.1")
+
+    async def health(request):
+        return web.Response(text="Healthy!")
+
+    server.app.router.add_get("/v2/health", health)
+    loop.run_until_complete(server.start_server())
+    try:
+        url = str(server.make_url("/v2"))
+        result = [None]
+
+        def check():
+            result[0] = GreptileTools(_config({"GREPTILE_API_KEY": "key", "GREPTILE_API_URL": url})).health_check()
+
+        loop.run_until_complete(loop.run_in_executor(None, check))
+        assert result[0]["status"] == "OK" and "Healthy!" in result[0]["message"]
+    finally:
+        loop.run_until_complete(server.close())
+        loop.close()
@@ -0,0 +1,65 @@
+"""
+Tests for IntentClassifier's local fast path: confident messages are
+classified by the local model without an LLM call, everything else still
+goes to the LLM.
+"""
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("numpy")
+
+from core_logic.intent_classifier import DEFAULT_INTENT_EXAMPLES_PATH, IntentClassifier, UserIntent
+from core_logic.local_intent_model import LocalIntentModel, read_examples
+
+
+def _classifier(**settings):
+    llm = SimpleNamespace(
+        config=SimpleNamespace(INTENT_CLASSIFIER=settings),
+        generate_content=AsyncMock(return_value=SimpleNamespace(text="GENERAL_TASK|0.9")),
+    )
+    return IntentClassifier(llm), llm.generate_content
+
+
+async def test_confident_messages_skip_the_llm():
+    classifier, generate_content = _classifier()
+    intent, confidence = await classifier.classify_intent("list the pull requests waiting for my review", {})
+    assert intent == UserIntent.GENERAL_TASK and confidence >= 0.8
+    intent, _ = await classifier.classify_intent("thank you so much", {})
+    assert intent == UserIntent.THANKS
+    generate_content.assert_not_awaited()
+
+
+async def test_unsure_messages_fall_back_to_the_llm():
+    classifier, generate_content = _classifier()
+    assert await classifier.classify_intent("zq vlorp", {}) == (UserIntent.GENERAL_TASK, 0.9)
+    generate_content.assert_awaited_once()
+
+
+async def test_onboarding_answers_need_a_pending_decision():
+    classifier, generate_content = _classifier()
+    intent, _ = await classifier.classify_intent("ask me again next week", {"pending_onboarding_decision": True})
+    assert intent == UserIntent.ONBOARDING_POSTPONE
+    generate_content.assert_not_awaited()
+
+    assert (await classifier.classify_intent("ask me again next week", {}))[0] != UserIntent.ONBOARDING_POSTPONE
+
+
+async def test_local_model_can_be_disabled():
+    classifier, generate_content = _classifier(local_enabled=False)
+    assert classifier.local_model is None
+    await classifier.classify_intent("thank you so much", {})
+    generate_content.assert_awaited_once()
+
+
+def test_model_learns_the_shipped_examples():
+    examples = read_examples(DEFAULT_INTENT_EXAMPLES_PATH)
+    assert {label for _, label in examples} <= set(UserIntent.__members__)
+    model = LocalIntentModel.train(examples)
+    correct = sum(1 for text, label in examples if model.predict(text)[0] == label)
+    assert correct / len(examples) > 0.95
@@ -0,0 +1,159 @@
+"""
+Tests for the non-blocking LLM transport: the SDK stream runs on worker
+threads, a per-process slot limit caps concurrent calls, and abandoned
+turns stop the worker.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from state_models import AppState
+from utils.async_bridge import iterate_in_thread
+
+llm_interface = pytest.importorskip("llm_interface")
+if not llm_interface.SDK_AVAILABLE:
+    pytest.skip("google-generativeai SDK not installed", allow_module_level=True)
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+    def to_dict(self):
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+
+
+class _BlockingModel:
+    """Mimics the SDK: generate_content(stream=True) returns a blocking iterator."""
+
+    def __init__(self, chunk_delay=0.0, chunks=("Hello", " world")):
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+        self.produced = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, *args, **kwargs):
+        def stream():
+            with self._lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                for text in self.chunks:
+                    time.sleep(self.chunk_delay)  # blocking network read
+                    self.produced += 1
+                    yield _FakeChunk(text)
+            finally:
+                with self._lock:
+                    self.active -= 1
+        return stream()
+
+
+def _make_llm(model, max_concurrent_calls=8):
+    config = Mock(spec=Config)
+    config.GEMINI_API_KEY = "test-key"
+    config.GEMINI_MODEL = "gemini-1.5-flash"
+    config.DEFAULT_API_TIMEOUT_SECONDS = 5
+    config.DEFAULT_API_MAX_RETRIES = 0
+    config.DEFAULT_SYSTEM_PROMPT = "You are a test assistant."
+    config.LLM_MAX_CONCURRENT_CALLS = max_concurrent_calls
+    config.TOOL_SELECTOR = {"enabled": False}
+    config.SCHEMA_OPTIMIZATION = {}
+    llm = llm_interface.LLMInterface(config)
+    llm.CACHE_ENABLED = False
+    llm.model = model
+    return llm
+
+
+async def _collect_text(llm, text="hi"):
+    messages = [{"role": "user", "parts": [{"text": text}]}]
+    parts = []
+    async for event in llm.generate_content_stream(messages, AppState()):
+        if event["type"] == "text_chunk":
+            parts.append(event["content"])
+    return "".join(parts)
+
+
+async def test_iterate_in_thread_yields_items_and_propagates_errors():
+    def items():
+        yield 1
+        yield 2
+        raise ValueError("boom")
+
+    received = []
+    with pytest.raises(ValueError):
+        async for item in iterate_in_thread(items):
+            received.append(item)
+    assert received == [1, 2]
+
+
+async def test_iterate_in_thread_stops_worker_when_consumer_leaves():
+    produced = []
+    cancel_event = threading.Event()
+
+    def items():
+        for i in range(100):
+            time.sleep(0.01)
+            produced.append(i)
+            yield i
+
+    stream = iterate_in_thread(items, cancel_event=cancel_event, max_buffered=1)
+    async for item in stream:
+        if item == 2:
+            break
+    await stream.aclose()
+    assert cancel_event.is_set()
+    await asyncio.sleep(0.1)
+    assert len(produced) < 10
+
+
+async def test_slow_llm_call_does_not_block_event_loop():
+    llm = _make_llm(_BlockingModel(chunk_delay=0.3))
+    max_lag = 0.0
+
+    async def ticker():
+        nonlocal max_lag
+        for _ in range(10):
+            start = time.monotonic()
+            await asyncio.sleep(0.02)
+            max_lag = max(max_lag, time.monotonic() - start - 0.02)
+
+    text, _ = await asyncio.gather(_collect_text(llm), ticker())
+    assert text == "Hello world"
+    assert max_lag < 0.15
+
+
+async def test_concurrent_calls_are_capped_per_process():
+    model = _BlockingModel(chunk_delay=0.05)
+    llm = _make_llm(model, max_concurrent_calls=2)
+
+    results = await asyncio.gather(*(_collect_text(llm) for _ in range(5)))
+    assert results == ["Hello world"] * 5
+    assert model.max_active <= 2
+
+
+async def test_abandoned_turn_releases_the_sdk_stream():
+    model = _BlockingModel(chunk_delay=0.05, chunks=tuple(f"c{i}" for i in range(50)))
+    llm = _make_llm(model, max_concurrent_calls=1)
+    messages = [{"role": "user", "parts": [{"text": "hi"}]}]
+
+    stream = llm.generate_content_stream(messages, AppState())
+    async for event in stream:
+        if event["type"] == "text_chunk":
+            break
+    await stream.aclose()
+    await asyncio.sleep(0.2)
+    assert model.produced < 50
+
+    # The single call slot was released, so a new turn can proceed
+    model.chunks = ("ok",)
+    assert await asyncio.wait_for(_collect_text(llm), timeout=5) == "ok"
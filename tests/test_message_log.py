@@ -0,0 +1,111 @@
+"""
+Tests for MessageLogStorage: only new messages are appended, reads load a
+bounded tail, rewritten histories replace the log and inline-message blobs
+are moved into the log on their first write.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core.async_sqlite_storage import AsyncSQLiteStorage
+from bot_core.message_log import MessageLogStorage, SQLiteMessageLog
+from state_models import AppState
+
+KEY = "msteams/conversations/c1"
+PROPERTY = "AugieConversationState"
+
+
+class _RecordingLog(SQLiteMessageLog):
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.appends = []
+
+    async def append(self, state_key, start_seq, messages):
+        self.appends.append((start_seq, len(messages)))
+        await super().append(state_key, start_seq, messages)
+
+    async def replace(self, state_key, messages):
+        self.appends.append(("replace", len(messages)))
+        await super().replace(state_key, messages)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    db_path = str(tmp_path / "state.sqlite")
+    inner = AsyncSQLiteStorage(db_path)
+    yield MessageLogStorage(inner, _RecordingLog(db_path), tail_size=3)
+    inner.close()
+
+
+def _state(count, start=0):
+    state = AppState(session_id="c1")
+    for i in range(start, start + count):
+        state.add_message(role="user", content=f"message {i}")
+    return state
+
+
+async def _load(storage):
+    return AppState.model_validate((await storage.read([KEY]))[KEY][PROPERTY])
+
+
+async def test_only_new_messages_are_appended(storage):
+    await storage.write({KEY: {PROPERTY: _state(2), "e_tag": "*"}})
+    state = await _load(storage)
+    state.add_message(role="assistant", content="reply")
+    await storage.write({KEY: {PROPERTY: state, "e_tag": "*"}})
+
+    assert storage.message_log.appends == [(0, 2), (2, 1)]
+    blob = (await storage.inner.read([KEY]))[KEY][PROPERTY]
+    assert blob["messages"] == []
+    assert blob["message_log_length"] == 3
+
+
+async def test_read_loads_bounded_tail(storage):
+    await storage.write({KEY: {PROPERTY: _state(5), "e_tag": "*"}})
+    state = await _load(storage)
+
+    assert [m.text for m in state.messages] == ["message 2", "message 3", "message 4"]
+    assert state.message_log_offset == 2
+    assert await storage.message_log.read_range(KEY, 0, 5) != []
+
+    state.add_message(role="user", content="message 5")
+    await storage.write({KEY: {PROPERTY: state, "e_tag": "*"}})
+    assert storage.message_log.appends[-1] == (5, 1)
+    assert [m.text for m in (await _load(storage)).messages] == ["message 3", "message 4", "message 5"]
+
+
+async def test_cleared_history_replaces_log(storage):
+    await storage.write({KEY: {PROPERTY: _state(4), "e_tag": "*"}})
+    state = await _load(storage)
+    state.clear_chat()
+    state.add_message(role="user", content="fresh start")
+    await storage.write({KEY: {PROPERTY: state, "e_tag": "*"}})
+
+    assert storage.message_log.appends[-1] == ("replace", 1)
+    restored = await _load(storage)
+    assert [m.text for m in restored.messages] == ["fresh start"]
+    assert restored.message_log_length == 1
+
+
+async def test_inline_messages_are_backfilled_and_system_prompt_pinned(storage):
+    legacy = _state(2).model_dump(mode='json')
+    legacy["messages"].insert(0, {"role": "system", "parts": [{"type": "text", "text": "prompt"}]})
+    await storage.inner.write({KEY: {PROPERTY: legacy, "e_tag": "*"}})
+
+    item = (await storage.read([KEY]))[KEY]
+    assert len(item[PROPERTY]["messages"]) == 3
+    await storage.write({KEY: item})
+
+    assert storage.message_log.appends == [(0, 2)]
+    restored = await _load(storage)
+    assert [m.role for m in restored.messages] == ["system", "user", "user"]
+    assert restored.messages[0].log_seq is None
+
+
+async def test_delete_removes_log(storage):
+    await storage.write({KEY: {PROPERTY: _state(2), "e_tag": "*"}})
+    await storage.delete([KEY])
+    assert await storage.message_log.read_range(KEY, 0, 2) == []
@@ -0,0 +1,117 @@
+"""
+Tests for ProfileRepository: single-flight profile lookups and the
+write-behind buffer for last_active and tool metric updates.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_auth import utils
+from user_auth.models import UserProfile
+from user_auth.profile_repository import ProfileRepository
+
+
+@pytest.fixture
+async def repository():
+    repository = ProfileRepository(flush_interval_seconds=3600)
+    yield repository
+    with patch("user_auth.profile_repository.db_manager.update_profile_activity", return_value=0):
+        await repository.close()
+
+
+def _profile(user_id="u1", last_active=100):
+    return UserProfile(user_id=user_id, display_name="Test User", last_active_timestamp=last_active)
+
+
+async def test_concurrent_lookups_for_one_user_share_a_single_read(repository):
+    calls = []
+
+    def slow_lookup(context, db_path=None):
+        calls.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return _profile(context.current_user_id)
+
+    with patch("user_auth.profile_repository.get_current_user_profile", slow_lookup):
+        profiles = await asyncio.gather(
+            *[repository.get_profile(SimpleNamespace(current_user_id="u1")) for _ in range(5)],
+            repository.get_profile(SimpleNamespace(current_user_id="u2")),
+        )
+
+    assert len(calls) == 2  # One read per user, both off the event loop thread
+    assert all(name.startswith("profile-db") for name in calls)
+    assert [p.user_id for p in profiles] == ["u1"] * 5 + ["u2"]
+    assert len({id(p) for p in profiles}) == 6  # Every caller gets its own copy to mutate
+    assert repository.metrics()["coalesced_lookups"] == 4
+
+
+async def test_write_behind_coalesces_updates_per_user(repository):
+    repository.record_last_active(_profile("u1", 100))
+    repository.record_last_active(_profile("u1", 130))
+    repository.record_last_active(_profile("u1", 120))  # Out of order; the newest timestamp wins
+    profile = _profile("u2", 200)
+    profile.tool_adapter_metrics.total_selections = 3
+    await repository.record_tool_metrics(profile)
+
+    update = Mock(side_effect=[RuntimeError("database is locked"), 2])
+    with patch("user_auth.profile_repository.db_manager.update_profile_activity", update):
+        assert await repository.flush() == 0  # Failed batch goes back into the buffer
+        repository.record_last_active(_profile("u1", 140))
+        assert await repository.flush() == 2
+
+    assert update.call_count == 2
+    batch = update.call_args.args[0]
+    assert batch["u1"] == {"last_active_timestamp": 140}
+    assert batch["u2"]["tool_adapter_metrics"]["total_selections"] == 3
+    metrics = repository.metrics()
+    assert metrics["pending_users"] == 0 and metrics["flush_errors"] == 1 and metrics["flushes"] == 1
+
+
+async def test_cache_hits_buffer_last_active_instead_of_saving(repository):
+    profile = _profile("u-cache", 100)
+    with utils._cache_lock:
+        utils._user_profile_cache.put(profile.user_id, profile.model_dump())
+    try:
+        with patch("user_auth.utils.db_manager.save_user_profile") as save:
+            for _ in range(25):
+                loaded = utils.get_current_user_profile(SimpleNamespace(current_user_id="u-cache"), db_path=":memory:")
+                assert loaded.user_id == "u-cache"
+        save.assert_not_called()
+        assert repository.metrics()["pending_users"] == 1
+    finally:
+        utils.invalidate_user_profile_cache("u-cache")
+
+
+async def test_close_flushes_and_uninstalls_the_writer():
+    repository = ProfileRepository(flush_interval_seconds=3600)
+    repository.record_last_active(_profile("u1", 100))
+    with patch("user_auth.profile_repository.db_manager.update_profile_activity", return_value=1) as update:
+        await repository.close()
+    update.assert_called_once_with({"u1": {"last_active_timestamp": 100}})
+    assert utils._last_active_writer is None
+
+
+async def test_save_profile_discards_buffered_tool_metrics(repository):
+    stale = _profile("u1", 100)
+    stale.tool_adapter_metrics.total_selections = 1
+    await repository.record_tool_metrics(stale)
+    repository.record_last_active(_profile("u2", 100))
+
+    fresh = _profile("u1", 150)
+    fresh.tool_adapter_metrics.total_selections = 5
+    with patch("user_auth.profile_repository.db_manager.save_user_profile", return_value=True) as save:
+        assert await repository.save_profile(fresh)
+    assert save.call_args.args[0]["tool_adapter_metrics"]["total_selections"] == 5
+
+    with patch("user_auth.profile_repository.db_manager.update_profile_activity", return_value=2) as update:
+        await repository.flush()
+    batch = update.call_args.args[0]
+    assert "tool_adapter_metrics" not in batch["u1"]  # The flush cannot roll back the saved metrics
+    assert batch["u1"] == {"last_active_timestamp": 100} and batch["u2"] == {"last_active_timestamp": 100}
@@ -0,0 +1,197 @@
+"""
+Tests for the LRU-cached, micro-batched query embedding service.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core_logic.query_embedding import QueryEmbeddingService, normalize_query
+
+
+class _RecordingEncoder:
+    """Batch encoder that records every call and the thread it ran on."""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.threads.append(threading.current_thread().name)
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+
+def test_normalize_query_collapses_case_and_whitespace():
+    assert normalize_query("  Show   my\tTickets ") == "show my tickets"
+    assert normalize_query(None) == ""
+
+
+def test_encode_sync_uses_lru_cache():
+    encoder = _RecordingEncoder()
+    service = QueryEmbeddingService(encoder, cache_size=2)
+
+    first = service.encode_sync("List my repos")
+    assert service.encode_sync("list   my REPOS") == first
+    assert encoder.batches == [["list my repos"]]
+
+    service.encode_sync("b")
+    service.encode_sync("c")  # evicts "list my repos"
+    service.encode_sync("list my repos")
+    assert len(encoder.batches) == 4
+
+    metrics = service.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 4
+    assert metrics["hit_rate"] == 0.2
+    assert metrics["cache_size"] == 2
+
+
+def test_concurrent_encodes_are_batched_on_worker_thread():
+    encoder = _RecordingEncoder()
+    service = QueryEmbeddingService(encoder, batch_window_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            service.encode("show my tickets"),
+            service.encode("list my repos"),
+            service.encode("Show my tickets"),  # joins the pending request
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        service.shutdown()
+
+    assert encoder.batches == [["show my tickets", "list my repos"]]
+    assert encoder.threads[0].startswith("query-embed")
+    assert results[0] == results[2]
+    metrics = service.metrics()
+    assert metrics["batches"] == 1
+    assert metrics["max_batch_size"] == 2
+    assert metrics["coalesced"] == 1
+
+
+def test_full_batch_flushes_before_window():
+    encoder = _RecordingEncoder()
+    # A window this long would time the test out if size-based flushing failed
+    service = QueryEmbeddingService(encoder, batch_window_ms=60_000, max_batch_size=3)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(service.encode(f"query {i}") for i in range(3))), timeout=5
+        )
+
+    try:
+        asyncio.run(run())
+    finally:
+        service.shutdown()
+    assert [len(batch) for batch in encoder.batches] == [3]
+
+
+def test_encoder_errors_propagate_and_are_not_cached():
+    calls = []
+
+    def failing_encoder(texts):
+        calls.append(texts)
+        raise RuntimeError("model unavailable")
+
+    service = QueryEmbeddingService(failing_encoder, batch_window_ms=0)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await service.encode("hello")
+        with pytest.raises(RuntimeError):
+            await service.encode("hello")
+
+    try:
+        asyncio.run(run())
+    finally:
+        service.shutdown()
+    assert len(calls) == 2
+    assert service.metrics()["cache_size"] == 0
+
+
+def test_tool_selector_reuses_cached_query_embedding(tmp_path):
+    np = pytest.importorskip("numpy")
+    from unittest.mock import patch
+    from core_logic import tool_selector as tool_selector_module
+    from core_logic.tool_selector import ToolSelector
+
+    class CountingModel:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, text):
+            self.calls.append(text)
+            if isinstance(text, list):
+                return np.ones((len(text), 4), dtype=np.float32)
+            return np.ones(4, dtype=np.float32)
+
+    config = SimpleNamespace(
+        TOOL_SELECTOR={
+            "similarity_threshold": -10.0,
+            "cache_path": str(tmp_path / "tool_embeddings.npy"),
+            "legacy_cache_path": str(tmp_path / "missing.json"),
+        },
+        SCHEMA_OPTIMIZATION={},
+    )
+    tools = [{"name": f"tool_{i}", "description": f"Tool {i}", "metadata": {}} for i in range(4)]
+
+    with patch.multiple(tool_selector_module, ML_DEPENDENCIES_AVAILABLE=True, np=np):
+        selector = ToolSelector(config)
+        selector.embedding_model = CountingModel()
+        selector.build_tool_embeddings(tools)
+        tool_encodes = len(selector.embedding_model.calls)
+
+        selector.select_tools("zzz query", app_state=None, available_tools=tools)
+        selector.select_tools("ZZZ  query", app_state=None, available_tools=tools)
+        selector.find_similar_tools("zzz query", threshold=-10.0)
+
+        precomputed = asyncio.run(selector.embed_query_async("zzz query"))
+        selector.query_embeddings.shutdown()
+
+    assert len(selector.embedding_model.calls) == tool_encodes + 1
+    assert precomputed is not None
+    assert selector.query_embeddings.metrics()["hits"] == 3
+
+
+async def test_agent_loop_tool_selection_uses_precomputed_embedding():
+    llm_interactions = pytest.importorskip("core_logic.llm_interactions")
+    from unittest.mock import patch
+
+    class FakeSelector:
+        def __init__(self):
+            self.selected_with = []
+
+        async def embed_query_async(self, query):
+            return [float(len(query))]
+
+        def embed_query(self, query):
+            raise AssertionError("query encoded synchronously on the event loop")
+
+        def select_tools(self, query, app_state, available_tools=None, max_tools=None, query_embedding=None):
+            if query_embedding is None:
+                self.embed_query(query)
+            self.selected_with.append(query_embedding)
+            return available_tools[:1]
+
+    selector = FakeSelector()
+    config = SimpleNamespace(TOOL_SELECTOR={"enabled": True})
+    tools = [{"name": "list_repos", "description": "List repositories"}, {"name": "help", "description": "Help"}]
+    with patch.object(llm_interactions, "get_tool_selector", lambda config: selector):
+        embedding = await llm_interactions._embed_query_for_tool_selection("list my repos", config)
+        selected = llm_interactions._prepare_tool_definitions(
+            tools, is_initial_decision_call=False, provide_tools=True, user_query="list my repos",
+            config=config, app_state=object(), query_embedding=embedding,
+        )
+        assert await llm_interactions._embed_query_for_tool_selection("list my repos", SimpleNamespace(TOOL_SELECTOR={})) is None
+
+    assert selector.selected_with == [[13.0]]
+    assert [t["name"] for t in selected] == ["list_repos"]
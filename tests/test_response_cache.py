@@ -0,0 +1,173 @@
+"""
+Tests for the LLM response cache: LRU/TTL/size bounds, key coverage and the
+shared Redis tier.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic import response_cache
+from core_logic.response_cache import LLMResponseCache, RedisResponseCacheTier, build_cache_key
+
+
+class _Clock:
+    """Controllable stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(response_cache.time, "monotonic", fake)
+    return fake
+
+
+class _FakeRedis:
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+
+    async def get(self, key):
+        value, expires_at = self.values.get(key, (None, 0))
+        return value if expires_at > self.clock() else None
+
+    async def ttl(self, key):
+        return int(self.values[key][1] - self.clock()) if key in self.values else -2
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = (value, self.clock() + ex)
+
+
+def _shared_tier(client):
+    tier = RedisResponseCacheTier(SimpleNamespace(redis_prefix="test:"))
+    tier._client = client
+    return tier
+
+
+def _events(text):
+    return [{"type": "text_chunk", "content": text}]
+
+
+async def test_lru_evicts_least_recently_used(clock):
+    cache = LLMResponseCache(max_entries=2)
+    await cache.set("a", _events("A"))
+    await cache.set("b", _events("B"))
+    assert await cache.get("a") == _events("A")  # "b" is now least recently used
+    await cache.set("c", _events("C"))
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == _events("A")
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["evictions"]) == (2, 1, 1)
+
+
+async def test_entries_expire_after_ttl(clock):
+    cache = LLMResponseCache(ttl_seconds=60)
+    await cache.set("a", _events("A"))
+    clock.now += 59
+    assert await cache.get("a") is not None
+    clock.now += 2
+    assert await cache.get("a") is None
+    assert cache.metrics()["expirations"] == 1
+    assert len(cache) == 0
+
+
+async def test_byte_budget_bounds_total_size(clock):
+    one_entry = len(response_cache.json.dumps(_events("x" * 100)))
+    cache = LLMResponseCache(max_entries=100, max_bytes=one_entry * 2)
+    for key in "abc":
+        await cache.set(key, _events("x" * 100))
+    assert len(cache) == 2
+    assert cache.metrics()["bytes"] <= one_entry * 2
+
+    await cache.set("huge", _events("x" * one_entry * 3))
+    assert await cache.get("huge") is None
+
+
+def test_key_covers_function_parts_and_generation_config():
+    history = [
+        {"role": "user", "parts": [{"text": "list my repos"}]},
+        {"role": "model", "parts": [{"function_call": {"name": "github_list_repositories", "args": {"org": "a"}}}]},
+        {"role": "function", "parts": [{"function_response": {"name": "github_list_repositories", "response": {"repos": ["x"]}}}]},
+    ]
+    base = build_cache_key(history, "gemini-1.5-flash")
+    assert base == build_cache_key([dict(m) for m in history], "gemini-1.5-flash")
+
+    other_args = [history[0], {"role": "model", "parts": [{"function_call": {"name": "github_list_repositories", "args": {"org": "b"}}}]}, history[2]]
+    other_result = history[:2] + [{"role": "function", "parts": [{"function_response": {"name": "github_list_repositories", "response": {"repos": ["y"]}}}]}]
+    assert build_cache_key(other_args, "gemini-1.5-flash") != base
+    assert build_cache_key(other_result, "gemini-1.5-flash") != base
+    assert build_cache_key(history, "gemini-1.5-flash", generation_config={"temperature": 0.2}) != base
+
+
+async def test_shared_tier_serves_hits_across_instances(clock):
+    redis_client = _FakeRedis(clock)
+    writer = LLMResponseCache(ttl_seconds=60, shared_tier=_shared_tier(redis_client))
+    reader = LLMResponseCache(ttl_seconds=60, shared_tier=_shared_tier(redis_client))
+
+    await writer.set("k", _events("shared"))
+    assert await reader.get("k") == _events("shared")
+    assert reader.metrics()["shared_hits"] == 1
+
+    # The local copy expires with the Redis entry, not a full TTL later
+    clock.now += 61
+    assert await reader.get("k") is None
+
+
+async def test_shared_tier_failure_falls_back_to_memory(clock):
+    class _BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+        async def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+    cache = LLMResponseCache(shared_tier=_shared_tier(_BrokenRedis()))
+    await cache.set("k", _events("local"))
+    assert await cache.get("k") == _events("local")
+    assert await cache.get("missing") is None
+    assert cache.metrics()["shared_tier_errors"] == 1
+
+
+async def test_llm_interface_replays_cached_response():
+    llm_interface = pytest.importorskip("llm_interface")
+    if not llm_interface.SDK_AVAILABLE:
+        pytest.skip("google-generativeai SDK not installed")
+    from unittest.mock import Mock
+    from config import Config
+    from state_models import AppState
+
+    class _Model:
+        calls = 0
+
+        def generate_content(self, *args, **kwargs):
+            self.calls += 1
+            return iter([SimpleNamespace(to_dict=lambda: {"candidates": [{"content": {"parts": [{"text": "cached reply"}]}}]})])
+
+    config = Mock(spec=Config)
+    config.GEMINI_API_KEY = "test-key"
+    config.GEMINI_MODEL = "gemini-1.5-flash"
+    config.DEFAULT_API_TIMEOUT_SECONDS = 5
+    config.DEFAULT_API_MAX_RETRIES = 0
+    config.DEFAULT_SYSTEM_PROMPT = "You are a test assistant."
+    config.LLM_MAX_CONCURRENT_CALLS = 2
+    config.LLM_RESPONSE_CACHE = {"enabled": True, "backend": "memory", "max_entries": 8, "ttl_seconds": 60}
+    config.TOOL_SELECTOR = {"enabled": False}
+    llm = llm_interface.LLMInterface(config)
+    llm.model = _Model()
+    messages = [{"role": "user", "parts": [{"text": "hi"}]}]
+
+    first = [event async for event in llm.generate_content_stream(messages, AppState())]
+    second = [event async for event in llm.generate_content_stream(messages, AppState())]
+    assert llm.model.calls == 1
+    assert [e for e in second if e["type"] == "text_chunk"] == [e for e in first if e["type"] == "text_chunk"]
+    assert second[-1]["type"] == "completed"
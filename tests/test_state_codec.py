@@ -0,0 +1,79 @@
+"""
+Tests for StateCodec: versioned binary round trips, compression threshold,
+legacy JSON rows and fallbacks for optional libraries.
+"""
+import json
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core import state_codec
+from bot_core.state_codec import FORMAT_VERSION, StateCodec, StateCodecError
+from state_models import AppState
+
+
+def _store_item(messages=3):
+    app_state = AppState(session_id="s1")
+    for i in range(messages):
+        app_state.add_message(role="user", content=f"message {i} " + "word " * 30)
+    return {"AugieConversationState": app_state, "e_tag": "*"}
+
+
+@pytest.mark.parametrize("encoding", ["json", "orjson", "msgpack"])
+def test_round_trip_matches_json_dump(encoding):
+    codec = StateCodec(encoding=encoding, compression="none")
+    item = _store_item()
+    decoded = codec.decode(codec.encode(item))
+    expected = {"AugieConversationState": item["AugieConversationState"].model_dump(mode='json'), "e_tag": "*"}
+    assert decoded == expected
+    assert AppState.model_validate(decoded["AugieConversationState"]).messages[2].text.startswith("message 2")
+
+
+def test_compresses_only_above_threshold():
+    codec = StateCodec(encoding="json", compression="zlib", compress_min_bytes=4096)
+    small = codec.encode({"turn": 1})
+    large = codec.encode(_store_item(messages=100))
+
+    assert small[:3] == bytes((FORMAT_VERSION, 0, 0))
+    assert large[:3] == bytes((FORMAT_VERSION, 0, 1))
+    assert len(zlib.decompress(large[3:])) > len(large)
+    assert codec.decode(large)["e_tag"] == "*"
+
+
+def test_reads_legacy_json_text_and_bytes():
+    codec = StateCodec()
+    legacy = json.dumps({"AugieConversationState": {"session_id": "old"}, "eTag": "1"})
+    assert codec.decode(legacy)["AugieConversationState"]["session_id"] == "old"
+    assert codec.decode(legacy.encode("utf-8"))["eTag"] == "1"
+
+
+def test_legacy_json_encoding_writes_plain_text():
+    codec = StateCodec(encoding="legacy_json")
+    encoded = codec.encode(_store_item(messages=1))
+    assert isinstance(encoded, str)
+    assert json.loads(encoded)["AugieConversationState"]["session_id"] == "s1"
+
+
+def test_corrupt_value_raises_codec_error():
+    codec = StateCodec()
+    with pytest.raises(StateCodecError):
+        codec.decode(bytes((FORMAT_VERSION, 0, 1)) + b"not zlib")
+    with pytest.raises(StateCodecError):
+        codec.decode("{not json")
+
+
+def test_unserializable_value_raises_type_error():
+    with pytest.raises(TypeError):
+        StateCodec().encode({"value": object()})
+
+
+def test_unavailable_libraries_fall_back(monkeypatch):
+    monkeypatch.setattr(state_codec, "MSGPACK_AVAILABLE", False)
+    monkeypatch.setattr(state_codec, "ZSTD_AVAILABLE", False)
+    codec = StateCodec(encoding="msgpack", compression="zstd")
+    assert codec.encoding in ("orjson", "json")
+    assert codec.compression == "zlib"
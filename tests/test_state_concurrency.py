@@ -0,0 +1,135 @@
+"""
+Tests for optimistic concurrency on bot state: stale e_tags are rejected by
+SQLiteStorage and AsyncSQLiteStorage, and ConflictMergingStorage merges two
+workers' saves of the same conversation instead of losing one.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core.async_sqlite_storage import AsyncSQLiteStorage
+from bot_core.message_log import MessageLogStorage, SQLiteMessageLog
+from bot_core.my_bot import SQLiteStorage
+from bot_core.state_concurrency import ConflictMergingStorage, ETagConflictError
+from state_models import AppState
+
+KEY = "msteams/conversations/c1"
+PROPERTY = "AugieConversationState"
+
+
+@pytest.fixture(params=["sqlite", "async_sqlite"])
+def storage(request, tmp_path):
+    db_path = str(tmp_path / "state.sqlite")
+    if request.param == "sqlite":
+        yield SQLiteStorage(db_path)
+    else:
+        store = AsyncSQLiteStorage(db_path)
+        yield store
+        store.close()
+
+
+async def test_stale_etag_is_rejected(storage):
+    await storage.write({KEY: {"turn": 1}})
+    first = (await storage.read([KEY]))[KEY]
+    second = (await storage.read([KEY]))[KEY]
+
+    await storage.write({KEY: {**first, "turn": 2}})
+    with pytest.raises(ETagConflictError) as excinfo:
+        await storage.write({KEY: {**second, "turn": 3}})
+
+    assert excinfo.value.keys == [KEY]
+    assert (await storage.read([KEY]))[KEY]["turn"] == 2
+
+
+async def test_second_save_in_same_turn_succeeds(storage):
+    await storage.write({KEY: {"turn": 1}})
+    item = (await storage.read([KEY]))[KEY]
+    item["turn"] = 2
+    await storage.write({KEY: item})
+    item["turn"] = 3
+    await storage.write({KEY: item})
+    assert (await storage.read([KEY]))[KEY]["turn"] == 3
+
+
+async def test_wildcard_etag_overwrites(storage):
+    await storage.write({KEY: {"turn": 1}})
+    await storage.write({KEY: {"turn": 2, "e_tag": "*"}})
+    assert (await storage.read([KEY]))[KEY]["turn"] == 2
+
+
+async def test_conflict_only_fails_its_own_write(storage):
+    await storage.write({KEY: {"turn": 1}})
+    stale = (await storage.read([KEY]))[KEY]
+    await storage.write({KEY: {**stale, "turn": 2}})
+    other = {"turn": 1}
+    with pytest.raises(ETagConflictError) as excinfo:
+        await storage.write({"ns/other": other, KEY: {**stale, "turn": 3}})
+
+    assert excinfo.value.keys == [KEY]
+    assert (await storage.read(["ns/other"]))["ns/other"]["turn"] == 1  # Committed, as in every backend
+    assert (await storage.read([KEY]))[KEY]["turn"] == 2
+    other["turn"] = 2
+    await storage.write({"ns/other": other})  # Its new e_tag was handed back
+
+
+async def _load(storage):
+    item = (await storage.read([KEY]))[KEY]
+    return item, AppState.model_validate(item[PROPERTY])
+
+
+@pytest.mark.parametrize("with_message_log", [False, True])
+async def test_multi_key_conflict_writes_every_key(tmp_path, with_message_log):
+    db_path = str(tmp_path / "state.sqlite")
+    inner = AsyncSQLiteStorage(db_path)
+    base = MessageLogStorage(inner, SQLiteMessageLog(db_path)) if with_message_log else inner
+    storage = ConflictMergingStorage(base)
+    other_key = "msteams/users/u1"
+    try:
+        await storage.write({KEY: {"turn": 1}, other_key: {"turn": 1}})
+        ours = await storage.read([KEY, other_key])
+        theirs = (await storage.read([other_key]))[other_key]
+        await storage.write({other_key: {**theirs, "turn": 2}})  # Another worker saves one of the keys
+
+        changes = {KEY: {**ours[KEY], "turn": 3}, other_key: {**ours[other_key], "turn": 3}}
+        await storage.write(changes)
+
+        stored = await storage.read([KEY, other_key])
+        assert stored[KEY]["turn"] == 3 and stored[other_key]["turn"] == 3
+        assert storage.conflicts == 1 and storage.merges == 1
+        # The caller's items carry the stored versions, so a second save in the turn does not conflict
+        assert changes[KEY]["e_tag"] == stored[KEY]["e_tag"]
+        assert changes[other_key]["e_tag"] == stored[other_key]["e_tag"]
+        changes[other_key]["turn"] = 4
+        await storage.write(changes)
+        assert storage.conflicts == 1
+    finally:
+        inner.close()
+
+
+@pytest.mark.parametrize("with_message_log", [False, True])
+async def test_concurrent_turns_are_merged(tmp_path, with_message_log):
+    db_path = str(tmp_path / "state.sqlite")
+    inner = AsyncSQLiteStorage(db_path)
+    base = MessageLogStorage(inner, SQLiteMessageLog(db_path)) if with_message_log else inner
+    storage = ConflictMergingStorage(base)
+    try:
+        state = AppState(session_id="c1")
+        state.add_message(role="user", content="hello")
+        await storage.write({KEY: {PROPERTY: state}})
+
+        # Two workers load the same version and each add a message
+        item_a, state_a = await _load(storage)
+        item_b, state_b = await _load(storage)
+        state_a.add_message(role="assistant", content="from worker a")
+        state_b.add_message(role="assistant", content="from worker b")
+        await storage.write({KEY: {PROPERTY: state_a, "e_tag": item_a["e_tag"]}})
+        await storage.write({KEY: {PROPERTY: state_b, "e_tag": item_b["e_tag"]}})
+
+        _, merged = await _load(storage)
+        assert [m.text for m in merged.messages] == ["hello", "from worker a", "from worker b"]
+        assert storage.conflicts == 1 and storage.merges == 1
+    finally:
+        inner.close()
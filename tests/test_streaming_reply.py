@@ -0,0 +1,125 @@
+"""
+Tests for progressive (send, then update) delivery of streamed LLM replies.
+"""
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core import streaming_reply
+from bot_core.streaming_reply import StreamingReplyWriter
+
+
+class _Clock:
+    """Controllable stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(streaming_reply.time, "monotonic", fake)
+    return fake
+
+
+def _turn_context():
+    turn_context = Mock()
+    sent_ids = iter(f"activity-{i}" for i in range(100))
+    turn_context.send_activity = AsyncMock(side_effect=lambda *_: SimpleNamespace(id=next(sent_ids)))
+    turn_context.update_activity = AsyncMock()
+    return turn_context
+
+
+def _sent_texts(turn_context):
+    return [call.args[0].text for call in turn_context.send_activity.call_args_list]
+
+
+def _updated(turn_context):
+    return [(call.args[0].id, call.args[0].text) for call in turn_context.update_activity.call_args_list]
+
+
+async def test_sends_first_chunk_then_updates_in_place(clock):
+    turn_context = _turn_context()
+    writer = StreamingReplyWriter(turn_context, flush_interval_ms=500, min_chunk_chars=5, started_at=99.0)
+
+    await writer.append("Hello there")
+    assert _sent_texts(turn_context) == ["Hello there"]
+    assert writer.time_to_first_token_ms == 1000
+
+    # Inside the flush interval: buffered
+    clock.now += 0.1
+    await writer.append(", how are")
+    assert turn_context.update_activity.await_count == 0
+
+    clock.now += 0.5
+    await writer.append(" you today?")
+    assert _updated(turn_context) == [("activity-0", "Hello there, how are you today?")]
+
+    await writer.append("!")
+    await writer.finalize()
+    assert _updated(turn_context)[-1] == ("activity-0", "Hello there, how are you today?!")
+    assert turn_context.send_activity.await_count == 1
+    assert writer.metrics()["updates"] == 2
+
+
+async def test_small_chunks_wait_for_min_chunk_size(clock):
+    turn_context = _turn_context()
+    writer = StreamingReplyWriter(turn_context, flush_interval_ms=0, min_chunk_chars=10)
+
+    await writer.append("Hi")
+    await writer.append(" you")
+    assert turn_context.send_activity.await_count == 0
+    await writer.append(" there")
+    assert _sent_texts(turn_context) == ["Hi you there"]
+
+
+async def test_long_reply_continues_in_new_activity(clock):
+    turn_context = _turn_context()
+    writer = StreamingReplyWriter(turn_context, flush_interval_ms=0, min_chunk_chars=1, max_update_chars=10)
+
+    await writer.append("12345678")
+    await writer.append("abcdef")
+    await writer.finalize()
+    assert _sent_texts(turn_context) == ["12345678", "abcdef"]
+
+
+async def test_failed_update_falls_back_to_new_message(clock):
+    turn_context = _turn_context()
+    turn_context.update_activity = AsyncMock(side_effect=RuntimeError("not supported"))
+    writer = StreamingReplyWriter(turn_context, flush_interval_ms=0, min_chunk_chars=1)
+
+    await writer.append("first")
+    await writer.append(" second")
+    assert _sent_texts(turn_context) == ["first", "first second"]
+    assert writer.activity_id == "activity-1"
+
+
+async def test_disabled_streaming_buffers_until_end_of_message(clock):
+    turn_context = _turn_context()
+    writer = StreamingReplyWriter.from_config(
+        turn_context, SimpleNamespace(STREAMING_REPLY={"enabled": False, "min_chunk_chars": 1})
+    )
+
+    await writer.append("Part one. ")
+    await writer.append("Part two.")
+    assert turn_context.send_activity.await_count == 0
+    await writer.end_message()
+    await writer.append("After tools.")
+    await writer.finalize()
+    assert _sent_texts(turn_context) == ["Part one. Part two.", "After tools."]
+    assert turn_context.update_activity.await_count == 0
+
+
+def test_from_config_ignores_missing_section():
+    writer = StreamingReplyWriter.from_config(_turn_context(), Mock())
+    assert writer.enabled is True
+    assert writer.min_chunk_chars == streaming_reply.DEFAULT_MIN_CHUNK_CHARS
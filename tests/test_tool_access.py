@@ -0,0 +1,96 @@
+"""
+Tests for requires_permission: sync and async tools are checked inline
+(no executor or nested event loop), fallbacks pass read_only_mode, and the
+user's permission bitset (role plus profile grants) is cached on the
+AppState for the turn.
+"""
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_models
+from state_models import AppState
+from user_auth import tool_access
+from user_auth.models import UserProfile
+from user_auth.permissions import (
+    ALL_PERMISSIONS_MASK, PERMISSION_BITS, PROFILE_PERMISSION_GRANTS_KEY, ROLE_PERMISSION_MASKS, ROLE_PERMISSIONS,
+    Permission, PermissionManager, UserRole,
+)
+from user_auth.tool_access import requires_permission
+
+
+@pytest.fixture(autouse=True)
+def rbac_enabled(monkeypatch):
+    config = SimpleNamespace(settings=SimpleNamespace(security_rbac_enabled=True))
+    monkeypatch.setattr(tool_access, "get_config", lambda: config)
+    monkeypatch.setattr(state_models, "get_config", lambda: config)
+    return config
+
+
+class FakeTools:
+    @requires_permission(Permission.GITHUB_WRITE_ISSUES, fallback_permission=Permission.GITHUB_READ_ISSUES)
+    def sync_tool(self, app_state, title, **kwargs):
+        return {"thread": threading.current_thread(), "read_only": kwargs.get("read_only_mode", False), "title": title}
+
+    @requires_permission(Permission.JIRA_CREATE_ISSUE)
+    async def async_tool(self, app_state, title, **kwargs):
+        return {"user": app_state.current_user.user_id, "title": title}
+
+
+def _state(role):
+    return AppState(session_id="s1", current_user=UserProfile(user_id="u1", display_name="User", assigned_role=role))
+
+
+async def test_sync_tool_is_checked_inline_on_running_loop():
+    result = FakeTools().sync_tool(app_state=_state("ADMIN"), title="t", tool_config=object())
+    assert result["thread"] is threading.current_thread()  # Previously ran on a fresh executor + event loop
+    assert result == {"thread": threading.current_thread(), "read_only": False, "title": "t"}
+
+
+async def test_fallback_and_denial():
+    assert FakeTools().sync_tool(app_state=_state("STAKEHOLDER"), title="t")["read_only"] is True
+
+    denied = await FakeTools().async_tool(app_state=_state("STAKEHOLDER"), title="t")
+    assert denied["status"] == "PERMISSION_DENIED"
+    assert await FakeTools().async_tool(app_state=_state("DEVELOPER"), title="t") == {"user": "u1", "title": "t"}
+
+
+def test_missing_user_is_denied():
+    assert FakeTools().sync_tool(app_state=AppState(session_id="s1"), title="t")["status"] == "PERMISSION_DENIED"
+
+
+def test_permission_mask_is_cached_per_user_and_role():
+    app_state = _state("developer")
+    assert app_state.permission_mask() == ROLE_PERMISSION_MASKS[UserRole.DEVELOPER]
+    assert app_state.has_permission(Permission.GITHUB_SEARCH_CODE)
+    assert app_state._permission_mask_cache[2] == ROLE_PERMISSION_MASKS[UserRole.DEVELOPER]
+
+    app_state.current_user.assigned_role = "STAKEHOLDER"  # Role change invalidates the cached mask
+    assert not app_state.has_permission(Permission.GITHUB_SEARCH_CODE)
+    assert app_state.permission_mask() & PERMISSION_BITS[Permission.GITHUB_READ_ISSUES]
+
+    app_state.current_user.assigned_role = "not-a-role"
+    assert app_state.permission_mask() == 0
+
+
+def test_profile_grants_are_merged_into_the_mask():
+    app_state = _state("STAKEHOLDER")
+    app_state.current_user.profile_data = {PROFILE_PERMISSION_GRANTS_KEY: ["JIRA_CREATE_ISSUE", "greptile_read", "BOGUS"]}
+    assert app_state.has_permission(Permission.JIRA_CREATE_ISSUE)
+    assert app_state.has_permission(Permission.GREPTILE_READ)
+    assert not app_state.has_permission(Permission.JIRA_LINK_ISSUES)
+
+    manager = PermissionManager.__new__(PermissionManager)  # No database needed for mask checks
+    effective = manager.get_effective_permissions(app_state.current_user)
+    assert effective == ROLE_PERMISSIONS[UserRole.STAKEHOLDER] | {Permission.JIRA_CREATE_ISSUE, Permission.GREPTILE_READ}
+    assert manager.has_permission(app_state.current_user, Permission.JIRA_CREATE_ISSUE)
+
+
+def test_granted_mask_covers_everything_without_rbac(rbac_enabled):
+    rbac_enabled.settings.security_rbac_enabled = False
+    assert _state("NONE").granted_permission_mask() == ALL_PERMISSIONS_MASK
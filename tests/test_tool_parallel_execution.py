@@ -0,0 +1,103 @@
+"""
+Tests for concurrent execution of the tool calls requested in one LLM turn:
+ordering, per-service limits and BREAK_ON_CRITICAL_TOOL_ERROR.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.tool_processing import _execute_tool_calls
+from state_models import AppState
+
+TOOL_DEFINITIONS = [{"name": "github_list_repositories"}, {"name": "jira_get_issues_by_user"}]
+
+
+class _FakeExecutor:
+    """Sleeps per call and tracks how many calls run at once, overall and per service."""
+
+    def __init__(self, delays, results=None):
+        self.delays = delays
+        self.results = results or {}
+        self.running = {}
+        self.max_running = {}
+        self.started = []
+        self.cancelled = []
+
+    async def execute_tool(self, tool_name, tool_input, app_state=None):
+        key = tool_input.get("n")
+        self.started.append(key)
+        for scope in ("all", tool_name.split("_")[0]):
+            self.running[scope] = self.running.get(scope, 0) + 1
+            self.max_running[scope] = max(self.max_running.get(scope, 0), self.running[scope])
+        try:
+            await asyncio.sleep(self.delays.get(key, 0.01))
+        except asyncio.CancelledError:
+            self.cancelled.append(key)
+            raise
+        finally:
+            for scope in ("all", tool_name.split("_")[0]):
+                self.running[scope] -= 1
+        return self.results.get(key, {"status": "SUCCESS", "data": {"n": key}})
+
+
+def _config(parallel=True, max_per_service=2, break_on_critical=False):
+    return SimpleNamespace(
+        TOOL_PARALLEL_EXECUTION={"enabled": parallel, "max_concurrency_per_service": max_per_service},
+        BREAK_ON_CRITICAL_TOOL_ERROR=break_on_critical,
+    )
+
+
+def _call(n, name="github_list_repositories"):
+    return {"id": f"call-{n}", "function": {"name": name, "arguments": json.dumps({"n": n})}}
+
+
+async def test_parallel_calls_overlap_and_keep_request_order():
+    executor = _FakeExecutor({1: 0.2, 2: 0.05})
+    app_state = AppState(session_id="parallel")
+    calls = [_call(1), _call(2, "jira_get_issues_by_user")]
+
+    start = time.monotonic()
+    results, _, critical, previous = await _execute_tool_calls(calls, executor, [], app_state, _config(), TOOL_DEFINITIONS)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.24  # Not the 0.25s sum of both latencies
+    assert executor.max_running["all"] == 2
+    assert [r["tool_call_id"] for r in results] == ["call-1", "call-2"]
+    assert [p[0] for p in previous] == ["call-1", "call-2"]
+    assert [e.tool_name for e in app_state.scratchpad] == ["github_list_repositories", "jira_get_issues_by_user"]
+    assert not critical
+
+
+async def test_calls_to_one_service_are_limited():
+    executor = _FakeExecutor({n: 0.05 for n in range(5)})
+    calls = [_call(n) for n in range(5)]
+    results, _, _, _ = await _execute_tool_calls(calls, executor, [], AppState(), _config(max_per_service=2), TOOL_DEFINITIONS)
+
+    assert executor.max_running["github"] == 2
+    assert [r["tool_call_id"] for r in results] == [f"call-{n}" for n in range(5)]
+
+
+async def test_disabled_runs_calls_one_at_a_time():
+    executor = _FakeExecutor({})
+    calls = [_call(1), _call(2, "jira_get_issues_by_user")]
+    await _execute_tool_calls(calls, executor, [], AppState(), _config(parallel=False), TOOL_DEFINITIONS)
+    assert executor.max_running["all"] == 1
+
+
+async def test_critical_error_stops_reporting_and_cancels_later_calls():
+    executor = _FakeExecutor(
+        {1: 0.01, 2: 0.02, 3: 1.0},
+        results={2: {"status": "ERROR", "error": "boom", "is_critical": True}},
+    )
+    calls = [_call(1), _call(2, "jira_get_issues_by_user"), _call(3, "jira_get_issues_by_user")]
+    results, _, critical, previous = await _execute_tool_calls(calls, executor, [], AppState(), _config(break_on_critical=True), TOOL_DEFINITIONS)
+
+    assert critical
+    assert [r["tool_call_id"] for r in results] == ["call-1", "call-2"]
+    assert [p[0] for p in previous] == ["call-1", "call-2"]
+    assert executor.cancelled == [3]
@@ -0,0 +1,103 @@
+"""
+Tests for the process-wide ToolSelector registry: one model load per
+process, warm-up readiness, and atomic swaps when settings or tool
+definitions change.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+np = pytest.importorskip("numpy")
+
+from core_logic import tool_selector as tool_selector_module
+from core_logic.tool_selector_registry import ToolSelectorRegistry
+
+
+class FakeModel:
+    loads = []
+
+    def __init__(self, name):
+        FakeModel.loads.append(name)
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        if isinstance(text, list):
+            return np.ones((len(text), 8), dtype=np.float32)
+        return np.full(8, float(len(text) % 5 + 1), dtype=np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fake_model():
+    FakeModel.loads = []
+    with patch.multiple(tool_selector_module, ML_DEPENDENCIES_AVAILABLE=True, np=np, SentenceTransformer=FakeModel):
+        yield
+
+
+def _config(tmp_path, **overrides):
+    settings = {
+        "similarity_threshold": 0.1,
+        "cache_path": str(tmp_path / "tool_embeddings.npy"),
+        "legacy_cache_path": str(tmp_path / "missing.json"),
+        "embedding_model": "model-a",
+    }
+    settings.update(overrides)
+    return SimpleNamespace(TOOL_SELECTOR=settings, SCHEMA_OPTIMIZATION={})
+
+
+def _tools(n=4):
+    return [{"name": f"tool_{i}", "description": f"Tool number {i}", "metadata": {}} for i in range(n)]
+
+
+def test_selector_and_model_are_shared(tmp_path):
+    registry = ToolSelectorRegistry()
+    first = registry.get(_config(tmp_path))
+    assert registry.get(_config(tmp_path)) is first  # Equal settings from a different config object
+    assert FakeModel.loads == ["model-a"]
+    assert not registry.ready
+
+
+def test_warm_up_embeds_catalog_and_marks_ready(tmp_path):
+    registry = ToolSelectorRegistry()
+    selector = registry.warm_up(_config(tmp_path), _tools())
+
+    assert registry.ready
+    assert set(selector.tool_embeddings) == {f"tool_{i}" for i in range(4)}
+    assert selector._similarity_index is not None
+    assert selector.embedding_model.encoded[-1] == "warm up"
+    assert registry.metrics()["tools_embedded"] == 4
+
+
+def test_settings_change_swaps_in_selector_reusing_model_and_embeddings(tmp_path):
+    registry = ToolSelectorRegistry()
+    old = registry.warm_up(_config(tmp_path), _tools())
+
+    new = registry.get(_config(tmp_path, similarity_threshold=0.5))
+    assert new is not old and new.similarity_threshold == 0.5
+    assert new.embedding_model is old.embedding_model
+    assert new.tool_embeddings is old.tool_embeddings
+    assert registry.ready and FakeModel.loads == ["model-a"]
+
+    other = registry.get(_config(tmp_path, embedding_model="model-b"))
+    assert FakeModel.loads == ["model-a", "model-b"]
+    assert not other.tool_embeddings and not registry.ready
+    assert registry.metrics()["swaps"] == 2
+
+
+def test_tool_changes_publish_a_new_embedding_set(tmp_path):
+    registry = ToolSelectorRegistry()
+    tools = _tools()
+    selector = registry.warm_up(_config(tmp_path), tools)
+    published = selector.tool_embeddings
+
+    changed = tools[:3] + [{"name": "tool_3", "description": "Rewritten tool", "metadata": {}}, *_tools(6)[4:]]
+    assert selector.sync_tool_embeddings(changed) == 3
+    assert selector.tool_embeddings is not published
+    assert set(published) == {f"tool_{i}" for i in range(4)}  # Readers of the old set saw no partial update
+    assert set(selector.tool_embeddings) == {f"tool_{i}" for i in range(6)}
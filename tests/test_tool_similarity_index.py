@@ -0,0 +1,298 @@
+"""
+Tests for the vectorized tool similarity index used by ToolSelector.
+
+The reference scorer below is the per-tool loop ToolSelector.select_tools
+used before the index existed; the index must reproduce its ranking.
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+np = pytest.importorskip("numpy")
+
+from core_logic import tool_selector as tool_selector_module
+from core_logic.tool_index import ToolSimilarityIndex, read_embedding_cache, write_embedding_cache
+from core_logic.tool_selector import ToolSelector
+
+
+def _make_config(tmp_path, threshold=0.1):
+    return SimpleNamespace(
+        TOOL_SELECTOR={
+            "enabled": True,
+            "similarity_threshold": threshold,
+            "max_tools": 6,
+            "always_include_tools": [],
+            "debug_logging": False,
+            "default_fallback": True,
+            "cache_path": str(tmp_path / "tool_embeddings.npy"),
+            "legacy_cache_path": str(tmp_path / "missing_legacy.json"),
+            "auto_save_interval_seconds": 300,
+            "rebuild_cache_on_startup": False,
+        },
+        SCHEMA_OPTIMIZATION={},
+    )
+
+
+def _make_catalog(n_tools, dim=32, seed=7):
+    rng = np.random.default_rng(seed)
+    services = ["github", "jira", "greptile", "perplexity", "misc"]
+    tool_defs = []
+    embeddings = {}
+    for i in range(n_tools):
+        service = services[i % len(services)]
+        name = f"{service}_tool_{i}"
+        if i == 3:
+            name = "perplexity_web_search"
+        metadata = {"keywords": [f"{service} thing", f"kw{i % 7}"]}
+        if i % 3 == 0:
+            metadata["categories"] = [service, "database"]
+        tool_defs.append({"name": name, "description": f"Tool {i}", "metadata": metadata})
+        embeddings[name] = rng.normal(size=dim).tolist()
+    embeddings["zero_vector_tool"] = [0.0] * dim
+    tool_defs.append({"name": "zero_vector_tool", "description": "zero", "metadata": {}})
+    return tool_defs, embeddings
+
+
+def _reference_scores(selector, query, query_embedding, tool_name_to_def, embeddings, exclude):
+    """Per-tool scoring loop as implemented before the similarity index."""
+    similarities = []
+    for tool_name, tool_embedding_data in embeddings.items():
+        if tool_name in exclude or tool_name not in tool_name_to_def:
+            continue
+        tool_embedding = np.array(tool_embedding_data)
+        norm_query = np.linalg.norm(query_embedding)
+        norm_tool = np.linalg.norm(tool_embedding)
+        if norm_query == 0 or norm_tool == 0:
+            similarity = 0.0
+        else:
+            similarity = np.dot(query_embedding, tool_embedding) / (norm_query * norm_tool)
+        keyword_boost = selector._check_direct_keyword_match(query, tool_name_to_def[tool_name])
+        if keyword_boost > 0:
+            similarity = similarity + keyword_boost
+        if tool_name in ("search_web", "perplexity_web_search"):
+            if similarity > selector.similarity_threshold and similarity < 0.8:
+                similarity = similarity * 0.85
+        for cat in selector._get_tool_categories(tool_name, tool_name_to_def[tool_name]):
+            if cat.lower() in [c.lower() for c in selector._extract_query_categories(query)]:
+                similarity += 0.1
+        if similarity >= selector.similarity_threshold:
+            similarities.append((tool_name, float(similarity)))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities
+
+
+@pytest.mark.parametrize("n_tools", [10, 100, 1000])
+@pytest.mark.parametrize("query", [
+    "show me the github thing for kw3",
+    "search the jira database table",
+    "latest news online",
+    "",
+])
+def test_index_matches_reference_ranking(tmp_path, n_tools, query):
+    selector = ToolSelector(_make_config(tmp_path))
+    tool_defs, embeddings = _make_catalog(n_tools)
+    tool_name_to_def = {t["name"]: t for t in tool_defs}
+    query_embedding = np.random.default_rng(len(query)).normal(size=32).astype(np.float32)
+    exclude = {tool_defs[1]["name"]}
+
+    index = ToolSimilarityIndex.from_embeddings(embeddings)
+    profile = index.compile_profile(tool_name_to_def, selector._get_tool_categories)
+    actual = index.score_query(
+        query,
+        query_embedding,
+        profile,
+        query_categories=selector._extract_query_categories(query),
+        threshold=selector.similarity_threshold,
+        exclude=exclude,
+    )
+    expected = _reference_scores(selector, query, query_embedding, tool_name_to_def, embeddings, exclude)
+
+    assert [name for name, _ in actual] == [name for name, _ in expected]
+    assert np.allclose([s for _, s in actual], [s for _, s in expected], atol=1e-5)
+
+
+def test_profile_is_reused_for_same_catalog(tmp_path):
+    selector = ToolSelector(_make_config(tmp_path))
+    tool_defs, embeddings = _make_catalog(20)
+    tool_name_to_def = {t["name"]: t for t in tool_defs}
+    index = ToolSimilarityIndex.from_embeddings(embeddings)
+
+    first = index.compile_profile(tool_name_to_def, selector._get_tool_categories)
+    second = index.compile_profile(dict(tool_name_to_def), selector._get_tool_categories)
+    assert first is second
+
+    changed = dict(tool_name_to_def)
+    changed[tool_defs[0]["name"]] = dict(tool_defs[0])
+    assert index.compile_profile(changed, selector._get_tool_categories) is not first
+
+
+def test_from_embeddings_skips_invalid_vectors():
+    index = ToolSimilarityIndex.from_embeddings({
+        "ok": [1.0, 0.0, 0.0],
+        "scalar": 3.0,
+        "wrong_dim": [1.0, 2.0],
+        "also_ok": [0.0, 2.0, 0.0],
+    })
+    assert index.names == ["ok", "also_ok"]
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+    assert index.top_k([0.0, 1.0, 0.0], threshold=0.5, max_results=5) == [("also_ok", 1.0)]
+
+
+def test_select_tools_uses_index(tmp_path):
+    class FakeModel:
+        def encode(self, text):
+            return np.ones(32, dtype=np.float32)
+
+    selector = ToolSelector(_make_config(tmp_path, threshold=-10.0))
+    tool_defs, embeddings = _make_catalog(50)
+    selector.embedding_model = FakeModel()
+    selector.tool_embeddings = {name: np.array(vec) for name, vec in embeddings.items()}
+
+    with patch.object(tool_selector_module, "ML_DEPENDENCIES_AVAILABLE", True), \
+            patch.object(tool_selector_module, "np", np):
+        selected = selector.select_tools("zzz", app_state=None, available_tools=tool_defs)
+        similar = selector.find_similar_tools("zzz", threshold=-10.0, max_results=3)
+
+    expected = _reference_scores(
+        selector, "zzz", np.ones(32, dtype=np.float32),
+        {t["name"]: t for t in tool_defs}, embeddings, set()
+    )
+    # No user context: every synthetic tool is permission-free, so the top six survive
+    assert [t["name"] for t in selected] == [name for name, _ in expected[:6]]
+    assert len(similar) == 3
+    assert selector._similarity_index is not None
+
+
+class _CountingModel:
+    """Deterministic stand-in for SentenceTransformer that counts encodes."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, text):
+        self.calls.append(text)
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.normal(size=self.dim).astype(np.float32)
+
+
+def _ml_enabled():
+    return patch.multiple(tool_selector_module, ML_DEPENDENCIES_AVAILABLE=True, np=np)
+
+
+def test_binary_cache_round_trip_is_memory_mapped(tmp_path):
+    tool_defs, _ = _make_catalog(12)
+    with _ml_enabled():
+        builder = ToolSelector(_make_config(tmp_path))
+        builder.embedding_model = _CountingModel()
+        builder.build_tool_embeddings(tool_defs)
+
+        assert (tmp_path / "tool_embeddings.meta.json").exists()
+        assert [p.name for p in tmp_path.glob("tool_embeddings.*.npy")] == [
+            json.loads((tmp_path / "tool_embeddings.meta.json").read_text())["matrix_file"]
+        ]
+
+        worker = ToolSelector(_make_config(tmp_path))
+        expected = builder._get_similarity_index().matrix
+
+    index = worker._similarity_index
+    assert index is not None
+    assert index.names == [t["name"] for t in tool_defs]
+    # Zero-copy: the index matrix is backed by the memory-mapped file
+    assert not index.matrix.flags.owndata
+    assert not index.matrix.flags.writeable
+    assert set(worker.tool_content_hashes) == set(index.names)
+    assert np.allclose(index.matrix, expected)
+
+
+def test_only_changed_tools_are_re_embedded(tmp_path):
+    tool_defs, _ = _make_catalog(8)
+    with _ml_enabled():
+        selector = ToolSelector(_make_config(tmp_path))
+        selector.embedding_model = _CountingModel()
+        selector.build_tool_embeddings(tool_defs)
+        assert len(selector.embedding_model.calls) == len(tool_defs)
+
+        worker = ToolSelector(_make_config(tmp_path))
+        worker.embedding_model = _CountingModel()
+        changed = [dict(t) for t in tool_defs]
+        changed[2]["description"] = "A brand new description"
+        changed.append({"name": "new_tool", "description": "New", "metadata": {}})
+
+        assert worker.sync_tool_embeddings(changed) == 2
+        assert len(worker.embedding_model.calls) == 2
+        # Same catalog again: nothing to do
+        assert worker.sync_tool_embeddings(changed) == 0
+
+        reloaded = ToolSelector(_make_config(tmp_path))
+    assert "new_tool" in reloaded._similarity_index.names
+    assert reloaded.tool_content_hashes[changed[2]["name"]] == worker.tool_content_hashes[changed[2]["name"]]
+
+
+def test_cache_rewrite_switches_matrix_and_names_together(tmp_path):
+    matrix_path = str(tmp_path / "tool_embeddings.npy")
+    sidecar_path = tmp_path / "tool_embeddings.meta.json"
+    old = np.eye(3, dtype=np.float32)
+    write_embedding_cache(matrix_path, ["a", "b", "c"], old, {}, {}, "model")
+    old_sidecar = json.loads(sidecar_path.read_text())
+
+    # Same row count, tools renamed and reordered: shape checks alone cannot tell the versions apart
+    new = np.eye(3, dtype=np.float32)[::-1]
+    write_embedding_cache(matrix_path, ["c", "b", "x"], new, {}, {}, "model")
+
+    cache = read_embedding_cache(matrix_path)
+    assert cache.names == ["c", "b", "x"]
+    assert np.array_equal(cache.matrix, new)
+    # A reader still holding the previous sidecar finds the matrix that goes with it
+    assert np.array_equal(np.load(tmp_path / old_sidecar["matrix_file"]), old)
+    assert not list(tmp_path.glob("*.tmp"))
+
+    write_embedding_cache(matrix_path, ["a"], np.ones((1, 3), dtype=np.float32), {}, {}, "model")
+    assert len(list(tmp_path.glob("tool_embeddings.*.npy"))) == 2  # Current and previous only
+
+
+def test_legacy_json_cache_is_migrated(tmp_path):
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(json.dumps({
+        "embeddings": {"help": [1.0, 0.0, 0.0], "read_file": [0.0, 1.0, 0.0]},
+        "metadata": {"help": {"name": "help"}, "read_file": {"name": "read_file"}},
+        "timestamp": 0,
+        "version": "1.1",
+    }))
+    config = _make_config(tmp_path)
+    config.TOOL_SELECTOR["legacy_cache_path"] = str(legacy)
+
+    with _ml_enabled():
+        migrated = ToolSelector(config)
+        assert set(migrated.tool_embeddings) == {"help", "read_file"}
+        assert migrated.tool_content_hashes == {"help": None, "read_file": None}
+
+        reloaded = ToolSelector(config)
+    assert reloaded._similarity_index.names == ["help", "read_file"]
+    assert not reloaded._similarity_index.matrix.flags.owndata
+
+
+def test_permission_filtering_uses_one_mask_operation(tmp_path):
+    from core_logic.tool_index import permitted_by_mask
+    from user_auth.permissions import PERMISSION_BITS, Permission
+
+    selector = ToolSelector(_make_config(tmp_path))
+    read_repo, write_issues = Permission.GITHUB_READ_REPO, Permission.GITHUB_WRITE_ISSUES
+    tools = [
+        {"name": "help", "metadata": {}},
+        {"name": "read", "metadata": {"required_permission_name": read_repo.name}},
+        {"name": "write", "metadata": {"required_permission_name": write_issues.name}},
+        {"name": "broken", "metadata": {"required_permission_name": "NOT_A_PERMISSION"}},
+    ]
+
+    permitted = selector._filter_by_permission_mask(tools, PERMISSION_BITS[read_repo])
+    assert [t["name"] for t in permitted] == ["help", "read"]
+    assert selector._permission_bits == {"help": 0, "read": PERMISSION_BITS[read_repo], "write": PERMISSION_BITS[write_issues], "broken": -1}
+    assert permitted_by_mask([0, 1, 2, -1], 1) == [True, True, False, False]
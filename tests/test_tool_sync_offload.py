@@ -0,0 +1,94 @@
+"""
+Tests for running synchronous tools off the event loop: a slow sync tool
+must not stall other coroutines, pools are bounded per service and queue
+time is reported.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from tools import _tool_decorator, _tool_offload
+from tools._tool_decorator import tool_function
+from tools._tool_offload import SyncToolOffload, configure_sync_tool_offload
+
+
+@pytest.fixture
+def offload():
+    offload = configure_sync_tool_offload(
+        SimpleNamespace(TOOL_SYNC_OFFLOAD={"enabled": True, "default_pool_size": 4, "pool_sizes": {"slowsvc": 1}})
+    )
+    yield offload
+    offload.shutdown(wait=True)
+    _tool_offload._offload = None
+
+
+@pytest.fixture
+def slow_tool():
+    class SlowTools:
+        def __init__(self):
+            self.threads = []
+
+        @tool_function(name="slowsvc_fetch", description="Blocking fetch used in tests.")
+        def fetch(self, delay: float) -> str:
+            """Blocking fetch.
+
+            Args:
+                delay: Seconds to block.
+            """
+            self.threads.append(threading.current_thread().name)
+            time.sleep(delay)  # Stands in for requests.Session.request
+            return "done"
+
+    yield SlowTools
+    _tool_decorator._TOOL_REGISTRY.pop("slowsvc_fetch", None)
+    _tool_decorator._TOOL_DEFINITIONS.pop("slowsvc_fetch", None)
+
+
+async def test_slow_sync_tool_does_not_block_loop(offload, slow_tool):
+    tools = slow_tool()
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    result = await tools.fetch(tool_config=MagicMock(spec=Config), delay=0.3)
+    beat.cancel()
+
+    assert result["status"] == "SUCCESS" and result["data"] == "done"
+    assert ticks >= 10  # ~30 expected; 0 if the tool ran on the loop thread
+    assert tools.threads[0].startswith("tool-slowsvc")
+
+
+async def test_pool_is_bounded_per_service_and_reports_queue_time(offload):
+    def block(delay):
+        time.sleep(delay)
+        return delay
+
+    await asyncio.gather(*(offload.run("slowsvc", block, 0.05) for _ in range(3)))
+    await offload.run("othersvc", block, 0)
+
+    metrics = offload.metrics()
+    assert metrics["slowsvc"]["pool_size"] == 1
+    assert metrics["slowsvc"]["calls"] == 3
+    assert metrics["slowsvc"]["max_queue_ms"] >= 90  # Third call waited for two others
+    assert metrics["slowsvc"]["queued"] == 0 and metrics["slowsvc"]["running"] == 0
+    assert metrics["othersvc"]["pool_size"] == 4
+
+
+async def test_disabled_offload_calls_inline():
+    offload = SyncToolOffload(enabled=False)
+    assert await offload.run("svc", threading.current_thread) is threading.current_thread()
+    assert offload.metrics() == {}
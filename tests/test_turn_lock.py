@@ -0,0 +1,102 @@
+"""
+Tests for TurnLockManager: turns of one conversation are serialized, other
+conversations are not blocked, and queue depth / wait metrics are recorded.
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_core.intelligent_conversation_orchestrator import IntelligentConversationOrchestrator
+from bot_core.turn_lock import RedisTurnLockManager, TurnLockManager
+
+
+async def _turn(locks, conversation_id, log, duration=0.02):
+    async with locks.hold(conversation_id):
+        log.append(("start", conversation_id))
+        await asyncio.sleep(duration)
+        log.append(("end", conversation_id))
+
+
+async def test_same_conversation_is_serialized():
+    locks, log = TurnLockManager(), []
+    await asyncio.gather(*(_turn(locks, "c1", log) for _ in range(3)))
+
+    assert [event for event, _ in log] == ["start", "end"] * 3
+    metrics = locks.metrics()
+    assert metrics["contended"] == 2
+    assert metrics["max_queue_depth"] == 2
+    assert metrics["max_wait_ms"] >= 30
+    assert metrics["active_conversations"] == 0
+
+
+async def test_other_conversations_run_in_parallel():
+    locks, log = TurnLockManager(), []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(_turn(locks, f"c{i}", log, duration=0.1) for i in range(10)))
+
+    assert loop.time() - start < 0.5
+    assert locks.metrics()["contended"] == 0
+
+
+async def test_queue_depth_and_release_on_error():
+    locks = TurnLockManager()
+    entered = asyncio.Event()
+
+    async def failing_turn():
+        async with locks.hold("c1"):
+            entered.set()
+            await asyncio.sleep(0.02)
+            raise RuntimeError("turn failed")
+
+    first = asyncio.create_task(failing_turn())
+    await entered.wait()
+    second = asyncio.create_task(_turn(locks, "c1", []))
+    await asyncio.sleep(0)
+    assert locks.queue_depth("c1") == 1
+
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    assert isinstance(results[0], RuntimeError) and results[1] is None
+    assert locks.queue_depth("c1") == 0
+
+
+async def test_orchestrator_entry_point_serializes_a_conversation():
+    locks, log = TurnLockManager(), []
+    orchestrator = IntelligentConversationOrchestrator.__new__(IntelligentConversationOrchestrator)
+    orchestrator.turn_locks = locks
+
+    async def process(turn_context):
+        conversation_id = turn_context.activity.conversation.id
+        log.append(("start", conversation_id))
+        await asyncio.sleep(0.02)
+        log.append(("end", conversation_id))
+
+    orchestrator._process_activity = process
+
+    def turn_context(conversation_id):
+        return SimpleNamespace(activity=SimpleNamespace(conversation=SimpleNamespace(id=conversation_id)))
+
+    await asyncio.gather(*(orchestrator.process_activity(turn_context("c1")) for _ in range(2)))
+
+    assert log == [("start", "c1"), ("end", "c1")] * 2
+    assert locks.metrics()["contended"] == 1
+
+
+async def test_timeout_lets_turn_proceed():
+    locks, log = TurnLockManager(acquire_timeout=0.05), []
+    await asyncio.gather(_turn(locks, "c1", log, duration=0.2), _turn(locks, "c1", log))
+    assert locks.metrics()["timeouts"] == 1
+    assert [event for event, _ in log][:2] == ["start", "start"]
+
+
+def test_from_settings_selects_backend():
+    assert TurnLockManager.from_settings(SimpleNamespace(turn_lock_backend="none")) is None
+    assert type(TurnLockManager.from_settings(SimpleNamespace())) is TurnLockManager
+    redis_locks = TurnLockManager.from_settings(
+        SimpleNamespace(turn_lock_backend="redis", turn_lock_lease_seconds=10, redis_prefix="bot:")
+    )
+    assert isinstance(redis_locks, RedisTurnLockManager)
+    assert redis_locks.lease_ms == 10000 and redis_locks.key_prefix == "bot:turn_lock:"
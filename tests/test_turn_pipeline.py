@@ -0,0 +1,133 @@
+"""
+Tests for TurnPipeline and the orchestrator's concurrent turn stages: state
+and profile load together, the query embedding and intent classification
+start speculatively, and short-circuited turns cancel what they don't need.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botbuilder.schema import ActivityTypes
+
+from bot_core.intelligent_conversation_orchestrator import IntelligentConversationOrchestrator
+from bot_core.turn_pipeline import TurnPipeline
+from core_logic.intent_classifier import UserIntent
+from state_models import AppState
+from user_auth.profile_repository import close_profile_repository
+
+
+@pytest.fixture(autouse=True)
+async def _close_profile_repository():
+    yield
+    await close_profile_repository()
+
+
+async def test_stages_overlap_and_speculative_work_is_cancelled(caplog):
+    pipeline = TurnPipeline()
+    slow = pipeline.start("slow", asyncio.sleep(0.05, result="slow"))
+    fast = pipeline.start("fast", asyncio.sleep(0.05, result="fast"))
+    speculative = pipeline.start("speculative", asyncio.sleep(10), speculative=True)
+
+    started = time.monotonic()
+    assert await asyncio.gather(slow, fast) == ["slow", "fast"]
+    assert time.monotonic() - started < 0.09  # Ran concurrently, not one after the other
+
+    assert pipeline.short_circuit("help") == ["speculative"]
+    with caplog.at_level(logging.INFO, logger="bot_core.turn_pipeline"):
+        details = pipeline.finish()
+    await asyncio.sleep(0)
+    assert speculative.cancelled()
+
+    assert details["outcome"] == "help"
+    assert details["cancelled"] == ["speculative"]
+    assert details["stages"]["slow"]["status"] == "completed"
+    assert details["stages"]["speculative"]["status"] == "cancelled"
+    assert [r for r in caplog.records if getattr(r, "event_type", None) == "turn_pipeline_timings"]
+
+
+async def test_unawaited_failures_are_recorded():
+    async def fail():
+        raise RuntimeError("boom")
+
+    pipeline = TurnPipeline()
+    pipeline.start("flaky", fail(), speculative=True)
+    await asyncio.sleep(0.01)
+    details = pipeline.finish()
+    assert details["outcome"] == "completed"
+    assert details["stages"]["flaky"]["status"] == "failed"
+
+
+def _orchestrator(intent, speculation_enabled=True):
+    orchestrator = IntelligentConversationOrchestrator.__new__(IntelligentConversationOrchestrator)
+    orchestrator.logger = logging.getLogger("test_turn_pipeline")
+    orchestrator.turn_locks = None
+    orchestrator.config = SimpleNamespace(STATE_DB_PATH=":memory:", TURN_PIPELINE={"speculation_enabled": speculation_enabled})
+    orchestrator.workflow_manager = None
+    orchestrator.tool_executor = object()
+    orchestrator.embedded = []
+
+    async def load_state(turn_context, factory):
+        await asyncio.sleep(0.05)
+        return AppState(session_id="conv-1")
+
+    async def classify_intent(message, context):
+        await asyncio.sleep(0.05)
+        return intent, 0.9
+
+    async def embed_query_async(query):
+        orchestrator.embedded.append(query)
+        await asyncio.sleep(10)
+
+    orchestrator.convo_state_accessor = SimpleNamespace(get=load_state)
+    orchestrator.intent_classifier = SimpleNamespace(classify_intent=classify_intent)
+    orchestrator.llm_interface = SimpleNamespace(tool_selector=SimpleNamespace(embed_query_async=embed_query_async))
+    orchestrator._send_help_message = AsyncMock()
+    orchestrator._handle_general_task_with_tools = AsyncMock()
+    orchestrator._save_app_state = AsyncMock()
+    return orchestrator
+
+
+def _turn(text):
+    activity = SimpleNamespace(type=ActivityTypes.message, text=text, conversation=SimpleNamespace(id="conv-1"))
+    return SimpleNamespace(activity=activity, send_activity=AsyncMock())
+
+
+def _slow_profile(*args, **kwargs):
+    time.sleep(0.05)
+    return None
+
+
+async def test_help_turn_cancels_speculative_embedding(caplog):
+    orchestrator = _orchestrator(UserIntent.COMMAND_HELP)
+    with patch("user_auth.profile_repository.get_current_user_profile", _slow_profile), \
+         caplog.at_level(logging.INFO, logger="test_turn_pipeline"):
+        await orchestrator.process_activity(_turn("show me what you can do with jira"))
+
+    orchestrator._send_help_message.assert_awaited_once()
+    orchestrator._handle_general_task_with_tools.assert_not_awaited()
+    assert orchestrator.embedded == ["show me what you can do with jira"]
+
+    details = next(r.details for r in caplog.records if getattr(r, "event_type", None) == "turn_pipeline_timings")
+    stages = details["stages"]
+    assert details["outcome"] == "intent:command_help"
+    assert stages["query_embedding"]["status"] == "cancelled"
+    # State and profile loaded concurrently, with the embedding already running
+    assert stages["profile_load"]["start_ms"] < stages["state_load"]["start_ms"] + stages["state_load"]["duration_ms"]
+    assert stages["query_embedding"]["start_ms"] <= stages["state_load"]["start_ms"]
+
+
+async def test_general_task_runs_after_classification():
+    orchestrator = _orchestrator(UserIntent.GENERAL_TASK, speculation_enabled=False)
+    with patch("user_auth.profile_repository.get_current_user_profile", _slow_profile):
+        await orchestrator.process_activity(_turn("list my open pull requests"))
+
+    orchestrator._handle_general_task_with_tools.assert_awaited_once()
+    assert orchestrator.embedded == []  # Speculation disabled: LLMInterface embeds the query itself
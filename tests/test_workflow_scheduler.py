@@ -0,0 +1,80 @@
+"""
+Tests for the dependency-graph scheduler in WorkflowOrchestrator: concurrent
+independent steps, dependents of failed steps, deadlines and step timings.
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.workflow_orchestrator import WorkflowOrchestrator, WorkflowStep, topological_order
+from state_models import AppState
+
+
+class _FakeExecutor:
+    def __init__(self, delays, failures=()):
+        self.delays = delays
+        self.failures = set(failures)
+        self.calls = []
+
+    async def execute_tool(self, tool_name, tool_input, app_state=None):
+        self.calls.append(tool_name)
+        await asyncio.sleep(self.delays.get(tool_name, 0.01))
+        if tool_name in self.failures:
+            return {"status": "ERROR", "message": f"{tool_name} failed"}
+        return {"status": "SUCCESS", "data": [tool_name]}
+
+
+def _orchestrator(executor, steps, timeout=5):
+    orchestrator = WorkflowOrchestrator(executor, SimpleNamespace(WORKFLOW_TIMEOUT_SECONDS=timeout))
+    orchestrator.workflow_patterns = {"test": steps}
+    return orchestrator
+
+
+def _step(step_id, depends_on=None):
+    return WorkflowStep(step_id=step_id, tool_name=f"tool_{step_id}", parameters={}, depends_on=depends_on)
+
+
+def test_topological_order_drops_cycles_and_unknown_dependencies():
+    steps = [_step("c", ["b"]), _step("a"), _step("b", ["a"]), _step("x", ["y"]), _step("y", ["x"]), _step("z", ["missing"])]
+    assert topological_order(steps) == ["a", "b", "c"]
+
+
+async def test_independent_steps_run_concurrently():
+    executor = _FakeExecutor({"tool_a": 0.2, "tool_b": 0.2, "tool_c": 0.05})
+    steps = [_step("a"), _step("b"), _step("c", ["a"])]
+    result = await _orchestrator(executor, steps).execute_workflow("test", AppState())
+
+    # Critical path a -> c is 0.25s; the sum of all steps is 0.45s
+    assert result.execution_time_ms < 400
+    assert result.steps_executed == ["a", "b", "c"]
+    timings = result.step_timings
+    assert timings["a"]["start_ms"] < 50 and timings["b"]["start_ms"] < 50
+    assert timings["c"]["start_ms"] >= timings["a"]["end_ms"]
+    assert all(timings[s]["status"] == "succeeded" for s in "abc")
+
+
+async def test_dependents_of_failed_step_are_skipped():
+    executor = _FakeExecutor({}, failures={"tool_a"})
+    steps = [_step("a"), _step("b", ["a"]), _step("c", ["b"]), _step("d")]
+    result = await _orchestrator(executor, steps).execute_workflow("test", AppState())
+
+    assert result.steps_executed == ["a", "d"]
+    assert result.skipped_steps == ["b", "c"]
+    assert "tool_b" not in executor.calls
+    assert result.step_timings["a"]["status"] == "failed"
+    assert result.step_timings["c"]["status"] == "skipped"
+
+
+async def test_deadline_cancels_running_steps():
+    executor = _FakeExecutor({"tool_slow": 5.0, "tool_fast": 0.01})
+    steps = [_step("fast"), _step("slow"), _step("after_slow", ["slow"])]
+    result = await _orchestrator(executor, steps, timeout=0.2).execute_workflow("test", AppState())
+
+    assert result.timed_out
+    assert result.execution_time_ms < 1000
+    assert result.steps_executed == ["fast"]
+    assert sorted(result.skipped_steps) == ["after_slow", "slow"]
+    assert result.success
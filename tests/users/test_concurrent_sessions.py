@@ -8,6 +8,7 @@ This test proves that concurrent user sessions remain completely isolated.
 """
 
 import asyncio
+import contextlib
 import logging
 import time
 import threading
@@ -21,6 +22,7 @@ from state_models import AppState
 from user_auth.models import UserProfile
 from user_auth.db_manager import save_user_profile, get_user_profile_by_id
 from user_auth.permissions import PermissionManager, UserRole
+from bot_core.turn_lock import TurnLockManager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -343,6 +345,65 @@ class ConcurrentSessionValidator:
                 conn.close()
             return False
             
+    async def _run_contended_turns(self, turn_locks, group_turns: int, private_turns: int, turn_seconds: float) -> Dict[str, Any]:
+        """Simulate turns that load, update and save a conversation's AppState (as MyBot.on_turn does)."""
+        states: Dict[str, Dict[str, Any]] = {}
+        private_latencies: List[float] = []
+
+        async def turn(conversation_id: str, user_id: str, index: int, latencies: List[float] = None):
+            started = time.perf_counter()
+            async with turn_locks.hold(conversation_id) if turn_locks else contextlib.nullcontext():
+                loaded = dict(states.get(conversation_id, {"messages": []}))  # Load
+                await asyncio.sleep(turn_seconds)  # LLM call / tool work
+                loaded["messages"] = loaded["messages"] + [f"{user_id}:{index}"]
+                states[conversation_id] = loaded  # save_changes
+            if latencies is not None:
+                latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        for user in self.test_users:
+            tasks += [turn("group-chat", user.user_id, i) for i in range(group_turns)]
+            tasks += [turn(f"private-{user.user_id}", user.user_id, i, private_latencies) for i in range(private_turns)]
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        return {
+            "elapsed": time.perf_counter() - start,
+            "group_messages": len(states["group-chat"]["messages"]),
+            "expected_group_messages": group_turns * len(self.test_users),
+            "worst_private_latency": max(private_latencies),
+        }
+
+    async def benchmark_turn_lock_contention(self) -> bool:
+        """Benchmark per-conversation turn locks: one busy group chat next to private chats."""
+        print("\n⏱️  BENCHMARKING TURN LOCK CONTENTION")
+        group_turns, private_turns, turn_seconds = 4, 4, 0.01
+
+        try:
+            unlocked = await self._run_contended_turns(None, group_turns, private_turns, turn_seconds)
+            turn_locks = TurnLockManager()
+            locked = await self._run_contended_turns(turn_locks, group_turns, private_turns, turn_seconds)
+            metrics = turn_locks.metrics()
+
+            print(f"{'mode':>10} | {'elapsed (s)':>11} | {'group msgs kept':>15} | {'worst private turn (ms)':>23}")
+            for mode, result in (("no lock", unlocked), ("turn lock", locked)):
+                kept = f"{result['group_messages']}/{result['expected_group_messages']}"
+                print(f"{mode:>10} | {result['elapsed']:>11.3f} | {kept:>15} | {result['worst_private_latency'] * 1000:>23.1f}")
+            print(f"📊 Turn lock metrics: {metrics}")
+
+            if locked["group_messages"] != locked["expected_group_messages"]:
+                print("❌ Turn lock lost group chat updates")
+                return False
+            # Private chats queue behind their own turns only, never behind the group chat
+            if locked["worst_private_latency"] > turn_seconds * private_turns * 3:
+                print("❌ Private conversations were blocked by group chat contention")
+                return False
+            print("✅ Group chat turns serialized without lost updates; private chats unaffected")
+            return True
+
+        except Exception as e:
+            print(f"❌ Turn lock benchmark failed: {e}")
+            return False
+
     def cleanup_concurrent_test_data(self) -> bool:
         """Clean up concurrent test data."""
         print("\n🧹 CLEANING UP CONCURRENT TEST DATA")
@@ -364,6 +425,7 @@ class ConcurrentSessionValidator:
             ("Creating concurrent test users", self.create_concurrent_test_users),
             ("Running concurrent sessions", self.run_concurrent_sessions),
             ("Verifying database isolation", self.verify_database_isolation_concurrent),
+            ("Benchmarking turn lock contention", self.benchmark_turn_lock_contention),
             ("Cleaning up test data", self.cleanup_concurrent_test_data)
         ]
         
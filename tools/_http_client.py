@@ -0,0 +1,294 @@
+"""
+Shared async HTTP client for tool integrations.
+
+Tools used to talk to their APIs through ``requests.Session``, either from
+sync methods or from ``async def`` methods that still blocked the event loop.
+``AsyncHTTPClient`` is the async replacement, built on aiohttp (already the
+bot's web server):
+
+- one pooled ``aiohttp.ClientSession`` per event loop, with a per-host
+  connection limit, DNS cache and keep-alive, shared by every instance of a
+  tool class (``get_http_client(service)``);
+- total and connect timeouts;
+- retries with exponential backoff for connection errors, timeouts and
+  429/5xx responses, honoring ``Retry-After`` (seconds or HTTP date);
+- a response size limit, enforced while the body is streamed.
+
+Non-retryable error statuses are returned to the caller as an
+``HTTPResponse``, so each tool keeps its own API-specific error messages.
+Sync code with no running loop (health checks run on worker threads) can use
+``run_sync``.
+"""
+
+import asyncio
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+
+import aiohttp
+from multidict import CIMultiDict
+
+log = logging.getLogger("tools.http_client")
+
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE_SECONDS = 0.5
+DEFAULT_MAX_BACKOFF_SECONDS = 30.0
+DEFAULT_MAX_RESPONSE_BYTES = 10 * 1024 * 1024
+DEFAULT_LIMIT_PER_HOST = 10
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_CHUNK_SIZE = 64 * 1024
+
+T = TypeVar("T")
+
+
+class HTTPClientError(RuntimeError):
+    """A request could not be completed."""
+
+
+class HTTPTransportError(HTTPClientError):
+    """Connection failure or timeout, after all retries."""
+
+
+class ResponseTooLargeError(HTTPClientError):
+    """The response body exceeded the client's ``max_response_bytes``."""
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    headers: Mapping[str, str] = field(default_factory=CIMultiDict)  # Case-insensitive
+    body: bytes = b""
+    url: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        """Parsed JSON body; raises ``json.JSONDecodeError`` like ``requests.Response.json``."""
+        return json.loads(self.body)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AsyncHTTPClient:
+    """Pooled async HTTP client for one service (e.g. "perplexity")."""
+
+    def __init__(
+        self,
+        service: str,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+        max_backoff: float = DEFAULT_MAX_BACKOFF_SECONDS,
+        max_response_bytes: int = DEFAULT_MAX_RESPONSE_BYTES,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+    ):
+        """
+        Args:
+            service: Name used in logs and metrics
+            timeout: Default total timeout per attempt, in seconds
+            connect_timeout: Timeout for establishing a connection
+            max_retries: Retries after the first attempt for retryable failures
+            backoff_base: First backoff delay; doubled per retry, with jitter
+            max_backoff: Longest wait between attempts, including Retry-After;
+                a longer Retry-After ends the retries
+            max_response_bytes: Largest accepted response body
+            limit_per_host: Concurrent connections per host
+        """
+        self.service = service
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_response_bytes = max_response_bytes
+        self.limit_per_host = limit_per_host
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes_received = 0
+
+    def _session(self) -> aiohttp.ClientSession:
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            session = aiohttp.ClientSession(connector=connector, raise_for_status=False)
+            with self._lock:
+                self._sessions = {
+                    other_loop: other for other_loop, other in self._sessions.items() if not other_loop.is_closed()
+                }
+                self._sessions[loop] = session
+        return session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+    ) -> HTTPResponse:
+        """
+        Send a request, retrying connection errors, timeouts and 429/5xx responses.
+
+        Returns the final response whatever its status. Raises
+        ``HTTPTransportError`` if no response was received and
+        ``ResponseTooLargeError`` if the body is over the limit.
+        """
+        max_retries = self.max_retries if retries is None else retries
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout, connect=self.connect_timeout)
+        method = method.upper()
+        for attempt in range(max_retries + 1):
+            self.requests += 1
+            try:
+                response = await self._send(method, url, params, json_body, headers, client_timeout)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                if attempt >= max_retries:
+                    self.failures += 1
+                    raise HTTPTransportError(f"{self.service} {method} {url} failed after {attempt + 1} attempts: {error}") from e
+                delay = self._backoff(attempt)
+                log.warning(f"{self.service} {method} {url} failed ({error}); retrying in {delay:.2f}s")
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self.max_backoff:
+                    log.warning(f"{self.service} {method} {url} returned {response.status} with Retry-After {retry_after:.0f}s; not retrying")
+                    return response
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                log.warning(f"{self.service} {method} {url} returned {response.status}; retrying in {delay:.2f}s")
+            self.retries += 1
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")  # The last attempt always returns or raises
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json_body: Any,
+        headers: Optional[Dict[str, str]],
+        client_timeout: aiohttp.ClientTimeout,
+    ) -> HTTPResponse:
+        async with self._session().request(
+            method, url, params=params, json=json_body, headers=headers, timeout=client_timeout
+        ) as response:
+            if response.content_length is not None and response.content_length > self.max_response_bytes:
+                raise ResponseTooLargeError(
+                    f"{self.service} response of {response.content_length} bytes exceeds the {self.max_response_bytes}-byte limit"
+                )
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > self.max_response_bytes:
+                    raise ResponseTooLargeError(
+                        f"{self.service} response exceeds the {self.max_response_bytes}-byte limit"
+                    )
+            self.bytes_received += len(body)
+            return HTTPResponse(status=response.status, headers=CIMultiDict(response.headers), body=bytes(body), url=str(response.url))
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff_base * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+    def run_sync(self, make_coro: Callable[[], Awaitable[T]]) -> T:
+        """Run ``make_coro()`` to completion from sync code that has no running event loop."""
+        async def main() -> T:
+            try:
+                return await make_coro()
+            finally:
+                await self._close_session(asyncio.get_running_loop())
+        return asyncio.run(main())
+
+    async def _close_session(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def close(self) -> None:
+        """Close the session of the running loop."""
+        await self._close_session(asyncio.get_running_loop())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes_received": self.bytes_received,
+            "sessions": len(self._sessions),
+        }
+
+
+_clients: Dict[str, AsyncHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _client_settings(config: Any) -> Dict[str, Any]:
+    """The HTTP_CLIENT section of the app config, tolerating partial or mocked configs."""
+    settings = getattr(config, "HTTP_CLIENT", None) if config is not None else None
+    if not isinstance(settings, dict):
+        return {}
+    allowed: Dict[str, Tuple[type, ...]] = {
+        "timeout": (int, float),
+        "connect_timeout": (int, float),
+        "max_retries": (int,),
+        "max_response_bytes": (int,),
+        "limit_per_host": (int,),
+    }
+    return {key: value for key, value in settings.items() if key in allowed and isinstance(value, allowed[key])}
+
+
+def get_http_client(service: str, config: Any = None) -> AsyncHTTPClient:
+    """The process-wide client for ``service``, built from ``config`` on first use."""
+    client = _clients.get(service)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service)
+            if client is None:
+                client = _clients[service] = AsyncHTTPClient(service, **_client_settings(config))
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close every client's session on the running loop (application shutdown)."""
+    for client in list(_clients.values()):
+        await client.close()
+
+
+def http_client_metrics() -> Dict[str, Dict[str, Any]]:
+    return {service: client.metrics() for service, client in _clients.items()}
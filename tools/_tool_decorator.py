@@ -33,6 +33,8 @@ class CustomJSONEncoder(json.JSONEncoder):
 # Import the main Config class for type hinting and accessing settings
 from config import Config  # Assuming config.py exists and defines Config
 
+from ._tool_offload import SyncToolOffload, get_sync_tool_offload
+
 # Use the 'tools' section logger
 log = logging.getLogger("tools.decorator")
 
@@ -724,6 +726,7 @@ def tool_function(
             ) from e
 
         log.debug(f"Registered tool '{tool_name}' with definition.")
+        tool_service = SyncToolOffload.service_of(tool_name)
 
         # --- Define Wrapper Function ---
         @functools.wraps(func)
@@ -934,18 +937,15 @@ def tool_function(
                             f"prepared_kwargs keys: {list(prepared_kwargs.keys())}" # Log new var
                         )
 
-                        if is_method:
-                            # Call the method on the instance
-                            if inspect.iscoroutinefunction(func):
-                                result = await func(instance, **prepared_kwargs)
-                            else:
-                                result = func(instance, **prepared_kwargs)
+                        # Sync tools block on network I/O, so they run on their
+                        # service's thread pool instead of the event loop
+                        call_args = (instance,) if is_method else ()
+                        if inspect.iscoroutinefunction(func):
+                            result = await func(*call_args, **prepared_kwargs)
                         else:
-                            # Call the standalone function
-                            if inspect.iscoroutinefunction(func):
-                                result = await func(**prepared_kwargs)
-                            else:
-                                result = func(**prepared_kwargs)
+                            result = await get_sync_tool_offload(tool_config).run(
+                                tool_service, func, *call_args, **prepared_kwargs
+                            )
 
                         # Success! Break the retry loop
                         if attempt > 0:
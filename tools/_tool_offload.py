@@ -0,0 +1,177 @@
+"""
+Thread pools for synchronous tool functions.
+
+Most service SDKs the tools use (requests, PyGithub, jira) block. Called
+directly from the ``tool_function`` wrapper, a sync tool stalls the event loop,
+and with it every other conversation, for the whole HTTP round trip.
+``SyncToolOffload.run`` runs the call on a bounded thread pool owned by the
+tool's service (the tool name prefix, e.g. ``perplexity_web_search`` ->
+``perplexity``). One slow service can therefore only exhaust its own pool.
+
+The pool sizes come from TOOL_SYNC_POOL_SIZE / TOOL_SYNC_POOL_SIZES. Per-service
+queue time (submitted until a worker picked the call up), run time and
+backlog are exposed via ``metrics()``.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+log = logging.getLogger("tools.offload")
+
+DEFAULT_POOL_SIZE = 8
+SLOW_QUEUE_LOG_SECONDS = 1.0
+
+
+class _ServiceStats:
+    __slots__ = ("calls", "queued", "running", "total_queue_seconds", "max_queue_seconds", "total_run_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.queued = 0
+        self.running = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+
+class SyncToolOffload:
+    """Runs sync tool functions on one bounded ``ThreadPoolExecutor`` per service."""
+
+    def __init__(
+        self,
+        default_pool_size: int = DEFAULT_POOL_SIZE,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            default_pool_size: Worker threads for services without an explicit size
+            pool_sizes: Worker threads per service name (e.g. {"perplexity": 4})
+            enabled: If False, sync tools are called inline on the event loop
+        """
+        self.default_pool_size = max(1, default_pool_size)
+        self.pool_sizes = {service.lower(): max(1, size) for service, size in (pool_sizes or {}).items()}
+        self.enabled = enabled
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._stats: Dict[str, _ServiceStats] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "SyncToolOffload":
+        """Build from the TOOL_SYNC_OFFLOAD section of the app config, tolerating partial or mocked configs."""
+        settings = getattr(config, "TOOL_SYNC_OFFLOAD", None) if config is not None else None
+        if not isinstance(settings, dict):
+            settings = {}
+        default_size = settings.get("default_pool_size", DEFAULT_POOL_SIZE)
+        pool_sizes = settings.get("pool_sizes")
+        return cls(
+            default_pool_size=default_size if isinstance(default_size, int) else DEFAULT_POOL_SIZE,
+            pool_sizes=pool_sizes if isinstance(pool_sizes, dict) else None,
+            enabled=settings.get("enabled", True) is not False,
+        )
+
+    @staticmethod
+    def service_of(tool_name: str) -> str:
+        """Service a tool belongs to, from its name prefix (e.g. 'github_list_repositories' -> 'github')."""
+        return tool_name.split("_", 1)[0].lower()
+
+    def _pool(self, service: str) -> ThreadPoolExecutor:
+        pool = self._pools.get(service)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(service)
+                if pool is None:
+                    size = self.pool_sizes.get(service, self.default_pool_size)
+                    pool = self._pools[service] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"tool-{service}")
+                    self._stats[service] = _ServiceStats()
+        return pool
+
+    async def run(self, service: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Call ``func(*args, **kwargs)`` on the service's pool and await the result."""
+        if not self.enabled:
+            return func(*args, **kwargs)
+        pool = self._pool(service)
+        stats = self._stats[service]
+        # Context variables (tool call id, request logging context) follow the call into the worker
+        context = contextvars.copy_context()
+        submitted = time.monotonic()
+        with self._lock:
+            stats.queued += 1
+
+        def call() -> Any:
+            started = time.monotonic()
+            waited = started - submitted
+            with self._lock:
+                stats.queued -= 1
+                stats.running += 1
+                stats.calls += 1
+                stats.total_queue_seconds += waited
+                stats.max_queue_seconds = max(stats.max_queue_seconds, waited)
+            if waited >= SLOW_QUEUE_LOG_SECONDS:
+                log.warning(
+                    f"Sync tool '{getattr(func, '__name__', func)}' waited {waited:.2f}s for a free '{service}' worker",
+                    extra={"event_type": "tool_offload_queue_wait", "details": {"service": service, "queue_ms": round(waited * 1000, 1)}},
+                )
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    stats.running -= 1
+                    stats.total_run_seconds += time.monotonic() - started
+
+        future = pool.submit(context.run, call)
+
+        def on_done(done) -> None:
+            if done.cancelled():  # Caller gave up before a worker picked the call up
+                with self._lock:
+                    stats.queued -= 1
+
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                service: {
+                    "pool_size": self.pool_sizes.get(service, self.default_pool_size),
+                    "calls": stats.calls,
+                    "queued": stats.queued,
+                    "running": stats.running,
+                    "avg_queue_ms": round(stats.total_queue_seconds * 1000 / stats.calls, 2) if stats.calls else 0.0,
+                    "max_queue_ms": round(stats.max_queue_seconds * 1000, 2),
+                    "avg_run_ms": round(stats.total_run_seconds * 1000 / stats.calls, 2) if stats.calls else 0.0,
+                }
+                for service, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop all pools; calls already running finish on their threads."""
+        with self._lock:
+            pools, self._pools, self._stats = list(self._pools.values()), {}, {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+
+_offload: Optional[SyncToolOffload] = None
+
+
+def get_sync_tool_offload(config: Any = None) -> SyncToolOffload:
+    """The process-wide offload, built from the first config seen."""
+    global _offload
+    if _offload is None:
+        _offload = SyncToolOffload.from_config(config)
+    return _offload
+
+
+def configure_sync_tool_offload(config: Any) -> SyncToolOffload:
+    """Replace the process-wide offload with one built from ``config`` (e.g. at startup)."""
+    global _offload
+    previous, _offload = _offload, SyncToolOffload.from_config(config)
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _offload
@@ -3,6 +3,7 @@ import logging
 from typing import Dict, Any, List, Optional, Union, Literal
 import datetime
 import asyncio
+import itertools
 
 from github import Github, GithubException, UnknownObjectException, RateLimitExceededException, Auth
 from github.Repository import Repository
@@ -27,6 +28,8 @@ log = get_logger("tools.github") # Use get_logger
 
 MAX_LIST_RESULTS = 25
 MAX_SEARCH_RESULTS = 15
+# Page size requested from the API, so a capped listing or search is a single request
+GITHUB_PAGE_SIZE = max(MAX_LIST_RESULTS, MAX_SEARCH_RESULTS)
 
 class GitHubTools:
     """
@@ -125,7 +128,8 @@ class GitHubTools:
             personal_client = Github(
                 auth=auth,
                 timeout=timeout_seconds,
-                retry=3
+                retry=3,
+                per_page=GITHUB_PAGE_SIZE
             )
             
             # Test the client
@@ -160,14 +164,16 @@ class GitHubTools:
                     auth=auth,
                     base_url=str(base_url),
                     timeout=timeout_seconds,
-                    retry=3
+                    retry=3,
+                    per_page=GITHUB_PAGE_SIZE
                 )
             else:
                 auth = Auth.Token(token)
                 github_client = Github(
                     auth=auth,
                     timeout=timeout_seconds,
-                    retry=3
+                    retry=3,
+                    per_page=GITHUB_PAGE_SIZE
                 )
 
             if not testing_mode:
@@ -359,38 +365,38 @@ class GitHubTools:
                      raise RuntimeError(f"GitHub user or organization '{target_name}' not found (404).") from None
 
             log.info(f"Retrieved target entity '{target_name}', getting repositories...")
-            repos_paginated = await asyncio.to_thread(target_entity.get_repos, type=repo_type, sort=sort, direction=direction)
-
-            results = []
-            for i, repo in enumerate(repos_paginated):
-                if i >= MAX_LIST_RESULTS:
-                    log.debug(f"MAX_LIST_RESULTS ({MAX_LIST_RESULTS}) reached, stopping repository list iteration.")
-                    break
-
-                try:
-                    updated_at_val = getattr(repo, 'updated_at', None)
-                    repo_details = {
-                        "name": getattr(repo, 'name', 'N/A'),
-                        "full_name": getattr(repo, 'full_name', 'N/A'),
-                        "description": getattr(repo, 'description', '') or "",
-                        "url": getattr(repo, 'html_url', 'N/A'),
-                        "private": getattr(repo, 'private', False),
-                        "language": getattr(repo, 'language', None),
-                        "stars": getattr(repo, 'stargazers_count', 0),
-                        "updated_at": updated_at_val.isoformat() if updated_at_val else None,
-                    }
-                    results.append(repo_details)
-                    log.debug(f"Added repo {i+1}: {repo_details['full_name']}")
-
-                except Exception as repo_error:
-                    repo_name_fallback = getattr(repo, 'full_name', f"Index {i+1}")
-                    log.error(f"Error processing repo '{repo_name_fallback}': {repo_error}", exc_info=True)
-                    results.append({
-                        "name": f"Error processing repo {i+1}",
-                        "full_name": repo_name_fallback,
-                        "error": str(repo_error)
-                    })
 
+            def collect_repos() -> List[Dict[str, Any]]:
+                # Iterating fetches pages, so the whole listing runs on the worker thread
+                repos = target_entity.get_repos(type=repo_type, sort=sort, direction=direction)
+                results = []
+                for i, repo in enumerate(itertools.islice(repos, MAX_LIST_RESULTS)):
+                    try:
+                        updated_at_val = getattr(repo, 'updated_at', None)
+                        repo_details = {
+                            "name": getattr(repo, 'name', 'N/A'),
+                            "full_name": getattr(repo, 'full_name', 'N/A'),
+                            "description": getattr(repo, 'description', '') or "",
+                            "url": getattr(repo, 'html_url', 'N/A'),
+                            "private": getattr(repo, 'private', False),
+                            "language": getattr(repo, 'language', None),
+                            "stars": getattr(repo, 'stargazers_count', 0),
+                            "updated_at": updated_at_val.isoformat() if updated_at_val else None,
+                        }
+                        results.append(repo_details)
+                        log.debug(f"Added repo {i+1}: {repo_details['full_name']}")
+
+                    except Exception as repo_error:
+                        repo_name_fallback = getattr(repo, 'full_name', f"Index {i+1}")
+                        log.error(f"Error processing repo '{repo_name_fallback}': {repo_error}", exc_info=True)
+                        results.append({
+                            "name": f"Error processing repo {i+1}",
+                            "full_name": repo_name_fallback,
+                            "error": str(repo_error)
+                        })
+                return results
+
+            results = await asyncio.to_thread(collect_repos)
             log.info(f"Finished listing repositories for '{target_name}'. Found {len(results)} results (max {MAX_LIST_RESULTS}).")
             return results
         except UnknownObjectException:
@@ -449,28 +455,28 @@ class GitHubTools:
             log.info(f"Searching GitHub code with query: '{full_query}'")
         
         try:
-            paginated_list = await asyncio.to_thread(client.search_code, query=full_query)
-
-            results = []
-            count = 0
-            for item in paginated_list:
-                if count >= MAX_SEARCH_RESULTS:
-                    log.debug(f"MAX_SEARCH_RESULTS ({MAX_SEARCH_RESULTS}) reached for code search, stopping iteration.")
-                    break
-                try:
-                    repo_name_val = item.repository.full_name if hasattr(item, 'repository') and item.repository else "N/A"
-                    results.append({
-                        "name": item.name,
-                        "path": item.path,
-                        "repository": repo_name_val,
-                        "url": item.html_url,
-                        "git_url": item.git_url,
-                    })
-                    log.debug(f"Added code search result {count+1}: {item.path} in {repo_name_val}")
-                    count += 1
-                except Exception as result_error:
-                     log.warning(f"Error processing code search result {count+1} ('{getattr(item, 'path', 'Unknown')}'): {result_error}", exc_info=True)
-                     count += 1
+            def collect_results() -> List[Dict[str, Any]]:
+                # Iterating fetches pages, so the whole search runs on the worker thread
+                results = []
+                count = 0
+                for item in itertools.islice(client.search_code(query=full_query), MAX_SEARCH_RESULTS):
+                    try:
+                        repo_name_val = item.repository.full_name if hasattr(item, 'repository') and item.repository else "N/A"
+                        results.append({
+                            "name": item.name,
+                            "path": item.path,
+                            "repository": repo_name_val,
+                            "url": item.html_url,
+                            "git_url": item.git_url,
+                        })
+                        log.debug(f"Added code search result {count+1}: {item.path} in {repo_name_val}")
+                        count += 1
+                    except Exception as result_error:
+                         log.warning(f"Error processing code search result {count+1} ('{getattr(item, 'path', 'Unknown')}'): {result_error}", exc_info=True)
+                         count += 1
+                return results
+
+            results = await asyncio.to_thread(collect_results)
             log.info(f"Finished code search for query '{full_query}'. Found {len(results)} results (max {MAX_SEARCH_RESULTS}).")
             return results
         except RateLimitExceededException as e:
@@ -672,18 +678,19 @@ class GitHubTools:
         repository = await self._get_repo(app_state, owner, repo, **kwargs)
         try:
             issue = await asyncio.to_thread(repository.get_issue, number=issue_number)
-            comments_paginated = await asyncio.to_thread(issue.get_comments)
-            
-            results = []
-            for comment in comments_paginated:
-                results.append({
+
+            def collect_comments() -> List[Dict[str, Any]]:
+                # Iterating fetches pages, so the whole listing runs on the worker thread
+                return [{
                     "id": comment.id,
                     "user": comment.user.login,
                     "body": comment.body,
                     "created_at": comment.created_at.isoformat(),
                     "updated_at": comment.updated_at.isoformat(),
                     "url": comment.html_url,
-                })
+                } for comment in issue.get_comments()]
+
+            results = await asyncio.to_thread(collect_comments)
             log.info(f"Successfully retrieved {len(results)} comments for issue #{issue_number} from {owner}/{repo}")
             return results
         except UnknownObjectException:
@@ -870,14 +877,10 @@ class GitHubTools:
             if head:
                 params['head'] = head
             
-            prs_paginated = await asyncio.to_thread(repository.get_pulls, **params)
-            
-            results = []
-            for i, pr in enumerate(prs_paginated):
-                if i >= MAX_LIST_RESULTS: # Using MAX_LIST_RESULTS similar to list_repositories
-                    log.debug(f"MAX_LIST_RESULTS ({MAX_LIST_RESULTS}) reached, stopping PR list iteration.")
-                    break
-                results.append({
+
+            def collect_pulls() -> List[Dict[str, Any]]:
+                # Iterating fetches pages, so the whole listing runs on the worker thread
+                return [{
                     "number": pr.number,
                     "title": pr.title,
                     "state": pr.state,
@@ -887,7 +890,9 @@ class GitHubTools:
                     "updated_at": pr.updated_at.isoformat(),
                     "head_branch": pr.head.ref,
                     "base_branch": pr.base.ref,
-                })
+                } for pr in itertools.islice(repository.get_pulls(**params), MAX_LIST_RESULTS)]
+
+            results = await asyncio.to_thread(collect_pulls)
             log.info(f"Successfully retrieved {len(results)} PRs for {owner}/{repo} (max {MAX_LIST_RESULTS}).")
             return results
         except RateLimitExceededException as e:
@@ -1,9 +1,7 @@
-import requests
 import json
 import logging
 from typing import Dict, Any, Optional, List, Tuple, Union
 import time
-import asyncio
 from unittest.mock import MagicMock
 import sys
 
@@ -11,6 +9,7 @@ import sys
 from config import Config
 # Import the tool decorator
 from . import tool
+from ._http_client import HTTPTransportError, get_http_client
 
 log = logging.getLogger("tools.greptile")
 
@@ -23,7 +22,6 @@ class GreptileTools:
     This version is stripped down to 3 core tools: query_codebase, search_code, and summarize_repo.
     Requires a GREPTILE_API_KEY to be configured.
     """
-    session: requests.Session
     default_repo: Optional[str]
 
     def __init__(self, config: Config):
@@ -71,13 +69,8 @@ class GreptileTools:
         if not self.api_key:
             log.warning("Greptile API key is not configured. Greptile tools will not be functional.")
 
-        # Use a session for potential connection pooling
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.api_key}" if self.api_key else "",
-            "Content-Type": "application/json",
-            "X-GitHub-Token": self.github_token if self.github_token else ""
-        })
+        # Shared pooled client; every GreptileTools instance reuses its connections
+        self.http = get_http_client("greptile", config)
         log.info(f"Greptile tools initialized. API URL: {self.api_url}")
 
     def _sanitize_value(self, value: str) -> str:
@@ -148,92 +141,63 @@ class GreptileTools:
         if self.github_token:
             request_headers["X-GitHub-Token"] = self.github_token
             
-        # Start with fresh session
-        session = self.session
-        
-        # Configure timeout
-        timeout = self.timeout
-        
         # Set up logging for the request
         method_str = method.upper()
+        if method_str not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
         params_str = f", params={params}" if params else ""
         data_str = f", data={json.dumps(data)[:100]}..." if data else ""
         log.info(f"Greptile API Request: Method={method_str}, URL={url}, Params={params_str}, Data={data_str}, Headers={request_headers}")
-        
-        attempt = 0
-        last_error = None
-        
-        while attempt <= retries:
-            try:
-                if method.upper() == "GET":
-                    response = session.get(url, params=params, headers=request_headers, timeout=timeout)
-                elif method.upper() == "POST":
-                    response = session.post(url, json=data, headers=request_headers, timeout=timeout)
-                elif method.upper() == "PUT":
-                    response = session.put(url, json=data, headers=request_headers, timeout=timeout)
-                elif method.upper() == "DELETE":
-                    response = session.delete(url, headers=request_headers, timeout=timeout)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                    
-                log.info(f"Greptile API Response: Status={response.status_code}, Headers={dict(response.headers)}")
 
-                # Check rate limits
-                remaining = response.headers.get("X-RateLimit-Remaining")
-                if remaining and int(remaining) <= 5:
-                    log.warning(f"Greptile API rate limit running low: {remaining} requests remaining")
-                    
-                # Handle non-2xx responses
-                if response.status_code >= 400:
-                    error_message = f"Greptile API error ({response.status_code}): {response.text}"
-                    log.error(f"Greptile API Error Details: URL={url}, Status={response.status_code}, Response Body={response.text[:500]}, Response Headers={dict(response.headers)}")
-                    
-                    # Handle specific error cases
-                    if response.status_code == 401:
-                        raise RuntimeError(f"Authentication error: Invalid or missing API key")
-                    elif response.status_code == 403:
-                        raise RuntimeError(f"Authorization error: Not authorized to access this repository or endpoint")
-                    elif response.status_code == 404:
-                        raise RuntimeError(f"Not found: The requested resource or repository does not exist")
-                    elif response.status_code == 429:
-                        # Rate limit exceeded - check if we should retry
-                        if attempt < retries:
-                            retry_after = int(response.headers.get("Retry-After", 2))
-                            log.warning(f"Rate limit exceeded, retrying after {retry_after} seconds")
-                            await asyncio.sleep(retry_after)
-                            attempt += 1
-                            continue
-                        else:
-                            raise RuntimeError(f"Rate limit exceeded. Try again later.")
-                    else:
-                        raise RuntimeError(error_message)
-                
-                # Parse JSON response
-                try:
-                    response_json = response.json()
-                    if include_headers:
-                        return {"data": response_json, "headers": dict(response.headers)}
-                    return response_json
-                except json.JSONDecodeError:
-                    error_message = f"Invalid JSON response from Greptile API: {response.text[:200]}"
-                    log.error(error_message)
-                    raise RuntimeError(error_message)
-                    
-            except (requests.RequestException, ConnectionError, TimeoutError) as e:
-                last_error = str(e)
-                
-                # Check if we should retry
-                if attempt < retries:
-                    backoff = 2 ** attempt  # Exponential backoff
-                    log.warning(f"Request failed, retrying in {backoff} seconds: {str(e)}")
-                    await asyncio.sleep(backoff)
-                    attempt += 1
-                else:
-                    log.error(f"Request failed after {retries} retries: {str(e)}")
-                    raise RuntimeError(f"Failed to connect to Greptile API: {str(e)}")
-        
-        # This should only be reached if all retries fail
-        raise RuntimeError(f"Request failed after {retries} retries: {last_error}")
+        # The shared client retries connection errors, timeouts, 429 and 5xx (honoring Retry-After)
+        try:
+            response = await self.http.request(
+                method_str,
+                url,
+                params=params if method_str == "GET" else None,
+                json_body=data if method_str in ("POST", "PUT") else None,
+                headers=request_headers,
+                timeout=self.timeout,
+                retries=retries,
+            )
+        except HTTPTransportError as e:
+            log.error(f"Request failed after {retries} retries: {str(e)}")
+            raise RuntimeError(f"Failed to connect to Greptile API: {str(e)}") from e
+
+        log.info(f"Greptile API Response: Status={response.status}, Headers={dict(response.headers)}")
+
+        # Check rate limits
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining and int(remaining) <= 5:
+            log.warning(f"Greptile API rate limit running low: {remaining} requests remaining")
+
+        # Handle non-2xx responses
+        if response.status >= 400:
+            error_message = f"Greptile API error ({response.status}): {response.text}"
+            log.error(f"Greptile API Error Details: URL={url}, Status={response.status}, Response Body={response.text[:500]}, Response Headers={dict(response.headers)}")
+
+            # Handle specific error cases
+            if response.status == 401:
+                raise RuntimeError(f"Authentication error: Invalid or missing API key")
+            elif response.status == 403:
+                raise RuntimeError(f"Authorization error: Not authorized to access this repository or endpoint")
+            elif response.status == 404:
+                raise RuntimeError(f"Not found: The requested resource or repository does not exist")
+            elif response.status == 429:
+                raise RuntimeError(f"Rate limit exceeded. Try again later.")
+            else:
+                raise RuntimeError(error_message)
+
+        # Parse JSON response
+        try:
+            response_json = response.json()
+            if include_headers:
+                return {"data": response_json, "headers": dict(response.headers)}
+            return response_json
+        except json.JSONDecodeError:
+            error_message = f"Invalid JSON response from Greptile API: {response.text[:200]}"
+            log.error(error_message)
+            raise RuntimeError(error_message)
 
     def _extract_owner_repo(self, github_url: str) -> Tuple[str, str]:
         """
@@ -443,11 +407,14 @@ class GreptileTools:
             if self.github_token:
                 headers["X-GitHub-Token"] = self.github_token
             
-            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            # Health checks run on worker threads without an event loop
+            response = self.http.run_sync(
+                lambda: self.http.request("GET", url, headers=headers, timeout=self.timeout, retries=0)
+            )
             
-            log.info(f"Greptile health check response: Status={response.status_code}, Text='{response.text}'")
+            log.info(f"Greptile health check response: Status={response.status}, Text='{response.text}'")
             
-            if response.status_code == 200:
+            if response.status == 200:
                 # Greptile health endpoint returns plain text "Healthy!"
                 rate_limit_remaining = response.headers.get("X-RateLimit-Remaining", "Unknown")
                 
@@ -458,7 +425,7 @@ class GreptileTools:
                     "api_url": self.api_url
                 }
             else:
-                error_message = f"Greptile health check failed with status {response.status_code}: {response.text}"
+                error_message = f"Greptile health check failed with status {response.status}: {response.text}"
                 log.error(error_message)
                 return {"status": "ERROR", "message": error_message}
                 
@@ -1,4 +1,3 @@
-import requests
 import json
 import logging
 from typing import Dict, Any, Optional, List, Literal
@@ -9,6 +8,7 @@ import re
 from config import Config, AVAILABLE_PERPLEXITY_MODELS_REF
 # Import the tool decorator
 from . import tool
+from ._http_client import HTTPResponse, HTTPTransportError, get_http_client
 
 log = logging.getLogger("tools.perplexity")
 
@@ -22,7 +22,6 @@ class PerplexityTools:
     Requires a PERPLEXITY_API_KEY to be configured.
     Uses models capable of accessing current web information.
     """
-    session: requests.Session
 
     def __init__(self, config: Config):
         """Initializes the PerplexityTools with configuration."""
@@ -47,23 +46,23 @@ class PerplexityTools:
             log.warning(
                 "Perplexity API key is not configured. Perplexity tools will not be functional.")
 
-        # Use a session for potential connection pooling
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Shared pooled client; every PerplexityTools instance reuses its connections
+        self.http = get_http_client("perplexity", config)
+        self.headers = {
             "Authorization": f"Bearer {self.api_key}" if self.api_key else "",
             "Content-Type": "application/json",
             "Accept": "application/json"
-        })
+        }
         log.info(
             f"Perplexity tools initialized. API URL: {self.api_url}, Default Model: {self.default_model}")
 
-    def _send_request(self,
-                      endpoint: str,
-                      method: str = "POST",
-                      data: Optional[Dict[str,
-                                          Any]] = None,
-                      include_headers: bool = False) -> Dict[str,
-                                                             Any]:
+    async def _send_request(self,
+                            endpoint: str,
+                            method: str = "POST",
+                            data: Optional[Dict[str,
+                                                Any]] = None,
+                            include_headers: bool = False) -> Dict[str,
+                                                                   Any]:
         """Internal helper to send authenticated requests to the Perplexity API."""
         if not self.api_key:
             raise ValueError("Perplexity API key is missing.")
@@ -78,10 +77,11 @@ class PerplexityTools:
             f"Perplexity request data keys: {list(data.keys()) if data else 'None'}")
 
         try:
-            response = self.session.request(
-                method, url, json=data, timeout=self.timeout
+            response = await self.http.request(
+                method, url, json_body=data, headers=self.headers, timeout=self.timeout
             )
-            response.raise_for_status()
+            if not response.ok:
+                raise RuntimeError(self._error_details(response, method, url))
 
             response_data = response.json()
             response_headers = dict(response.headers)
@@ -100,59 +100,13 @@ class PerplexityTools:
                     "rate_limit": rate_limit_headers}
             else:
                 return response_data
-        except requests.exceptions.HTTPError as e:
-            status_code = e.response.status_code
-            error_text = e.response.text[:500]
-            log.error(
-                f"Perplexity API HTTP error ({status_code}) for {method} {url}: {error_text}",
-                exc_info=False)
-            error_details = f"Perplexity API returned HTTP {status_code}."
-
-            try:
-                error_body = e.response.json()
-
-                # Handle different error response structures
-                if 'error' in error_body:
-                    error_obj = error_body.get('error', {})
-                    if isinstance(error_obj, dict):
-                        message = error_obj.get(
-                            'message', error_obj.get(
-                                'type', 'No detail provided.'))
-                    else:
-                        message = str(error_obj)
-                    error_details += f" Error: {message}"
-                elif 'detail' in error_body:
-                    detail_obj = error_body.get('detail', {})
-                    if isinstance(detail_obj, dict):
-                        message = detail_obj.get(
-                            'message', 'No detail provided.')
-                    else:
-                        message = str(detail_obj)
-                    error_details += f" Detail: {message}"
-                elif 'message' in error_body:
-                    error_details += f" Message: {error_body['message']}"
-                else:
-                    error_details += f" Response: {json.dumps(error_body)[:200]}"
-
-            except json.JSONDecodeError:
-                error_details += f" Response: {error_text}"
-
-            # Special handling for common status codes
-            if status_code == 401:
-                error_details = "Perplexity API authentication failed (401). Check API Key."
-            elif status_code == 429:
-                error_details = "Perplexity API rate limit exceeded (429). Check rate limits in your account."
-            elif status_code == 400:
-                error_details = f"Perplexity API bad request (400): {error_details}"
-            elif status_code == 403:
-                error_details = "Perplexity API request forbidden (403). Check account permissions and tier level."
-
-            raise RuntimeError(error_details) from e
-        except requests.exceptions.RequestException as e:
+        except HTTPTransportError as e:
             log.error(
                 f"Perplexity API request failed ({method} {url}): {e}",
                 exc_info=True)
             raise e  # Re-raise for decorator
+        except RuntimeError:
+            raise  # API error status or oversized response, already described
         except Exception as e:
             log.error(
                 f"Unexpected error during Perplexity API request ({method} {url}): {e}",
@@ -160,6 +114,56 @@ class PerplexityTools:
             raise RuntimeError(
                 f"Unexpected error during Perplexity API request: {e}") from e
 
+    def _error_details(self, response: HTTPResponse, method: str, url: str) -> str:
+        """Readable error message for a non-2xx Perplexity API response."""
+        status_code = response.status
+        error_text = response.text[:500]
+        log.error(
+            f"Perplexity API HTTP error ({status_code}) for {method} {url}: {error_text}",
+            exc_info=False)
+        error_details = f"Perplexity API returned HTTP {status_code}."
+
+        try:
+            error_body = response.json()
+
+            # Handle different error response structures
+            if 'error' in error_body:
+                error_obj = error_body.get('error', {})
+                if isinstance(error_obj, dict):
+                    message = error_obj.get(
+                        'message', error_obj.get(
+                            'type', 'No detail provided.'))
+                else:
+                    message = str(error_obj)
+                error_details += f" Error: {message}"
+            elif 'detail' in error_body:
+                detail_obj = error_body.get('detail', {})
+                if isinstance(detail_obj, dict):
+                    message = detail_obj.get(
+                        'message', 'No detail provided.')
+                else:
+                    message = str(detail_obj)
+                error_details += f" Detail: {message}"
+            elif 'message' in error_body:
+                error_details += f" Message: {error_body['message']}"
+            else:
+                error_details += f" Response: {json.dumps(error_body)[:200]}"
+
+        except json.JSONDecodeError:
+            error_details += f" Response: {error_text}"
+
+        # Special handling for common status codes
+        if status_code == 401:
+            error_details = "Perplexity API authentication failed (401). Check API Key."
+        elif status_code == 429:
+            error_details = "Perplexity API rate limit exceeded (429). Check rate limits in your account."
+        elif status_code == 400:
+            error_details = f"Perplexity API bad request (400): {error_details}"
+        elif status_code == 403:
+            error_details = "Perplexity API request forbidden (403). Check account permissions and tier level."
+
+        return error_details
+
     def _extract_answer(self,
                         response_data: Dict[str,
                                             Any],
@@ -309,7 +313,7 @@ class PerplexityTools:
               "required": []
           }
     )
-    def web_search(
+    async def web_search(
         self,
         query: Optional[str] = None,
         model_name: Optional[str] = None,
@@ -381,7 +385,7 @@ class PerplexityTools:
             log.debug(f"Using web_search_options: {web_search_options}")
 
         # Let exceptions from _send_request propagate to the decorator
-        response_data = self._send_request(
+        response_data = await self._send_request(
             "chat/completions", method="POST", data=payload)
 
         # The try-except block below is for parsing issues, not API call failures.
@@ -410,7 +414,7 @@ class PerplexityTools:
         name="perplexity_summarize_topic",
         description="Given a broad topic, returns a concise summary using Perplexity's Sonar models with web information access.",
     )
-    def summarize_topic(
+    async def summarize_topic(
         self,
         topic: str,
         model_name: Optional[str] = None,
@@ -504,7 +508,7 @@ class PerplexityTools:
             log.debug(f"Using web_search_options: {web_search_options}")
 
         # Let exceptions from _send_request propagate to the decorator
-        response_data = self._send_request(
+        response_data = await self._send_request(
             "chat/completions", method="POST", data=payload)
 
         try:
@@ -582,7 +586,7 @@ class PerplexityTools:
             ]
         }
     )
-    def structured_search(
+    async def structured_search(
         self,
         query: str,
         format_type: Literal["json_schema", "regex"],
@@ -659,7 +663,7 @@ class PerplexityTools:
             log.debug(f"Using web_search_options: {web_search_options}")
 
         # Let exceptions from _send_request propagate
-        response_data = self._send_request(
+        response_data = await self._send_request(
             "chat/completions", method="POST", data=payload)
 
         try:
@@ -726,8 +730,9 @@ class PerplexityTools:
                 f"Health check: Sending request to Perplexity with model '{health_check_model}'")
 
             start_time = time.time()
-            response_data = self._send_request(
-                "chat/completions", method="POST", data=payload, include_headers=True)
+            # Health checks run on worker threads without an event loop
+            response_data = self.http.run_sync(lambda: self._send_request(
+                "chat/completions", method="POST", data=payload, include_headers=True))
             latency_ms = int((time.time() - start_time) * 1000)
 
             # Check for basic presence of API response
@@ -765,7 +770,7 @@ class PerplexityTools:
                     "model_tested": health_check_model,
                     "latency_ms": latency_ms}
 
-        except requests.exceptions.RequestException as e:
+        except HTTPTransportError as e:
             log.error(
                 f"Perplexity health check failed: Network error - {e}",
                 exc_info=True)
@@ -234,6 +234,9 @@ class ToolExecutor:
         self.configured_tools = configured_tools_temp
         self.configured_tool_definitions = configured_defs_temp
         self.tool_name_to_instance_key = name_to_instance_map
+        # Declarations compiled from the previous catalog may no longer match it
+        from core_logic.declaration_cache import invalidate_tool_declarations # Lazy import: core_logic imports this module
+        invalidate_tool_declarations()
         
         # Update discovery stats
         self.discovery_stats["tools_configured"] = validation_stats["configured"]
@@ -196,6 +196,39 @@ def save_user_profile(user_profile_dict: Dict[str, Any]) -> bool:
         logger.error(f"Unexpected error saving user profile for {user_profile_dict.get('user_id')}: {e}", exc_info=True)
         return False
 
+def update_profile_activity(updates: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Applies buffered activity updates to existing user profiles in one transaction.
+    ``updates`` maps user_id to the fields to set; only ``last_active_timestamp``
+    (never moved backwards) and ``tool_adapter_metrics`` are accepted, so a
+    buffered update cannot overwrite profile changes saved in the meantime.
+    Profiles that no longer exist are skipped.
+
+    Returns:
+        Number of profiles updated.
+
+    Raises:
+        SQLAlchemyError: If the transaction fails, so the caller can retry the batch.
+    """
+    if not updates:
+        return 0
+    updated = 0
+    with get_session() as session:
+        for user_id, fields in updates.items():
+            user_profile = session.get(UserProfile, user_id)
+            if user_profile is None:
+                logger.debug(f"Skipping activity update for unknown user profile: {user_id}")
+                continue
+            last_active = fields.get('last_active_timestamp')
+            if last_active is not None and (user_profile.last_active_timestamp or 0) < last_active:
+                user_profile.last_active_timestamp = last_active
+            metrics = fields.get('tool_adapter_metrics')
+            if metrics is not None:
+                user_profile.tool_adapter_metrics = json.dumps(metrics) if isinstance(metrics, dict) else metrics
+            updated += 1
+    logger.debug(f"Applied activity updates to {updated} user profile(s).")
+    return updated
+
 def get_all_user_profiles() -> List[Dict[str, Any]]:
     """Retrieves all user profiles from the database using SQLAlchemy ORM."""
     profiles_list = []
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, List, Set, Optional, TYPE_CHECKING
+from typing import Dict, Iterable, List, Set, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from user_auth.models import UserProfile
@@ -189,6 +189,60 @@ def get_permissions_for_role(role: UserRole) -> Set[Permission]:
     """Returns the set of permissions associated with a given role."""
     return ROLE_PERMISSIONS.get(role, set())
 
+# --- Compiled permission bitsets ---
+# Each Permission gets one bit; each role's permission set is compiled once into an int,
+# so a permission check is a single AND instead of a role parse plus set lookup.
+PERMISSION_BITS: Dict[Permission, int] = {permission: 1 << i for i, permission in enumerate(Permission)}
+
+
+def permission_mask(permissions: Iterable[Permission]) -> int:
+    """Bitset of the given permissions."""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+ROLE_PERMISSION_MASKS: Dict[UserRole, int] = {role: permission_mask(perms) for role, perms in ROLE_PERMISSIONS.items()}
+ALL_PERMISSIONS_MASK = permission_mask(Permission)
+
+# UserProfile.profile_data key holding extra permissions granted to one user on top of their role,
+# as Permission names or values (e.g. ["GITHUB_WRITE_ISSUES", "jira_admin"])
+PROFILE_PERMISSION_GRANTS_KEY = "permission_grants"
+
+
+def role_permission_mask(role_str: Optional[str]) -> int:
+    """Bitset for a role string as stored on UserProfile.assigned_role; unknown roles get no permissions."""
+    return ROLE_PERMISSION_MASKS.get(UserRole.from_string(role_str or ""), 0)
+
+
+def _grant_mask(grants: Iterable[str], user_id: str) -> int:
+    mask = 0
+    for grant in grants:
+        try:
+            permission = Permission[grant] if grant in Permission.__members__ else Permission(grant)
+        except ValueError:
+            logger.warning(f"Ignoring unknown permission grant '{grant}' for user '{user_id}'.")
+            continue
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+def user_permission_mask(user_profile: Optional["UserProfile"]) -> int:
+    """Bitset of a user's role permissions merged with the custom grants in their profile_data."""
+    if not user_profile:
+        return 0
+    mask = role_permission_mask(user_profile.assigned_role)
+    grants = (user_profile.profile_data or {}).get(PROFILE_PERMISSION_GRANTS_KEY)
+    if isinstance(grants, list):
+        mask |= _grant_mask((g for g in grants if isinstance(g, str)), user_profile.user_id)
+    return mask
+
+
+def permissions_from_mask(mask: int) -> Set[Permission]:
+    """The set of permissions whose bits are set in ``mask``."""
+    return {permission for permission, bit in PERMISSION_BITS.items() if mask & bit}
+
 # This file defines the structure. The PermissionManager class (P3A.2.2)
 # will use these definitions to perform actual permission checks and assignments.
 
@@ -273,7 +327,8 @@ class PermissionManager:
 
     def has_permission(self, user_profile: "UserProfile", permission_key: Permission) -> bool:
         """
-        Checks if a user has a specific permission based on their assigned role.
+        Checks if a user has a specific permission based on their assigned role
+        and any custom grants in their profile.
 
         Args:
             user_profile: The UserProfile object of the user.
@@ -286,31 +341,17 @@ class PermissionManager:
             logger.warning("has_permission called with None UserProfile. Denying permission.")
             return False
 
-        user_role_str = user_profile.assigned_role
-        try:
-            role = UserRole(user_role_str.upper()) # Convert role string from profile to Enum
-        except ValueError:
-            logger.warning(f"User '{user_profile.user_id}' has an invalid role '{user_role_str}'. Assigning UserRole.NONE.")
-            role = UserRole.NONE
-        
-        role_permissions = ROLE_PERMISSIONS.get(role, set())
-
-        if permission_key in role_permissions:
-            logger.debug(f"User '{user_profile.user_id}' (Role: {role.value}) has permission '{permission_key.value}'.")
+        if user_permission_mask(user_profile) & PERMISSION_BITS[permission_key]:
+            logger.debug(f"User '{user_profile.user_id}' (Role: {user_profile.assigned_role}) has permission '{permission_key.value}'.")
             return True
-        
-        # Special handling for ADMIN if needed, though ROLE_PERMISSIONS should be exhaustive
-        # For example, if ADMIN permissions were not explicitly listed for some reason:
-        # if role == UserRole.ADMIN:
-        #     logger.debug(f"User '{user_profile.user_id}' is ADMIN. Granting permission '{permission_key.value}' by default.")
-        #     return True
 
-        logger.debug(f"User '{user_profile.user_id}' (Role: {role.value}) does NOT have permission '{permission_key.value}'.")
+        logger.debug(f"User '{user_profile.user_id}' (Role: {user_profile.assigned_role}) does NOT have permission '{permission_key.value}'.")
         return False
 
     def get_effective_permissions(self, user_profile: "UserProfile") -> Set[Permission]:
         """
-        Gets all effective permissions for a user based on their assigned role.
+        Gets all effective permissions for a user based on their assigned role
+        and any custom grants in their profile.
 
         Args:
             user_profile: The UserProfile object of the user.
@@ -321,13 +362,7 @@ class PermissionManager:
         if not user_profile:
             return set()
             
-        user_role_str = user_profile.assigned_role
-        try:
-            role = UserRole(user_role_str.upper())
-        except ValueError:
-            role = UserRole.NONE # Default to NONE if role string is invalid
-            
-        return ROLE_PERMISSIONS.get(role, set())
+        return permissions_from_mask(user_permission_mask(user_profile))
 
 # Example Usage (illustrative, actual usage would be in bot logic):
 # if __name__ == '__main__':
@@ -0,0 +1,249 @@
+# user_auth/profile_repository.py
+
+"""
+Async User Profile Repository
+
+``get_current_user_profile`` and ``db_manager`` are synchronous SQLAlchemy
+code, but they are called from the bot's async turn handlers. The
+ProfileRepository puts an async front on them:
+
+* Reads and saves run on a small dedicated thread pool, so a database round
+  trip never blocks the aiohttp event loop.
+* Concurrent lookups for the same user (several conversations, or a burst of
+  activities) share one in-flight lookup instead of each missing the cache
+  and reading the database. Every caller gets its own copy of the profile.
+* ``last_active_timestamp`` bumps and tool adapter metrics go into a
+  write-behind buffer that keeps only the latest value per user and is
+  flushed with ``db_manager.update_profile_activity`` every
+  ``flush_interval_seconds`` and on shutdown. Flushes only move
+  ``last_active`` forward and touch no column besides it and the tool
+  metrics. ``save_profile`` runs under the flush lock and drops the user's
+  buffered tool metrics first, so a flush can never write metrics older than
+  a profile saved after them. A failed flush is merged back into the buffer
+  and retried on the next interval.
+
+Profile changes that must be durable at once (onboarding answers, role
+changes) still go straight to the database via ``save_profile``.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from . import db_manager
+from .models import UserProfile
+from .utils import get_current_user_profile, invalidate_user_profile_cache, resolve_user_id, set_last_active_writer
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 30.0
+DEFAULT_MAX_WORKERS = 4
+
+
+class ProfileRepository:
+    """Thread-pooled profile reads and saves with single-flight lookups and write-behind activity updates."""
+
+    def __init__(
+        self,
+        write_behind_enabled: bool = True,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        """
+        Args:
+            write_behind_enabled: Buffer last_active and metric updates; if False they are written at once
+            flush_interval_seconds: How often the buffer is flushed while the event loop runs
+            max_workers: Threads for blocking database calls
+        """
+        self.write_behind_enabled = write_behind_enabled
+        self.flush_interval_seconds = flush_interval_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="profile-db")
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}  # user_id -> fields to write
+        self._pending_lock = threading.Lock()  # Lookups record last_active from pool threads
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+        self._lookups = 0
+        self._coalesced = 0
+        self._buffered = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._flush_errors = 0
+        if write_behind_enabled:
+            set_last_active_writer(self.record_last_active)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def get_profile(self, turn_context_or_app_state: Any, db_path: Optional[str] = None) -> Optional[UserProfile]:
+        """
+        Async ``get_current_user_profile``. Callers looking up a user whose lookup
+        is already running wait for it and receive a copy of its result.
+        """
+        self._ensure_flusher()
+        self._lookups += 1
+        user_id = resolve_user_id(turn_context_or_app_state)
+        if not user_id:
+            return await self._run(get_current_user_profile, turn_context_or_app_state, db_path=db_path)
+
+        in_flight = self._in_flight.get(user_id)
+        if in_flight is not None:
+            self._coalesced += 1
+            # Shield so a cancelled waiter does not cancel the lookup other turns share
+            profile = await asyncio.shield(in_flight)
+            return profile.model_copy(deep=True) if profile is not None else None
+
+        future = asyncio.ensure_future(self._run(get_current_user_profile, turn_context_or_app_state, db_path=db_path))
+        self._in_flight[user_id] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def save_profile(self, profile: UserProfile) -> bool:
+        """
+        Saves the whole profile immediately and drops its cached copy. The
+        saved profile carries the newest tool metrics, so any buffered for
+        the user are discarded rather than flushed over it.
+        """
+        async with self._get_flush_lock():
+            # Holding the flush lock keeps a batch already swapped out from landing after this save
+            with self._pending_lock:
+                pending = self._pending.get(profile.user_id)
+                if pending is not None:
+                    pending.pop("tool_adapter_metrics", None)
+                    if not pending:
+                        del self._pending[profile.user_id]
+            saved = await self._run(db_manager.save_user_profile, profile.model_dump())
+        if saved:
+            invalidate_user_profile_cache(profile.user_id)
+        return saved
+
+    def record_last_active(self, profile: UserProfile) -> None:
+        """Buffers a profile's last_active_timestamp. Safe to call from any thread."""
+        self._buffer(profile.user_id, {"last_active_timestamp": profile.last_active_timestamp})
+
+    async def record_tool_metrics(self, profile: UserProfile) -> None:
+        """Buffers a profile's tool adapter metrics (written at once if write-behind is off)."""
+        fields = {
+            "last_active_timestamp": profile.last_active_timestamp,
+            "tool_adapter_metrics": profile.tool_adapter_metrics.model_dump(mode="json"),
+        }
+        if not self.write_behind_enabled:
+            await self._run(db_manager.update_profile_activity, {profile.user_id: fields})
+            return
+        self._ensure_flusher()
+        self._buffer(profile.user_id, fields)
+
+    def _buffer(self, user_id: str, fields: Dict[str, Any]) -> None:
+        with self._pending_lock:
+            pending = self._pending.setdefault(user_id, {})
+            if "last_active_timestamp" in fields and pending.get("last_active_timestamp", 0) > fields["last_active_timestamp"]:
+                fields = {k: v for k, v in fields.items() if k != "last_active_timestamp"}
+            pending.update(fields)
+            self._buffered += 1
+
+    def _get_flush_lock(self) -> asyncio.Lock:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    async def flush(self) -> int:
+        """Writes the buffered updates in one transaction. Returns the number of profiles updated."""
+        async with self._get_flush_lock():
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                updated = await self._run(db_manager.update_profile_activity, batch)
+            except Exception as e:
+                self._flush_errors += 1
+                with self._pending_lock:
+                    # Newer values buffered during the failed flush take precedence
+                    for user_id, fields in batch.items():
+                        self._pending[user_id] = {**fields, **self._pending.get(user_id, {})}
+                log.warning(f"Profile write-behind flush of {len(batch)} user(s) failed, will retry: {e}")
+                return 0
+            self._flushes += 1
+            self._flushed_rows += updated
+            log.debug(f"Flushed activity updates for {len(batch)} user(s) ({updated} updated)")
+            return updated
+
+    def _ensure_flusher(self) -> None:
+        if not self.write_behind_enabled or self._closed or (self._flusher is not None and not self._flusher.done()):
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+        except RuntimeError:
+            pass  # No running loop; close() flushes whatever was buffered
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stops the periodic flush, writes what is buffered and releases the thread pool."""
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        if self.write_behind_enabled:
+            set_last_active_writer(None)
+        self._executor.shutdown(wait=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "lookups": self._lookups,
+            "coalesced_lookups": self._coalesced,
+            "in_flight": len(self._in_flight),
+            "write_behind_enabled": self.write_behind_enabled,
+            "pending_users": pending,
+            "buffered_updates": self._buffered,
+            "flushes": self._flushes,
+            "flushed_rows": self._flushed_rows,
+            "flush_errors": self._flush_errors,
+        }
+
+
+_repository: Optional[ProfileRepository] = None
+_repository_lock = threading.Lock()
+
+
+def _repository_settings(config: Any) -> Dict[str, Any]:
+    """The PROFILE_REPOSITORY section of the app config, tolerating partial or mocked configs."""
+    settings = getattr(config, "PROFILE_REPOSITORY", None) if config is not None else None
+    if not isinstance(settings, dict):
+        return {}
+    return {key: settings[key] for key in ("write_behind_enabled", "flush_interval_seconds", "max_workers") if key in settings}
+
+
+def get_profile_repository(config: Any = None) -> ProfileRepository:
+    """The process-wide repository, built from ``config`` on first use."""
+    global _repository
+    repository = _repository
+    if repository is None:
+        with _repository_lock:
+            repository = _repository
+            if repository is None:
+                repository = _repository = ProfileRepository(**_repository_settings(config))
+    return repository
+
+
+async def close_profile_repository() -> None:
+    """Flush buffered updates and shut the repository down (application shutdown)."""
+    global _repository
+    with _repository_lock:
+        repository, _repository = _repository, None
+    if repository is not None:
+        await repository.close()
+
+
+def profile_repository_metrics() -> Dict[str, Any]:
+    return _repository.metrics() if _repository is not None else {}
@@ -1,8 +1,8 @@
 from functools import wraps
-from typing import Callable, Any, Optional, TYPE_CHECKING
+from typing import Callable, Any, Dict, Optional, Tuple, TYPE_CHECKING
 import inspect
 
-from user_auth.permissions import Permission, PermissionManager
+from user_auth.permissions import Permission
 from user_auth.models import UserProfile
 from config import get_config 
 import logging 
@@ -30,108 +30,106 @@ def requires_permission(permission_name: Permission, fallback_permission: Option
                              passed to the wrapped function.
     """
     def decorator(func: Callable) -> Callable:
-        # Check if the original function is async
-        is_async_func = inspect.iscoroutinefunction(func)
-        
-        if is_async_func:
+        # The permission check itself is synchronous (a bitset test on the turn's AppState),
+        # so both wrappers run it inline and call the tool directly
+        if inspect.iscoroutinefunction(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs) -> Any:
-                return await _execute_with_permission_check(func, is_async_func, permission_name, fallback_permission, args, kwargs)
+                denial, call_args, call_kwargs = _check_permission(func, permission_name, fallback_permission, args, kwargs)
+                if denial is not None:
+                    return denial
+                return await func(*call_args, **call_kwargs)
             return async_wrapper
         else:
             @wraps(func)
             def sync_wrapper(*args, **kwargs) -> Any:
-                # For sync functions, execute permission check and function synchronously
-                import asyncio
-                
-                # Check if we're already in an async context (e.g., during tests)
-                try:
-                    # Try to get the current event loop
-                    current_loop = asyncio.get_running_loop()
-                    # If we're in an event loop, we need to run in a thread to avoid "RuntimeError: Cannot run the event loop while another loop is running"
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(
-                            lambda: asyncio.run(_execute_with_permission_check(func, is_async_func, permission_name, fallback_permission, args, kwargs))
-                        )
-                        return future.result()
-                except RuntimeError:
-                    # No running event loop, we can safely use asyncio.run()
-                    return asyncio.run(_execute_with_permission_check(func, is_async_func, permission_name, fallback_permission, args, kwargs))
+                denial, call_args, call_kwargs = _check_permission(func, permission_name, fallback_permission, args, kwargs)
+                if denial is not None:
+                    return denial
+                return func(*call_args, **call_kwargs)
             return sync_wrapper
     return decorator
 
-async def _execute_with_permission_check(func: Callable, is_async_func: bool, permission_name: Permission, fallback_permission: Optional[Permission], args, kwargs) -> Any:
-    app_config = get_config()
-    app_state: Optional['AppState'] = None
 
-    # Attempt to find AppState instance
+def _find_app_state(args, kwargs) -> Optional['AppState']:
+    """Locate the AppState among the call's arguments."""
     # Priority 1: Keyword argument named 'app_state'
     if 'app_state' in kwargs and hasattr(kwargs['app_state'], 'current_user'):
-        app_state = kwargs['app_state']
+        return kwargs['app_state']
 
     # Priority 2: Positional arguments
-    if not app_state and args:
+    if args:
         # Scenario 2a: args[0] is 'self' and has 'self.app_state'
         if hasattr(args[0], 'app_state') and \
            hasattr(args[0].app_state, 'current_user') and \
            hasattr(args[0].app_state, 'has_permission'): # Check if self.app_state is AppState-like
-            app_state = args[0].app_state
+            return args[0].app_state
         # Scenario 2b: args[0] *is* an AppState instance
-        elif hasattr(args[0], 'current_user') and hasattr(args[0], 'has_permission'):
-            app_state = args[0]
+        if hasattr(args[0], 'current_user') and hasattr(args[0], 'has_permission'):
+            return args[0]
         # Scenario 2c: args[1] *is* an AppState instance (if args[0] was 'self' but didn't have valid .app_state)
-        elif len(args) > 1 and hasattr(args[1], 'current_user') and hasattr(args[1], 'has_permission'):
-            app_state = args[1]
+        if len(args) > 1 and hasattr(args[1], 'current_user') and hasattr(args[1], 'has_permission'):
+            return args[1]
 
     # Fallback: If not found by specific name/position, iterate through all kwargs values then all args
-    if not app_state:
-        for kw_val in kwargs.values():
-            if hasattr(kw_val, 'current_user') and hasattr(kw_val, 'has_permission'):
-                app_state = kw_val
-                break
-    if not app_state and args:
-        for arg_val in args:
-            if hasattr(arg_val, 'current_user') and hasattr(arg_val, 'has_permission'):
-                app_state = arg_val
-                break
-    
+    for value in list(kwargs.values()) + list(args):
+        if hasattr(value, 'current_user') and hasattr(value, 'has_permission'):
+            return value
+    return None
+
+
+def _call_arguments(args, kwargs, app_state, dedupe_app_state: bool = True) -> Tuple[tuple, Dict[str, Any]]:
+    """
+    Positional and keyword arguments for the wrapped function: the instance (if any)
+    followed by app_state as the second positional argument, unless the function
+    already receives it through ``self.app_state`` or another keyword.
+    """
+    if not (args and app_state):
+        return args, kwargs
+    cleaned_kwargs = {k: v for k, v in kwargs.items() if k != 'app_state'}
+    # args[0] is None for standalone functions - don't pass it
+    if args[0] is None:
+        return (app_state,), cleaned_kwargs
+    if dedupe_app_state:
+        # app_state comes from args[0].app_state, or is already passed in kwargs under a different name
+        if (hasattr(args[0], 'app_state') and args[0].app_state is app_state) or \
+           any(v is app_state for v in cleaned_kwargs.values()):
+            return (args[0],), cleaned_kwargs
+    return (args[0], app_state), cleaned_kwargs
+
+
+def _check_permission(
+    func: Callable,
+    permission_name: Permission,
+    fallback_permission: Optional[Permission],
+    args,
+    kwargs,
+) -> Tuple[Optional[Dict[str, Any]], tuple, Dict[str, Any]]:
+    """
+    Evaluate the permission for one tool call.
+
+    Returns ``(denial, args, kwargs)``: ``denial`` is the PERMISSION_DENIED result to return
+    instead of calling the tool, or None with the arguments to call it with.
+    """
+    app_config = get_config()
+    app_state = _find_app_state(args, kwargs)
+
     # Prepare a clean version of kwargs for the wrapped function,
     # removing decorator-specific or potentially problematic args.
     kwargs_for_actual_call = kwargs.copy()
     kwargs_for_actual_call.pop('tool_config', None) # ToolExecutor might pass this
-    # Do NOT pop 'app_state' here if it was originally passed as a kwarg,
-    # func(*args, **kwargs_for_actual_call) will pass it correctly.
 
     # If RBAC is disabled, bypass permission checks
     if not app_config.settings.security_rbac_enabled:
-        user_id_for_log = "N/A"
-        if app_state and hasattr(app_state, 'current_user') and app_state.current_user:
-            user_id_for_log = app_state.current_user.user_id
-        logger.debug(
-            f"RBAC is disabled. Allowing action '{func.__name__}' for user '{user_id_for_log}' without permission check."
-        )
-        # Ensure app_state is passed correctly. args[0] is self.
-        # Explicitly pass app_state as the second positional arg.
-        # Filter out 'app_state' from kwargs if it exists to prevent multiple values error.
-        cleaned_kwargs = {k: v for k, v in kwargs_for_actual_call.items() if k != 'app_state'}
-        if args and app_state:
-            # Check if args[0] is None (standalone function) - don't pass it
-            if args[0] is None:
-                if is_async_func:
-                    return await func(app_state, **cleaned_kwargs)
-                else:
-                    return func(app_state, **cleaned_kwargs)
-            else: # args[0] is self (the instance)
-                if is_async_func:
-                    return await func(args[0], app_state, **cleaned_kwargs)
-                else:
-                    return func(args[0], app_state, **cleaned_kwargs)
-        else: # Should not typically happen for instance methods if app_state is always expected
-            if is_async_func:
-                return await func(*args, **kwargs_for_actual_call) # Fallback, might still error if app_state missing
-            else:
-                return func(*args, **kwargs_for_actual_call)
+        if logger.isEnabledFor(logging.DEBUG):
+            user_id_for_log = "N/A"
+            if app_state and hasattr(app_state, 'current_user') and app_state.current_user:
+                user_id_for_log = app_state.current_user.user_id
+            logger.debug(
+                f"RBAC is disabled. Allowing action '{func.__name__}' for user '{user_id_for_log}' without permission check."
+            )
+        call_args, call_kwargs = _call_arguments(args, kwargs_for_actual_call, app_state, dedupe_app_state=False)
+        return None, call_args, call_kwargs
 
     # --- RBAC is ENFORCED from here --- 
     if not app_state or not hasattr(app_state, 'current_user'):
@@ -139,7 +137,7 @@ async def _execute_with_permission_check(func: Callable, is_async_func: bool, pe
         return {
             "status": "PERMISSION_DENIED",
             "message": f"Action '{func.__name__}' cannot be performed due to missing user context for permission check."
-        }
+        }, args, kwargs
 
     current_user: Optional[UserProfile] = app_state.current_user
 
@@ -148,102 +146,18 @@ async def _execute_with_permission_check(func: Callable, is_async_func: bool, pe
         return {
             "status": "PERMISSION_DENIED",
             "message": f"Action '{func.__name__}' cannot be performed because the user profile could not be loaded."
-        }
+        }, args, kwargs
 
-    # At this point, app_state and current_user are valid.
-    # Now, use AppState's own has_permission method, which already incorporates the RBAC check
-    # and PermissionManager logic.
+    # AppState.has_permission checks the user's permission bitset, cached for the turn
     if app_state.has_permission(permission_name):
-        cleaned_kwargs = {k: v for k, v in kwargs_for_actual_call.items() if k != 'app_state'}
-        if args and app_state:
-            # Check if args[0] is None (standalone function) - don't pass it
-            if args[0] is None:
-                # For standalone functions, just pass app_state and cleaned_kwargs
-                if is_async_func:
-                    return await func(app_state, **cleaned_kwargs)
-                else:
-                    return func(app_state, **cleaned_kwargs)
-            # Check if app_state comes from args[0].app_state
-            elif hasattr(args[0], 'app_state') and args[0].app_state is app_state:
-                # If app_state is from args[0].app_state, don't add it as a second argument
-                if is_async_func:
-                    return await func(args[0], **cleaned_kwargs)
-                else:
-                    return func(args[0], **cleaned_kwargs)
-            else:
-                # Check if app_state is already being passed in kwargs with a different parameter name
-                app_state_in_kwargs = False
-                for k, v in cleaned_kwargs.items():
-                    if v is app_state:
-                        app_state_in_kwargs = True
-                        break
-                
-                if app_state_in_kwargs:
-                    # If app_state is already in kwargs with a different name, don't add it again
-                    if is_async_func:
-                        return await func(args[0], **cleaned_kwargs)
-                    else:
-                        return func(args[0], **cleaned_kwargs)
-                else:
-                    # Otherwise pass it as the second parameter
-                    if is_async_func:
-                        return await func(args[0], app_state, **cleaned_kwargs)
-                    else:
-                        return func(args[0], app_state, **cleaned_kwargs)
-        else:
-            if is_async_func:
-                return await func(*args, **kwargs_for_actual_call)
-            else:
-                return func(*args, **kwargs_for_actual_call)
-    
-    if fallback_permission and app_state.has_permission(fallback_permission):
-        # Create a new kwargs dict for fallback to avoid modifying the original one
-        kwargs_for_fallback_call_copy = kwargs_for_actual_call.copy()
-        kwargs_for_fallback_call_copy['read_only_mode'] = True
-        
-        cleaned_kwargs_fallback = {k: v for k, v in kwargs_for_fallback_call_copy.items() if k != 'app_state'}
+        call_args, call_kwargs = _call_arguments(args, kwargs_for_actual_call, app_state)
+        return None, call_args, call_kwargs
 
+    if fallback_permission and app_state.has_permission(fallback_permission):
+        kwargs_for_fallback_call = dict(kwargs_for_actual_call, read_only_mode=True)
         logger.debug(f"User '{current_user.user_id}' using fallback permission '{fallback_permission.value}' for {func.__name__}, read_only_mode=True")
-        if args and app_state:
-            # Check if args[0] is None (standalone function) - don't pass it
-            if args[0] is None:
-                # For standalone functions, just pass app_state and cleaned_kwargs
-                if is_async_func:
-                    return await func(app_state, **cleaned_kwargs_fallback)
-                else:
-                    return func(app_state, **cleaned_kwargs_fallback)
-            # Check if app_state comes from args[0].app_state for fallback permission as well
-            elif hasattr(args[0], 'app_state') and args[0].app_state is app_state:
-                # If app_state is from args[0].app_state, don't add it as a second argument
-                if is_async_func:
-                    return await func(args[0], **cleaned_kwargs_fallback)
-                else:
-                    return func(args[0], **cleaned_kwargs_fallback)
-            else:
-                # Check if app_state is already being passed in kwargs with a different parameter name
-                app_state_in_kwargs = False
-                for k, v in cleaned_kwargs_fallback.items():
-                    if v is app_state:
-                        app_state_in_kwargs = True
-                        break
-                
-                if app_state_in_kwargs:
-                    # If app_state is already in kwargs with a different name, don't add it again
-                    if is_async_func:
-                        return await func(args[0], **cleaned_kwargs_fallback)
-                    else:
-                        return func(args[0], **cleaned_kwargs_fallback)
-                else:
-                    # Otherwise pass it as the second parameter
-                    if is_async_func:
-                        return await func(args[0], app_state, **cleaned_kwargs_fallback)
-                    else:
-                        return func(args[0], app_state, **cleaned_kwargs_fallback)
-        else:
-            if is_async_func:
-                return await func(*args, **kwargs_for_fallback_call_copy) # Original fallback kwargs if no args/app_state adjustments
-            else:
-                return func(*args, **kwargs_for_fallback_call_copy)
+        call_args, call_kwargs = _call_arguments(args, kwargs_for_fallback_call, app_state)
+        return None, call_args, call_kwargs
 
     # If neither primary nor fallback permission (if applicable) is met
     denial_message = f"Action '{func.__name__}' requires permission '{permission_name.value}' which you do not have."
@@ -255,4 +169,4 @@ async def _execute_with_permission_check(func: Callable, is_async_func: bool, pe
     return {
         "status": "PERMISSION_DENIED",
         "message": denial_message
-    } 
\ No newline at end of file
+    }, args, kwargs
@@ -1,5 +1,5 @@
 # user_auth/utils.py
-from typing import Optional, Any, List, Dict, Tuple
+from typing import Optional, Any, Callable, List, Dict, Tuple
 import threading
 import time
 import logging
@@ -113,35 +113,22 @@ class ProfileCache:
 # Initialize the profile cache
 _user_profile_cache = ProfileCache(max_size=MAX_CACHE_SIZE)
 
-def get_current_user_profile(turn_context_or_app_state: Any, db_path: Optional[str] = None) -> Optional[UserProfile]:
-    """
-    Retrieves the current UserProfile based on the turn context or app state.
-    Implements efficient thread-safe caching with LRU eviction and uses db_manager for persistence.
-    
-    Args:
-        turn_context_or_app_state: The TurnContext or AppState object for the current turn.
-                                   This needs to provide a way to get the user_id.
-        db_path: Optional path to the SQLite database. If None, db_manager.DB_NAME is used.
+# When set (by ProfileRepository), last_active bumps are handed to this callable
+# for write-behind instead of being saved to the DB on the lookup path
+_last_active_writer: Optional[Callable[[UserProfile], None]] = None
 
-    Returns:
-        The UserProfile for the current user, or None if not found/identifiable.
+def set_last_active_writer(writer: Optional[Callable[[UserProfile], None]]) -> None:
+    """Installs (or, with None, removes) the write-behind sink for last_active updates."""
+    global _last_active_writer
+    _last_active_writer = writer
+
+def resolve_user_id(turn_context_or_app_state: Any) -> Optional[str]:
+    """
+    Returns the user ID for a TurnContext, AppState or similar context object,
+    or None if it cannot be determined.
     """
     user_id: Optional[str] = None
-    activity_obj: Optional[Any] = None # Renamed to avoid conflict with activity var name in some contexts
-    cache_status = "UNKNOWN"
-    
-    # Start precise timing for performance tracking
-    start_time = time.time()
-
-    # Determine database path to use
-    effective_db_path = db_path
-    if effective_db_path is None:
-        app_config = get_config()
-        effective_db_path = app_config.STATE_DB_PATH
-
-    # Try to get activity_obj if the context object has it
-    if hasattr(turn_context_or_app_state, 'activity'):
-        activity_obj = turn_context_or_app_state.activity
+    activity_obj = getattr(turn_context_or_app_state, 'activity', None)
 
     # Extract user_id using a prioritized hierarchy of sources
     
@@ -175,6 +162,40 @@ def get_current_user_profile(turn_context_or_app_state: Any, db_path: Optional[s
             logger.debug(f"Error calling get_session_metadata: {e}")
             pass # Catch if get_session_metadata is not callable or errors
 
+    return user_id
+
+def get_current_user_profile(turn_context_or_app_state: Any, db_path: Optional[str] = None) -> Optional[UserProfile]:
+    """
+    Retrieves the current UserProfile based on the turn context or app state.
+    Implements efficient thread-safe caching with LRU eviction and uses db_manager for persistence.
+    
+    Args:
+        turn_context_or_app_state: The TurnContext or AppState object for the current turn.
+                                   This needs to provide a way to get the user_id.
+        db_path: Optional path to the SQLite database. If None, db_manager.DB_NAME is used.
+
+    Returns:
+        The UserProfile for the current user, or None if not found/identifiable.
+    """
+    user_id: Optional[str] = None
+    activity_obj: Optional[Any] = None # Renamed to avoid conflict with activity var name in some contexts
+    cache_status = "UNKNOWN"
+    
+    # Start precise timing for performance tracking
+    start_time = time.time()
+
+    # Determine database path to use
+    effective_db_path = db_path
+    if effective_db_path is None:
+        app_config = get_config()
+        effective_db_path = app_config.STATE_DB_PATH
+
+    # Try to get activity_obj if the context object has it
+    if hasattr(turn_context_or_app_state, 'activity'):
+        activity_obj = turn_context_or_app_state.activity
+
+    user_id = resolve_user_id(turn_context_or_app_state)
+
     # 4. Final check: ensure we have a valid user ID
     if not user_id:
         logger.warning("Could not determine user_id from the provided context.")
@@ -219,7 +240,10 @@ def get_current_user_profile(turn_context_or_app_state: Any, db_path: Optional[s
                     # This reduces DB writes while still periodically recording activity
                     # Use access count from cache for smarter update policy
                     cache_entry = _user_profile_cache.cache_dict.get(user_id)
-                    if cache_entry:
+                    if _last_active_writer is not None:
+                        # Buffered and coalesced per user, so every hit can record it
+                        _last_active_writer(profile)
+                    elif cache_entry:
                         _, _, access_count = cache_entry
                         
                         # Update DB increasingly less frequently based on access count
@@ -274,7 +298,9 @@ def get_current_user_profile(turn_context_or_app_state: Any, db_path: Optional[s
             # Save updated last_active time back to DB
             try:
                 profile_dict = profile.model_dump()
-                if not db_manager.save_user_profile(profile_dict):
+                if _last_active_writer is not None:
+                    _last_active_writer(profile)
+                elif not db_manager.save_user_profile(profile_dict):
                     logger.error(f"Failed to save updated last_active for user {user_id} to DB.")
                     _CACHE_STATS["errors"] += 1
                 else:
@@ -0,0 +1,102 @@
+"""
+Helpers for running blocking, synchronous iterators off the asyncio event loop.
+
+Many SDKs we depend on (google-generativeai streaming, PyGithub pagination)
+only expose blocking iterators. Iterating them directly inside a coroutine
+stalls every other conversation served by the same loop. ``iterate_in_thread``
+drives such an iterator on a worker thread and hands items back to the loop
+through an ``asyncio.Queue``.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+log = logging.getLogger("utils.async_bridge")
+
+_ITEM = "item"
+_ERROR = "error"
+_DONE = "done"
+
+
+async def iterate_in_thread(
+    make_iterable: Callable[[], Iterable[Any]],
+    executor: Optional[Executor] = None,
+    cancel_event: Optional[threading.Event] = None,
+    max_buffered: int = 0,
+    thread_name: str = "async-bridge",
+) -> AsyncIterator[Any]:
+    """
+    Asynchronously iterate a blocking iterable on a worker thread.
+
+    ``make_iterable`` is called on the worker thread too, so a blocking
+    request that returns the iterable (e.g. ``model.generate_content(...,
+    stream=True)``) also stays off the loop. Exceptions raised by the
+    producer are re-raised in the consumer.
+
+    Closing or cancelling the consumer sets ``cancel_event``; the worker
+    stops after the item it is currently blocked on.
+
+    Args:
+        make_iterable: Zero-argument callable returning the blocking iterable
+        executor: Executor for the worker. By default a dedicated daemon thread
+            is used, so a worker stuck on network I/O never delays process exit
+        cancel_event: Event used to stop the worker; created if not given
+        max_buffered: Items the worker may run ahead of the consumer (0 = unbounded)
+        thread_name: Name of the dedicated worker thread (ignored with an executor)
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = cancel_event or threading.Event()
+    # Back-pressure for the worker thread; released by the consumer per item
+    slots = threading.Semaphore(max_buffered) if max_buffered > 0 else None
+
+    def publish(kind: str, payload: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, payload))
+        except RuntimeError:
+            # Loop already closed: nobody is listening any more
+            cancelled.set()
+
+    def produce() -> None:
+        try:
+            for item in make_iterable():
+                if slots is not None:
+                    while not slots.acquire(timeout=0.1):
+                        if cancelled.is_set():
+                            return
+                if cancelled.is_set():
+                    return
+                publish(_ITEM, item)
+        except BaseException as e:  # noqa: B036 - forwarded to the consumer
+            publish(_ERROR, e)
+        finally:
+            publish(_DONE, None)
+
+    if executor is not None:
+        worker: Optional[asyncio.Future] = loop.run_in_executor(executor, produce)
+    else:
+        worker = None
+        threading.Thread(target=produce, name=thread_name, daemon=True).start()
+    try:
+        while True:
+            kind, payload = await queue.get()
+            if kind == _ITEM:
+                if slots is not None:
+                    slots.release()
+                yield payload
+            elif kind == _ERROR:
+                raise payload
+            else:
+                break
+    finally:
+        cancelled.set()
+        if worker is not None and not worker.done():
+            # Don't await: the worker may be blocked on network I/O
+            worker.add_done_callback(_log_worker_failure)
+
+
+def _log_worker_failure(future: "asyncio.Future[Any]") -> None:
+    if not future.cancelled() and future.exception() is not None:
+        log.debug(f"Background iterator worker ended with: {future.exception()!r}")